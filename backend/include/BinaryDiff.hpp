@@ -0,0 +1,60 @@
+#pragma once
+
+#include "ByteCompare.hpp"
+#include <cstdint>
+#include <functional>
+#include <string>
+#include <vector>
+
+namespace vmtool {
+
+// Reads up to `length` bytes at `offset` into `out`; returns the bytes read
+using ReadFn = std::function<size_t(uint64_t offset, size_t length, char *out)>;
+
+// One non-equal stretch of an insertion-aware diff: old bytes [a_begin, a_end)
+// became new bytes [b_begin, b_end). Delete has an empty new side, Insert an
+// empty old side.
+struct BinaryEdit {
+    enum Kind { Replace, Delete, Insert };
+    Kind kind;
+    uint64_t a_begin, a_end;
+    uint64_t b_begin, b_end;
+};
+
+struct BinaryDiffOptions {
+    size_t chunk_size = 1024 * 1024; // bytes compared per step (and read per side)
+    size_t max_ranges = 10000;       // ranges/edits kept; counting continues past it
+    bool shift = false;              // insertion-aware mode
+    size_t lookahead = 64 * 1024;    // shift mode: bytes searched for a resync point
+    size_t window = 32;              // shift mode: bytes that must match to resync
+    size_t preview_count = 64;       // ranges/edits that get a byte preview
+    size_t preview_bytes = 32;       // bytes kept per side per preview
+};
+
+struct BinaryDiffResult {
+    uint64_t differing_bytes = 0;         // aligned: bytes that differ (length difference included);
+                                          // shift: bytes in edits, counted on the longer side
+    uint64_t range_count = 0;             // ranges/edits found, including those not kept
+    std::vector<ByteRange> ranges;        // aligned mode
+    std::vector<BinaryEdit> edits;        // shift mode
+    std::vector<std::pair<std::string, std::string>> previews; // first bytes of the first ranges/edits
+    bool truncated = false;               // more than max_ranges found
+};
+
+// Compare two byte streams of known size chunk by chunk, with memory bounded by
+// the chunk size (plus the lookahead in shift mode) however large the inputs.
+// Equal chunks are skipped with memcmp; differing ones are scanned a word at a
+// time. Both sides are read in parallel.
+//
+// Aligned mode compares offset by offset and reports differing byte ranges; a
+// size difference is one range at the end. Shift mode re-synchronises after a
+// mismatch: windows of the old stream in the next `lookahead` bytes are indexed
+// by a rolling hash, the new stream is rolled forward until a window matches,
+// and the skipped bytes become a Replace, Delete or Insert edit. Data inserted
+// or removed in the middle then costs one edit instead of a mismatch through to
+// the end of the file.
+BinaryDiffResult diff_streams(const ReadFn &read_a, uint64_t size_a,
+                              const ReadFn &read_b, uint64_t size_b,
+                              const BinaryDiffOptions &options);
+
+} // namespace vmtool
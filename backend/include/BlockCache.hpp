@@ -0,0 +1,102 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <list>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+
+namespace vmtool {
+
+// Host-side identity of a disk image file. Two paths naming the same file share
+// an identity (device + inode); size and mtime form its version, so any change
+// to the image file invalidates what was cached for it. Changes to a qcow2
+// backing file are not tracked.
+struct ImageIdentity {
+    std::string key;          // "<st_dev>:<st_ino>"
+    uint64_t size = 0;
+    int64_t mtime_sec = 0;
+    int64_t mtime_nsec = 0;
+    bool valid = false;       // false if the image could not be stat'ed
+
+    static ImageIdentity of(const std::string &disk_path);
+    bool same_version(const ImageIdentity &other) const {
+        return size == other.size && mtime_sec == other.mtime_sec && mtime_nsec == other.mtime_nsec;
+    }
+};
+
+// Largest block size the block APIs accept: one request reads at most a few of
+// them and BlockStats keeps a table entry per possible byte count of a block
+constexpr size_t kMaxBlockSize = 1024 * 1024;
+
+// Throw std::runtime_error unless block_size is a power of two <= kMaxBlockSize
+void check_block_size(size_t block_size);
+
+// Process-wide, byte-size bounded LRU cache of raw disk ranges keyed by
+// (image identity, offset, length). Shared by every block read, whichever
+// handle or call produced the data. Thread-safe.
+class BlockCache {
+public:
+    struct Stats {
+        uint64_t hits = 0;
+        uint64_t misses = 0;
+        uint64_t evictions = 0;
+        uint64_t invalidations = 0;
+        size_t entries = 0;
+        size_t bytes = 0;
+        size_t capacity = 0;
+    };
+
+    static BlockCache &instance();
+
+    // Copy the cached data for the range into `out`. Returns false on a miss.
+    // The data may be shorter than `length` when the range crosses the end of the disk.
+    bool get(const ImageIdentity &image, uint64_t offset, size_t length, std::string &out);
+
+    // Store the data read for (offset, length)
+    void put(const ImageIdentity &image, uint64_t offset, size_t length, const std::string &data);
+
+    // Device size seen by the appliance for this image version, or 0 if unknown
+    uint64_t device_size(const ImageIdentity &image);
+    void set_device_size(const ImageIdentity &image, uint64_t size);
+
+    Stats stats();
+    void set_capacity(size_t bytes);
+    void clear();
+
+    static constexpr size_t kDefaultCapacity = 64 * 1024 * 1024;
+
+private:
+    BlockCache() = default;
+
+    struct Entry {
+        std::string key;
+        std::string image;
+        std::string data;
+    };
+
+    struct ImageState {
+        ImageIdentity version;
+        uint64_t device_size = 0;
+    };
+
+    static std::string make_key(const ImageIdentity &image, uint64_t offset, size_t length);
+
+    // Drop every entry of an image whose file changed since it was cached (lock held)
+    void check_version_locked(const ImageIdentity &image);
+    void evict_locked();
+
+    std::mutex mutex_;
+    std::list<Entry> lru_; // most recently used at the front
+    std::unordered_map<std::string, std::list<Entry>::iterator> index_;
+    std::unordered_map<std::string, ImageState> images_;
+    size_t capacity_ = kDefaultCapacity;
+    size_t bytes_ = 0;
+    uint64_t hits_ = 0;
+    uint64_t misses_ = 0;
+    uint64_t evictions_ = 0;
+    uint64_t invalidations_ = 0;
+};
+
+} // namespace vmtool
@@ -0,0 +1,55 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <utility>
+#include <vector>
+
+namespace vmtool {
+
+// Half-open block range [first, second)
+using BlockRange = std::pair<uint64_t, uint64_t>;
+
+// Differing blocks of a disk comparison stored as sorted, coalesced ranges.
+// Answers heatmap and paging queries without materialising one entry per block,
+// so a scan with millions of differing blocks stays small and quick to query.
+class BlockRangeSet {
+public:
+    // `blocks` must be sorted; [start_block, end_block) is the range that was compared
+    // out of the `total_blocks` the two disks have in common
+    BlockRangeSet(uint64_t start_block, uint64_t end_block, uint64_t total_blocks,
+                  size_t block_size, const std::vector<uint64_t> &blocks);
+
+    uint64_t start_block() const { return start_block_; }
+    uint64_t end_block() const { return end_block_; }
+    uint64_t total_blocks() const { return total_blocks_; }
+    size_t block_size() const { return block_size_; }
+    uint64_t differing_blocks() const { return differing_; }
+    const std::vector<BlockRange> &ranges() const { return ranges_; }
+
+    // Number of windows the compared range is split into at a zoom level (2^zoom,
+    // capped so that a window never covers less than one block)
+    uint64_t window_count(unsigned zoom) const;
+
+    // Blocks covered by window `window` of zoom level `zoom`
+    BlockRange window(unsigned zoom, uint64_t window) const;
+
+    // Number of differing blocks in each of `buckets` equal slices of a window.
+    // Costs O(buckets + ranges inside the window).
+    std::vector<uint64_t> heatmap(unsigned zoom, uint64_t window, size_t buckets) const;
+
+    // Up to `limit` differing block numbers >= from_block, in ascending order
+    std::vector<uint64_t> blocks_from(uint64_t from_block, size_t limit) const;
+
+    static constexpr unsigned kMaxZoom = 40;
+
+private:
+    uint64_t start_block_;
+    uint64_t end_block_;
+    uint64_t total_blocks_;
+    size_t block_size_;
+    uint64_t differing_ = 0;
+    std::vector<BlockRange> ranges_;
+};
+
+} // namespace vmtool
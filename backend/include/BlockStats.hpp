@@ -0,0 +1,52 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <vector>
+
+namespace vmtool {
+
+// Per-block content statistics of a disk range: an all-zero flag (one bit per
+// block) and the Shannon entropy of the block's bytes (one byte per block, in
+// 1/32 bit-per-byte units, so 0 = constant data and 255 ~ 8.0 = random data).
+// Filled by feeding consecutive chunks of the range to add().
+class BlockStats {
+public:
+    BlockStats(uint64_t start_block, size_t block_size);
+
+    // Append the statistics of consecutive blocks. `size` must be a multiple of
+    // block_size except for the last chunk of the range, whose tail block may be short.
+    void add(const unsigned char *data, size_t size);
+
+    uint64_t start_block() const { return start_block_; }
+    size_t block_size() const { return block_size_; }
+    uint64_t blocks() const { return entropy_.size(); }
+    uint64_t zero_blocks() const { return zero_count_; }
+
+    bool is_zero(uint64_t i) const { return (zero_[i / 64] >> (i % 64)) & 1; }
+    const std::vector<uint8_t> &entropy() const { return entropy_; }
+    const std::vector<uint64_t> &zero_bitmap() const { return zero_; }
+
+    // Number of (non-zero) blocks with entropy below / at or above a threshold in bits per byte
+    uint64_t count_below(double bits) const;
+    uint64_t count_at_least(double bits) const;
+
+    // Mean entropy (bits per byte) and fraction of zero blocks for each of
+    // `buckets` equal slices of the range, for overview strips
+    void profile(size_t buckets, std::vector<double> &mean_entropy, std::vector<double> &zero_fraction) const;
+
+    // Entropy units per bit per byte
+    static constexpr double kScale = 32.0;
+
+private:
+    uint8_t block_entropy(const unsigned char *data, size_t size);
+
+    uint64_t start_block_;
+    size_t block_size_;
+    uint64_t zero_count_ = 0;
+    std::vector<uint8_t> entropy_;
+    std::vector<uint64_t> zero_;
+    std::vector<double> clog2c_; // c * log2(c) for c = 0..block_size
+};
+
+} // namespace vmtool
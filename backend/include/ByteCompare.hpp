@@ -0,0 +1,22 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <utility>
+#include <vector>
+
+namespace vmtool {
+
+// Half-open byte range [first, second)
+using ByteRange = std::pair<uint64_t, uint64_t>;
+
+// Compare two equally sized buffers a word at a time.
+// Writes 1 into mask[i] where a[i] != b[i] and 0 elsewhere (mask may be null),
+// appends the differing runs to `ranges` (may be null) shifted by base_offset,
+// and returns the number of differing bytes.
+size_t diff_mask(const unsigned char *a, const unsigned char *b, size_t size,
+                 unsigned char *mask,
+                 std::vector<ByteRange> *ranges,
+                 uint64_t base_offset = 0);
+
+} // namespace vmtool
@@ -0,0 +1,67 @@
+#pragma once
+
+#include "TreeWalk.hpp"
+#include <array>
+#include <cstdint>
+#include <string>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+namespace vmtool {
+
+// Totals of one owner, group or top-level directory
+struct UsageTotals {
+    int64_t files = 0; // regular files
+    int64_t dirs = 0;
+    int64_t bytes = 0; // sizes of regular files
+};
+
+// Aggregates of walked entries for get_disk_meta_data. Each worker fills its own
+// and the results are merged, so adding needs no locking.
+class DiskStats {
+public:
+    // Bucket 0 holds empty files; bucket k >= 1 sizes in [2^(k-1), 2^k)
+    static constexpr size_t kSizeBuckets = 65;
+    static constexpr size_t kTypeCount = 8;
+
+    explicit DiskStats(size_t top_n = 20) : top_n_(top_n) {}
+
+    // Count one entry under top-level directory `top` ("/" for entries in the root)
+    void add(const TreeEntry &entry, const std::string &top);
+    void merge(DiskStats &&other);
+
+    // "file", "directory", "symlink", "chardev", "blockdev", "fifo", "socket", "other"
+    static const char *type_name(size_t type);
+    static size_t size_bucket(int64_t size);
+
+    int64_t files() const { return type_counts_[0]; }
+    int64_t dirs() const { return type_counts_[1]; }
+    int64_t file_bytes() const { return file_bytes_; }
+    int64_t dir_bytes() const { return dir_bytes_; }
+    const std::array<int64_t, kTypeCount> &type_counts() const { return type_counts_; }
+    const std::array<int64_t, kSizeBuckets> &bucket_files() const { return bucket_files_; }
+    const std::array<int64_t, kSizeBuckets> &bucket_bytes() const { return bucket_bytes_; }
+    const std::unordered_map<int64_t, UsageTotals> &per_uid() const { return per_uid_; }
+    const std::unordered_map<int64_t, UsageTotals> &per_gid() const { return per_gid_; }
+    const std::unordered_map<std::string, UsageTotals> &per_top() const { return per_top_; }
+
+    // The top_n largest regular files, largest first
+    std::vector<TreeEntry> largest() const;
+
+private:
+    void offer_largest(const TreeEntry &entry);
+
+    size_t top_n_;
+    std::array<int64_t, kTypeCount> type_counts_{};
+    std::array<int64_t, kSizeBuckets> bucket_files_{};
+    std::array<int64_t, kSizeBuckets> bucket_bytes_{};
+    int64_t file_bytes_ = 0;
+    int64_t dir_bytes_ = 0;
+    std::unordered_map<int64_t, UsageTotals> per_uid_;
+    std::unordered_map<int64_t, UsageTotals> per_gid_;
+    std::unordered_map<std::string, UsageTotals> per_top_;
+    std::vector<TreeEntry> largest_; // min-heap on size, at most top_n_ entries
+};
+
+} // namespace vmtool
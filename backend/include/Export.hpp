@@ -0,0 +1,76 @@
+#pragma once
+
+#include "Formatters.hpp"
+#include "TreeWalk.hpp"
+#include <cstdint>
+#include <memory>
+#include <string>
+
+namespace vmtool {
+
+enum class ExportFormat { Tsv, Csv, Ndjson, Table };
+enum class ExportCompression { None, Gzip, Zstd };
+
+// "tsv", "csv", "ndjson" or "table"; throws std::invalid_argument otherwise
+ExportFormat parse_export_format(const std::string &name);
+
+// "none", "gzip", "zstd" or "auto" (picked from the output name: .gz, .zst).
+// Throws std::invalid_argument for other names and std::runtime_error when the
+// module was built without the library for that compression.
+ExportCompression parse_export_compression(const std::string &name, const std::string &output_name);
+
+// Byte sink writing to a file descriptor, compressing on the way. The
+// descriptor is not closed. Throws std::runtime_error when a write fails.
+class ExportSink {
+public:
+    ExportSink(int fd, ExportCompression compression);
+    ~ExportSink();
+
+    ExportSink(const ExportSink &) = delete;
+    ExportSink &operator=(const ExportSink &) = delete;
+
+    void write(const char *data, size_t size);
+    // Flush the compressor's trailer; no writes are allowed after it
+    void finish();
+
+    uint64_t bytes_in() const { return bytes_in_; }
+    uint64_t bytes_out() const { return bytes_out_; }
+
+private:
+    struct Codec;
+
+    void write_fd(const char *data, size_t size);
+
+    int fd_;
+    ExportCompression compression_;
+    std::unique_ptr<Codec> codec_;
+    bool finished_ = false;
+    uint64_t bytes_in_ = 0;
+    uint64_t bytes_out_ = 0;
+};
+
+// Formats walked entries as rows and hands them to a sink in 64 KiB pieces.
+// TSV, CSV and NDJSON carry path, type, size, mode (octal), uid, gid,
+// mtime_sec, mtime_nsec and target; the table matches write_files_with_metadata
+// (Size, Permission, Last Modified, Name).
+class ExportWriter {
+public:
+    ExportWriter(ExportSink &sink, ExportFormat format);
+
+    void header();
+    void row(const TreeEntry &entry);
+    void finish();
+
+    uint64_t rows() const { return rows_; }
+
+private:
+    void flush();
+
+    ExportSink &sink_;
+    ExportFormat format_;
+    std::string buffer_;
+    TimeFormatter format_mtime_;
+    uint64_t rows_ = 0;
+};
+
+} // namespace vmtool
@@ -0,0 +1,91 @@
+#pragma once
+
+#include "BlockCache.hpp"
+#include "GuestSession.hpp"
+#include <cstddef>
+#include <cstdint>
+#include <list>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <unordered_set>
+
+namespace vmtool {
+
+// Process-wide, content-addressed cache of whole guest files on the host.
+// Contents live once in a blob store keyed by (content hash, size), so the same
+// /etc/passwd of a dozen cloned images costs one copy; a file map ties
+// (image identity, guest path) to a blob together with the inode, mtime and size
+// the guest reported when it was read. Blobs are evicted least recently used
+// once their total size exceeds the capacity; a file whose blob was evicted is
+// a miss. Thread-safe.
+class FileCache {
+public:
+    struct Stats {
+        uint64_t hits = 0;
+        uint64_t misses = 0;
+        uint64_t evictions = 0;
+        uint64_t shared = 0;   // puts whose content was already stored
+        size_t files = 0;
+        size_t blobs = 0;
+        size_t bytes = 0;
+        size_t capacity = 0;
+    };
+
+    static FileCache &instance();
+
+    // Contents of `path` as last read from this version of the image. Needs no
+    // appliance: an unchanged image file means unchanged guest files. Misses are
+    // not counted here; callers go on to the stat-checked lookup, which counts them.
+    bool get(const ImageIdentity &image, const std::string &path, std::string &out);
+
+    // As above, but also accept an entry stored for an older version of the image
+    // when the guest still reports the same inode, mtime and size for the file
+    bool get(const ImageIdentity &image, const std::string &path, const GuestStat &st, std::string &out);
+
+    // Store the whole contents of a regular file (data.size() must equal st.size).
+    // Files larger than a quarter of the capacity are not kept.
+    void put(const ImageIdentity &image, const std::string &path, const GuestStat &st, const std::string &data);
+
+    Stats stats();
+    void set_capacity(size_t bytes);
+    void clear();
+
+    static constexpr size_t kDefaultCapacity = 128 * 1024 * 1024;
+
+private:
+    FileCache() = default;
+
+    struct Blob {
+        std::string key;                // "<hash>:<size>"
+        std::string data;
+        std::unordered_set<std::string> files; // file map keys pointing at this blob
+    };
+
+    struct FileEntry {
+        ImageIdentity version;
+        int64_t ino = 0;
+        int64_t mtime_sec = 0;
+        int64_t mtime_nsec = 0;
+        int64_t size = 0;
+        std::string blob;
+    };
+
+    static std::string file_key(const ImageIdentity &image, const std::string &path);
+    // Look up the blob of a file entry; drops the entry if the blob is gone (lock held)
+    bool fetch_locked(std::unordered_map<std::string, FileEntry>::iterator it, std::string &out);
+    void evict_locked();
+
+    std::mutex mutex_;
+    std::list<Blob> lru_; // most recently used at the front
+    std::unordered_map<std::string, std::list<Blob>::iterator> blobs_;
+    std::unordered_map<std::string, FileEntry> files_;
+    size_t capacity_ = kDefaultCapacity;
+    size_t bytes_ = 0;
+    uint64_t hits_ = 0;
+    uint64_t misses_ = 0;
+    uint64_t evictions_ = 0;
+    uint64_t shared_ = 0;
+};
+
+} // namespace vmtool
@@ -0,0 +1,63 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+namespace vmtool {
+
+// Owning byte buffer exposed to Python through the buffer protocol, so raw
+// reads can be handed out as a memoryview without copying.
+struct ByteBuffer {
+    std::string data;
+};
+
+// Uppercase spaced hex bytes: "00 0F 1A 2B"
+std::string format_hex(const unsigned char *data, size_t size);
+
+// Continuous bitstring, 8 characters per byte: "00000001..."
+std::string format_bits(const unsigned char *data, size_t size);
+
+// Multi-line dump with offsets, one row per line joined by '\n':
+//  - format == "hex":  16 bytes per row, "0000: 00 0F 1A ..."
+//  - format == "bits":  8 bytes per row, "0000: 0000000000001111..."
+// Offsets are base_offset + row start, uppercase hex padded to at least 4 digits.
+// If ascii is true, each row ends with a "  |....|" printable-ASCII gutter.
+std::string format_dump(const unsigned char *data, size_t size,
+                        const std::string &format,
+                        uint64_t base_offset = 0,
+                        bool ascii = false);
+
+// One row of a dump: absolute offset, data column and printable-ASCII gutter
+struct DumpRow {
+    uint64_t offset;
+    std::string data;
+    std::string ascii;
+};
+
+// The rows format_dump() would print, kept apart so a viewer can lay them out
+// itself. Row sizes are those of format_dump(); rows start at base_offset.
+std::vector<DumpRow> dump_rows(const unsigned char *data, size_t size,
+                               const std::string &format,
+                               uint64_t base_offset = 0);
+
+// Epoch seconds as "YYYY-mm-dd HH:MM:SS" (local time, or UTC), "-" for t <= 0.
+// Meant for formatting many timestamps at once: localtime_r/gmtime_r and
+// strftime run once per distinct minute and the seconds are filled in from the
+// cached "YYYY-mm-dd HH:MM:" text, since files in an image cluster around a
+// few install and update times.
+class TimeFormatter {
+public:
+    explicit TimeFormatter(bool utc = false) : utc_(utc) {}
+    std::string operator()(int64_t t);
+
+private:
+    static constexpr size_t kMaxMinutes = 4096;
+
+    bool utc_;
+    std::unordered_map<int64_t, std::string> minutes_; // minute -> "YYYY-mm-dd HH:MM:" ("" if unformattable)
+};
+
+} // namespace vmtool
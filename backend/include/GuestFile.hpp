@@ -0,0 +1,61 @@
+#pragma once
+
+#include "GuestSession.hpp"
+#include <cstdint>
+#include <memory>
+#include <mutex>
+#include <string>
+
+namespace vmtool {
+
+// Read-only, seekable handle on a file inside a guest image, reading through a
+// pooled session. Small reads are served from a read-ahead buffer refilled with
+// one chunked pread; reads at least as large as the buffer go straight into the
+// caller's memory. Closing (or destroying) the file returns the session to the pool.
+// Misuse (closed file, bad whence, negative position) throws std::invalid_argument,
+// which Python sees as ValueError like on its own file objects.
+class GuestFile {
+public:
+    GuestFile(const std::string &disk_path, const std::string &path, size_t read_ahead);
+    ~GuestFile();
+
+    GuestFile(const GuestFile &) = delete;
+    GuestFile &operator=(const GuestFile &) = delete;
+
+    // Copy up to `length` bytes at the current position into `out` and advance.
+    // Returns 0 at end of file.
+    size_t readinto(char *out, size_t length);
+
+    // Bytes up to and including the next '\n' (or `limit` bytes, or EOF)
+    std::string readline(int64_t limit);
+
+    // whence: 0 = from start, 1 = from current position, 2 = from end
+    uint64_t seek(int64_t offset, int whence);
+    uint64_t tell() const { return pos_; }
+    uint64_t size() const { return size_; }
+
+    void close();
+    bool closed() const { return !session_; }
+
+    const std::string &disk_path() const { return disk_path_; }
+    const std::string &path() const { return path_; }
+
+    static constexpr size_t kDefaultReadAhead = 1024 * 1024;
+
+private:
+    void check_open() const;
+    // Make the buffer cover pos_ (if pos_ < size_); returns bytes available from pos_
+    size_t fill();
+
+    std::string disk_path_;
+    std::string path_;
+    std::shared_ptr<GuestSession> session_;
+    uint64_t size_ = 0;
+    uint64_t pos_ = 0;
+    size_t read_ahead_;
+    std::string buf_;
+    uint64_t buf_offset_ = 0;
+    std::mutex mutex_;
+};
+
+} // namespace vmtool
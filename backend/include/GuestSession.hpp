@@ -0,0 +1,115 @@
+#pragma once
+
+#include <cstdint>
+#include <string>
+#include <vector>
+
+typedef struct guestfs_h guestfs_h;
+
+namespace vmtool {
+
+// Subset of guestfs_statns for one guest path
+struct GuestStat {
+    bool exists = false;
+    int64_t ino = 0;
+    int64_t mode = 0;
+    int64_t nlink = 0;
+    int64_t uid = 0;
+    int64_t gid = 0;
+    int64_t size = 0;
+    int64_t atime_sec = 0;
+    int64_t atime_nsec = 0;
+    int64_t mtime_sec = 0;
+    int64_t mtime_nsec = 0;
+    int64_t ctime_sec = 0;
+    int64_t ctime_nsec = 0;
+
+    bool is_dir() const { return (mode & 0170000) == 0040000; }
+    bool is_reg() const { return (mode & 0170000) == 0100000; }
+    bool is_link() const { return (mode & 0170000) == 0120000; }
+};
+
+// RAII wrapper around a launched libguestfs handle with one or more drives
+// attached read-only. The handle is closed when the session goes out of scope.
+class GuestSession {
+public:
+    // Adds every disk in order (read-only) and launches the appliance.
+    // Throws std::runtime_error on any failure.
+    explicit GuestSession(const std::vector<std::string> &disk_paths);
+    ~GuestSession();
+
+    GuestSession(const GuestSession &) = delete;
+    GuestSession &operator=(const GuestSession &) = delete;
+
+    guestfs_h *handle() const { return g_; }
+
+    // Number of attached drives and the appliance device name for each (/dev/sda, ...)
+    size_t drive_count() const { return devices_.size(); }
+    const std::string &device(size_t drive) const;
+
+    // Size in bytes of an attached drive
+    uint64_t device_size(size_t drive);
+
+    // Read up to `length` bytes at `offset` from a drive into `out`, splitting the
+    // request into chunks below the libguestfs message limit.
+    // Returns the number of bytes read (short only at end of device).
+    size_t read_device(size_t drive, uint64_t offset, size_t length, char *out);
+
+    // Inspect the guest and mount every filesystem of every OS root read-only,
+    // shortest mountpoint first. Throws if no OS is found.
+    void mount_os();
+
+    // lstat every name in directory `dir`, batching the names into few
+    // guestfs_lstatnslist calls. Missing entries come back with exists == false;
+    // if `dir` itself cannot be listed, every entry is missing.
+    std::vector<GuestStat> lstat_list(const std::string &dir, const std::vector<std::string> &names);
+
+    // Names in a guest directory (no "." or ".."); throws if it cannot be listed
+    std::vector<std::string> list_dir(const std::string &dir);
+
+    // Every path below `dir` (guestfs_find), relative to it and without `dir` itself;
+    // throws if it cannot be listed
+    std::vector<std::string> find(const std::string &dir);
+
+    // Targets of the symlinks `names` in `dir`, batched like lstat_list;
+    // an entry that is not a symlink comes back empty
+    std::vector<std::string> readlink_list(const std::string &dir, const std::vector<std::string> &names);
+
+    // Inodes in use, summed over every mounted filesystem (guestfs_mountpoints and
+    // guestfs_statvfs); 0 when nothing is mounted or the counts are unavailable
+    uint64_t used_inodes();
+
+    // stat a path following symlinks; exists == false if it cannot be stat'ed
+    GuestStat stat(const std::string &path);
+
+    // Names passed per guestfs_lstatnslist call
+    static constexpr size_t kStatBatch = 1000;
+
+    // True while the appliance is up and accepting commands
+    bool alive() const;
+
+    // Size in bytes of a file in the mounted guest; throws if it cannot be stat'ed
+    uint64_t file_size(const std::string &path);
+
+    // Checksum of a guest file computed inside the appliance (csumtype as for
+    // guestfs_checksum, e.g. "sha256"); throws if the file cannot be read
+    std::string checksum(const std::string &csumtype, const std::string &path);
+
+    // Checksum every regular file under a guest directory in one appliance call
+    // (guestfs_checksums_out) and write the "<sum>  ./<path>" lines to a host file
+    void checksums_out(const std::string &csumtype, const std::string &directory,
+                       const std::string &host_file);
+
+    // Read up to `length` bytes at `offset` from a guest file into `out` with
+    // guestfs_pread in bounded chunks. Returns the number of bytes read (short only at EOF).
+    size_t read_file(const std::string &path, uint64_t offset, size_t length, char *out);
+
+    // Maximum bytes requested from the daemon per pread call
+    static constexpr size_t kMaxChunk = 2 * 1024 * 1024;
+
+private:
+    guestfs_h *g_ = nullptr;
+    std::vector<std::string> devices_;
+};
+
+} // namespace vmtool
@@ -0,0 +1,54 @@
+#pragma once
+
+#include "BlockCache.hpp"
+#include <cstdint>
+#include <mutex>
+#include <string>
+
+namespace vmtool {
+
+// Persistent per-image index on the host: named sections of data computed from
+// a disk image (tree checksums, listings, ...) stored as files under
+// directory()/<image key>/. A section is valid only while the image file keeps
+// the size and mtime it had when the section was written; the first lookup
+// after the image changed drops every section stored for it. Thread-safe.
+class ImageIndex {
+public:
+    struct Stats {
+        uint64_t hits = 0;
+        uint64_t misses = 0;
+        uint64_t stores = 0;
+        uint64_t invalidations = 0;
+    };
+
+    static ImageIndex &instance();
+
+    // Copy a stored section into `out`. Returns false if it is missing or stale.
+    bool load(const ImageIdentity &image, const std::string &section, std::string &out);
+
+    // Store (or replace) a section. Failures to write are ignored: the index is a cache.
+    void store(const ImageIdentity &image, const std::string &section, const std::string &data);
+
+    // Root directory of the index: $VMTOOL_INDEX_DIR, else $XDG_CACHE_HOME/vmtool/index,
+    // else ~/.cache/vmtool/index
+    std::string directory();
+    void set_directory(const std::string &path);
+
+    // Remove every stored section of every image and reset the counters. Only the
+    // index's own image directories and files under directory() are touched.
+    void clear();
+    Stats stats();
+
+private:
+    ImageIndex();
+
+    std::string image_dir_locked(const ImageIdentity &image) const;
+    // Make sure the stored sections of an image belong to its current version (lock held)
+    bool check_version_locked(const ImageIdentity &image, bool create);
+
+    std::mutex mutex_;
+    std::string root_;
+    Stats stats_;
+};
+
+} // namespace vmtool
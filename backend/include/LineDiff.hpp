@@ -0,0 +1,104 @@
+#pragma once
+
+#include "ByteCompare.hpp"
+#include <cstddef>
+#include <string>
+#include <string_view>
+#include <vector>
+
+namespace vmtool {
+
+// Lines of `text` without their '\n' (a trailing newline does not start a new line)
+std::vector<std::string_view> split_lines(std::string_view text);
+
+// One run of the edit script: lines [a_begin, a_end) of the old text and
+// [b_begin, b_end) of the new text are equal, deleted or inserted
+struct DiffOp {
+    enum Kind { Equal, Delete, Insert };
+    Kind kind;
+    size_t a_begin, a_end;
+    size_t b_begin, b_end;
+};
+
+// Myers: shortest edit script (O(ND), linear space).
+// Histogram: anchors on lines that are rare in the old text and recurses around
+// them, falling back to Myers where no anchor exists. Usually faster on large,
+// mostly similar files and keeps moved blocks and braces better aligned.
+enum class DiffAlgorithm { Myers, Histogram };
+
+// "myers" or "histogram"; throws std::invalid_argument otherwise
+DiffAlgorithm parse_diff_algorithm(const std::string &name);
+
+// Edit script between two line sequences. The common prefix and suffix are
+// stripped first and lines are interned to integers so comparisons are O(1).
+// When a Myers sub-problem needs more than kMaxCost edits, it is split at the
+// furthest point reached so far instead of searching on (as GNU diff does for
+// expensive inputs), which bounds the time spent on very different files.
+std::vector<DiffOp> diff_lines(const std::vector<std::string_view> &a,
+                               const std::vector<std::string_view> &b,
+                               DiffAlgorithm algorithm = DiffAlgorithm::Myers);
+
+// Byte ranges that differ between two versions of one line, widened to whole
+// UTF-8 characters. Lines longer than kMaxIntralineBytes are not diffed; the
+// whole line is reported as one range.
+void diff_chars(std::string_view a, std::string_view b,
+                std::vector<ByteRange> &a_ranges, std::vector<ByteRange> &b_ranges);
+
+// A unified-diff style hunk: changes plus up to `context` equal lines around them
+struct DiffHunk {
+    size_t a_start, a_count; // 0-based first line and number of old lines covered
+    size_t b_start, b_count;
+    std::vector<DiffOp> ops; // Equal ops are context only
+};
+
+std::vector<DiffHunk> make_hunks(const std::vector<DiffOp> &ops, size_t context);
+
+constexpr int kMaxCost = 4096;
+constexpr size_t kMaxIntralineBytes = 4096;
+
+// Line diff of two texts, kept for paging through the result. Owns both texts;
+// the side-by-side view is a row list where a deleted run facing an inserted
+// run is paired up into Change rows, so only the rows on screen need rendering.
+class TextDiff {
+public:
+    struct Row {
+        enum Kind : uint8_t { Equal, Change, Delete, Insert };
+        Kind kind;
+        int64_t a_line; // 0-based line in the old text, -1 if none
+        int64_t b_line; // 0-based line in the new text, -1 if none
+    };
+
+    TextDiff(std::string a, std::string b, DiffAlgorithm algorithm = DiffAlgorithm::Myers);
+    // The line views point into a_ and b_, so a copy or a move would leave them
+    // dangling (short strings live inside the object); deleting the copy
+    // operations also suppresses the implicit moves
+    TextDiff(const TextDiff &) = delete;
+    TextDiff &operator=(const TextDiff &) = delete;
+
+    const std::vector<DiffOp> &ops() const { return ops_; }
+    const std::vector<Row> &rows() const { return rows_; }
+    std::vector<DiffHunk> hunks(size_t context) const { return make_hunks(ops_, context); }
+
+    // Row index where each block of changes starts (for next/previous change navigation)
+    const std::vector<size_t> &change_starts() const { return change_starts_; }
+
+    std::string_view a_line(size_t i) const { return a_lines_[i]; }
+    std::string_view b_line(size_t i) const { return b_lines_[i]; }
+    size_t a_line_count() const { return a_lines_.size(); }
+    size_t b_line_count() const { return b_lines_.size(); }
+
+    size_t added() const { return added_; }
+    size_t removed() const { return removed_; }
+    bool identical() const { return added_ == 0 && removed_ == 0; }
+
+private:
+    std::string a_, b_;
+    std::vector<std::string_view> a_lines_, b_lines_;
+    std::vector<DiffOp> ops_;
+    std::vector<Row> rows_;
+    std::vector<size_t> change_starts_;
+    size_t added_ = 0;
+    size_t removed_ = 0;
+};
+
+} // namespace vmtool
@@ -0,0 +1,72 @@
+#pragma once
+
+#include "PathSet.hpp"
+#include <cstddef>
+#include <cstdint>
+#include <memory>
+#include <regex>
+#include <string>
+#include <string_view>
+#include <vector>
+
+namespace vmtool {
+
+// Trigram index over a PathSet: for every 3-byte sequence occurring in some path,
+// the sorted indices of the paths that contain it, stored as delta varints.
+// A query intersects the lists of the trigrams its pattern must contain, so only
+// the candidates left are checked against the pattern itself.
+class TrigramIndex {
+public:
+    TrigramIndex() = default;
+    explicit TrigramIndex(const PathSet &paths);
+
+    // Number of paths of the PathSet the index was built from
+    size_t path_count() const { return path_count_; }
+    size_t trigram_count() const { return keys_.size(); }
+    size_t memory_bytes() const;
+
+    // Indices of the paths containing every one of `literals`, sorted. Literals
+    // shorter than 3 bytes do not narrow the search; `all` is set to true (and
+    // nothing returned) when no literal does.
+    std::vector<uint32_t> candidates(const std::vector<std::string> &literals, bool &all) const;
+
+    // Bytes for the image index; deserialize() throws std::runtime_error on malformed data
+    std::string serialize() const;
+    static TrigramIndex deserialize(std::string_view bytes);
+
+private:
+    std::vector<uint32_t> postings(size_t key_index) const;
+
+    size_t path_count_ = 0;
+    std::vector<uint32_t> keys_;    // sorted trigrams (three bytes, big-endian)
+    std::vector<uint32_t> counts_;  // paths per trigram
+    std::vector<uint64_t> offsets_; // start of each posting list in data_, plus the end
+    std::string data_;
+};
+
+enum class SearchMode { Substring, Glob, Regex };
+
+// "substring", "glob" or "regex"; throws std::invalid_argument otherwise
+SearchMode parse_search_mode(const std::string &name);
+
+// A compiled search pattern. Substrings match anywhere in the path. Globs use
+// fnmatch(3) against the whole path when they contain '/', else against the
+// last component (like find -name). Regexes (ECMAScript) match anywhere in the path.
+// Throws std::invalid_argument for an invalid regex.
+class PathPattern {
+public:
+    PathPattern(const std::string &pattern, SearchMode mode);
+
+    bool matches(const std::string &path) const;
+    // Substrings every matching path contains (for TrigramIndex::candidates)
+    const std::vector<std::string> &literals() const { return literals_; }
+
+private:
+    std::string pattern_;
+    SearchMode mode_;
+    bool whole_path_ = false;
+    std::unique_ptr<std::regex> regex_;
+    std::vector<std::string> literals_;
+};
+
+} // namespace vmtool
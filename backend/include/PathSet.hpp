@@ -0,0 +1,94 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <iterator>
+#include <string>
+#include <string_view>
+#include <utility>
+#include <vector>
+
+namespace vmtool {
+
+// Sorted, duplicate-free set of paths stored front-coded: paths are grouped in
+// blocks of kBlock; the first path of a block is stored whole and every other one
+// as (bytes shared with the previous path, remaining suffix). Deep listings such
+// as /usr/share/locale/<lang>/LC_MESSAGES/... share most of each path with the
+// one before it, so this takes a fraction of the memory of one std::string per
+// path. Random access decodes at most one block; iteration decodes sequentially.
+class PathSet {
+public:
+    static constexpr size_t kBlock = 16;
+
+    PathSet() = default;
+    // Sorts (only if needed) and drops duplicates
+    explicit PathSet(std::vector<std::string> paths);
+
+    // Append a path greater than the last one; throws std::invalid_argument otherwise
+    void push_back(std::string_view path);
+
+    size_t size() const { return count_; }
+    bool empty() const { return count_ == 0; }
+    std::string at(size_t index) const;
+
+    // Index of the first path >= key (size() if none)
+    size_t lower_bound(std::string_view key) const;
+    bool contains(std::string_view path) const;
+
+    // [first, last) indices of the paths starting with `prefix`
+    std::pair<size_t, size_t> prefix_range(std::string_view prefix) const;
+    // [first, last) indices of the paths below guest directory `dir` (dir itself excluded)
+    std::pair<size_t, size_t> subtree_range(std::string_view dir) const;
+
+    // Bytes held by the encoded paths and the block table, and the bytes the
+    // same paths take as plain characters
+    size_t memory_bytes() const { return data_.capacity() + offsets_.capacity() * sizeof(uint64_t); }
+    uint64_t raw_bytes() const { return raw_bytes_; }
+
+    // Compact byte form for the image index; deserialize() throws std::runtime_error
+    // on malformed input
+    std::string serialize() const;
+    static PathSet deserialize(std::string_view bytes);
+
+    // Forward iterator decoding one path per step
+    class const_iterator {
+    public:
+        using iterator_category = std::forward_iterator_tag;
+        using value_type = std::string;
+        using difference_type = std::ptrdiff_t;
+        using pointer = const std::string *;
+        using reference = const std::string &;
+
+        const_iterator() = default;
+        reference operator*() const { return current_; }
+        pointer operator->() const { return &current_; }
+        const_iterator &operator++();
+        const_iterator operator++(int) { const_iterator old = *this; ++*this; return old; }
+        bool operator==(const const_iterator &other) const { return index_ == other.index_; }
+        bool operator!=(const const_iterator &other) const { return index_ != other.index_; }
+        size_t index() const { return index_; }
+
+    private:
+        friend class PathSet;
+        const_iterator(const PathSet *set, size_t index);
+        void decode();
+
+        const PathSet *set_ = nullptr;
+        size_t index_ = 0;
+        size_t pos_ = 0; // offset of the next entry in data_
+        std::string current_;
+    };
+
+    const_iterator begin() const { return const_iterator(this, 0); }
+    const_iterator end() const { return const_iterator(this, count_); }
+    const_iterator iterator_at(size_t index) const { return const_iterator(this, index); }
+
+private:
+    std::string data_;
+    std::vector<uint64_t> offsets_; // start of each block in data_
+    std::string last_;              // last path appended
+    size_t count_ = 0;
+    uint64_t raw_bytes_ = 0;
+};
+
+} // namespace vmtool
@@ -0,0 +1,76 @@
+#pragma once
+
+#include "BlockCache.hpp"
+#include "GuestSession.hpp"
+#include <chrono>
+#include <condition_variable>
+#include <cstdint>
+#include <list>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <vector>
+
+namespace vmtool {
+
+// Process-wide pool of launched appliances kept alive between calls. A lease
+// gives exclusive use of a session; when the last reference to it is dropped
+// the session goes back to the pool (if it is still healthy) instead of being
+// shut down. Idle sessions are closed when the images they were launched for
+// change, when they exceed max_idle, when the appliance has died, or after
+// kIdleTimeout without use; a background thread enforces the timeout even when
+// no further calls come in.
+class SessionPool {
+public:
+    struct Stats {
+        uint64_t launches = 0;
+        uint64_t reuses = 0;
+        size_t idle = 0;
+        size_t max_idle = 0;
+    };
+
+    static SessionPool &instance();
+
+    // Lease a session with `disks` attached read-only (and the guest OS mounted
+    // when `mount` is true), reusing an idle one when possible. Thread-safe;
+    // launching happens outside the pool lock.
+    std::shared_ptr<GuestSession> acquire(const std::vector<std::string> &disks, bool mount);
+
+    Stats stats();
+    void set_max_idle(size_t count);
+    void clear();
+
+    static constexpr size_t kDefaultMaxIdle = 2;
+    static constexpr std::chrono::seconds kIdleTimeout{300};
+
+private:
+    SessionPool() = default;
+    ~SessionPool();
+
+    struct Idle {
+        std::string key;
+        std::vector<ImageIdentity> images;
+        std::unique_ptr<GuestSession> session;
+        std::chrono::steady_clock::time_point since;
+    };
+
+    static std::string make_key(const std::vector<ImageIdentity> &images, bool mount);
+    void release(std::unique_ptr<GuestSession> session, std::string key, std::vector<ImageIdentity> images);
+    // Close sessions over the idle limit, past the timeout or no longer alive;
+    // returns them so they close unlocked
+    std::vector<std::unique_ptr<GuestSession>> trim_locked();
+    // Background loop closing idle sessions as they time out
+    void reap();
+
+    std::mutex mutex_;
+    std::list<Idle> idle_; // most recently released at the front
+    size_t max_idle_ = kDefaultMaxIdle;
+    std::condition_variable reaper_wake_;
+    std::thread reaper_; // started by the first release
+    bool stopping_ = false;
+    uint64_t launches_ = 0;
+    uint64_t reuses_ = 0;
+};
+
+} // namespace vmtool
@@ -0,0 +1,34 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <string>
+
+namespace vmtool {
+
+// Incremental Boyer-Moore-Horspool search over a byte stream delivered in
+// chunks. The last (needle length - 1) bytes of each chunk are carried over,
+// so matches that straddle a chunk boundary are found without re-buffering.
+class StreamSearcher {
+public:
+    explicit StreamSearcher(const std::string &needle);
+
+    // Feed the next chunk of the stream. Returns the stream offset of the first
+    // match, or npos if the needle has not appeared yet. Once found, the offset
+    // is returned for every later call.
+    uint64_t feed(const char *data, size_t size);
+
+    static constexpr uint64_t npos = UINT64_MAX;
+
+private:
+    // First match of the needle in hay[0, n), or npos
+    uint64_t search(const char *hay, size_t n) const;
+
+    std::string needle_;
+    size_t shift_[256];
+    std::string tail_;       // last needle_.size() - 1 bytes seen
+    uint64_t consumed_ = 0;  // stream bytes fed so far
+    uint64_t found_ = npos;
+};
+
+} // namespace vmtool
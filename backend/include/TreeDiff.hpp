@@ -0,0 +1,95 @@
+#pragma once
+
+#include "PathSet.hpp"
+#include "TreeWalk.hpp"
+#include <cstdint>
+#include <string>
+#include <vector>
+
+namespace vmtool {
+
+// What differs between two versions of one path, as a bitmask
+enum TreeChangeFlag : uint32_t {
+    kChangeType = 1u << 0,
+    kChangeSize = 1u << 1,
+    kChangeMode = 1u << 2,    // permission bits (07777)
+    kChangeUid = 1u << 3,
+    kChangeGid = 1u << 4,
+    kChangeMtime = 1u << 5,
+    kChangeTarget = 1u << 6,  // symlink target
+    kChangeContent = 1u << 7, // regular file content (size or checksum)
+};
+constexpr uint32_t kAllChanges = 0xFF;
+constexpr uint32_t kMetadataChanges = kAllChanges & ~kChangeContent;
+
+// "type", "size", "mode", "uid", "gid", "mtime", "target", "content" for the set bits
+std::vector<std::string> change_names(uint32_t flags);
+
+// Inverse of change_names(); throws std::invalid_argument on an unknown name
+uint32_t parse_change_names(const std::vector<std::string> &names);
+
+// Changes between two entries of the same path. Content is compared for regular
+// files only: by size, then by checksum when both sides carry one.
+uint32_t compare_entries(const TreeEntry &a, const TreeEntry &b);
+
+// One row of a tree diff
+struct TreeChange {
+    enum Kind : uint8_t { Removed, Added, Modified, Unchanged };
+    Kind kind;
+    int64_t a;      // index in the old listing, -1 if absent
+    int64_t b;      // index in the new listing, -1 if absent
+    uint32_t flags; // compare_entries() & report_mask for Modified rows
+};
+
+struct TreeDiffResult {
+    std::vector<TreeChange> rows; // in path order
+    size_t removed = 0;
+    size_t added = 0;
+    size_t modified = 0;
+    size_t unchanged = 0;
+};
+
+// Merge-join two path-sorted listings (as walk_tree() returns them) in one linear
+// pass. Entries are matched by their path relative to a_root / b_root, so two
+// different directories can be compared. Unchanged rows are only counted unless
+// keep_unchanged is set. Changes outside report_mask are ignored while merging, so
+// a path whose only changes are masked out counts as unchanged and no row is built
+// for it.
+TreeDiffResult diff_trees(const std::vector<TreeEntry> &a, const std::string &a_root,
+                          const std::vector<TreeEntry> &b, const std::string &b_root,
+                          bool keep_unchanged = false, uint32_t report_mask = kAllChanges);
+
+// A tree diff kept together with both listings its rows index into, so the rows
+// can be paged without building them all (diff_files_with_metadata)
+struct MetadataDiff {
+    std::vector<TreeEntry> trees[2];
+    std::vector<TreeChange> rows; // reported rows, in path order
+};
+
+// Two path lists merged into one sorted, categorised row list, kept so callers can
+// page through it (by category or all together) without holding it in Python.
+// Both sets are merged in one linear pass; the merged paths stay front-coded.
+class FileListDiff {
+public:
+    enum Status : uint8_t { Removed, Added, Common }; // only in the first, only in the second, in both
+
+    FileListDiff(const PathSet &first, const PathSet &second);
+
+    size_t size() const { return paths_.size(); }
+    std::string path(size_t row) const { return paths_.at(row); }
+    const PathSet &paths() const { return paths_; }
+    Status status(size_t row) const { return static_cast<Status>(status_[row]); }
+
+    // Rows of one category, in path order
+    const std::vector<uint32_t> &rows_of(Status status) const { return by_status_[status]; }
+    size_t count(Status status) const { return by_status_[status].size(); }
+    size_t total_first() const { return count(Removed) + count(Common); }
+    size_t total_second() const { return count(Added) + count(Common); }
+
+private:
+    PathSet paths_;
+    std::vector<uint8_t> status_;
+    std::vector<uint32_t> by_status_[3];
+};
+
+} // namespace vmtool
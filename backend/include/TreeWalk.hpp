@@ -0,0 +1,36 @@
+#pragma once
+
+#include "GuestSession.hpp"
+#include <functional>
+#include <string>
+#include <vector>
+
+namespace vmtool {
+
+// One entry of a walked guest tree
+struct TreeEntry {
+    std::string path;     // absolute guest path
+    GuestStat st;         // lstat: symlinks are not followed
+    std::string target;   // symlink target (symlinks only)
+    std::string checksum; // content checksum, when filled in by the caller
+};
+
+// Every entry below `root` (root itself excluded) in a mounted session, sorted by
+// path. Each directory costs one guestfs_ls plus batched guestfs_lstatnslist (and
+// guestfs_readlinklist for its symlinks) calls instead of a round trip per path.
+// Subdirectories that cannot be listed are skipped; throws if `root` cannot be.
+std::vector<TreeEntry> walk_tree(GuestSession &session, const std::string &root);
+
+// Receives the entries of one directory (sorted by name, symlink targets filled in);
+// it may move them out
+using TreeVisitor = std::function<void(const std::string &dir, std::vector<TreeEntry> &entries)>;
+
+// walk_tree() without collecting: directories are listed depth-first in name order
+// and handed to `visit` one at a time, so memory stays bounded by one directory plus
+// the directories still to be listed, however many entries the tree has.
+void walk_tree_each(GuestSession &session, const std::string &root, const TreeVisitor &visit);
+
+// Absolute guest directory without a trailing slash ("/" stays "/")
+std::string normalize_guest_dir(std::string dir);
+
+} // namespace vmtool
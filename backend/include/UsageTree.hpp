@@ -0,0 +1,61 @@
+#pragma once
+
+#include "DiskStats.hpp"
+#include "GuestSession.hpp"
+#include <cstddef>
+#include <cstdint>
+#include <string>
+#include <string_view>
+#include <vector>
+
+namespace vmtool {
+
+// Disk usage of every directory of a guest tree (du for all of them at once),
+// built from one batched walk and a bottom-up pass that adds each directory's
+// totals into its parent. Directories are kept in depth-first preorder, so the
+// subtree of a node is the index range [index, end) and children follow their
+// parent in name order; names share one buffer. Small enough to keep in the
+// image index and drill into without walking the image again.
+class UsageTree {
+public:
+    struct Node {
+        uint32_t parent = 0;      // index of the parent directory (the root is its own)
+        uint32_t end = 0;         // one past the last node of this subtree
+        uint32_t name_offset = 0; // last path component, in names_
+        uint32_t name_length = 0;
+        UsageTotals own;          // entries directly in this directory
+        UsageTotals total;        // this directory and everything below it
+    };
+
+    static constexpr size_t npos = static_cast<size_t>(-1);
+
+    // Walk the mounted guest from "/". Directories that cannot be listed have no
+    // node of their own but still count in their parent's dirs.
+    static UsageTree build(GuestSession &session);
+
+    size_t size() const { return nodes_.size(); }
+    const Node &node(size_t index) const { return nodes_[index]; }
+    std::string_view name(size_t index) const;
+    // Absolute guest path of a node ("/" for the root)
+    std::string path(size_t index) const;
+    // Node of guest directory `dir`, or npos if the tree has none
+    size_t find(std::string_view dir) const;
+    // Direct subdirectories of a node, in name order
+    std::vector<size_t> children(size_t index) const;
+
+    size_t memory_bytes() const { return nodes_.capacity() * sizeof(Node) + names_.capacity(); }
+
+    // Bytes for the image index; deserialize() throws std::runtime_error on malformed data
+    std::string serialize() const;
+    static UsageTree deserialize(std::string_view bytes);
+
+private:
+    void add_node(std::string_view name, size_t parent);
+    // Fill every total from the own counts, children before parents
+    void sum_totals();
+
+    std::vector<Node> nodes_;
+    std::string names_;
+};
+
+} // namespace vmtool
@@ -1,9 +1,18 @@
 #pragma once
 
+#include <memory>
+#include <optional>
 #include <string>
+#include <vector>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
+#include "BlockRangeSet.hpp"
+#include "BlockStats.hpp"
+#include "PathSet.hpp"
+#include "LineDiff.hpp"
+#include "TreeDiff.hpp"
+
 namespace vmtool {
 
 // Returns the libguestfs version string
@@ -12,44 +21,158 @@ std::string get_guestfs_version();
 // List all files in a VM disk image with metadata using libguestfs
 pybind11::list list_files_with_metadata(const std::string& disk_path, bool verbose = false);
 
+// Epoch seconds as "YYYY-mm-dd HH:MM:SS" text (local time unless utc), "-" for
+// None or t <= 0. Listings carry raw *_sec/*_nsec integers; callers format only
+// the rows they display, in one call.
+pybind11::list format_times(const std::vector<std::optional<int64_t>>& seconds, bool utc = false);
+
 // Write the entries returned by list_files_with_metadata to a text file in a formatted table
 void write_files_with_metadata(pybind11::list entries, const std::string& output_file);
 
-// Returns a dict with summary stats: files, directories, users, sizes, per-user breakdown
-pybind11::dict get_disk_meta_data(const std::string& disk_path, bool verbose = false);
+// Stream a listing of `directory` (size, mode, owner, mtime, symlink target) straight
+// from the tree walker to `output`, a host path or an open file descriptor (int, not
+// closed), as "tsv", "csv", "ndjson" or a fixed-width "table". compression is
+// "none", "gzip", "zstd" or "auto" (from the .gz/.zst extension). Memory stays
+// constant whatever the number of files. Returns {"output","directory","format",
+// "compression","rows","bytes_uncompressed","bytes_written"}.
+pybind11::dict export_files_with_metadata(const std::string& disk_path,
+                                          const pybind11::object& output,
+                                          const std::string& format = "tsv",
+                                          const std::string& compression = "auto",
+                                          const std::string& directory = "/");
+
+// Returns a dict with summary stats from one walk: files, directories, users, sizes,
+// per-user/group/top-level-directory breakdowns, file types, a log2 size histogram
+// and the top_n largest files
+pybind11::dict get_disk_meta_data(const std::string& disk_path, bool verbose = false, size_t top_n = 20);
 
 // Returns a dict with numbered string keys mapping to {"Size","Permission","Last Modified","Name"}
 pybind11::dict get_files_with_metadata_json(const std::string& disk_path, bool verbose = false);
 
 // Read contents of a file inside the guest image.
 // If binary is true, returns Python bytes; otherwise returns Python str (UTF-8 best effort).
-// If read < 0, reads all; otherwise reads up to 'read' bytes.
+// Only the range [offset, offset + read) is transferred; read < 0 reads to the end of the file.
 // If stop is non-empty, reading stops at the first occurrence of 'stop' (inclusive=false).
 pybind11::object get_file_contents_in_disk(const std::string& disk_path,
                                            const std::string& name,
                                            bool binary = false,
                                            long long read = -1,
-                                           const std::string& stop = "");
+                                           const std::string& stop = "",
+                                           long long offset = 0);
+
+// Read many guest files through one (pooled) appliance. Paths are lstat'ed in one
+// batch per parent directory and each file is read with chunked pread, up to
+// max_bytes bytes per file (-1 for whole files). Symlinks are followed.
+// Returns {path: bytes} for files read and {path: {"error": message}} for the rest.
+pybind11::dict get_files_contents_in_disk(const std::string& disk_path,
+                                          const std::vector<std::string>& paths,
+                                          long long max_bytes = -1);
+
+// Compare one file from each of two disk images. Both appliances are leased from the
+// session pool and stat/hash/read in parallel. Files of equal size are checksummed
+// (sha256) inside the appliances first and reported identical without reading them.
+// Otherwise both are read (up to max_bytes each, -1 = whole file) and diffed:
+// text as unified hunks with `context` lines around each change, binary (NUL in
+// the first 8000 bytes) as differing byte ranges.
+// Returns {"identical","method" ("checksum"|"content"|"missing"),"binary","truncated",
+//          "file1","file2" ({"path","exists","type","size","mode"[,"sha256"]}),
+//          "data1","data2" (bytes), "hunks" ([{"old_start","old_lines","new_start",
+//          "new_lines","lines": [(tag, text)]}], tag in " ", "-", "+"; starts are
+//          1-based), "differing_ranges" ([(start, end)])}.
+// With read_identical, data1 holds the contents of identical files. For text files
+// "diff" is the TextDiff the hunks came from (None otherwise), for paging through a
+// side-by-side view. algorithm: "histogram" (default) or "myers".
+pybind11::dict compare_file_in_disks(const std::string& disk_path1,
+                                     const std::string& path1,
+                                     const std::string& disk_path2,
+                                     const std::string& path2,
+                                     long long max_bytes = -1,
+                                     size_t context = 3,
+                                     bool read_identical = false,
+                                     const std::string& algorithm = "histogram");
+
+// Byte-level comparison of one file from each of two disk images, streamed through
+// two pooled appliances in chunk_size pieces with constant memory. Equal-sized files
+// are checksummed in the guests first. mode "aligned" compares offset by offset and
+// reports differing byte ranges; "shift" resynchronises after inserted or removed
+// bytes and reports edits instead.
+// Returns {"identical","method","mode","file1","file2","differing_bytes","range_count",
+//          "truncated","ranges": [(start, end)],
+//          "edits": [(kind, old_start, old_end, new_start, new_end)] (kind "replace",
+//          "delete" or "insert"), "previews": [(bytes1, bytes2)] for the first ranges/edits}.
+// At most max_ranges ranges/edits are returned; range_count has the full number.
+pybind11::dict diff_binary_file_in_disks(const std::string& disk_path1,
+                                         const std::string& path1,
+                                         const std::string& disk_path2,
+                                         const std::string& path2,
+                                         const std::string& mode = "aligned",
+                                         size_t chunk_size = 1024 * 1024,
+                                         size_t max_ranges = 10000);
+
+// Unified hunks of a TextDiff as returned in compare_file_in_disks()["hunks"]
+pybind11::list text_diff_hunks(const TextDiff& diff, size_t context = 3);
+
+// Side-by-side rows [start, start + count) of a TextDiff as
+// (kind, old_line_no, old_segments, new_line_no, new_segments) with kind in
+// "eq", "chg", "del", "add", 1-based line numbers (None on the empty side) and
+// segments a list of (text, changed). With intraline, "chg" rows mark the
+// characters that changed; otherwise each side is one unchanged segment.
+pybind11::list text_diff_rows(const TextDiff& diff, size_t start, size_t count, bool intraline = true);
+
+// Lines [start, start + count) of one side ("old" or "new") of a TextDiff as str,
+// without line terminators
+pybind11::list text_diff_lines(const TextDiff& diff, const std::string& side, size_t start, size_t count);
 
 // Read contents and return a formatted string based on format:
 //  - format == "hex": returns uppercase hex bytes separated by spaces, e.g. "00 0F 1A 2B"
 //  - format == "bits": returns a continuous bitstring, e.g. "00000001..."
-// The read and stop parameters behave the same as in get_file_contents_in_disk.
+// The read, stop and offset parameters behave the same as in get_file_contents_in_disk.
 pybind11::str get_file_contents_in_disk_format(const std::string& disk_path,
                                                const std::string& name,
                                                const std::string& format, // hex, bits
                                                long long read = -1,
-                                               const std::string& stop = "");
+                                               const std::string& stop = "",
+                                               long long offset = 0);
+
+// File reads up to this many bytes use chunked guestfs_pread with no temporary file;
+// larger reads are streamed through one ranged download into a temporary file.
+constexpr uint64_t kDefaultDownloadThreshold = 16 * 1024 * 1024;
+uint64_t get_download_threshold();
+void set_download_threshold(uint64_t bytes);
 
 // check if a file exists in the guest image
 pybind11::dict check_file_exists_in_disk(const std::string& disk_path, const std::string& name);
 
+// check_file_exists_in_disk for many paths in one session, keyed by the given names.
+// Paths are lstat'ed in one batch per parent directory (symlinks then followed);
+// when the image index holds the image's listing, paths it rules out are answered
+// without the appliance.
+pybind11::dict check_files_exist_in_disk(const std::string& disk_path, const std::vector<std::string>& names);
+
 // list all files from a directory in the guest image
 pybind11::dict list_files_in_directory_in_disk(const std::string& disk_path, const std::string& directory, bool detailed);
 
+// Every path in the image, sorted and front-coded. Kept in the image index, so
+// later calls (and list_all_filenames_in_disk) skip the appliance until the
+// image changes.
+std::shared_ptr<PathSet> list_paths(const std::string& disk_path);
+
+// Paths of the image matching `pattern` (mode "substring", "glob" or "regex"),
+// at most `limit` of them (0: all). A trigram index over list_paths() narrows each
+// search to the paths containing the pattern's literal text; it is kept in the
+// image index next to the listing.
+pybind11::dict search_paths(const std::string& disk_path, const std::string& pattern,
+                            const std::string& mode = "substring", size_t limit = 1000);
+
 // list all files in the disk with serial numbers as keys
 pybind11::dict list_all_filenames_in_disk(const std::string& disk_path, bool verbose = false);
 
+// du-style usage of `directory`: cumulative bytes, files and dirs with its top_n
+// largest subdirectories, nested max_depth levels. Every directory's totals come
+// from one walk kept in the image index, so drilling down does not walk again.
+pybind11::dict usage_tree(const std::string& disk_path, size_t max_depth = 2, size_t top_n = 10,
+                          const std::string& directory = "/");
+
 // list all filenames in a directory with serial numbers as keys
 pybind11::dict list_all_filenames_in_directory(const std::string& disk_path, const std::string& directory, bool verbose = false);
 
@@ -63,6 +186,15 @@ pybind11::dict list_blocks_difference_in_disks(const std::string& disk_path1,
                                                 int64_t start_block = 0,
                                                 int64_t end_block = -1);
 
+// Same scan as list_blocks_difference_in_disks, but the differing blocks are kept in C++
+// as coalesced ranges that answer heatmap (per-bucket counts at a zoom level and window)
+// and paging queries, instead of one Python dict entry per block.
+std::shared_ptr<BlockRangeSet> block_diff_map(const std::string& disk_path1,
+                                              const std::string& disk_path2,
+                                              size_t block_size = 4096,
+                                              int64_t start_block = 0,
+                                              int64_t end_block = -1);
+
 // Read a specific block from a disk image and return its contents in the specified format
 // Returns a dict with block number as key and formatted data as value
 // format: "hex" (uppercase hex bytes separated by spaces) or "bits" (continuous bitstring)
@@ -71,4 +203,123 @@ pybind11::dict get_block_data_in_disk(const std::string& disk_path,
                                        size_t block_size = 4096,
                                        const std::string& format = "hex");
 
+// Read `count` consecutive blocks starting at start_block in a single appliance launch.
+// Returns a read-only memoryview over the raw bytes (no copy); the range is cut
+// short at the end of the disk. Format on demand with format_dump().
+// Blocks are served from the shared block cache when all of them are cached.
+pybind11::memoryview read_blocks(const std::string& disk_path,
+                                 uint64_t start_block,
+                                 uint64_t count = 1,
+                                 size_t block_size = 4096);
+
+// Windowed hex viewer: format `length` bytes (at most kMaxHexdumpWindow) at `offset`
+// of a guest file or of the raw disk as rows of (offset, data, ascii), 16 bytes per
+// row for "hex" and 8 for "bits". Only the window is read, so a viewer can page
+// through a large file or disk a screen at a time. Returns {"disk"[, "path"], "size",
+// "offset", "length", "format", "next_offset", "prev_offset", "rows"}; next_offset is
+// None at the end and prev_offset None at offset 0. Raw disk windows are read as
+// kHexdumpBlockSize blocks through the shared block cache.
+constexpr uint64_t kMaxHexdumpWindow = 1024 * 1024;
+constexpr size_t kHexdumpBlockSize = 4096;
+pybind11::dict hexdump_file_in_disk(const std::string& disk_path,
+                                    const std::string& name,
+                                    uint64_t offset = 0,
+                                    long long length = 4096,
+                                    const std::string& format = "hex");
+pybind11::dict hexdump_disk(const std::string& disk_path,
+                            uint64_t offset = 0,
+                            long long length = 4096,
+                            const std::string& format = "hex");
+
+// Read the same block from two disk images in one appliance launch and compare them.
+// Returns {"block","block_size","data1","data2","diff_mask","differing_bytes",
+//          "differing_ranges","identical"} where data1/data2 are memoryviews of the raw
+// blocks, diff_mask holds one byte per position (1 = differs) and differing_ranges
+// is a list of half-open (start, end) byte offsets within the block.
+pybind11::dict compare_block(const std::string& disk_path1,
+                             const std::string& disk_path2,
+                             uint64_t block_number,
+                             size_t block_size = 4096);
+
+// Per-block zero flags and Shannon entropy of [start_block, end_block) of a disk
+// (end_block -1 = last block), computed in one streaming pass over the device.
+std::shared_ptr<BlockStats> block_stats(const std::string& disk_path,
+                                        size_t block_size = 4096,
+                                        int64_t start_block = 0,
+                                        int64_t end_block = -1);
+
+// Checksums of every regular file under `directory`, computed inside the appliance
+// in one guestfs_checksums_out call and streamed back as (absolute path, checksum)
+// pairs sorted by path. algorithm: crc, md5, sha1, sha224, sha256 (default), sha384
+// or sha512. Results are kept in the persistent image index, so asking again for an
+// unchanged image costs no appliance launch. Call without the GIL held.
+using PathChecksums = std::vector<std::pair<std::string, std::string>>;
+PathChecksums checksum_tree_entries(const std::string& disk_path,
+                                    const std::string& directory = "/",
+                                    const std::string& algorithm = "sha256");
+
+// checksum_tree_entries() as a {path: checksum} dict in path order
+pybind11::dict checksum_tree(const std::string& disk_path,
+                             const std::string& directory = "/",
+                             const std::string& algorithm = "sha256");
+
+// Change report between a directory of one image and a directory of another (or
+// the same) image. Both trees are walked in their own appliance at the same time,
+// with batched lstat/readlink calls per directory, and merge-joined by path relative
+// to each directory. With compare_content, regular files are also compared by
+// checksum (checksum_tree_entries(), so hashes come from the image index when
+// present). Returns {"disk1","dir1","disk2","dir2","total1","total2","removed",
+// "added","modified","unchanged","content_compared","rows"}; each row is
+// {"path" (relative),"status" ("removed","added","modified","unchanged"),"changes"
+// (names from "type","size","mode","uid","gid","mtime","target","content"),
+// "path1","path2","old","new"}. Unchanged rows are left out unless include_unchanged.
+pybind11::dict diff_directories(const std::string& disk_path1,
+                                const std::string& directory1,
+                                const std::string& disk_path2,
+                                const std::string& directory2,
+                                bool compare_content = true,
+                                const std::string& algorithm = "sha256",
+                                bool include_unchanged = false);
+
+// Metadata-only change report between two whole images: both trees are listed at
+// the same time (batched lstat per directory) and merge-joined by path. Rows are
+// {"path","status" ("removed","added","modified"),"flags","changes","old","new"};
+// flags is the change bitmask (TreeChangeFlag). `changes` restricts which kinds of
+// change make a common path count as modified (default: all metadata changes);
+// include_presence=false leaves out paths present in only one image. Only the
+// first `limit` rows are built ("truncated" tells whether there are more); the
+// whole diff stays in C++ as result["diff"] and is paged with metadata_diff_rows().
+pybind11::dict diff_files_with_metadata(const std::string& disk_path1,
+                                        const std::string& disk_path2,
+                                        const std::vector<std::string>& changes = {},
+                                        bool include_presence = true,
+                                        size_t limit = 1000);
+
+// Rows [start, start + count) of a MetadataDiff, as in diff_files_with_metadata()
+pybind11::list metadata_diff_rows(const MetadataDiff& diff, size_t start, size_t count);
+
+// Categorised merge of two path lists (PathSets, iterables of str, or dicts whose
+// values are paths such as list_all_filenames_in_disk returns). Sorted lists are
+// merged in a single linear pass; the result stays in C++ and is paged with file_list_diff_rows().
+std::shared_ptr<FileListDiff> diff_file_lists(const pybind11::object& paths1,
+                                              const pybind11::object& paths2);
+
+// Rows [start, start + count) of a FileListDiff as (path, status) tuples; status is
+// "removed" (only in the first list), "added" (only in the second) or "common".
+// With a status, rows of that category only are paged.
+pybind11::list file_list_diff_rows(const FileListDiff& diff, size_t start, size_t count,
+                                   const std::string& status = "");
+
+// Location and counters of the persistent image index:
+// {"directory", "hits", "misses", "stores", "invalidations"}
+pybind11::dict image_index_stats();
+
+// Counters and usage of the host file cache:
+// {"hits","misses","evictions","shared","files","blobs","bytes","capacity"}
+pybind11::dict file_cache_stats();
+
+// Counters and usage of the shared block cache:
+// {"hits","misses","evictions","invalidations","entries","bytes","capacity"}
+pybind11::dict block_cache_stats();
+
 } // namespace vmtool
\ No newline at end of file
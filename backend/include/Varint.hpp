@@ -0,0 +1,32 @@
+#pragma once
+
+#include <cstddef>
+#include <cstdint>
+#include <string>
+
+namespace vmtool {
+
+// LEB128 varints used by the serialized index sections (PathSet, UsageTree, ...)
+
+inline void put_varint(std::string &out, uint64_t value) {
+    while (value >= 0x80) {
+        out.push_back(static_cast<char>((value & 0x7F) | 0x80));
+        value >>= 7;
+    }
+    out.push_back(static_cast<char>(value));
+}
+
+// Varint at data[pos] into `value`; advances pos. False if it runs past `size`
+// or is longer than 64 bits.
+inline bool read_varint(const char *data, size_t size, size_t &pos, uint64_t &value) {
+    value = 0;
+    for (int shift = 0; shift < 64; shift += 7) {
+        if (pos >= size) return false;
+        uint8_t byte = static_cast<uint8_t>(data[pos++]);
+        value |= static_cast<uint64_t>(byte & 0x7F) << shift;
+        if (!(byte & 0x80)) return true;
+    }
+    return false;
+}
+
+} // namespace vmtool
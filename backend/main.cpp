@@ -1,7 +1,14 @@
+#include <algorithm>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 
 #include "VMTool.hpp"
+#include "../include/BlockCache.hpp"
+#include "../include/FileCache.hpp"
+#include "../include/Formatters.hpp"
+#include "../include/GuestFile.hpp"
+#include "../include/ImageIndex.hpp"
+#include "../include/SessionPool.hpp"
 #include "../include/Converter.hpp"
 #include "../include/vmmanager.hpp"
 
@@ -48,6 +55,342 @@ PYBIND11_MODULE(vmtool, m) {
                 py::arg("dest_format"),
                 "Convert a disk image from src_format to dest_format using qemu-img and return a dict with src/dest/converted/time.");
 
+    // Submodule for the shared LRU cache of raw disk blocks
+    py::module_ bcache = m.def_submodule("block_cache", "Shared LRU cache of raw disk blocks");
+    bcache.def("stats", &vmtool::block_cache_stats,
+               "Return cache counters and usage: hits, misses, evictions, invalidations, entries, bytes, capacity");
+    bcache.def("clear", []() { vmtool::BlockCache::instance().clear(); },
+               "Drop every cached block and reset the counters");
+    bcache.def("set_capacity",
+               [](size_t capacity_bytes) { vmtool::BlockCache::instance().set_capacity(capacity_bytes); },
+               py::arg("capacity_bytes"),
+               "Set the cache size limit in bytes (default 64 MiB); 0 disables caching");
+
+    // Content-addressed cache of whole guest files
+    py::module_ fcache = m.def_submodule("file_cache", "Content-addressed host cache of guest files read from images");
+    fcache.def("stats", &vmtool::file_cache_stats,
+               "Return cache counters and usage: hits, misses, evictions, shared, files, blobs, bytes, capacity");
+    fcache.def("clear", []() { vmtool::FileCache::instance().clear(); },
+               "Drop every cached file and reset the counters");
+    fcache.def("set_capacity",
+               [](size_t capacity_bytes) { vmtool::FileCache::instance().set_capacity(capacity_bytes); },
+               py::arg("capacity_bytes"),
+               "Set the cache size limit in bytes (default 128 MiB); files over a quarter of it are not kept");
+
+    // Persistent per-image index of results computed from images
+    py::module_ iindex = m.def_submodule("image_index", "Persistent per-image index of computed results (tree checksums, ...)");
+    iindex.def("stats", &vmtool::image_index_stats,
+               "Return the index directory and counters: hits, misses, stores, invalidations");
+    iindex.def("clear", []() { vmtool::ImageIndex::instance().clear(); },
+               "Remove every stored section of every image and reset the counters");
+    iindex.def("set_directory",
+               [](const std::string &path) { vmtool::ImageIndex::instance().set_directory(path); },
+               py::arg("path"),
+               "Store the index under `path`; an empty path restores the default\n"
+               "($VMTOOL_INDEX_DIR, else $XDG_CACHE_HOME/vmtool/index, else ~/.cache/vmtool/index)");
+
+    // Pool of launched appliances reused across calls
+    py::module_ spool = m.def_submodule("session_pool", "Pool of launched libguestfs appliances reused between calls");
+    spool.def("stats",
+              []() {
+                  auto s = vmtool::SessionPool::instance().stats();
+                  py::dict out;
+                  out[py::str("launches")] = py::int_(s.launches);
+                  out[py::str("reuses")] = py::int_(s.reuses);
+                  out[py::str("idle")] = py::int_(s.idle);
+                  out[py::str("max_idle")] = py::int_(s.max_idle);
+                  return out;
+              },
+              "Return {'launches','reuses','idle','max_idle'}");
+    spool.def("clear", []() { vmtool::SessionPool::instance().clear(); },
+              "Shut down every idle appliance");
+    spool.def("set_max_idle",
+              [](size_t count) { vmtool::SessionPool::instance().set_max_idle(count); },
+              py::arg("count"),
+              "Number of idle appliances kept for reuse (default 2); 0 disables pooling");
+
+    // Owning byte buffer handed out as a memoryview by raw read functions
+    py::class_<vmtool::ByteBuffer, std::shared_ptr<vmtool::ByteBuffer>>(m, "ByteBuffer", py::buffer_protocol())
+        .def_buffer([](vmtool::ByteBuffer &b) {
+            return py::buffer_info(const_cast<char *>(b.data.data()), 1,
+                                   py::format_descriptor<uint8_t>::format(), 1,
+                                   {static_cast<py::ssize_t>(b.data.size())}, {1},
+                                   /*readonly=*/true);
+        })
+        .def("__len__", [](const vmtool::ByteBuffer &b) { return b.data.size(); });
+
+    // Differing blocks of a comparison kept as coalesced ranges, queried by zoom level and window
+    py::class_<vmtool::BlockRangeSet, std::shared_ptr<vmtool::BlockRangeSet>>(m, "BlockDiffMap")
+        .def_property_readonly("start_block", &vmtool::BlockRangeSet::start_block)
+        .def_property_readonly("end_block", &vmtool::BlockRangeSet::end_block)
+        .def_property_readonly("total_blocks", &vmtool::BlockRangeSet::total_blocks)
+        .def_property_readonly("block_size", &vmtool::BlockRangeSet::block_size)
+        .def_property_readonly("differing_blocks", &vmtool::BlockRangeSet::differing_blocks)
+        .def("ranges", [](const vmtool::BlockRangeSet &s) { return s.ranges(); },
+             "List of (first, end) half-open block ranges that differ")
+        .def("window_count", &vmtool::BlockRangeSet::window_count, py::arg("zoom"),
+             "Number of windows at a zoom level (2^zoom, at most one block per window)")
+        .def("heatmap",
+             [](const vmtool::BlockRangeSet &s, unsigned zoom, uint64_t window, size_t buckets) {
+                 std::vector<uint64_t> counts;
+                 vmtool::BlockRange w;
+                 {
+                     py::gil_scoped_release release;
+                     counts = s.heatmap(zoom, window, buckets);
+                     w = s.window(zoom, window);
+                 }
+                 uint64_t peak = counts.empty() ? 0 : *std::max_element(counts.begin(), counts.end());
+                 py::dict out;
+                 out[py::str("zoom")] = py::int_(zoom);
+                 out[py::str("window")] = py::int_(window);
+                 out[py::str("windows")] = py::int_(s.window_count(zoom));
+                 out[py::str("first_block")] = py::int_(w.first);
+                 out[py::str("end_block")] = py::int_(w.second);
+                 out[py::str("buckets")] = py::int_(buckets);
+                 out[py::str("counts")] = py::cast(counts);
+                 out[py::str("max")] = py::int_(peak);
+                 return out;
+             },
+             py::arg("zoom") = 0,
+             py::arg("window") = 0,
+             py::arg("buckets") = 256,
+             "Count differing blocks in `buckets` equal slices of one window of a zoom level.\n"
+             "Returns {'zoom','window','windows','first_block','end_block','buckets','counts','max'}.")
+        .def("blocks_from", &vmtool::BlockRangeSet::blocks_from,
+             py::arg("from_block") = 0,
+             py::arg("limit") = 100,
+             "Up to `limit` differing block numbers >= from_block, ascending")
+        .def("__len__", &vmtool::BlockRangeSet::differing_blocks);
+
+    // Line diff of two texts, paged into side-by-side rows on demand
+    py::class_<vmtool::TextDiff, std::shared_ptr<vmtool::TextDiff>>(m, "TextDiff")
+        .def_property_readonly("added", &vmtool::TextDiff::added)
+        .def_property_readonly("removed", &vmtool::TextDiff::removed)
+        .def_property_readonly("identical", &vmtool::TextDiff::identical)
+        .def_property_readonly("old_lines", &vmtool::TextDiff::a_line_count)
+        .def_property_readonly("new_lines", &vmtool::TextDiff::b_line_count)
+        .def("rows", &vmtool::text_diff_rows,
+             py::arg("start") = 0,
+             py::arg("count") = 500,
+             py::arg("intraline") = true,
+             "Side-by-side rows [start, start + count) as (kind, old_no, old_segments, new_no,\n"
+             "new_segments); kind is 'eq', 'chg', 'del' or 'add', segments are (text, changed).")
+        .def("lines", &vmtool::text_diff_lines,
+             py::arg("side"),
+             py::arg("start") = 0,
+             py::arg("count") = 10000,
+             "Lines [start, start + count) of the 'old' or 'new' text, without line terminators")
+        .def("hunks", &vmtool::text_diff_hunks,
+             py::arg("context") = 3,
+             "Unified hunks: [{'old_start','old_lines','new_start','new_lines','lines': [(tag, text)]}]")
+        .def("change_starts", [](const vmtool::TextDiff &d) { return d.change_starts(); },
+             "Row index where each block of changes starts")
+        .def("__len__", [](const vmtool::TextDiff &d) { return d.rows().size(); });
+
+    // Front-coded sorted path set (listings, index and diff results)
+    py::class_<vmtool::PathSet, std::shared_ptr<vmtool::PathSet>>(m, "PathSet")
+        .def(py::init([](std::vector<std::string> paths) {
+                 return std::make_shared<vmtool::PathSet>(std::move(paths));
+             }),
+             py::arg("paths"),
+             "Build a PathSet from an iterable of paths (sorted and de-duplicated)")
+        .def_property_readonly("memory_bytes", &vmtool::PathSet::memory_bytes,
+                               "Bytes held by the encoded paths")
+        .def_property_readonly("raw_bytes", &vmtool::PathSet::raw_bytes,
+                               "Bytes the same paths take as plain characters")
+        .def("__len__", &vmtool::PathSet::size)
+        .def("__getitem__",
+             [](const vmtool::PathSet &s, long long index) {
+                 if (index < 0) index += static_cast<long long>(s.size());
+                 if (index < 0 || static_cast<size_t>(index) >= s.size()) {
+                     throw py::index_error("PathSet index out of range");
+                 }
+                 return s.at(static_cast<size_t>(index));
+             })
+        .def("__iter__",
+             [](const vmtool::PathSet &s) { return py::make_iterator(s.begin(), s.end()); },
+             py::keep_alive<0, 1>())
+        .def("__contains__", &vmtool::PathSet::contains)
+        .def("index", &vmtool::PathSet::lower_bound,
+             py::arg("path"),
+             "Index of the first path >= path (binary search)")
+        .def("slice",
+             [](const vmtool::PathSet &s, size_t start, size_t count) {
+                 std::vector<std::string> out;
+                 size_t end = std::min(s.size(), start + std::min(count, s.size()));
+                 for (auto it = s.iterator_at(start); it.index() < end; ++it) out.push_back(*it);
+                 return out;
+             },
+             py::arg("start") = 0,
+             py::arg("count") = 500,
+             "Paths [start, start + count)")
+        .def("prefix_range",
+             [](const vmtool::PathSet &s, const std::string &prefix) { return s.prefix_range(prefix); },
+             py::arg("prefix"),
+             "(first, last) indices of the paths starting with prefix")
+        .def("subtree_range",
+             [](const vmtool::PathSet &s, const std::string &directory) { return s.subtree_range(directory); },
+             py::arg("directory"),
+             "(first, last) indices of the paths below directory (directory itself excluded)");
+
+    // Categorised merge of two path lists, paged from C++
+    py::class_<vmtool::FileListDiff, std::shared_ptr<vmtool::FileListDiff>>(m, "FileListDiff")
+        .def_property_readonly("only_in_first", [](const vmtool::FileListDiff &d) { return d.count(vmtool::FileListDiff::Removed); })
+        .def_property_readonly("only_in_second", [](const vmtool::FileListDiff &d) { return d.count(vmtool::FileListDiff::Added); })
+        .def_property_readonly("common", [](const vmtool::FileListDiff &d) { return d.count(vmtool::FileListDiff::Common); })
+        .def_property_readonly("total_first", &vmtool::FileListDiff::total_first)
+        .def_property_readonly("total_second", &vmtool::FileListDiff::total_second)
+        .def("rows", &vmtool::file_list_diff_rows,
+             py::arg("start") = 0,
+             py::arg("count") = 500,
+             py::arg("status") = "",
+             "Rows [start, start + count) as (path, status), status 'removed', 'added' or 'common'.\n"
+             "Pass a status to page through that category only.")
+        .def("__len__", &vmtool::FileListDiff::size);
+
+    // Whole-image metadata diff (diff_files_with_metadata()["diff"]), paged from C++
+    py::class_<vmtool::MetadataDiff, std::shared_ptr<vmtool::MetadataDiff>>(m, "MetadataDiff")
+        .def("rows", &vmtool::metadata_diff_rows,
+             py::arg("start") = 0,
+             py::arg("count") = 1000,
+             "Rows [start, start + count) as {path, status, flags, changes, old, new}")
+        .def("__len__", [](const vmtool::MetadataDiff &d) { return d.rows.size(); });
+
+    // Per-block zero flags and entropy of a disk range
+    py::class_<vmtool::BlockStats, std::shared_ptr<vmtool::BlockStats>>(m, "BlockStats")
+        .def_property_readonly("start_block", &vmtool::BlockStats::start_block)
+        .def_property_readonly("block_size", &vmtool::BlockStats::block_size)
+        .def_property_readonly("blocks", &vmtool::BlockStats::blocks)
+        .def_property_readonly("zero_blocks", &vmtool::BlockStats::zero_blocks)
+        .def("entropy",
+             [](const vmtool::BlockStats &s) {
+                 auto buffer = std::make_shared<vmtool::ByteBuffer>();
+                 buffer->data.assign(s.entropy().begin(), s.entropy().end());
+                 return py::memoryview(py::cast(buffer));
+             },
+             "memoryview with one byte per block: entropy in 1/32 bits per byte (255 ~ 8.0)")
+        .def("zero_map",
+             [](const vmtool::BlockStats &s) {
+                 auto buffer = std::make_shared<vmtool::ByteBuffer>();
+                 const auto &words = s.zero_bitmap();
+                 buffer->data.resize((s.blocks() + 7) / 8);
+                 for (size_t i = 0; i < buffer->data.size(); ++i) {
+                     buffer->data[i] = static_cast<char>((words[i / 8] >> (8 * (i % 8))) & 0xFF);
+                 }
+                 return py::memoryview(py::cast(buffer));
+             },
+             "memoryview bitmap, bit (i % 8) of byte i // 8 set when block i is all zeros")
+        .def("is_zero",
+             [](const vmtool::BlockStats &s, uint64_t i) {
+                 if (i >= s.blocks()) throw py::index_error("block index out of range");
+                 return s.is_zero(i);
+             },
+             py::arg("index"))
+        .def("count_below", &vmtool::BlockStats::count_below, py::arg("bits"),
+             "Non-zero blocks with entropy below `bits` per byte")
+        .def("count_at_least", &vmtool::BlockStats::count_at_least, py::arg("bits"),
+             "Blocks with entropy of at least `bits` per byte")
+        .def("profile",
+             [](const vmtool::BlockStats &s, size_t buckets) {
+                 std::vector<double> mean_entropy, zero_fraction;
+                 {
+                     py::gil_scoped_release release;
+                     s.profile(buckets, mean_entropy, zero_fraction);
+                 }
+                 py::dict out;
+                 out[py::str("mean_entropy")] = py::cast(mean_entropy);
+                 out[py::str("zero_fraction")] = py::cast(zero_fraction);
+                 return out;
+             },
+             py::arg("buckets") = 256,
+             "Mean entropy and zero-block fraction per bucket: {'mean_entropy': [...], 'zero_fraction': [...]}")
+        .def("__len__", &vmtool::BlockStats::blocks);
+
+    // Read-only seekable guest file; registered as an io.RawIOBase below
+    py::class_<vmtool::GuestFile, std::shared_ptr<vmtool::GuestFile>> guest_file(m, "GuestFile");
+    guest_file
+        .def("readinto",
+             [](vmtool::GuestFile &f, py::buffer b) {
+                 py::buffer_info info = b.request(/*writable=*/true);
+                 size_t length = static_cast<size_t>(info.size * info.itemsize);
+                 py::gil_scoped_release release;
+                 return f.readinto(static_cast<char *>(info.ptr), length);
+             },
+             py::arg("buffer"),
+             "Read into a writable buffer (bytearray, memoryview, numpy array...) without copying; returns bytes read")
+        .def("read",
+             [](vmtool::GuestFile &f, int64_t size) {
+                 uint64_t remaining = f.tell() < f.size() ? f.size() - f.tell() : 0;
+                 uint64_t want = (size < 0) ? remaining : std::min<uint64_t>(remaining, static_cast<uint64_t>(size));
+                 std::string out(static_cast<size_t>(want), '\0');
+                 {
+                     py::gil_scoped_release release;
+                     out.resize(f.readinto(&out[0], out.size()));
+                 }
+                 return py::bytes(out);
+             },
+             py::arg("size") = -1)
+        .def("readall", [](vmtool::GuestFile &f) {
+                 std::string out(static_cast<size_t>(f.tell() < f.size() ? f.size() - f.tell() : 0), '\0');
+                 {
+                     py::gil_scoped_release release;
+                     out.resize(f.readinto(&out[0], out.size()));
+                 }
+                 return py::bytes(out);
+             })
+        .def("readline",
+             [](vmtool::GuestFile &f, int64_t size) {
+                 std::string line;
+                 {
+                     py::gil_scoped_release release;
+                     line = f.readline(size);
+                 }
+                 return py::bytes(line);
+             },
+             py::arg("size") = -1)
+        .def("__iter__", [](py::object self) { return self; })
+        .def("__next__",
+             [](vmtool::GuestFile &f) {
+                 std::string line;
+                 {
+                     py::gil_scoped_release release;
+                     line = f.readline(-1);
+                 }
+                 if (line.empty()) throw py::stop_iteration();
+                 return py::bytes(line);
+             })
+        .def("seek", &vmtool::GuestFile::seek, py::arg("offset"), py::arg("whence") = 0)
+        .def("tell", &vmtool::GuestFile::tell)
+        .def("readable", [](const vmtool::GuestFile &f) {
+                 if (f.closed()) throw py::value_error("I/O operation on closed file");
+                 return true;
+             })
+        .def("seekable", [](const vmtool::GuestFile &f) {
+                 if (f.closed()) throw py::value_error("I/O operation on closed file");
+                 return true;
+             })
+        .def("writable", [](const vmtool::GuestFile &f) {
+                 if (f.closed()) throw py::value_error("I/O operation on closed file");
+                 return false;
+             })
+        .def("isatty", [](const vmtool::GuestFile &) { return false; })
+        .def("flush", [](const vmtool::GuestFile &) {})
+        .def("fileno", [](const vmtool::GuestFile &) -> int {
+                 py::object unsupported = py::module_::import("io").attr("UnsupportedOperation");
+                 PyErr_SetString(unsupported.ptr(), "GuestFile has no file descriptor");
+                 throw py::error_already_set();
+             })
+        .def("close", &vmtool::GuestFile::close, "Close the file and return its appliance to the session pool")
+        .def_property_readonly("closed", &vmtool::GuestFile::closed)
+        .def_property_readonly("size", &vmtool::GuestFile::size)
+        .def_property_readonly("name", &vmtool::GuestFile::path)
+        .def_property_readonly("mode", [](const vmtool::GuestFile &) { return "rb"; })
+        .def_property_readonly("disk_path", &vmtool::GuestFile::disk_path)
+        .def("__enter__", [](py::object self) { return self; })
+        .def("__exit__", [](vmtool::GuestFile &f, py::args) { f.close(); return false; });
+    // isinstance(f, io.RawIOBase) holds and io.BufferedReader(f) works
+    py::module_::import("io").attr("RawIOBase").attr("register")(guest_file);
+
     // Functions
     m.def("get_version", &vmtool::get_guestfs_version,
           "Return the libguestfs version string");
@@ -56,7 +399,16 @@ PYBIND11_MODULE(vmtool, m) {
           &vmtool::list_files_with_metadata,
           py::arg("disk_path"),
           py::arg("verbose") = false,
-          "List all files in a VM disk image with metadata using libguestfs");
+          "List all files in a VM disk image with metadata using libguestfs. Rows are {size, perms, path,\n"
+          "mtime_sec, mtime_nsec, atime_sec, atime_nsec, ctime_sec, ctime_nsec}; format_times() turns the\n"
+          "seconds into text for the rows being shown.");
+
+    m.def("format_times",
+          &vmtool::format_times,
+          py::arg("seconds"),
+          py::arg("utc") = false,
+          "Format epoch seconds (None allowed) as 'YYYY-mm-dd HH:MM:SS' in local time (or UTC), '-' when\n"
+          "missing. One call formats a whole page of rows.");
 
     m.def("write_files_with_metadata",
           &vmtool::write_files_with_metadata,
@@ -64,11 +416,26 @@ PYBIND11_MODULE(vmtool, m) {
           py::arg("output_file"),
           "Write the entries returned by list_files_with_metadata to a text file in a formatted table");
 
+    m.def("export_files_with_metadata",
+          &vmtool::export_files_with_metadata,
+          py::arg("disk_path"),
+          py::arg("output"),
+          py::arg("format") = "tsv",
+          py::arg("compression") = "auto",
+          py::arg("directory") = "/",
+          "Stream a file listing (path, type, size, mode, uid, gid, mtime, symlink target) from the tree\n"
+          "walker straight to a host file or file descriptor, in constant memory. format: 'tsv', 'csv',\n"
+          "'ndjson' or 'table'; compression: 'none', 'gzip', 'zstd' or 'auto' (from a .gz/.zst name).");
+
     m.def("get_disk_meta_data",
           &vmtool::get_disk_meta_data,
           py::arg("disk_path"),
           py::arg("verbose") = false,
-          "Return aggregated metadata for the disk image: counts (files/dirs), total sizes, and per-user breakdown");
+          py::arg("top_n") = 20,
+          "Return aggregated metadata for the disk image from one batched walk (spread over several\n"
+          "sessions on large images): counts (files/dirs), total sizes, per-user, per-group and\n"
+          "per-top-level-directory breakdowns, file type counts, a log2 size histogram and the\n"
+          "top_n largest files");
 
     m.def("get_files_with_metadata_json",
           &vmtool::get_files_with_metadata_json,
@@ -83,9 +450,121 @@ PYBIND11_MODULE(vmtool, m) {
           py::arg("binary") = false,
           py::arg("read") = -1,
           py::arg("stop") = "",
+          py::arg("offset") = 0,
           "Read contents of a file inside the guest. If binary is true returns bytes, else str.\n"
           "read=-1 reads all bytes, otherwise reads up to N bytes. If stop is non-empty, reading\n"
-          "stops at the first occurrence of 'stop' (exclusive).");
+          "stops at the first occurrence of 'stop' (exclusive). offset: first byte to read (default 0).\n"
+          "Only the requested range is transferred from the guest.");
+
+    m.def("get_files_contents_in_disk",
+          &vmtool::get_files_contents_in_disk,
+          py::arg("disk_path"),
+          py::arg("paths"),
+          py::arg("max_bytes") = -1,
+          "Read many files from the guest in one appliance session. Returns a dict mapping each\n"
+          "requested path to its bytes (at most max_bytes per file; -1 reads whole files) or to\n"
+          "{'error': message} when it is missing, a directory or unreadable.");
+
+    m.def("checksum_tree",
+          &vmtool::checksum_tree,
+          py::arg("disk_path"),
+          py::arg("directory") = "/",
+          py::arg("algorithm") = "sha256",
+          "Checksum every regular file under `directory` inside the appliance in one call.\n"
+          "Returns {path: checksum} in path order. algorithm: crc, md5, sha1, sha224, sha256, sha384, sha512.\n"
+          "Results are kept in the persistent image index and reused while the image is unchanged.");
+
+    m.def("diff_directories",
+          &vmtool::diff_directories,
+          py::arg("disk_path1"),
+          py::arg("directory1"),
+          py::arg("disk_path2"),
+          py::arg("directory2"),
+          py::arg("compare_content") = true,
+          py::arg("algorithm") = "sha256",
+          py::arg("include_unchanged") = false,
+          "Change report between two guest directories, walked in two appliances at the same time.\n"
+          "Rows are {path, status (removed/added/modified/unchanged), changes, path1, path2, old, new};\n"
+          "changes lists type/size/mode/uid/gid/mtime/target/content. compare_content checksums regular\n"
+          "files inside the appliances (cached in the image index). Unchanged rows only with include_unchanged.");
+
+    m.def("diff_files_with_metadata",
+          &vmtool::diff_files_with_metadata,
+          py::arg("disk_path1"),
+          py::arg("disk_path2"),
+          py::arg("changes") = std::vector<std::string>{},
+          py::arg("include_presence") = true,
+          py::arg("limit") = 1000,
+          "Metadata change report between two whole images, listed in two appliances at the same time\n"
+          "and merge-joined by path. Rows are {path, status (removed/added/modified), flags, changes, old, new};\n"
+          "flags bits: type=1 size=2 mode=4 uid=8 gid=16 mtime=32 target=64. changes (names) selects which\n"
+          "changes are reported (default: all); include_presence=False drops paths found in one image only.\n"
+          "Only the first `limit` rows are returned (truncated=True if total_rows is larger); the rest are\n"
+          "paged from result['diff'] (a MetadataDiff).");
+
+    m.def("compare_file_in_disks",
+          &vmtool::compare_file_in_disks,
+          py::arg("disk_path1"),
+          py::arg("path1"),
+          py::arg("disk_path2"),
+          py::arg("path2"),
+          py::arg("max_bytes") = -1,
+          py::arg("context") = 3,
+          py::arg("read_identical") = false,
+          py::arg("algorithm") = "histogram",
+          "Compare a file in disk 1 with a file in disk 2 using two pooled appliances in parallel.\n"
+          "Equal-sized files are checksummed in the guests first; identical ones are not read.\n"
+          "Returns identical, method, binary, truncated, file1/file2 info, data1/data2 bytes,\n"
+          "unified hunks plus a TextDiff ('diff') for text and differing_ranges for binary files.");
+
+    m.def("diff_binary_file_in_disks",
+          &vmtool::diff_binary_file_in_disks,
+          py::arg("disk_path1"),
+          py::arg("path1"),
+          py::arg("disk_path2"),
+          py::arg("path2"),
+          py::arg("mode") = "aligned",
+          py::arg("chunk_size") = 1024 * 1024,
+          py::arg("max_ranges") = 10000,
+          "Byte-level compare of a file in disk 1 with a file in disk 2, streamed in chunks with\n"
+          "constant memory. mode 'aligned' returns differing byte 'ranges'; 'shift' detects inserted\n"
+          "and removed bytes and returns 'edits' (kind, old_start, old_end, new_start, new_end).\n"
+          "'previews' holds the first bytes of each side for the first ranges/edits.");
+
+    m.def("diff_file_lists",
+          &vmtool::diff_file_lists,
+          py::arg("paths1"),
+          py::arg("paths2"),
+          "Merge two path lists (PathSets, iterables of str, or {n: path} dicts) into a FileListDiff with counts\n"
+          "and paged rows. Sorted inputs are merged in one linear pass.");
+
+    m.def("diff_text",
+          [](py::buffer a, py::buffer b, const std::string &algorithm) {
+              py::buffer_info ia = a.request(), ib = b.request();
+              std::string sa(static_cast<const char *>(ia.ptr), static_cast<size_t>(ia.size * ia.itemsize));
+              std::string sb(static_cast<const char *>(ib.ptr), static_cast<size_t>(ib.size * ib.itemsize));
+              vmtool::DiffAlgorithm algo = vmtool::parse_diff_algorithm(algorithm);
+              py::gil_scoped_release release;
+              return std::make_shared<vmtool::TextDiff>(std::move(sa), std::move(sb), algo);
+          },
+          py::arg("a"),
+          py::arg("b"),
+          py::arg("algorithm") = "histogram",
+          "Line diff of two texts given as bytes-like objects. Returns a TextDiff; page through it\n"
+          "with rows(start, count) or get unified hunks(context). algorithm: 'histogram' or 'myers'.");
+
+    m.def("open",
+          [](const std::string &disk_path, const std::string &path, size_t read_ahead) {
+              py::gil_scoped_release release;
+              return std::make_shared<vmtool::GuestFile>(disk_path, path, read_ahead);
+          },
+          py::arg("disk_path"),
+          py::arg("path"),
+          py::arg("read_ahead") = vmtool::GuestFile::kDefaultReadAhead,
+          "Open a file inside the guest for reading. Returns a read-only, seekable GuestFile\n"
+          "(registered as io.RawIOBase) supporting readinto(), read(), readline(), seek() and\n"
+          "iteration over lines. Reads go through a pooled appliance with a read-ahead buffer\n"
+          "of read_ahead bytes; use it as a context manager or call close() to release the appliance.");
 
     m.def("get_file_contents_in_disk_format",
           &vmtool::get_file_contents_in_disk_format,
@@ -94,14 +573,31 @@ PYBIND11_MODULE(vmtool, m) {
           py::arg("format"),
           py::arg("read") = -1,
           py::arg("stop") = "",
+          py::arg("offset") = 0,
           "Read contents and return formatted output. format: 'hex' (uppercase spaced hex) or 'bits' (bitstring).\n"
-          "read/stop behave like get_file_contents_in_disk.");
+          "read/stop/offset behave like get_file_contents_in_disk.");
+
+    m.def("get_download_threshold", &vmtool::get_download_threshold,
+          "File reads up to this many bytes use chunked pread with no temporary file (default 16 MiB).");
+
+    m.def("set_download_threshold", &vmtool::set_download_threshold,
+          py::arg("bytes"),
+          "Set the size above which file reads are streamed through a ranged download to a temporary file.");
 
     m.def("check_file_exists_in_disk",    
           &vmtool::check_file_exists_in_disk,
           py::arg("disk_path"),
           py::arg("name"),
-          "Check if a file exists in the guest image.");    
+          "Check if a file exists in the guest image. Timestamps are returned as mtime/atime/ctime\n"
+          "_sec and _nsec integers (None when the path cannot be stat'ed).");    
+
+    m.def("check_files_exist_in_disk",
+          &vmtool::check_files_exist_in_disk,
+          py::arg("disk_path"),
+          py::arg("names"),
+          "check_file_exists_in_disk for many paths at once: a dict keyed by the given names with the\n"
+          "same per-path dicts. One session lstats the paths in one batch per parent directory; paths\n"
+          "the stored listing (list_paths) rules out are answered without the appliance.");
 
     m.def("list_files_in_directory_in_disk",    
           &vmtool::list_files_in_directory_in_disk,
@@ -116,6 +612,37 @@ PYBIND11_MODULE(vmtool, m) {
           py::arg("verbose") = false,
           "List all files in the disk with serial numbers as keys. Returns dict with '1', '2', ... as keys and file paths as values, sorted alphabetically.");
 
+    m.def("list_paths",
+          [](const std::string &disk_path) {
+              py::gil_scoped_release release;
+              return vmtool::list_paths(disk_path);
+          },
+          py::arg("disk_path"),
+          "Every path in the disk as a sorted, front-coded PathSet (iteration, index(), prefix and\n"
+          "subtree ranges). Kept in the image index until the image changes.");
+
+    m.def("search_paths",
+          &vmtool::search_paths,
+          py::arg("disk_path"),
+          py::arg("pattern"),
+          py::arg("mode") = "substring",
+          py::arg("limit") = 1000,
+          "Search the image's paths: mode 'substring', 'glob' (fnmatch; against the last component\n"
+          "unless the pattern has a '/') or 'regex' (ECMAScript, anywhere in the path). Returns\n"
+          "{pattern, mode, total, checked, truncated, paths} with at most limit paths (0: all). A\n"
+          "trigram index over the listing, kept in the image index, narrows the paths checked.");
+
+    m.def("usage_tree",
+          &vmtool::usage_tree,
+          py::arg("disk_path"),
+          py::arg("max_depth") = 2,
+          py::arg("top_n") = 10,
+          py::arg("directory") = "/",
+          "du-style usage of a directory: {path, bytes, files, dirs, own_bytes, own_files, children, more}\n"
+          "with its top_n largest subdirectories nested max_depth levels ('more' counts the ones left\n"
+          "out). Totals for every directory come from one walk kept in the image index, so calls for\n"
+          "other directories or depths do not walk the image again.");
+
     m.def("list_all_filenames_in_directory",
           &vmtool::list_all_filenames_in_directory,
           py::arg("disk_path"),
@@ -136,6 +663,27 @@ PYBIND11_MODULE(vmtool, m) {
           "end_block: ending block number (default -1 for last block)\n"
           "Default block size is 4096 bytes.");
 
+    m.def("block_diff_map",
+          &vmtool::block_diff_map,
+          py::arg("disk_path1"),
+          py::arg("disk_path2"),
+          py::arg("block_size") = 4096,
+          py::arg("start_block") = 0,
+          py::arg("end_block") = -1,
+          "Compare two disk images block by block like list_blocks_difference_in_disks, but return\n"
+          "a BlockDiffMap holding the differing blocks as ranges. Query it with heatmap(zoom, window,\n"
+          "buckets) and blocks_from(from_block, limit) instead of materialising every block number.");
+
+    m.def("block_stats",
+          &vmtool::block_stats,
+          py::arg("disk_path"),
+          py::arg("block_size") = 4096,
+          py::arg("start_block") = 0,
+          py::arg("end_block") = -1,
+          "Compute per-block zero flags and Shannon entropy over a disk range in one streaming pass.\n"
+          "Returns a BlockStats object (entropy(), zero_map(), count_below(), count_at_least(), profile()).\n"
+          "end_block: -1 for last block. Default block size is 4096 bytes.");
+
     m.def("get_block_data_in_disk",
           &vmtool::get_block_data_in_disk,
           py::arg("disk_path"),
@@ -147,6 +695,67 @@ PYBIND11_MODULE(vmtool, m) {
           "format: 'hex' (uppercase hex bytes separated by spaces) or 'bits' (continuous bitstring).\n"
           "Default block size is 4096 bytes.");
 
+    m.def("read_blocks",
+          &vmtool::read_blocks,
+          py::arg("disk_path"),
+          py::arg("start_block"),
+          py::arg("count") = 1,
+          py::arg("block_size") = 4096,
+          "Read `count` consecutive blocks starting at start_block in one appliance launch.\n"
+          "Returns a read-only memoryview over the raw bytes (zero-copy); use bytes(view) to copy.\n"
+          "The range is cut short at the end of the disk. Default block size is 4096 bytes.");
+
+    m.def("hexdump_file_in_disk",
+          &vmtool::hexdump_file_in_disk,
+          py::arg("disk_path"),
+          py::arg("name"),
+          py::arg("offset") = 0,
+          py::arg("length") = 4096,
+          py::arg("format") = "hex",
+          "Format one window of a guest file as hex viewer rows [(offset, data, ascii), ...].\n"
+          "Reads only [offset, offset + length) (length capped at 1 MiB). Returns {disk, path, size,\n"
+          "offset, length, format, next_offset, prev_offset, rows}; next_offset is None at the end.");
+
+    m.def("hexdump_disk",
+          &vmtool::hexdump_disk,
+          py::arg("disk_path"),
+          py::arg("offset") = 0,
+          py::arg("length") = 4096,
+          py::arg("format") = "hex",
+          "Format one window of the raw disk as hex viewer rows, like hexdump_file_in_disk.\n"
+          "Bytes are read as 4096-byte blocks through the shared block cache.");
+
+    m.def("compare_block",
+          &vmtool::compare_block,
+          py::arg("disk_path1"),
+          py::arg("disk_path2"),
+          py::arg("block_number"),
+          py::arg("block_size") = 4096,
+          "Read the same block from two disk images in one appliance launch and compare them.\n"
+          "Returns a dict with 'data1'/'data2' (memoryviews of the raw blocks), 'diff_mask'\n"
+          "(one byte per position, 1 = differs), 'differing_bytes', 'differing_ranges'\n"
+          "(list of (start, end) offsets within the block) and 'identical'.");
+
+    m.def("format_dump",
+          [](py::buffer data, const std::string &format, uint64_t base_offset, bool ascii) {
+              py::buffer_info info = data.request();
+              const auto *bytes = static_cast<const unsigned char *>(info.ptr);
+              size_t size = static_cast<size_t>(info.size * info.itemsize);
+              std::string out;
+              {
+                  py::gil_scoped_release release;
+                  out = vmtool::format_dump(bytes, size, format, base_offset, ascii);
+              }
+              return py::str(out);
+          },
+          py::arg("data"),
+          py::arg("format") = "hex",
+          py::arg("base_offset") = 0,
+          py::arg("ascii") = false,
+          "Format raw bytes (bytes, memoryview, ...) as an offset dump, one row per line.\n"
+          "format: 'hex' (16 bytes per row, '0000: 00 0F ...') or 'bits' (8 bytes per row).\n"
+          "base_offset is added to the printed offsets; ascii=True appends a '|....|' gutter.");
+
     // Attach vmmanager as a submodule so users can: from vmtool import vmmanager
     py::module_ vmman = m.def_submodule("vmmanager", "System VM management utilities (QEMU, VirtualBox, VMware)");
     vmmanager::bind_vmmanager(vmman);
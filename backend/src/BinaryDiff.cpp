@@ -0,0 +1,337 @@
+#include "../include/BinaryDiff.hpp"
+#include <algorithm>
+#include <cstdlib>
+#include <cstring>
+#include <exception>
+#include <thread>
+
+namespace vmtool {
+
+namespace {
+
+// A sliding window over one stream: keeps [start, start + len) of it resident
+class StreamWindow {
+public:
+    StreamWindow(const ReadFn &read, uint64_t size, size_t capacity)
+        : read_(read), size_(size), buf_(capacity) {}
+
+    uint64_t size() const { return size_; }
+
+    // True if [pos, pos + n) (clipped to the stream) is not resident yet
+    bool needs(uint64_t pos, size_t n) const {
+        uint64_t end = std::min<uint64_t>(pos + n, size_);
+        return pos < start_ || end > start_ + len_;
+    }
+
+    // Make [pos, pos + n) resident (n <= capacity); reads fill the whole buffer
+    void fill(uint64_t pos, size_t n) {
+        if (!needs(pos, n)) return;
+        if (pos >= start_ && pos < start_ + len_) {
+            size_t keep = static_cast<size_t>(start_ + len_ - pos);
+            std::memmove(buf_.data(), buf_.data() + (pos - start_), keep);
+            len_ = keep;
+        } else {
+            len_ = 0;
+        }
+        start_ = pos;
+        size_t want = static_cast<size_t>(std::min<uint64_t>(buf_.size(), size_ - start_));
+        while (len_ < want) {
+            size_t got = read_(start_ + len_, want - len_, buf_.data() + len_);
+            if (got == 0) break;
+            len_ += got;
+        }
+        if (len_ < std::min<uint64_t>(n, size_ - pos)) {
+            // The stream ended early (file shrank while reading): treat it as that short
+            size_ = start_ + len_;
+        }
+    }
+
+    const unsigned char *at(uint64_t pos) const {
+        return reinterpret_cast<const unsigned char *>(buf_.data()) + (pos - start_);
+    }
+
+private:
+    const ReadFn &read_;
+    uint64_t size_;
+    std::vector<char> buf_;
+    uint64_t start_ = 0;
+    size_t len_ = 0;
+};
+
+// Fill both windows, reading the two streams in parallel when both need data
+void fill_both(StreamWindow &wa, uint64_t pa, size_t na, StreamWindow &wb, uint64_t pb, size_t nb) {
+    if (!wa.needs(pa, na) || !wb.needs(pb, nb)) {
+        wa.fill(pa, na);
+        wb.fill(pb, nb);
+        return;
+    }
+    std::exception_ptr other;
+    std::thread t([&]() {
+        try {
+            wb.fill(pb, nb);
+        } catch (...) {
+            other = std::current_exception();
+        }
+    });
+    try {
+        wa.fill(pa, na);
+    } catch (...) {
+        t.join();
+        throw;
+    }
+    t.join();
+    if (other) std::rethrow_exception(other);
+}
+
+// Offset of the first differing byte, or n if equal; memcmp skips equal blocks
+size_t first_mismatch(const unsigned char *a, const unsigned char *b, size_t n) {
+    constexpr size_t kBlock = 64;
+    size_t i = 0;
+    while (i + kBlock <= n && std::memcmp(a + i, b + i, kBlock) == 0) i += kBlock;
+    while (i < n && a[i] == b[i]) ++i;
+    return i;
+}
+
+constexpr uint64_t kHashBase = 0x100000001b3ULL;
+constexpr size_t kMaxChain = 16;
+
+class Differ {
+public:
+    Differ(const ReadFn &read_a, uint64_t size_a, const ReadFn &read_b, uint64_t size_b,
+           const BinaryDiffOptions &options)
+        : opt_(options),
+          wa_(read_a, size_a, options.chunk_size + options.lookahead + options.window),
+          wb_(read_b, size_b, options.chunk_size + options.lookahead + options.window) {}
+
+    BinaryDiffResult run() {
+        if (opt_.shift) {
+            shifted();
+        } else {
+            aligned();
+        }
+        return std::move(result_);
+    }
+
+private:
+    std::string preview(StreamWindow &w, uint64_t begin, uint64_t end) {
+        size_t n = static_cast<size_t>(std::min<uint64_t>(end - begin, opt_.preview_bytes));
+        if (w.needs(begin, n)) return std::string();
+        return std::string(reinterpret_cast<const char *>(w.at(begin)), n);
+    }
+
+    // ---- aligned mode ----
+
+    void open_range(const ByteRange &r) {
+        pending_ = r;
+        have_pending_ = true;
+        if (result_.range_count < opt_.preview_count) {
+            result_.previews.emplace_back(preview(wa_, r.first, std::min(r.second, wa_.size())),
+                                          preview(wb_, r.first, std::min(r.second, wb_.size())));
+        }
+        ++result_.range_count;
+    }
+
+    void close_range() {
+        if (!have_pending_) return;
+        if (result_.ranges.size() < opt_.max_ranges) {
+            result_.ranges.push_back(pending_);
+        } else {
+            result_.truncated = true;
+        }
+        have_pending_ = false;
+    }
+
+    void add_range(const ByteRange &r) {
+        if (have_pending_ && pending_.second == r.first) {
+            pending_.second = r.second; // continues across a chunk boundary
+            return;
+        }
+        close_range();
+        open_range(r);
+    }
+
+    void aligned() {
+        const uint64_t common = std::min(wa_.size(), wb_.size());
+        std::vector<ByteRange> local;
+        uint64_t pos = 0;
+        while (pos < std::min(wa_.size(), wb_.size())) {
+            size_t n = static_cast<size_t>(std::min<uint64_t>(opt_.chunk_size, common - pos));
+            fill_both(wa_, pos, n, wb_, pos, n);
+            n = static_cast<size_t>(std::min<uint64_t>(n, std::min(wa_.size(), wb_.size()) - pos));
+            const unsigned char *a = wa_.at(pos);
+            const unsigned char *b = wb_.at(pos);
+            if (std::memcmp(a, b, n) != 0) {
+                local.clear();
+                result_.differing_bytes += diff_mask(a, b, n, nullptr, &local, pos);
+                for (const ByteRange &r : local) add_range(r);
+            }
+            pos += n;
+        }
+        // Whatever one side has beyond the other's end differs too
+        uint64_t shorter = std::min(wa_.size(), wb_.size());
+        uint64_t longer = std::max(wa_.size(), wb_.size());
+        if (longer > shorter) {
+            StreamWindow &w = wa_.size() > wb_.size() ? wa_ : wb_;
+            w.fill(shorter, opt_.preview_bytes);
+            result_.differing_bytes += longer - shorter;
+            add_range({shorter, longer});
+        }
+        close_range();
+    }
+
+    // ---- shift mode ----
+
+    static BinaryEdit::Kind edit_kind(uint64_t a0, uint64_t a1, uint64_t b0, uint64_t b1) {
+        if (a1 == a0) return BinaryEdit::Insert;
+        if (b1 == b0) return BinaryEdit::Delete;
+        return BinaryEdit::Replace;
+    }
+
+    void add_edit(uint64_t a0, uint64_t a1, uint64_t b0, uint64_t b1) {
+        if (have_last_ && last_.a_end == a0 && last_.b_end == b0) {
+            // Directly follows the previous edit: grow it instead
+            result_.differing_bytes -= std::max(last_.a_end - last_.a_begin, last_.b_end - last_.b_begin);
+            last_.a_end = a1;
+            last_.b_end = b1;
+            last_.kind = edit_kind(last_.a_begin, a1, last_.b_begin, b1);
+            result_.differing_bytes += std::max(a1 - last_.a_begin, b1 - last_.b_begin);
+            if (last_stored_) result_.edits.back() = last_;
+            return;
+        }
+        last_ = BinaryEdit{edit_kind(a0, a1, b0, b1), a0, a1, b0, b1};
+        have_last_ = true;
+        if (result_.range_count < opt_.preview_count) {
+            result_.previews.emplace_back(preview(wa_, a0, a1), preview(wb_, b0, b1));
+        }
+        ++result_.range_count;
+        result_.differing_bytes += std::max(a1 - a0, b1 - b0);
+        last_stored_ = result_.edits.size() < opt_.max_ranges;
+        if (last_stored_) {
+            result_.edits.push_back(last_);
+        } else {
+            result_.truncated = true;
+        }
+    }
+
+    // Find (i2, j2) past the mismatch at (i, j) where `window` bytes match again
+    bool resync(uint64_t i, uint64_t j, uint64_t &i2, uint64_t &j2) {
+        const size_t W = opt_.window;
+        const size_t span = opt_.lookahead + W;
+        fill_both(wa_, i, span, wb_, j, span);
+        const size_t la = static_cast<size_t>(std::min<uint64_t>(span, wa_.size() - i));
+        const size_t lb = static_cast<size_t>(std::min<uint64_t>(span, wb_.size() - j));
+        if (la < W || lb < W) return false;
+        const unsigned char *a = wa_.at(i);
+        const unsigned char *b = wb_.at(j);
+
+        uint64_t top = 1; // kHashBase^(W-1)
+        for (size_t k = 1; k < W; ++k) top *= kHashBase;
+        auto hash_of = [&](const unsigned char *p) {
+            uint64_t h = 0;
+            for (size_t k = 0; k < W; ++k) h = h * kHashBase + p[k];
+            return h;
+        };
+
+        // Index every window start of the old side; chains run in ascending position
+        const size_t positions = la - W + 1;
+        size_t buckets = 1;
+        unsigned shift = 64;
+        while (buckets < positions * 2) { buckets <<= 1; --shift; }
+        heads_.assign(buckets, -1);
+        next_.assign(positions, -1);
+        hashes_.resize(positions);
+        uint64_t h = hash_of(a);
+        for (size_t p = 0; p < positions; ++p) {
+            if (p > 0) h = (h - a[p - 1] * top) * kHashBase + a[p + W - 1];
+            hashes_[p] = h;
+        }
+        for (size_t p = positions; p-- > 0;) {
+            size_t slot = static_cast<size_t>((hashes_[p] * 0x9E3779B97F4A7C15ULL) >> shift);
+            next_[p] = heads_[slot];
+            heads_[slot] = static_cast<int32_t>(p);
+        }
+
+        // Roll the new side forward; the first window that matches wins, taking the
+        // old position nearest the diagonal (an in-place change keeps both offsets)
+        h = hash_of(b);
+        for (size_t q = 0; q + W <= lb; ++q) {
+            if (q > 0) h = (h - b[q - 1] * top) * kHashBase + b[q + W - 1];
+            if (q + W <= la && std::memcmp(a + q, b + q, W) == 0) {
+                i2 = i + q;
+                j2 = j + q;
+                return true;
+            }
+            size_t slot = static_cast<size_t>((h * 0x9E3779B97F4A7C15ULL) >> shift);
+            size_t seen = 0;
+            long best = -1;
+            for (int32_t p = heads_[slot]; p >= 0 && seen < kMaxChain; p = next_[p], ++seen) {
+                if (hashes_[p] != h || std::memcmp(a + p, b + q, W) != 0) continue;
+                if (best < 0 || std::labs(static_cast<long>(p) - static_cast<long>(q)) <
+                                    std::labs(best - static_cast<long>(q))) {
+                    best = p;
+                }
+            }
+            if (best >= 0) {
+                i2 = i + static_cast<uint64_t>(best);
+                j2 = j + q;
+                return true;
+            }
+        }
+        return false;
+    }
+
+    void shifted() {
+        uint64_t i = 0, j = 0;
+        while (i < wa_.size() && j < wb_.size()) {
+            size_t n = static_cast<size_t>(std::min<uint64_t>(opt_.chunk_size,
+                                                              std::min(wa_.size() - i, wb_.size() - j)));
+            fill_both(wa_, i, n, wb_, j, n);
+            n = static_cast<size_t>(std::min<uint64_t>(n, std::min(wa_.size() - i, wb_.size() - j)));
+            size_t k = first_mismatch(wa_.at(i), wb_.at(j), n);
+            i += k;
+            j += k;
+            if (k == n) continue;
+
+            uint64_t i2 = 0, j2 = 0;
+            if (!resync(i, j, i2, j2)) {
+                // No common window ahead: take one lookahead's worth as replaced
+                i2 = std::min<uint64_t>(i + opt_.lookahead, wa_.size());
+                j2 = std::min<uint64_t>(j + opt_.lookahead, wb_.size());
+            }
+            add_edit(i, i2, j, j2);
+            i = i2;
+            j = j2;
+        }
+        if (i < wa_.size() || j < wb_.size()) {
+            wa_.fill(i, opt_.preview_bytes);
+            wb_.fill(j, opt_.preview_bytes);
+            add_edit(i, wa_.size(), j, wb_.size());
+        }
+    }
+
+    const BinaryDiffOptions opt_;
+    StreamWindow wa_, wb_;
+    BinaryDiffResult result_;
+    ByteRange pending_{0, 0};
+    bool have_pending_ = false;
+    BinaryEdit last_{BinaryEdit::Replace, 0, 0, 0, 0};
+    bool have_last_ = false;
+    bool last_stored_ = false;
+    std::vector<int32_t> heads_, next_;
+    std::vector<uint64_t> hashes_;
+};
+
+} // namespace
+
+BinaryDiffResult diff_streams(const ReadFn &read_a, uint64_t size_a,
+                              const ReadFn &read_b, uint64_t size_b,
+                              const BinaryDiffOptions &options) {
+    BinaryDiffOptions opt = options;
+    opt.chunk_size = std::max<size_t>(opt.chunk_size, 4096);
+    opt.window = std::max<size_t>(opt.window, 4);
+    opt.lookahead = std::max(opt.lookahead, opt.window);
+    Differ differ(read_a, size_a, read_b, size_b, opt);
+    return differ.run();
+}
+
+} // namespace vmtool
@@ -0,0 +1,147 @@
+#include "../include/BlockCache.hpp"
+#include <stdexcept>
+#include <sys/stat.h>
+
+namespace vmtool {
+
+void check_block_size(size_t block_size) {
+    if (block_size == 0 || block_size > kMaxBlockSize || (block_size & (block_size - 1)) != 0) {
+        throw std::runtime_error("block_size must be a power of two no larger than " + std::to_string(kMaxBlockSize));
+    }
+}
+
+ImageIdentity ImageIdentity::of(const std::string &disk_path) {
+    ImageIdentity id;
+    struct stat st{};
+    if (::stat(disk_path.c_str(), &st) != 0) {
+        return id;
+    }
+    id.key = std::to_string(static_cast<unsigned long long>(st.st_dev)) + ":" +
+             std::to_string(static_cast<unsigned long long>(st.st_ino));
+    id.size = static_cast<uint64_t>(st.st_size);
+    id.mtime_sec = static_cast<int64_t>(st.st_mtim.tv_sec);
+    id.mtime_nsec = static_cast<int64_t>(st.st_mtim.tv_nsec);
+    id.valid = true;
+    return id;
+}
+
+BlockCache &BlockCache::instance() {
+    static BlockCache cache;
+    return cache;
+}
+
+std::string BlockCache::make_key(const ImageIdentity &image, uint64_t offset, size_t length) {
+    return image.key + "@" + std::to_string(offset) + "+" + std::to_string(length);
+}
+
+void BlockCache::check_version_locked(const ImageIdentity &image) {
+    auto it = images_.find(image.key);
+    if (it == images_.end()) {
+        images_[image.key] = ImageState{image, 0};
+        return;
+    }
+    if (it->second.version.same_version(image)) return;
+
+    // The image file changed: everything cached for it is stale
+    for (auto e = lru_.begin(); e != lru_.end();) {
+        if (e->image == image.key) {
+            bytes_ -= e->data.size();
+            index_.erase(e->key);
+            e = lru_.erase(e);
+        } else {
+            ++e;
+        }
+    }
+    it->second = ImageState{image, 0};
+    ++invalidations_;
+}
+
+void BlockCache::evict_locked() {
+    while (bytes_ > capacity_ && !lru_.empty()) {
+        Entry &victim = lru_.back();
+        bytes_ -= victim.data.size();
+        index_.erase(victim.key);
+        lru_.pop_back();
+        ++evictions_;
+    }
+}
+
+bool BlockCache::get(const ImageIdentity &image, uint64_t offset, size_t length, std::string &out) {
+    if (!image.valid) return false;
+    std::lock_guard<std::mutex> lock(mutex_);
+    check_version_locked(image);
+
+    auto it = index_.find(make_key(image, offset, length));
+    if (it == index_.end()) {
+        ++misses_;
+        return false;
+    }
+    lru_.splice(lru_.begin(), lru_, it->second);
+    out = it->second->data;
+    ++hits_;
+    return true;
+}
+
+void BlockCache::put(const ImageIdentity &image, uint64_t offset, size_t length, const std::string &data) {
+    if (!image.valid || data.size() > capacity_) return;
+    std::lock_guard<std::mutex> lock(mutex_);
+    check_version_locked(image);
+
+    std::string key = make_key(image, offset, length);
+    auto it = index_.find(key);
+    if (it != index_.end()) {
+        bytes_ -= it->second->data.size();
+        it->second->data = data;
+        bytes_ += data.size();
+        lru_.splice(lru_.begin(), lru_, it->second);
+    } else {
+        lru_.push_front(Entry{key, image.key, data});
+        index_[key] = lru_.begin();
+        bytes_ += data.size();
+    }
+    evict_locked();
+}
+
+uint64_t BlockCache::device_size(const ImageIdentity &image) {
+    if (!image.valid) return 0;
+    std::lock_guard<std::mutex> lock(mutex_);
+    check_version_locked(image);
+    return images_[image.key].device_size;
+}
+
+void BlockCache::set_device_size(const ImageIdentity &image, uint64_t size) {
+    if (!image.valid) return;
+    std::lock_guard<std::mutex> lock(mutex_);
+    check_version_locked(image);
+    images_[image.key].device_size = size;
+}
+
+BlockCache::Stats BlockCache::stats() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    Stats s;
+    s.hits = hits_;
+    s.misses = misses_;
+    s.evictions = evictions_;
+    s.invalidations = invalidations_;
+    s.entries = lru_.size();
+    s.bytes = bytes_;
+    s.capacity = capacity_;
+    return s;
+}
+
+void BlockCache::set_capacity(size_t bytes) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    capacity_ = bytes;
+    evict_locked();
+}
+
+void BlockCache::clear() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    lru_.clear();
+    index_.clear();
+    images_.clear();
+    bytes_ = 0;
+    hits_ = misses_ = evictions_ = invalidations_ = 0;
+}
+
+} // namespace vmtool
@@ -0,0 +1,83 @@
+#include "../include/BlockRangeSet.hpp"
+#include <algorithm>
+#include <stdexcept>
+
+namespace vmtool {
+
+BlockRangeSet::BlockRangeSet(uint64_t start_block, uint64_t end_block, uint64_t total_blocks,
+                             size_t block_size, const std::vector<uint64_t> &blocks)
+    : start_block_(start_block), end_block_(std::max(start_block, end_block)),
+      total_blocks_(total_blocks), block_size_(block_size) {
+    for (uint64_t b : blocks) {
+        if (!ranges_.empty() && ranges_.back().second == b) {
+            ranges_.back().second = b + 1;
+        } else if (ranges_.empty() || ranges_.back().second < b) {
+            ranges_.emplace_back(b, b + 1);
+        } else {
+            continue; // duplicate
+        }
+        ++differing_;
+    }
+}
+
+uint64_t BlockRangeSet::window_count(unsigned zoom) const {
+    uint64_t total = end_block_ - start_block_;
+    if (total == 0) return 1;
+    uint64_t windows = uint64_t(1) << std::min(zoom, kMaxZoom);
+    return std::min(windows, total);
+}
+
+BlockRange BlockRangeSet::window(unsigned zoom, uint64_t index) const {
+    uint64_t windows = window_count(zoom);
+    if (index >= windows) {
+        throw std::runtime_error("window " + std::to_string(index) + " is out of range for zoom level " +
+                                 std::to_string(zoom) + " (" + std::to_string(windows) + " windows)");
+    }
+    uint64_t total = end_block_ - start_block_;
+    uint64_t span = (total + windows - 1) / windows;
+    uint64_t lo = start_block_ + std::min(total, index * span);
+    uint64_t hi = start_block_ + std::min(total, (index + 1) * span);
+    return {lo, hi};
+}
+
+std::vector<uint64_t> BlockRangeSet::heatmap(unsigned zoom, uint64_t index, size_t buckets) const {
+    if (buckets == 0) {
+        throw std::runtime_error("buckets must be greater than zero");
+    }
+    std::vector<uint64_t> counts(buckets, 0);
+    BlockRange w = window(zoom, index);
+    uint64_t len = w.second - w.first;
+    if (len == 0) return counts;
+
+    // First range ending after the window start
+    auto it = std::upper_bound(ranges_.begin(), ranges_.end(), w.first,
+                               [](uint64_t v, const BlockRange &r) { return v < r.second; });
+
+    for (size_t i = 0; i < buckets && it != ranges_.end(); ++i) {
+        uint64_t lo = w.first + len * i / buckets;
+        uint64_t hi = w.first + len * (i + 1) / buckets;
+        // A range may span several buckets; only step past it once it ends inside this one
+        while (it != ranges_.end() && it->first < hi) {
+            uint64_t a = std::max(it->first, lo);
+            uint64_t b = std::min(it->second, hi);
+            if (b > a) counts[i] += b - a;
+            if (it->second > hi) break;
+            ++it;
+        }
+    }
+    return counts;
+}
+
+std::vector<uint64_t> BlockRangeSet::blocks_from(uint64_t from_block, size_t limit) const {
+    std::vector<uint64_t> out;
+    auto it = std::upper_bound(ranges_.begin(), ranges_.end(), from_block,
+                               [](uint64_t v, const BlockRange &r) { return v < r.second; });
+    for (; it != ranges_.end() && out.size() < limit; ++it) {
+        for (uint64_t b = std::max(it->first, from_block); b < it->second && out.size() < limit; ++b) {
+            out.push_back(b);
+        }
+    }
+    return out;
+}
+
+} // namespace vmtool
@@ -0,0 +1,109 @@
+#include "../include/BlockStats.hpp"
+#include "../include/BlockCache.hpp"
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+#include <stdexcept>
+
+namespace vmtool {
+
+BlockStats::BlockStats(uint64_t start_block, size_t block_size)
+    : start_block_(start_block), block_size_(block_size) {
+    check_block_size(block_size);
+    clog2c_.assign(block_size + 1, 0.0);
+    for (size_t c = 2; c <= block_size; ++c) {
+        clog2c_[c] = static_cast<double>(c) * std::log2(static_cast<double>(c));
+    }
+}
+
+// True if every byte is zero; OR-reduces 8-byte words so the loop vectorizes
+static bool all_zero(const unsigned char *data, size_t size) {
+    size_t i = 0;
+    uint64_t acc = 0;
+    for (; i + 64 <= size; i += 64) {
+        uint64_t w[8];
+        std::memcpy(w, data + i, 64);
+        acc |= w[0] | w[1] | w[2] | w[3] | w[4] | w[5] | w[6] | w[7];
+        if (acc) return false;
+    }
+    for (; i < size; ++i) acc |= data[i];
+    return acc == 0;
+}
+
+uint8_t BlockStats::block_entropy(const unsigned char *data, size_t size) {
+    // Four interleaved histograms avoid store-to-load stalls on runs of equal bytes
+    uint32_t hist[4][256] = {};
+    size_t i = 0;
+    for (; i + 4 <= size; i += 4) {
+        ++hist[0][data[i]];
+        ++hist[1][data[i + 1]];
+        ++hist[2][data[i + 2]];
+        ++hist[3][data[i + 3]];
+    }
+    for (; i < size; ++i) ++hist[0][data[i]];
+
+    // H = log2(n) - (1/n) * sum(c * log2 c)
+    double sum = 0.0;
+    for (int b = 0; b < 256; ++b) {
+        sum += clog2c_[hist[0][b] + hist[1][b] + hist[2][b] + hist[3][b]];
+    }
+    double n = static_cast<double>(size);
+    double h = std::log2(n) - sum / n;
+    return static_cast<uint8_t>(std::min(255.0, std::max(0.0, std::round(h * kScale))));
+}
+
+void BlockStats::add(const unsigned char *data, size_t size) {
+    for (size_t pos = 0; pos < size; pos += block_size_) {
+        size_t len = std::min(block_size_, size - pos);
+        uint64_t index = entropy_.size();
+        if (index % 64 == 0) zero_.push_back(0);
+
+        if (all_zero(data + pos, len)) {
+            zero_[index / 64] |= uint64_t(1) << (index % 64);
+            ++zero_count_;
+            entropy_.push_back(0);
+        } else {
+            entropy_.push_back(block_entropy(data + pos, len));
+        }
+    }
+}
+
+uint64_t BlockStats::count_below(double bits) const {
+    uint64_t n = 0;
+    for (uint64_t i = 0; i < entropy_.size(); ++i) {
+        if (!is_zero(i) && entropy_[i] < bits * kScale) ++n;
+    }
+    return n;
+}
+
+uint64_t BlockStats::count_at_least(double bits) const {
+    uint64_t n = 0;
+    for (uint8_t e : entropy_) {
+        if (e >= bits * kScale) ++n;
+    }
+    return n;
+}
+
+void BlockStats::profile(size_t buckets, std::vector<double> &mean_entropy, std::vector<double> &zero_fraction) const {
+    if (buckets == 0) {
+        throw std::runtime_error("buckets must be greater than zero");
+    }
+    uint64_t total = entropy_.size();
+    buckets = static_cast<size_t>(std::min<uint64_t>(buckets, std::max<uint64_t>(total, 1)));
+    mean_entropy.assign(buckets, 0.0);
+    zero_fraction.assign(buckets, 0.0);
+    for (size_t b = 0; b < buckets && total > 0; ++b) {
+        uint64_t lo = total * b / buckets;
+        uint64_t hi = total * (b + 1) / buckets;
+        uint64_t sum = 0, zeros = 0;
+        for (uint64_t i = lo; i < hi; ++i) {
+            sum += entropy_[i];
+            zeros += is_zero(i);
+        }
+        double n = static_cast<double>(hi - lo);
+        mean_entropy[b] = n ? sum / n / kScale : 0.0;
+        zero_fraction[b] = n ? zeros / n : 0.0;
+    }
+}
+
+} // namespace vmtool
@@ -0,0 +1,49 @@
+#include "../include/ByteCompare.hpp"
+#include <cstring>
+
+namespace vmtool {
+
+size_t diff_mask(const unsigned char *a, const unsigned char *b, size_t size,
+                 unsigned char *mask,
+                 std::vector<ByteRange> *ranges,
+                 uint64_t base_offset) {
+    if (mask) std::memset(mask, 0, size);
+
+    size_t differing = 0;
+    bool in_run = false;
+    uint64_t run_start = 0;
+
+    size_t i = 0;
+    while (i < size) {
+        // Skip equal 8-byte words in one comparison
+        if (!in_run && i + 8 <= size) {
+            uint64_t wa, wb;
+            std::memcpy(&wa, a + i, 8);
+            std::memcpy(&wb, b + i, 8);
+            if (wa == wb) {
+                i += 8;
+                continue;
+            }
+        }
+
+        bool differs = a[i] != b[i];
+        if (differs) {
+            ++differing;
+            if (mask) mask[i] = 1;
+            if (!in_run) {
+                in_run = true;
+                run_start = i;
+            }
+        } else if (in_run) {
+            if (ranges) ranges->emplace_back(base_offset + run_start, base_offset + i);
+            in_run = false;
+        }
+        ++i;
+    }
+    if (in_run && ranges) {
+        ranges->emplace_back(base_offset + run_start, base_offset + size);
+    }
+    return differing;
+}
+
+} // namespace vmtool
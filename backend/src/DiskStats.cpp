@@ -0,0 +1,103 @@
+#include "../include/DiskStats.hpp"
+#include <algorithm>
+
+namespace vmtool {
+
+namespace {
+
+const char *const kTypeNames[DiskStats::kTypeCount] = {
+    "file", "directory", "symlink", "chardev", "blockdev", "fifo", "socket", "other"};
+
+size_t type_index(int64_t mode) {
+    switch (mode & 0170000) {
+    case 0100000: return 0;
+    case 0040000: return 1;
+    case 0120000: return 2;
+    case 0020000: return 3;
+    case 0060000: return 4;
+    case 0010000: return 5;
+    case 0140000: return 6;
+    default: return 7;
+    }
+}
+
+// Heap order that keeps the smallest of the kept files on top
+bool larger(const TreeEntry &a, const TreeEntry &b) {
+    return a.st.size > b.st.size || (a.st.size == b.st.size && a.path < b.path);
+}
+
+void add_totals(UsageTotals &into, const UsageTotals &from) {
+    into.files += from.files;
+    into.dirs += from.dirs;
+    into.bytes += from.bytes;
+}
+
+} // anonymous namespace
+
+const char *DiskStats::type_name(size_t type) {
+    return kTypeNames[type < kTypeCount ? type : kTypeCount - 1];
+}
+
+size_t DiskStats::size_bucket(int64_t size) {
+    size_t bucket = 0;
+    for (uint64_t v = size > 0 ? static_cast<uint64_t>(size) : 0; v; v >>= 1) ++bucket;
+    return bucket;
+}
+
+void DiskStats::add(const TreeEntry &entry, const std::string &top) {
+    const GuestStat &st = entry.st;
+    const size_t type = type_index(st.mode);
+    ++type_counts_[type];
+
+    if (type == 1) {
+        if (st.size > 0) dir_bytes_ += st.size;
+        ++per_uid_[st.uid].dirs;
+        ++per_gid_[st.gid].dirs;
+        ++per_top_[top].dirs;
+    } else if (type == 0) {
+        const int64_t size = std::max<int64_t>(0, st.size);
+        file_bytes_ += size;
+        const size_t bucket = size_bucket(size);
+        ++bucket_files_[bucket];
+        bucket_bytes_[bucket] += size;
+        for (UsageTotals *t : {&per_uid_[st.uid], &per_gid_[st.gid], &per_top_[top]}) {
+            ++t->files;
+            t->bytes += size;
+        }
+        offer_largest(entry);
+    }
+}
+
+void DiskStats::offer_largest(const TreeEntry &entry) {
+    if (top_n_ == 0) return;
+    if (largest_.size() < top_n_) {
+        largest_.push_back(entry);
+        std::push_heap(largest_.begin(), largest_.end(), larger);
+    } else if (larger(entry, largest_.front())) {
+        std::pop_heap(largest_.begin(), largest_.end(), larger);
+        largest_.back() = entry;
+        std::push_heap(largest_.begin(), largest_.end(), larger);
+    }
+}
+
+void DiskStats::merge(DiskStats &&other) {
+    for (size_t i = 0; i < kTypeCount; ++i) type_counts_[i] += other.type_counts_[i];
+    for (size_t i = 0; i < kSizeBuckets; ++i) {
+        bucket_files_[i] += other.bucket_files_[i];
+        bucket_bytes_[i] += other.bucket_bytes_[i];
+    }
+    file_bytes_ += other.file_bytes_;
+    dir_bytes_ += other.dir_bytes_;
+    for (const auto &kv : other.per_uid_) add_totals(per_uid_[kv.first], kv.second);
+    for (const auto &kv : other.per_gid_) add_totals(per_gid_[kv.first], kv.second);
+    for (const auto &kv : other.per_top_) add_totals(per_top_[kv.first], kv.second);
+    for (const TreeEntry &e : other.largest_) offer_largest(e);
+}
+
+std::vector<TreeEntry> DiskStats::largest() const {
+    std::vector<TreeEntry> out = largest_;
+    std::sort(out.begin(), out.end(), larger);
+    return out;
+}
+
+} // namespace vmtool
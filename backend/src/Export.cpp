@@ -0,0 +1,352 @@
+#include "../include/Export.hpp"
+#include <cerrno>
+#include <cstdio>
+#include <cstring>
+#include <iomanip>
+#include <sstream>
+#include <stdexcept>
+#include <unistd.h>
+#ifdef VMTOOL_HAVE_ZLIB
+#include <zlib.h>
+#endif
+#ifdef VMTOOL_HAVE_ZSTD
+#include <zstd.h>
+#endif
+
+namespace vmtool {
+
+namespace {
+
+constexpr size_t kFlushBytes = 64 * 1024;
+
+bool ends_with(const std::string &s, const std::string &suffix) {
+    return s.size() >= suffix.size() && s.compare(s.size() - suffix.size(), suffix.size(), suffix) == 0;
+}
+
+const char *entry_type(const GuestStat &st) {
+    return st.is_reg() ? "file" : st.is_dir() ? "directory" : st.is_link() ? "symlink" : "other";
+}
+
+// "rwxr-xr-x" for the permission bits of a mode
+void append_perms(std::string &out, int64_t mode) {
+    static const char chars[] = "rwxrwxrwx";
+    for (int i = 0; i < 9; ++i) {
+        out.push_back((mode & (0400 >> i)) ? chars[i] : '-');
+    }
+}
+
+void append_octal_mode(std::string &out, int64_t mode) {
+    char buf[8];
+    std::snprintf(buf, sizeof(buf), "%04o", static_cast<unsigned>(mode & 07777));
+    out += buf;
+}
+
+// TSV field: tab, newline, carriage return and backslash are backslash-escaped
+void append_tsv(std::string &out, const std::string &field) {
+    for (char c : field) {
+        switch (c) {
+        case '\t': out += "\\t"; break;
+        case '\n': out += "\\n"; break;
+        case '\r': out += "\\r"; break;
+        case '\\': out += "\\\\"; break;
+        default: out.push_back(c);
+        }
+    }
+}
+
+// CSV field (RFC 4180): quoted when it holds a comma, quote or line break
+void append_csv(std::string &out, const std::string &field) {
+    if (field.find_first_of(",\"\r\n") == std::string::npos) {
+        out += field;
+        return;
+    }
+    out.push_back('"');
+    for (char c : field) {
+        if (c == '"') out.push_back('"');
+        out.push_back(c);
+    }
+    out.push_back('"');
+}
+
+// JSON string with quotes; control characters are \u-escaped, other bytes pass through
+void append_json(std::string &out, const std::string &field) {
+    out.push_back('"');
+    for (char c : field) {
+        switch (c) {
+        case '"': out += "\\\""; break;
+        case '\\': out += "\\\\"; break;
+        case '\n': out += "\\n"; break;
+        case '\t': out += "\\t"; break;
+        case '\r': out += "\\r"; break;
+        default:
+            if (static_cast<unsigned char>(c) < 0x20) {
+                char buf[8];
+                std::snprintf(buf, sizeof(buf), "\\u%04x", static_cast<unsigned>(c));
+                out += buf;
+            } else {
+                out.push_back(c);
+            }
+        }
+    }
+    out.push_back('"');
+}
+
+} // anonymous namespace
+
+ExportFormat parse_export_format(const std::string &name) {
+    if (name == "tsv") return ExportFormat::Tsv;
+    if (name == "csv") return ExportFormat::Csv;
+    if (name == "ndjson") return ExportFormat::Ndjson;
+    if (name == "table") return ExportFormat::Table;
+    throw std::invalid_argument("Invalid export format: " + name + ". Use 'tsv', 'csv', 'ndjson' or 'table'");
+}
+
+ExportCompression parse_export_compression(const std::string &name, const std::string &output_name) {
+    ExportCompression compression;
+    if (name == "auto") {
+        compression = ends_with(output_name, ".gz") ? ExportCompression::Gzip
+                    : ends_with(output_name, ".zst") ? ExportCompression::Zstd
+                    : ExportCompression::None;
+    } else if (name == "none" || name.empty()) {
+        compression = ExportCompression::None;
+    } else if (name == "gzip") {
+        compression = ExportCompression::Gzip;
+    } else if (name == "zstd") {
+        compression = ExportCompression::Zstd;
+    } else {
+        throw std::invalid_argument("Invalid compression: " + name + ". Use 'none', 'gzip', 'zstd' or 'auto'");
+    }
+#ifndef VMTOOL_HAVE_ZLIB
+    if (compression == ExportCompression::Gzip) throw std::runtime_error("vmtool was built without zlib (gzip)");
+#endif
+#ifndef VMTOOL_HAVE_ZSTD
+    if (compression == ExportCompression::Zstd) throw std::runtime_error("vmtool was built without zstd");
+#endif
+    return compression;
+}
+
+// Compressor state for the sink's compression, with one output buffer
+struct ExportSink::Codec {
+#ifdef VMTOOL_HAVE_ZLIB
+    z_stream z{};
+    bool z_open = false;
+#endif
+#ifdef VMTOOL_HAVE_ZSTD
+    ZSTD_CStream *zstd = nullptr;
+#endif
+    std::string out = std::string(kFlushBytes, '\0');
+
+    ~Codec() {
+#ifdef VMTOOL_HAVE_ZLIB
+        if (z_open) deflateEnd(&z);
+#endif
+#ifdef VMTOOL_HAVE_ZSTD
+        if (zstd) ZSTD_freeCStream(zstd);
+#endif
+    }
+};
+
+ExportSink::ExportSink(int fd, ExportCompression compression)
+    : fd_(fd), compression_(compression), codec_(std::make_unique<Codec>()) {
+#ifdef VMTOOL_HAVE_ZLIB
+    if (compression_ == ExportCompression::Gzip) {
+        // windowBits 15 + 16: gzip header and trailer instead of a zlib wrapper
+        if (deflateInit2(&codec_->z, Z_DEFAULT_COMPRESSION, Z_DEFLATED, 15 + 16, 8, Z_DEFAULT_STRATEGY) != Z_OK) {
+            throw std::runtime_error("Failed to initialise gzip compression");
+        }
+        codec_->z_open = true;
+    }
+#endif
+#ifdef VMTOOL_HAVE_ZSTD
+    if (compression_ == ExportCompression::Zstd) {
+        codec_->zstd = ZSTD_createCStream();
+        if (!codec_->zstd || ZSTD_isError(ZSTD_initCStream(codec_->zstd, 3))) {
+            throw std::runtime_error("Failed to initialise zstd compression");
+        }
+    }
+#endif
+}
+
+ExportSink::~ExportSink() = default;
+
+void ExportSink::write_fd(const char *data, size_t size) {
+    while (size > 0) {
+        ssize_t n = ::write(fd_, data, size);
+        if (n < 0) {
+            if (errno == EINTR) continue;
+            throw std::runtime_error(std::string("Failed to write export: ") + std::strerror(errno));
+        }
+        data += n;
+        size -= static_cast<size_t>(n);
+        bytes_out_ += static_cast<uint64_t>(n);
+    }
+}
+
+void ExportSink::write(const char *data, size_t size) {
+    if (finished_) throw std::logic_error("ExportSink::write after finish");
+    bytes_in_ += size;
+    switch (compression_) {
+    case ExportCompression::None:
+        write_fd(data, size);
+        break;
+    case ExportCompression::Gzip:
+#ifdef VMTOOL_HAVE_ZLIB
+        codec_->z.next_in = reinterpret_cast<Bytef *>(const_cast<char *>(data));
+        codec_->z.avail_in = static_cast<uInt>(size);
+        while (codec_->z.avail_in > 0) {
+            codec_->z.next_out = reinterpret_cast<Bytef *>(&codec_->out[0]);
+            codec_->z.avail_out = static_cast<uInt>(codec_->out.size());
+            deflate(&codec_->z, Z_NO_FLUSH);
+            write_fd(codec_->out.data(), codec_->out.size() - codec_->z.avail_out);
+        }
+#endif
+        break;
+    case ExportCompression::Zstd:
+#ifdef VMTOOL_HAVE_ZSTD
+    {
+        ZSTD_inBuffer in{data, size, 0};
+        while (in.pos < in.size) {
+            ZSTD_outBuffer out{&codec_->out[0], codec_->out.size(), 0};
+            size_t rc = ZSTD_compressStream(codec_->zstd, &out, &in);
+            if (ZSTD_isError(rc)) throw std::runtime_error(std::string("zstd: ") + ZSTD_getErrorName(rc));
+            write_fd(codec_->out.data(), out.pos);
+        }
+    }
+#endif
+        break;
+    }
+}
+
+void ExportSink::finish() {
+    if (finished_) return;
+    finished_ = true;
+#ifdef VMTOOL_HAVE_ZLIB
+    if (compression_ == ExportCompression::Gzip) {
+        int rc;
+        do {
+            codec_->z.next_out = reinterpret_cast<Bytef *>(&codec_->out[0]);
+            codec_->z.avail_out = static_cast<uInt>(codec_->out.size());
+            rc = deflate(&codec_->z, Z_FINISH);
+            write_fd(codec_->out.data(), codec_->out.size() - codec_->z.avail_out);
+        } while (rc == Z_OK);
+        if (rc != Z_STREAM_END) throw std::runtime_error("gzip compression failed");
+    }
+#endif
+#ifdef VMTOOL_HAVE_ZSTD
+    if (compression_ == ExportCompression::Zstd) {
+        size_t remaining;
+        do {
+            ZSTD_outBuffer out{&codec_->out[0], codec_->out.size(), 0};
+            remaining = ZSTD_endStream(codec_->zstd, &out);
+            if (ZSTD_isError(remaining)) throw std::runtime_error(std::string("zstd: ") + ZSTD_getErrorName(remaining));
+            write_fd(codec_->out.data(), out.pos);
+        } while (remaining > 0);
+    }
+#endif
+}
+
+ExportWriter::ExportWriter(ExportSink &sink, ExportFormat format) : sink_(sink), format_(format) {
+    buffer_.reserve(kFlushBytes + 4096);
+}
+
+void ExportWriter::header() {
+    switch (format_) {
+    case ExportFormat::Tsv:
+        buffer_ += "path\ttype\tsize\tmode\tuid\tgid\tmtime_sec\tmtime_nsec\ttarget\n";
+        break;
+    case ExportFormat::Csv:
+        buffer_ += "path,type,size,mode,uid,gid,mtime_sec,mtime_nsec,target\r\n";
+        break;
+    case ExportFormat::Ndjson:
+        break;
+    case ExportFormat::Table: {
+        std::ostringstream oss;
+        oss << std::right << std::setw(10) << "Size" << ' '
+            << std::setw(10) << "Permission" << ' '
+            << std::setw(20) << "Last Modified" << ' '
+            << std::setw(20) << "Name" << '\n'
+            << std::string(60, '=') << '\n';
+        buffer_ += oss.str();
+        break;
+    }
+    }
+    flush();
+}
+
+void ExportWriter::row(const TreeEntry &e) {
+    const GuestStat &st = e.st;
+    switch (format_) {
+    case ExportFormat::Tsv:
+    case ExportFormat::Csv: {
+        const bool tsv = format_ == ExportFormat::Tsv;
+        const char sep = tsv ? '\t' : ',';
+        tsv ? append_tsv(buffer_, e.path) : append_csv(buffer_, e.path);
+        buffer_.push_back(sep);
+        buffer_ += entry_type(st);
+        buffer_.push_back(sep);
+        buffer_ += std::to_string(st.size);
+        buffer_.push_back(sep);
+        append_octal_mode(buffer_, st.mode);
+        buffer_.push_back(sep);
+        buffer_ += std::to_string(st.uid);
+        buffer_.push_back(sep);
+        buffer_ += std::to_string(st.gid);
+        buffer_.push_back(sep);
+        buffer_ += std::to_string(st.mtime_sec);
+        buffer_.push_back(sep);
+        buffer_ += std::to_string(st.mtime_nsec);
+        buffer_.push_back(sep);
+        tsv ? append_tsv(buffer_, e.target) : append_csv(buffer_, e.target);
+        buffer_ += tsv ? "\n" : "\r\n";
+        break;
+    }
+    case ExportFormat::Ndjson:
+        buffer_ += "{\"path\":";
+        append_json(buffer_, e.path);
+        buffer_ += ",\"type\":\"";
+        buffer_ += entry_type(st);
+        buffer_ += "\",\"size\":" + std::to_string(st.size);
+        buffer_ += ",\"mode\":\"";
+        append_octal_mode(buffer_, st.mode);
+        buffer_ += "\",\"uid\":" + std::to_string(st.uid);
+        buffer_ += ",\"gid\":" + std::to_string(st.gid);
+        buffer_ += ",\"mtime_sec\":" + std::to_string(st.mtime_sec);
+        buffer_ += ",\"mtime_nsec\":" + std::to_string(st.mtime_nsec);
+        if (st.is_link()) {
+            buffer_ += ",\"target\":";
+            append_json(buffer_, e.target);
+        }
+        buffer_ += "}\n";
+        break;
+    case ExportFormat::Table: {
+        std::string size = std::to_string(st.size);
+        std::string perms;
+        append_perms(perms, st.mode);
+        std::string mtime = format_mtime_(st.mtime_sec);
+        buffer_.append(size.size() < 10 ? 10 - size.size() : 0, ' ') += size;
+        buffer_.push_back(' ');
+        buffer_.append(10 - perms.size(), ' ') += perms;
+        buffer_.push_back(' ');
+        buffer_.append(mtime.size() < 20 ? 20 - mtime.size() : 0, ' ') += mtime;
+        buffer_.push_back(' ');
+        buffer_ += e.path;
+        buffer_.push_back('\n');
+        break;
+    }
+    }
+    ++rows_;
+    if (buffer_.size() >= kFlushBytes) flush();
+}
+
+void ExportWriter::flush() {
+    if (buffer_.empty()) return;
+    sink_.write(buffer_.data(), buffer_.size());
+    buffer_.clear();
+}
+
+void ExportWriter::finish() {
+    flush();
+    sink_.finish();
+}
+
+} // namespace vmtool
@@ -0,0 +1,169 @@
+#include "../include/FileCache.hpp"
+#include <cstdio>
+#include <cstring>
+
+namespace vmtool {
+
+namespace {
+
+// 64-bit content hash, eight bytes per step. Blobs are keyed by hash and size and
+// compared byte for byte before content is shared, so collisions cost a copy, not
+// a wrong answer.
+uint64_t content_hash(const std::string &data) {
+    const uint64_t k = 0x9E3779B97F4A7C15ULL;
+    uint64_t h = 0xcbf29ce484222325ULL ^ (data.size() * k);
+    size_t i = 0;
+    for (; i + 8 <= data.size(); i += 8) {
+        uint64_t w;
+        std::memcpy(&w, data.data() + i, 8);
+        h = (h ^ w) * k;
+        h ^= h >> 29;
+    }
+    for (; i < data.size(); ++i) {
+        h = (h ^ static_cast<unsigned char>(data[i])) * 0x100000001b3ULL;
+    }
+    h ^= h >> 32;
+    return h;
+}
+
+std::string blob_key(const std::string &data) {
+    char key[64];
+    std::snprintf(key, sizeof(key), "%016llx:%zu", static_cast<unsigned long long>(content_hash(data)), data.size());
+    return key;
+}
+
+} // anonymous namespace
+
+FileCache &FileCache::instance() {
+    static FileCache cache;
+    return cache;
+}
+
+std::string FileCache::file_key(const ImageIdentity &image, const std::string &path) {
+    return image.key + "|" + path;
+}
+
+bool FileCache::fetch_locked(std::unordered_map<std::string, FileEntry>::iterator it, std::string &out) {
+    auto blob = blobs_.find(it->second.blob);
+    if (blob == blobs_.end()) {
+        files_.erase(it);
+        return false;
+    }
+    lru_.splice(lru_.begin(), lru_, blob->second);
+    out = blob->second->data;
+    return true;
+}
+
+bool FileCache::get(const ImageIdentity &image, const std::string &path, std::string &out) {
+    if (!image.valid) return false;
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto it = files_.find(file_key(image, path));
+    if (it == files_.end() || !it->second.version.same_version(image) || !fetch_locked(it, out)) {
+        return false;
+    }
+    ++hits_;
+    return true;
+}
+
+bool FileCache::get(const ImageIdentity &image, const std::string &path, const GuestStat &st, std::string &out) {
+    if (!image.valid || !st.exists) return false;
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto it = files_.find(file_key(image, path));
+    if (it == files_.end()) {
+        ++misses_;
+        return false;
+    }
+    FileEntry &e = it->second;
+    bool same_file = e.ino == st.ino && e.mtime_sec == st.mtime_sec &&
+                     e.mtime_nsec == st.mtime_nsec && e.size == st.size;
+    if (!same_file || !fetch_locked(it, out)) {
+        ++misses_;
+        return false;
+    }
+    // The image changed elsewhere but this file did not: carry it over to the new version
+    it->second.version = image;
+    ++hits_;
+    return true;
+}
+
+void FileCache::put(const ImageIdentity &image, const std::string &path, const GuestStat &st, const std::string &data) {
+    if (!image.valid || static_cast<int64_t>(data.size()) != st.size) return;
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (data.size() > capacity_ / 4) return;
+
+    std::string bkey = blob_key(data);
+    auto blob = blobs_.find(bkey);
+    if (blob != blobs_.end() && blob->second->data != data) {
+        return; // hash collision with different content: leave the stored blob alone
+    }
+
+    std::string fkey = file_key(image, path);
+    if (blob == blobs_.end()) {
+        lru_.push_front(Blob{bkey, data, {}});
+        blobs_[bkey] = lru_.begin();
+        bytes_ += data.size();
+    } else {
+        lru_.splice(lru_.begin(), lru_, blob->second);
+        ++shared_;
+    }
+    lru_.front().files.insert(fkey);
+
+    FileEntry &e = files_[fkey];
+    if (!e.blob.empty() && e.blob != bkey) {
+        // The file now holds other content; its old blob no longer refers to it
+        auto old = blobs_.find(e.blob);
+        if (old != blobs_.end()) old->second->files.erase(fkey);
+    }
+    e.version = image;
+    e.ino = st.ino;
+    e.mtime_sec = st.mtime_sec;
+    e.mtime_nsec = st.mtime_nsec;
+    e.size = st.size;
+    e.blob = bkey;
+    evict_locked();
+}
+
+void FileCache::evict_locked() {
+    while (bytes_ > capacity_ && !lru_.empty()) {
+        Blob &victim = lru_.back();
+        for (const std::string &fkey : victim.files) {
+            auto it = files_.find(fkey);
+            if (it != files_.end() && it->second.blob == victim.key) files_.erase(it);
+        }
+        bytes_ -= victim.data.size();
+        blobs_.erase(victim.key);
+        lru_.pop_back();
+        ++evictions_;
+    }
+}
+
+FileCache::Stats FileCache::stats() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    Stats s;
+    s.hits = hits_;
+    s.misses = misses_;
+    s.evictions = evictions_;
+    s.shared = shared_;
+    s.files = files_.size();
+    s.blobs = lru_.size();
+    s.bytes = bytes_;
+    s.capacity = capacity_;
+    return s;
+}
+
+void FileCache::set_capacity(size_t bytes) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    capacity_ = bytes;
+    evict_locked();
+}
+
+void FileCache::clear() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    lru_.clear();
+    blobs_.clear();
+    files_.clear();
+    bytes_ = 0;
+    hits_ = misses_ = evictions_ = shared_ = 0;
+}
+
+} // namespace vmtool
@@ -0,0 +1,177 @@
+#include "../include/Formatters.hpp"
+#include <algorithm>
+#include <cstring>
+#include <ctime>
+#include <stdexcept>
+
+namespace vmtool {
+
+namespace {
+
+// Lookup tables: two hex digits and eight bit characters for every byte value,
+// so formatting is a straight table copy per byte instead of stream formatting.
+struct FormatTables {
+    char hex[256][2];
+    char bits[256][8];
+    char ascii[256];
+
+    FormatTables() {
+        static const char *digits = "0123456789ABCDEF";
+        for (int b = 0; b < 256; ++b) {
+            hex[b][0] = digits[(b >> 4) & 0xF];
+            hex[b][1] = digits[b & 0xF];
+            for (int k = 0; k < 8; ++k) {
+                bits[b][k] = (b & (0x80 >> k)) ? '1' : '0';
+            }
+            ascii[b] = (b >= 32 && b <= 126) ? static_cast<char>(b) : '.';
+        }
+    }
+};
+
+const FormatTables &tables() {
+    static const FormatTables t;
+    return t;
+}
+
+// Width of the offset column: at least 4 hex digits, more for large offsets
+size_t offset_digits(uint64_t max_offset) {
+    size_t digits = 4;
+    while (digits < 16 && (max_offset >> (digits * 4)) != 0) ++digits;
+    return digits;
+}
+
+void put_offset(char *&out, uint64_t value, size_t digits) {
+    static const char *hexdigits = "0123456789ABCDEF";
+    for (size_t i = 0; i < digits; ++i) {
+        out[digits - 1 - i] = hexdigits[(value >> (i * 4)) & 0xF];
+    }
+    out += digits;
+}
+
+} // anonymous namespace
+
+std::string format_hex(const unsigned char *data, size_t size) {
+    if (size == 0) return std::string();
+    const FormatTables &t = tables();
+    std::string out(size * 3 - 1, ' ');
+    char *p = &out[0];
+    for (size_t i = 0; i < size; ++i) {
+        std::memcpy(p, t.hex[data[i]], 2);
+        p += 3;
+    }
+    return out;
+}
+
+std::string format_bits(const unsigned char *data, size_t size) {
+    const FormatTables &t = tables();
+    std::string out(size * 8, '0');
+    char *p = &out[0];
+    for (size_t i = 0; i < size; ++i) {
+        std::memcpy(p, t.bits[data[i]], 8);
+        p += 8;
+    }
+    return out;
+}
+
+std::string format_dump(const unsigned char *data, size_t size,
+                        const std::string &format,
+                        uint64_t base_offset,
+                        bool ascii) {
+    bool hex = (format == "hex");
+    if (!hex && format != "bits") {
+        throw std::runtime_error("Invalid format: " + format + ". Use 'hex' or 'bits'");
+    }
+    if (size == 0) return std::string();
+
+    const FormatTables &t = tables();
+    const size_t per_row = hex ? 16 : 8;
+    const size_t cell = hex ? 3 : 8;                       // chars per byte in the data column
+    const size_t data_width = hex ? per_row * 3 - 1 : per_row * 8;
+    const size_t rows = (size + per_row - 1) / per_row;
+    const size_t digits = offset_digits(base_offset + size - 1);
+
+    // offset + ": " + data column [+ "  |" + ascii + "|"] + '\n'
+    const size_t row_width = digits + 2 + data_width + (ascii ? 3 + per_row + 1 : 0) + 1;
+    std::string out(rows * row_width, ' ');
+    char *p = &out[0];
+
+    for (size_t r = 0; r < rows; ++r) {
+        const size_t start = r * per_row;
+        const size_t n = std::min(per_row, size - start);
+
+        put_offset(p, base_offset + start, digits);
+        *p++ = ':';
+        *p++ = ' ';
+        for (size_t i = 0; i < n; ++i) {
+            const unsigned char b = data[start + i];
+            if (hex) {
+                std::memcpy(p + i * cell, t.hex[b], 2);
+            } else {
+                std::memcpy(p + i * cell, t.bits[b], 8);
+            }
+        }
+        size_t used = hex ? n * 3 - 1 : n * 8;
+        p += ascii ? data_width : used;
+
+        if (ascii) {
+            std::memcpy(p, "  |", 3);
+            p += 3;
+            for (size_t i = 0; i < n; ++i) *p++ = t.ascii[data[start + i]];
+            *p++ = '|';
+        }
+        *p++ = '\n';
+    }
+
+    // Without a gutter the last row is not padded; drop the trailing newline too
+    out.resize(static_cast<size_t>(p - &out[0]) - 1);
+    return out;
+}
+
+std::vector<DumpRow> dump_rows(const unsigned char *data, size_t size,
+                               const std::string &format,
+                               uint64_t base_offset) {
+    bool hex = (format == "hex");
+    if (!hex && format != "bits") {
+        throw std::runtime_error("Invalid format: " + format + ". Use 'hex' or 'bits'");
+    }
+
+    const FormatTables &t = tables();
+    const size_t per_row = hex ? 16 : 8;
+    std::vector<DumpRow> rows;
+    rows.reserve((size + per_row - 1) / per_row);
+
+    for (size_t start = 0; start < size; start += per_row) {
+        const size_t n = std::min(per_row, size - start);
+        DumpRow row;
+        row.offset = base_offset + start;
+        row.data = hex ? format_hex(data + start, n) : format_bits(data + start, n);
+        row.ascii.resize(n);
+        for (size_t i = 0; i < n; ++i) row.ascii[i] = t.ascii[data[start + i]];
+        rows.push_back(std::move(row));
+    }
+    return rows;
+}
+
+std::string TimeFormatter::operator()(int64_t t) {
+    if (t <= 0) return "-";
+    const int64_t minute = t / 60;
+    auto it = minutes_.find(minute);
+    if (it == minutes_.end()) {
+        if (minutes_.size() >= kMaxMinutes) minutes_.clear();
+        std::time_t start = static_cast<std::time_t>(minute * 60);
+        std::tm tmv;
+        char buf[32] = {0};
+        bool ok = utc_ ? gmtime_r(&start, &tmv) != nullptr : localtime_r(&start, &tmv) != nullptr;
+        if (ok && std::strftime(buf, sizeof(buf), "%Y-%m-%d %H:%M:", &tmv) == 0) ok = false;
+        it = minutes_.emplace(minute, ok ? std::string(buf) : std::string()).first;
+    }
+    if (it->second.empty()) return "-";
+
+    const int sec = static_cast<int>(t % 60);
+    std::string out = it->second;
+    out.push_back(static_cast<char>('0' + sec / 10));
+    out.push_back(static_cast<char>('0' + sec % 10));
+    return out;
+}
+
+} // namespace vmtool
@@ -0,0 +1,110 @@
+#include "../include/GuestFile.hpp"
+#include "../include/SessionPool.hpp"
+#include <algorithm>
+#include <cstring>
+#include <stdexcept>
+
+namespace vmtool {
+
+GuestFile::GuestFile(const std::string &disk_path, const std::string &path, size_t read_ahead)
+    : disk_path_(disk_path), path_(path), read_ahead_(std::max<size_t>(read_ahead, 1)) {
+    if (path_.empty() || path_[0] != '/') {
+        path_ = "/" + path_;
+    }
+    session_ = SessionPool::instance().acquire({disk_path_}, /*mount=*/true);
+    size_ = session_->file_size(path_);
+}
+
+GuestFile::~GuestFile() {
+    close();
+}
+
+void GuestFile::check_open() const {
+    if (!session_) {
+        throw std::invalid_argument("I/O operation on closed file");
+    }
+}
+
+size_t GuestFile::fill() {
+    if (pos_ >= size_) return 0;
+    if (pos_ < buf_offset_ || pos_ >= buf_offset_ + buf_.size()) {
+        size_t want = static_cast<size_t>(std::min<uint64_t>(read_ahead_, size_ - pos_));
+        buf_.resize(want);
+        buf_.resize(session_->read_file(path_, pos_, want, &buf_[0]));
+        buf_offset_ = pos_;
+    }
+    return static_cast<size_t>(buf_offset_ + buf_.size() - pos_);
+}
+
+size_t GuestFile::readinto(char *out, size_t length) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    check_open();
+    length = static_cast<size_t>(std::min<uint64_t>(length, pos_ < size_ ? size_ - pos_ : 0));
+    size_t done = 0;
+
+    // Serve what the read-ahead buffer already holds
+    if (pos_ >= buf_offset_ && pos_ < buf_offset_ + buf_.size()) {
+        size_t n = std::min(length, static_cast<size_t>(buf_offset_ + buf_.size() - pos_));
+        std::memcpy(out, buf_.data() + (pos_ - buf_offset_), n);
+        pos_ += n;
+        done += n;
+    }
+    if (done == length) return done;
+
+    if (length - done >= read_ahead_) {
+        // Large read: straight into the caller's buffer, no copy through ours
+        size_t n = session_->read_file(path_, pos_, length - done, out + done);
+        pos_ += n;
+        return done + n;
+    }
+
+    size_t avail = fill();
+    size_t n = std::min(length - done, avail);
+    std::memcpy(out + done, buf_.data() + (pos_ - buf_offset_), n);
+    pos_ += n;
+    return done + n;
+}
+
+std::string GuestFile::readline(int64_t limit) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    check_open();
+    std::string line;
+    while (limit < 0 || line.size() < static_cast<uint64_t>(limit)) {
+        size_t avail = fill();
+        if (avail == 0) break;
+        if (limit >= 0) avail = std::min<size_t>(avail, static_cast<size_t>(limit) - line.size());
+        const char *start = buf_.data() + (pos_ - buf_offset_);
+        const char *nl = static_cast<const char *>(std::memchr(start, '\n', avail));
+        size_t n = nl ? static_cast<size_t>(nl - start) + 1 : avail;
+        line.append(start, n);
+        pos_ += n;
+        if (nl) break;
+    }
+    return line;
+}
+
+uint64_t GuestFile::seek(int64_t offset, int whence) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    check_open();
+    int64_t base = 0;
+    switch (whence) {
+        case 0: base = 0; break;
+        case 1: base = static_cast<int64_t>(pos_); break;
+        case 2: base = static_cast<int64_t>(size_); break;
+        default: throw std::invalid_argument("Invalid whence: " + std::to_string(whence));
+    }
+    if (base + offset < 0) {
+        throw std::invalid_argument("Negative seek position " + std::to_string(base + offset));
+    }
+    pos_ = static_cast<uint64_t>(base + offset);
+    return pos_;
+}
+
+void GuestFile::close() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    session_.reset();
+    buf_.clear();
+    buf_.shrink_to_fit();
+}
+
+} // namespace vmtool
@@ -0,0 +1,282 @@
+#include "../include/GuestSession.hpp"
+#include <guestfs.h>
+#include <algorithm>
+#include <cstdlib>
+#include <cstring>
+#include <stdexcept>
+
+namespace vmtool {
+
+static void free_string_list(char **list) {
+    if (!list) return;
+    for (size_t i = 0; list[i] != nullptr; ++i) {
+        std::free(list[i]);
+    }
+    std::free(list);
+}
+
+GuestSession::GuestSession(const std::vector<std::string> &disk_paths) {
+    if (disk_paths.empty()) {
+        throw std::runtime_error("No disk images given");
+    }
+
+    g_ = guestfs_create();
+    if (!g_) {
+        throw std::runtime_error("Failed to create libguestfs handle");
+    }
+
+    for (size_t i = 0; i < disk_paths.size(); ++i) {
+        if (guestfs_add_drive_opts(g_, disk_paths[i].c_str(),
+                                   GUESTFS_ADD_DRIVE_OPTS_READONLY, 1, -1) == -1) {
+            guestfs_close(g_);
+            g_ = nullptr;
+            throw std::runtime_error("Failed to add drive: " + disk_paths[i]);
+        }
+    }
+
+    if (guestfs_launch(g_) == -1) {
+        guestfs_close(g_);
+        g_ = nullptr;
+        throw std::runtime_error("guestfs_launch failed");
+    }
+
+    char **devices = guestfs_list_devices(g_);
+    if (devices) {
+        for (size_t i = 0; devices[i] != nullptr; ++i) {
+            devices_.emplace_back(devices[i]);
+        }
+        free_string_list(devices);
+    }
+    if (devices_.size() < disk_paths.size()) {
+        guestfs_close(g_);
+        g_ = nullptr;
+        throw std::runtime_error("Could not find a device for every attached drive");
+    }
+}
+
+GuestSession::~GuestSession() {
+    if (g_) {
+        guestfs_close(g_);
+    }
+}
+
+const std::string &GuestSession::device(size_t drive) const {
+    if (drive >= devices_.size()) {
+        throw std::runtime_error("Drive index out of range: " + std::to_string(drive));
+    }
+    return devices_[drive];
+}
+
+uint64_t GuestSession::device_size(size_t drive) {
+    int64_t size = guestfs_blockdev_getsize64(g_, device(drive).c_str());
+    if (size < 0) {
+        throw std::runtime_error("Failed to get size of " + device(drive));
+    }
+    return static_cast<uint64_t>(size);
+}
+
+size_t GuestSession::read_device(size_t drive, uint64_t offset, size_t length, char *out) {
+    const std::string &dev = device(drive);
+    size_t done = 0;
+    while (done < length) {
+        size_t want = std::min(length - done, kMaxChunk);
+        size_t got = 0;
+        char *buf = guestfs_pread_device(g_, dev.c_str(), static_cast<int>(want),
+                                         static_cast<int64_t>(offset + done), &got);
+        if (!buf) {
+            throw std::runtime_error("Failed to read " + std::to_string(want) +
+                                     " bytes at offset " + std::to_string(offset + done) +
+                                     " from " + dev);
+        }
+        std::memcpy(out + done, buf, got);
+        std::free(buf);
+        done += got;
+        if (got == 0) break; // end of device
+    }
+    return done;
+}
+
+void GuestSession::mount_os() {
+    char **roots = guestfs_inspect_os(g_);
+    if (!roots || !roots[0]) {
+        free_string_list(roots);
+        throw std::runtime_error("No OS found in image");
+    }
+    for (size_t i = 0; roots[i] != nullptr; ++i) {
+        char **mpdev = guestfs_inspect_get_mountpoints(g_, roots[i]);
+        if (!mpdev) continue;
+        std::vector<std::pair<std::string, std::string>> mps; // mountpoint, device
+        for (size_t j = 0; mpdev[j] && mpdev[j + 1]; j += 2) {
+            mps.emplace_back(mpdev[j], mpdev[j + 1]);
+        }
+        free_string_list(mpdev);
+        std::sort(mps.begin(), mps.end(), [](const auto &a, const auto &b) {
+            return a.first.size() < b.first.size();
+        });
+        for (const auto &mp : mps) {
+            (void) guestfs_mount_ro(g_, mp.second.c_str(), mp.first.c_str());
+        }
+    }
+    free_string_list(roots);
+}
+
+static GuestStat to_guest_stat(const struct guestfs_statns &st) {
+    GuestStat out;
+    out.exists = true;
+    out.ino = st.st_ino;
+    out.mode = st.st_mode;
+    out.nlink = st.st_nlink;
+    out.uid = st.st_uid;
+    out.gid = st.st_gid;
+    out.size = st.st_size;
+    out.atime_sec = st.st_atime_sec;
+    out.atime_nsec = st.st_atime_nsec;
+    out.mtime_sec = st.st_mtime_sec;
+    out.mtime_nsec = st.st_mtime_nsec;
+    out.ctime_sec = st.st_ctime_sec;
+    out.ctime_nsec = st.st_ctime_nsec;
+    return out;
+}
+
+std::vector<GuestStat> GuestSession::lstat_list(const std::string &dir, const std::vector<std::string> &names) {
+    std::vector<GuestStat> out(names.size());
+    for (size_t begin = 0; begin < names.size(); begin += kStatBatch) {
+        size_t end = std::min(names.size(), begin + kStatBatch);
+        std::vector<char *> argv;
+        for (size_t i = begin; i < end; ++i) {
+            argv.push_back(const_cast<char *>(names[i].c_str()));
+        }
+        argv.push_back(nullptr);
+
+        struct guestfs_statns_list *list = guestfs_lstatnslist(g_, dir.c_str(), argv.data());
+        if (!list) continue; // directory missing or unreadable
+        for (size_t i = 0; i < list->len && begin + i < end; ++i) {
+            // The daemon reports entries it could not lstat with st_ino == -1
+            if (list->val[i].st_ino >= 0) {
+                out[begin + i] = to_guest_stat(list->val[i]);
+            }
+        }
+        guestfs_free_statns_list(list);
+    }
+    return out;
+}
+
+std::vector<std::string> GuestSession::list_dir(const std::string &dir) {
+    char **names = guestfs_ls(g_, dir.c_str());
+    if (!names) {
+        throw std::runtime_error("Failed to list directory: " + dir);
+    }
+    std::vector<std::string> out;
+    for (size_t i = 0; names[i] != nullptr; ++i) {
+        out.emplace_back(names[i]);
+    }
+    free_string_list(names);
+    return out;
+}
+
+std::vector<std::string> GuestSession::find(const std::string &dir) {
+    char **names = guestfs_find(g_, dir.c_str());
+    if (!names) {
+        throw std::runtime_error("Failed to list files: " + dir);
+    }
+    std::vector<std::string> out;
+    for (size_t i = 0; names[i] != nullptr; ++i) {
+        out.emplace_back(names[i]);
+    }
+    free_string_list(names);
+    return out;
+}
+
+std::vector<std::string> GuestSession::readlink_list(const std::string &dir, const std::vector<std::string> &names) {
+    std::vector<std::string> out(names.size());
+    for (size_t begin = 0; begin < names.size(); begin += kStatBatch) {
+        size_t end = std::min(names.size(), begin + kStatBatch);
+        std::vector<char *> argv;
+        for (size_t i = begin; i < end; ++i) {
+            argv.push_back(const_cast<char *>(names[i].c_str()));
+        }
+        argv.push_back(nullptr);
+
+        char **targets = guestfs_readlinklist(g_, dir.c_str(), argv.data());
+        if (!targets) continue;
+        for (size_t i = 0; targets[i] != nullptr && begin + i < end; ++i) {
+            out[begin + i] = targets[i];
+        }
+        free_string_list(targets);
+    }
+    return out;
+}
+
+GuestStat GuestSession::stat(const std::string &path) {
+    struct guestfs_statns *st = guestfs_statns(g_, path.c_str());
+    if (!st) return GuestStat{};
+    GuestStat out = to_guest_stat(*st);
+    guestfs_free_statns(st);
+    return out;
+}
+
+uint64_t GuestSession::used_inodes() {
+    char **mounts = guestfs_mountpoints(g_);
+    if (!mounts) return 0;
+    uint64_t used = 0;
+    // Pairs of device, mountpoint
+    for (size_t i = 0; mounts[i] && mounts[i + 1]; i += 2) {
+        struct guestfs_statvfs *vfs = guestfs_statvfs(g_, mounts[i + 1]);
+        if (!vfs) continue;
+        if (vfs->files > vfs->ffree) used += static_cast<uint64_t>(vfs->files - vfs->ffree);
+        guestfs_free_statvfs(vfs);
+    }
+    free_string_list(mounts);
+    return used;
+}
+
+bool GuestSession::alive() const {
+    return g_ && guestfs_is_ready(g_) == 1;
+}
+
+uint64_t GuestSession::file_size(const std::string &path) {
+    int64_t size = guestfs_filesize(g_, path.c_str());
+    if (size < 0) {
+        throw std::runtime_error("Failed to stat file: " + path);
+    }
+    return static_cast<uint64_t>(size);
+}
+
+std::string GuestSession::checksum(const std::string &csumtype, const std::string &path) {
+    char *sum = guestfs_checksum(g_, csumtype.c_str(), path.c_str());
+    if (!sum) {
+        throw std::runtime_error("Failed to checksum file: " + path);
+    }
+    std::string out(sum);
+    free(sum);
+    return out;
+}
+
+void GuestSession::checksums_out(const std::string &csumtype, const std::string &directory,
+                                 const std::string &host_file) {
+    if (guestfs_checksums_out(g_, csumtype.c_str(), directory.c_str(), host_file.c_str()) == -1) {
+        throw std::runtime_error("Failed to checksum directory: " + directory);
+    }
+}
+
+size_t GuestSession::read_file(const std::string &path, uint64_t offset, size_t length, char *out) {
+    size_t done = 0;
+    while (done < length) {
+        size_t want = std::min(length - done, kMaxChunk);
+        size_t got = 0;
+        char *buf = guestfs_pread(g_, path.c_str(), static_cast<int>(want),
+                                  static_cast<int64_t>(offset + done), &got);
+        if (!buf) {
+            throw std::runtime_error("Failed to read " + std::to_string(want) +
+                                     " bytes at offset " + std::to_string(offset + done) +
+                                     " from " + path);
+        }
+        std::memcpy(out + done, buf, got);
+        std::free(buf);
+        done += got;
+        if (got == 0) break; // end of file
+    }
+    return done;
+}
+
+} // namespace vmtool
@@ -0,0 +1,178 @@
+#include "../include/ImageIndex.hpp"
+#include <cstdio>
+#include <cstdlib>
+#include <filesystem>
+#include <fstream>
+#include <sstream>
+#include <unistd.h>
+
+namespace fs = std::filesystem;
+
+namespace vmtool {
+
+namespace {
+
+// Section names are free-form ("checksums/sha256:/etc"); files are named by their
+// FNV-1a hash and start with the full name, so a hash collision reads as a miss.
+std::string section_file(const std::string &section) {
+    uint64_t h = 0xcbf29ce484222325ULL;
+    for (unsigned char c : section) {
+        h ^= c;
+        h *= 0x100000001b3ULL;
+    }
+    char name[32];
+    std::snprintf(name, sizeof(name), "%016llx.sec", static_cast<unsigned long long>(h));
+    return name;
+}
+
+std::string version_of(const ImageIdentity &image) {
+    return std::to_string(image.size) + " " + std::to_string(image.mtime_sec) + " " +
+           std::to_string(image.mtime_nsec);
+}
+
+bool read_all(const fs::path &path, std::string &out) {
+    std::ifstream in(path, std::ios::binary);
+    if (!in) return false;
+    std::ostringstream buf;
+    buf << in.rdbuf();
+    out = buf.str();
+    return true;
+}
+
+// Write through a temporary file and rename it, so readers never see a partial file
+bool write_all(const fs::path &path, const std::string &header, const std::string &data) {
+    fs::path tmp = path;
+    tmp += ".tmp" + std::to_string(static_cast<long>(::getpid()));
+    {
+        std::ofstream out(tmp, std::ios::binary | std::ios::trunc);
+        if (!out) return false;
+        out.write(header.data(), static_cast<std::streamsize>(header.size()));
+        out.write(data.data(), static_cast<std::streamsize>(data.size()));
+        if (!out) return false;
+    }
+    std::error_code ec;
+    fs::rename(tmp, path, ec);
+    if (ec) fs::remove(tmp, ec);
+    return !ec;
+}
+
+// The index may share its root with other files (a $VMTOOL_INDEX_DIR of /tmp, say),
+// so only what it wrote is removed: in an "<st_dev>_<st_ino>" directory holding a
+// version file, the version file, the sections and their temporaries. The directory
+// itself goes only once that leaves it empty.
+bool is_image_dir(const fs::path &dir) {
+    const std::string name = dir.filename().string();
+    const size_t sep = name.find('_');
+    auto digits = [](const std::string &s) {
+        return !s.empty() && s.find_first_not_of("0123456789") == std::string::npos;
+    };
+    std::error_code ec;
+    return sep != std::string::npos && digits(name.substr(0, sep)) && digits(name.substr(sep + 1)) &&
+           !fs::is_symlink(dir, ec) && fs::is_directory(dir, ec) && fs::is_regular_file(dir / "version", ec);
+}
+
+void remove_image_dir(const fs::path &dir) {
+    std::error_code ec;
+    for (const auto &entry : fs::directory_iterator(dir, ec)) {
+        const std::string name = entry.path().filename().string();
+        const bool ours = name == "version" || name.compare(0, 11, "version.tmp") == 0 ||
+                          (name.size() >= 4 && name.compare(name.size() - 4, 4, ".sec") == 0) ||
+                          name.find(".sec.tmp") != std::string::npos;
+        if (ours && !entry.is_directory(ec)) fs::remove(entry.path(), ec);
+    }
+    fs::remove(dir, ec);
+}
+
+std::string default_root() {
+    if (const char *dir = std::getenv("VMTOOL_INDEX_DIR"); dir && *dir) return dir;
+    if (const char *xdg = std::getenv("XDG_CACHE_HOME"); xdg && *xdg) return std::string(xdg) + "/vmtool/index";
+    const char *home = std::getenv("HOME");
+    return std::string(home && *home ? home : "/tmp") + "/.cache/vmtool/index";
+}
+
+} // anonymous namespace
+
+ImageIndex::ImageIndex() : root_(default_root()) {}
+
+ImageIndex &ImageIndex::instance() {
+    static ImageIndex index;
+    return index;
+}
+
+std::string ImageIndex::image_dir_locked(const ImageIdentity &image) const {
+    std::string name = image.key;
+    for (char &c : name) {
+        if (c == ':') c = '_';
+    }
+    return root_ + "/" + name;
+}
+
+bool ImageIndex::check_version_locked(const ImageIdentity &image, bool create) {
+    fs::path dir = image_dir_locked(image);
+    fs::path version_file = dir / "version";
+    std::string stored;
+    std::error_code ec;
+    if (read_all(version_file, stored)) {
+        if (stored == version_of(image)) return true;
+        // The image file changed: every section stored for it is stale
+        remove_image_dir(dir);
+        ++stats_.invalidations;
+    }
+    if (!create) return false;
+    fs::create_directories(dir, ec);
+    return !ec && write_all(version_file, "", version_of(image));
+}
+
+bool ImageIndex::load(const ImageIdentity &image, const std::string &section, std::string &out) {
+    if (!image.valid) return false;
+    std::lock_guard<std::mutex> lock(mutex_);
+    std::string content;
+    if (!check_version_locked(image, /*create=*/false) ||
+        !read_all(fs::path(image_dir_locked(image)) / section_file(section), content)) {
+        ++stats_.misses;
+        return false;
+    }
+    size_t eol = content.find('\n');
+    if (eol == std::string::npos || content.compare(0, eol, section) != 0) {
+        ++stats_.misses;
+        return false;
+    }
+    out.assign(content, eol + 1, std::string::npos);
+    ++stats_.hits;
+    return true;
+}
+
+void ImageIndex::store(const ImageIdentity &image, const std::string &section, const std::string &data) {
+    if (!image.valid) return;
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (!check_version_locked(image, /*create=*/true)) return;
+    if (write_all(fs::path(image_dir_locked(image)) / section_file(section), section + "\n", data)) {
+        ++stats_.stores;
+    }
+}
+
+std::string ImageIndex::directory() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return root_;
+}
+
+void ImageIndex::set_directory(const std::string &path) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    root_ = path.empty() ? default_root() : path;
+}
+
+void ImageIndex::clear() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    std::error_code ec;
+    for (const auto &entry : fs::directory_iterator(root_, ec)) {
+        if (is_image_dir(entry.path())) remove_image_dir(entry.path());
+    }
+    stats_ = Stats{};
+}
+
+ImageIndex::Stats ImageIndex::stats() {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return stats_;
+}
+
+} // namespace vmtool
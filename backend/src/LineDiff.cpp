@@ -0,0 +1,404 @@
+#include "../include/LineDiff.hpp"
+#include <algorithm>
+#include <stdexcept>
+#include <unordered_map>
+
+namespace vmtool {
+
+std::vector<std::string_view> split_lines(std::string_view text) {
+    std::vector<std::string_view> lines;
+    size_t start = 0;
+    while (start < text.size()) {
+        size_t nl = text.find('\n', start);
+        if (nl == std::string_view::npos) {
+            lines.push_back(text.substr(start));
+            break;
+        }
+        lines.push_back(text.substr(start, nl - start));
+        start = nl + 1;
+    }
+    return lines;
+}
+
+DiffAlgorithm parse_diff_algorithm(const std::string &name) {
+    if (name == "myers") return DiffAlgorithm::Myers;
+    if (name == "histogram") return DiffAlgorithm::Histogram;
+    throw std::invalid_argument("Invalid diff algorithm '" + name + "'. Supported: 'myers', 'histogram'.");
+}
+
+namespace {
+
+// Occurrence count above which a line is not used as a histogram anchor
+constexpr size_t kMaxAnchorCount = 64;
+
+// Marks changed elements of a and b (GNU diff style); the edit script is read off the marks
+class DiffEngine {
+public:
+    DiffEngine(const std::vector<int> &a, const std::vector<int> &b)
+        : a_(a), b_(b), a_changed_(a.size(), false), b_changed_(b.size(), false) {}
+
+    void run(DiffAlgorithm algorithm) {
+        if (algorithm == DiffAlgorithm::Histogram) {
+            index_positions();
+            histogram(0, a_.size(), 0, b_.size());
+        } else {
+            myers(0, a_.size(), 0, b_.size());
+        }
+    }
+
+    std::vector<DiffOp> ops() const {
+        std::vector<DiffOp> out;
+        auto push = [&out](DiffOp::Kind kind, size_t a0, size_t a1, size_t b0, size_t b1) {
+            if (a0 == a1 && b0 == b1) return;
+            if (!out.empty() && out.back().kind == kind) {
+                out.back().a_end = a1;
+                out.back().b_end = b1;
+            } else {
+                out.push_back(DiffOp{kind, a0, a1, b0, b1});
+            }
+        };
+
+        size_t i = 0, j = 0;
+        while (i < a_.size() || j < b_.size()) {
+            size_t i0 = i, j0 = j;
+            while (i < a_.size() && j < b_.size() && !a_changed_[i] && !b_changed_[j]) { ++i; ++j; }
+            push(DiffOp::Equal, i0, i, j0, j);
+            i0 = i;
+            while (i < a_.size() && a_changed_[i]) ++i;
+            push(DiffOp::Delete, i0, i, j, j);
+            j0 = j;
+            while (j < b_.size() && b_changed_[j]) ++j;
+            push(DiffOp::Insert, i, i, j0, j);
+        }
+        return out;
+    }
+
+private:
+    void mark_all(size_t a_lo, size_t a_hi, size_t b_lo, size_t b_hi) {
+        for (size_t i = a_lo; i < a_hi; ++i) a_changed_[i] = true;
+        for (size_t j = b_lo; j < b_hi; ++j) b_changed_[j] = true;
+    }
+
+    // Shrink the range by its common prefix and suffix; true if either side is then empty
+    bool trim(size_t &a_lo, size_t &a_hi, size_t &b_lo, size_t &b_hi) {
+        while (a_lo < a_hi && b_lo < b_hi && a_[a_lo] == b_[b_lo]) { ++a_lo; ++b_lo; }
+        while (a_lo < a_hi && b_lo < b_hi && a_[a_hi - 1] == b_[b_hi - 1]) { --a_hi; --b_hi; }
+        if (a_lo == a_hi || b_lo == b_hi) {
+            mark_all(a_lo, a_hi, b_lo, b_hi);
+            return true;
+        }
+        return false;
+    }
+
+    void myers(size_t a_lo, size_t a_hi, size_t b_lo, size_t b_hi) {
+        if (trim(a_lo, a_hi, b_lo, b_hi)) return;
+        size_t x = 0, y = 0;
+        if (!bisect(a_lo, a_hi, b_lo, b_hi, x, y)) {
+            mark_all(a_lo, a_hi, b_lo, b_hi);
+            return;
+        }
+        myers(a_lo, x, b_lo, y);
+        myers(x, a_hi, y, b_hi);
+    }
+
+    // Find the middle snake of a_[a_lo, a_hi) vs b_[b_lo, b_hi); (x, y) is an absolute split point.
+    // Past kMaxCost edits the furthest-reaching forward path is used as the split
+    // instead, trading minimality for bounded time. False if the ranges share nothing.
+    bool bisect(size_t a_lo, size_t a_hi, size_t b_lo, size_t b_hi, size_t &x_out, size_t &y_out) {
+        const long n = static_cast<long>(a_hi - a_lo);
+        const long m = static_cast<long>(b_hi - b_lo);
+        const long max_d = std::min<long>((n + m + 1) / 2, kMaxCost);
+        const long offset = max_d + 1;
+        const long length = 2 * max_d + 3;
+        std::vector<long> v1(length, -1), v2(length, -1);
+        v1[offset + 1] = 0;
+        v2[offset + 1] = 0;
+        const long delta = n - m;
+        const bool front = (delta % 2) != 0;
+        long k1start = 0, k1end = 0, k2start = 0, k2end = 0;
+        const int *A = a_.data() + a_lo;
+        const int *B = b_.data() + b_lo;
+        long best_x = 0, best_y = 0;
+
+        for (long d = 0; d < max_d; ++d) {
+            for (long k1 = -d + k1start; k1 <= d - k1end; k1 += 2) {
+                long k1o = offset + k1;
+                long x1 = (k1 == -d || (k1 != d && v1[k1o - 1] < v1[k1o + 1])) ? v1[k1o + 1] : v1[k1o - 1] + 1;
+                long y1 = x1 - k1;
+                while (x1 < n && y1 < m && A[x1] == B[y1]) { ++x1; ++y1; }
+                v1[k1o] = x1;
+                if (x1 <= n && y1 <= m && x1 + y1 > best_x + best_y) {
+                    best_x = x1;
+                    best_y = y1;
+                }
+                if (x1 > n) {
+                    k1end += 2;
+                } else if (y1 > m) {
+                    k1start += 2;
+                } else if (front) {
+                    long k2o = offset + delta - k1;
+                    if (k2o >= 0 && k2o < length && v2[k2o] != -1 && x1 >= n - v2[k2o]) {
+                        x_out = a_lo + static_cast<size_t>(x1);
+                        y_out = b_lo + static_cast<size_t>(y1);
+                        return true;
+                    }
+                }
+            }
+            for (long k2 = -d + k2start; k2 <= d - k2end; k2 += 2) {
+                long k2o = offset + k2;
+                long x2 = (k2 == -d || (k2 != d && v2[k2o - 1] < v2[k2o + 1])) ? v2[k2o + 1] : v2[k2o - 1] + 1;
+                long y2 = x2 - k2;
+                while (x2 < n && y2 < m && A[n - x2 - 1] == B[m - y2 - 1]) { ++x2; ++y2; }
+                v2[k2o] = x2;
+                if (x2 > n) {
+                    k2end += 2;
+                } else if (y2 > m) {
+                    k2start += 2;
+                } else if (!front) {
+                    long k1o = offset + delta - k2;
+                    if (k1o >= 0 && k1o < length && v1[k1o] != -1) {
+                        long x1 = v1[k1o];
+                        long y1 = offset + x1 - k1o;
+                        if (x1 >= n - x2) {
+                            x_out = a_lo + static_cast<size_t>(x1);
+                            y_out = b_lo + static_cast<size_t>(y1);
+                            return true;
+                        }
+                    }
+                }
+            }
+        }
+        if (best_x + best_y == 0 || (best_x == n && best_y == m)) return false;
+        x_out = a_lo + static_cast<size_t>(best_x);
+        y_out = b_lo + static_cast<size_t>(best_y);
+        return true;
+    }
+
+    // Sorted positions of every element of a_, so per-range counts are two binary searches
+    void index_positions() {
+        int max_id = -1;
+        for (int v : a_) max_id = std::max(max_id, v);
+        for (int v : b_) max_id = std::max(max_id, v);
+        positions_.assign(static_cast<size_t>(max_id + 1), {});
+        for (size_t i = 0; i < a_.size(); ++i) positions_[static_cast<size_t>(a_[i])].push_back(i);
+    }
+
+    void histogram(size_t a_lo, size_t a_hi, size_t b_lo, size_t b_hi) {
+        // The part after each anchor is handled by looping, so stack depth
+        // only grows with the part in front of it
+        while (!trim(a_lo, a_hi, b_lo, b_hi)) {
+            size_t best_count = kMaxAnchorCount + 1;
+            size_t best_a = 0, best_b = 0, best_a_end = 0, best_b_end = 0;
+            bool any_common = false;
+
+            for (size_t j = b_lo; j < b_hi; ++j) {
+                const auto &pos = positions_[static_cast<size_t>(b_[j])];
+                auto first = std::lower_bound(pos.begin(), pos.end(), a_lo);
+                auto last = std::lower_bound(first, pos.end(), a_hi);
+                size_t count = static_cast<size_t>(last - first);
+                if (count == 0) continue;
+                any_common = true;
+                if (count > best_count) continue;
+
+                for (auto it = first; it != last; ++it) {
+                    size_t s_a = *it, s_b = j, e_a = *it + 1, e_b = j + 1;
+                    while (s_a > a_lo && s_b > b_lo && a_[s_a - 1] == b_[s_b - 1]) { --s_a; --s_b; }
+                    while (e_a < a_hi && e_b < b_hi && a_[e_a] == b_[e_b]) { ++e_a; ++e_b; }
+                    if (count < best_count || e_a - s_a > best_a_end - best_a) {
+                        best_count = count;
+                        best_a = s_a;
+                        best_b = s_b;
+                        best_a_end = e_a;
+                        best_b_end = e_b;
+                    }
+                }
+                // A line unique in the old range is as good an anchor as it gets
+                if (best_count == 1) break;
+            }
+
+            if (!any_common) {
+                mark_all(a_lo, a_hi, b_lo, b_hi);
+                return;
+            }
+            if (best_count > kMaxAnchorCount) {
+                myers(a_lo, a_hi, b_lo, b_hi);
+                return;
+            }
+            histogram(a_lo, best_a, b_lo, best_b);
+            a_lo = best_a_end;
+            b_lo = best_b_end;
+        }
+    }
+
+    const std::vector<int> &a_;
+    const std::vector<int> &b_;
+    std::vector<bool> a_changed_;
+    std::vector<bool> b_changed_;
+    std::vector<std::vector<size_t>> positions_;
+};
+
+// Move a range outward so it does not cut a UTF-8 sequence in half
+ByteRange widen_to_utf8(std::string_view s, ByteRange r) {
+    auto continuation = [&s](uint64_t i) { return (static_cast<unsigned char>(s[i]) & 0xC0) == 0x80; };
+    while (r.first > 0 && r.first < s.size() && continuation(r.first)) --r.first;
+    while (r.second < s.size() && continuation(r.second)) ++r.second;
+    return r;
+}
+
+// Changed ranges of one side from the marks, with gaps of a byte or two closed up
+// so highlighting does not fragment into single characters
+void collect_ranges(std::string_view s, const std::vector<DiffOp> &ops, bool old_side,
+                    std::vector<ByteRange> &out) {
+    out.clear();
+    for (const DiffOp &op : ops) {
+        if (op.kind == DiffOp::Equal) continue;
+        size_t begin = old_side ? op.a_begin : op.b_begin;
+        size_t end = old_side ? op.a_end : op.b_end;
+        if (begin == end) continue;
+        ByteRange r = widen_to_utf8(s, {begin, end});
+        if (!out.empty() && r.first <= out.back().second + 2) {
+            out.back().second = std::max(out.back().second, r.second);
+        } else {
+            out.push_back(r);
+        }
+    }
+}
+
+} // namespace
+
+std::vector<DiffOp> diff_lines(const std::vector<std::string_view> &a,
+                               const std::vector<std::string_view> &b,
+                               DiffAlgorithm algorithm) {
+    std::unordered_map<std::string_view, int> ids;
+    ids.reserve(a.size() + b.size());
+    std::vector<int> ia, ib;
+    ia.reserve(a.size());
+    ib.reserve(b.size());
+    for (const auto &line : a) ia.push_back(ids.emplace(line, static_cast<int>(ids.size())).first->second);
+    const int a_ids = static_cast<int>(ids.size());
+    bool any_common = false;
+    for (const auto &line : b) {
+        ib.push_back(ids.emplace(line, static_cast<int>(ids.size())).first->second);
+        any_common = any_common || ib.back() < a_ids;
+    }
+
+    // Nothing in common: everything is replaced, no search needed
+    if (!any_common) {
+        std::vector<DiffOp> ops;
+        if (!a.empty()) ops.push_back(DiffOp{DiffOp::Delete, 0, a.size(), 0, 0});
+        if (!b.empty()) ops.push_back(DiffOp{DiffOp::Insert, a.size(), a.size(), 0, b.size()});
+        return ops;
+    }
+
+    DiffEngine engine(ia, ib);
+    engine.run(algorithm);
+    return engine.ops();
+}
+
+void diff_chars(std::string_view a, std::string_view b,
+                std::vector<ByteRange> &a_ranges, std::vector<ByteRange> &b_ranges) {
+    a_ranges.clear();
+    b_ranges.clear();
+    if (a.size() > kMaxIntralineBytes || b.size() > kMaxIntralineBytes) {
+        if (!a.empty()) a_ranges.emplace_back(0, a.size());
+        if (!b.empty()) b_ranges.emplace_back(0, b.size());
+        return;
+    }
+    std::vector<int> ia(a.begin(), a.end()), ib(b.begin(), b.end());
+    DiffEngine engine(ia, ib);
+    engine.run(DiffAlgorithm::Myers);
+    std::vector<DiffOp> ops = engine.ops();
+    collect_ranges(a, ops, true, a_ranges);
+    collect_ranges(b, ops, false, b_ranges);
+}
+
+std::vector<DiffHunk> make_hunks(const std::vector<DiffOp> &ops, size_t context) {
+    std::vector<DiffHunk> hunks;
+    DiffHunk *cur = nullptr;
+
+    for (size_t k = 0; k < ops.size(); ++k) {
+        const DiffOp &op = ops[k];
+        if (op.kind != DiffOp::Equal) {
+            if (!cur) {
+                hunks.push_back(DiffHunk{op.a_begin, 0, op.b_begin, 0, {}});
+                cur = &hunks.back();
+                // Leading context from the previous equal run
+                if (k > 0 && ops[k - 1].kind == DiffOp::Equal) {
+                    const DiffOp &eq = ops[k - 1];
+                    size_t n = std::min(context, eq.a_end - eq.a_begin);
+                    if (n) cur->ops.push_back(DiffOp{DiffOp::Equal, eq.a_end - n, eq.a_end, eq.b_end - n, eq.b_end});
+                }
+            }
+            cur->ops.push_back(op);
+            continue;
+        }
+        if (!cur) continue;
+        size_t len = op.a_end - op.a_begin;
+        bool last = (k + 1 == ops.size());
+        if (!last && len <= 2 * context) {
+            // Short equal run between changes stays inside the hunk
+            cur->ops.push_back(op);
+        } else {
+            size_t n = std::min(context, len);
+            if (n) cur->ops.push_back(DiffOp{DiffOp::Equal, op.a_begin, op.a_begin + n, op.b_begin, op.b_begin + n});
+            cur = nullptr;
+        }
+    }
+
+    for (auto &h : hunks) {
+        h.a_start = h.ops.front().a_begin;
+        h.b_start = h.ops.front().b_begin;
+        h.a_count = h.ops.back().a_end - h.a_start;
+        h.b_count = h.ops.back().b_end - h.b_start;
+    }
+    return hunks;
+}
+
+TextDiff::TextDiff(std::string a, std::string b, DiffAlgorithm algorithm)
+    : a_(std::move(a)), b_(std::move(b)) {
+    a_lines_ = split_lines(a_);
+    b_lines_ = split_lines(b_);
+    ops_ = diff_lines(a_lines_, b_lines_, algorithm);
+
+    for (size_t k = 0; k < ops_.size(); ++k) {
+        const DiffOp &op = ops_[k];
+        if (op.kind == DiffOp::Equal) {
+            for (size_t i = op.a_begin, j = op.b_begin; i < op.a_end; ++i, ++j) {
+                rows_.push_back(Row{Row::Equal, static_cast<int64_t>(i), static_cast<int64_t>(j)});
+            }
+            continue;
+        }
+        // A deletion directly followed by an insertion is one block of changes
+        if (k == 0 || ops_[k - 1].kind == DiffOp::Equal) change_starts_.push_back(rows_.size());
+
+        if (op.kind == DiffOp::Delete) {
+            removed_ += op.a_end - op.a_begin;
+            size_t paired = 0;
+            if (k + 1 < ops_.size() && ops_[k + 1].kind == DiffOp::Insert) {
+                const DiffOp &ins = ops_[k + 1];
+                paired = std::min(op.a_end - op.a_begin, ins.b_end - ins.b_begin);
+                for (size_t p = 0; p < paired; ++p) {
+                    rows_.push_back(Row{Row::Change, static_cast<int64_t>(op.a_begin + p),
+                                        static_cast<int64_t>(ins.b_begin + p)});
+                }
+            }
+            for (size_t i = op.a_begin + paired; i < op.a_end; ++i) {
+                rows_.push_back(Row{Row::Delete, static_cast<int64_t>(i), -1});
+            }
+            if (paired) {
+                const DiffOp &ins = ops_[++k];
+                added_ += ins.b_end - ins.b_begin;
+                for (size_t j = ins.b_begin + paired; j < ins.b_end; ++j) {
+                    rows_.push_back(Row{Row::Insert, -1, static_cast<int64_t>(j)});
+                }
+            }
+        } else {
+            added_ += op.b_end - op.b_begin;
+            for (size_t j = op.b_begin; j < op.b_end; ++j) {
+                rows_.push_back(Row{Row::Insert, -1, static_cast<int64_t>(j)});
+            }
+        }
+    }
+}
+
+} // namespace vmtool
@@ -0,0 +1,334 @@
+#include "../include/PathSearch.hpp"
+#include "../include/Varint.hpp"
+#include <algorithm>
+#include <cctype>
+#include <fnmatch.h>
+#include <iterator>
+#include <stdexcept>
+#include <unordered_map>
+
+namespace vmtool {
+
+namespace {
+
+constexpr std::string_view kMagic = "PATHGRAM1\n";
+
+uint64_t get_varint(const char *data, size_t size, size_t &pos) {
+    uint64_t value;
+    if (!read_varint(data, size, pos, value)) throw std::runtime_error("Malformed trigram index");
+    return value;
+}
+
+uint32_t trigram(std::string_view text, size_t at) {
+    return static_cast<uint32_t>(static_cast<uint8_t>(text[at])) << 16 |
+           static_cast<uint32_t>(static_cast<uint8_t>(text[at + 1])) << 8 |
+           static_cast<uint32_t>(static_cast<uint8_t>(text[at + 2]));
+}
+
+// Index of the ']' closing the bracket expression opened at `open`, or npos if it
+// does not parse. The ']' of nested [:class:], [=equiv=] and [.collating.] terms
+// is part of the set, and so is a glob's ']' right after '[' or the negation
+// (in ECMAScript, "[]" and "[^]" are complete classes).
+size_t bracket_end(const std::string &s, size_t open, bool glob) {
+    size_t j = open + 1;
+    if (j < s.size() && (s[j] == '^' || (glob && s[j] == '!'))) ++j;
+    if (glob && j < s.size() && s[j] == ']') ++j;
+    for (; j < s.size(); ++j) {
+        const char c = s[j];
+        if (c == ']') return j;
+        if (c == '\\') {
+            ++j;
+        } else if (c == '[' && j + 1 < s.size() && (s[j + 1] == ':' || s[j + 1] == '=' || s[j + 1] == '.')) {
+            const size_t close = s.find(std::string{s[j + 1], ']'}, j + 2);
+            if (close == std::string::npos) return std::string::npos;
+            j = close + 1;
+        }
+    }
+    return std::string::npos;
+}
+
+// Literal runs of a glob: the text between wildcards and bracket expressions
+std::vector<std::string> glob_literals(const std::string &glob) {
+    std::vector<std::string> out(1);
+    for (size_t i = 0; i < glob.size(); ++i) {
+        char c = glob[i];
+        if (c == '\\' && i + 1 < glob.size()) {
+            out.back().push_back(glob[++i]);
+        } else if (c == '*' || c == '?' || c == '[') {
+            if (c == '[') {
+                i = bracket_end(glob, i, true);
+                if (i == std::string::npos) {
+                    // Nothing after a bracket that does not parse is relied on
+                    out.emplace_back();
+                    return out;
+                }
+            }
+            out.emplace_back();
+        } else {
+            out.back().push_back(c);
+        }
+    }
+    return out;
+}
+
+// Literal runs every match of an ECMAScript regex must contain. Conservative:
+// only text outside groups and classes counts, a quantified character is left
+// out, and an alternation outside groups means there are none.
+std::vector<std::string> regex_literals(const std::string &re) {
+    std::vector<std::string> out(1);
+    auto cut = [&]() {
+        if (!out.back().empty()) out.emplace_back();
+    };
+    for (size_t i = 0; i < re.size(); ++i) {
+        char c = re[i];
+        switch (c) {
+        case '\\':
+            if (i + 1 < re.size() && !std::isalnum(static_cast<unsigned char>(re[i + 1]))) {
+                out.back().push_back(re[++i]);
+            } else if (++i < re.size()) {
+                // \d, \w, \b, ...: a class or an assertion. Escapes that spell a character
+                // (\xHH, \uHHHH, \cX, \0 and backreferences) also take their operand, so
+                // \x61bc requires "bc", not "61bc".
+                auto skip_hex = [&](size_t n) {
+                    for (; n && i + 1 < re.size() && std::isxdigit(static_cast<unsigned char>(re[i + 1])); --n) ++i;
+                };
+                if (re[i] == 'x') {
+                    skip_hex(2);
+                } else if (re[i] == 'u') {
+                    skip_hex(4);
+                } else if (re[i] == 'c') {
+                    if (i + 1 < re.size()) ++i;
+                } else if (std::isdigit(static_cast<unsigned char>(re[i]))) {
+                    while (i + 1 < re.size() && std::isdigit(static_cast<unsigned char>(re[i + 1]))) ++i;
+                }
+                cut();
+            }
+            break;
+        case '(':
+        case '[': {
+            // Skip the group or class (groups may nest and hold classes)
+            int depth = 0;
+            for (; i < re.size(); ++i) {
+                char d = re[i];
+                if (d == '\\') {
+                    ++i;
+                } else if (d == '[') {
+                    i = bracket_end(re, i, false);
+                    if (i == std::string::npos) {
+                        // Nothing after a class that does not parse is relied on
+                        cut();
+                        return out;
+                    }
+                } else if (d == '(') {
+                    ++depth;
+                } else if (d == ')') {
+                    --depth;
+                }
+                if (depth == 0) break;
+            }
+            cut();
+            break;
+        }
+        case '|':
+            return {};
+        case '*':
+        case '?':
+        case '{':
+            // The preceding character may be absent
+            if (!out.back().empty()) out.back().pop_back();
+            if (c == '{') {
+                while (i < re.size() && re[i] != '}') ++i;
+            }
+            cut();
+            break;
+        case '+':
+        case '.':
+        case '^':
+        case '$':
+            cut();
+            break;
+        default:
+            out.back().push_back(c);
+        }
+    }
+    return out;
+}
+
+} // anonymous namespace
+
+TrigramIndex::TrigramIndex(const PathSet &paths) : path_count_(paths.size()) {
+    if (paths.size() > UINT32_MAX) throw std::invalid_argument("Too many paths to index");
+
+    struct List {
+        uint32_t count = 0;
+        uint32_t last = 0;
+        std::string data;
+    };
+    std::unordered_map<uint32_t, List> lists;
+    std::vector<uint32_t> grams;
+    for (auto it = paths.begin(); it != paths.end(); ++it) {
+        const std::string &path = *it;
+        const uint32_t index = static_cast<uint32_t>(it.index());
+        grams.clear();
+        for (size_t i = 0; i + 3 <= path.size(); ++i) grams.push_back(trigram(path, i));
+        std::sort(grams.begin(), grams.end());
+        grams.erase(std::unique(grams.begin(), grams.end()), grams.end());
+        for (uint32_t g : grams) {
+            List &list = lists[g];
+            // Paths come in index order, so each list is sorted as it grows
+            put_varint(list.data, list.count ? index - list.last : index);
+            list.last = index;
+            ++list.count;
+        }
+    }
+
+    keys_.reserve(lists.size());
+    for (const auto &kv : lists) keys_.push_back(kv.first);
+    std::sort(keys_.begin(), keys_.end());
+    counts_.reserve(keys_.size());
+    offsets_.reserve(keys_.size() + 1);
+    for (uint32_t key : keys_) {
+        const List &list = lists[key];
+        counts_.push_back(list.count);
+        offsets_.push_back(data_.size());
+        data_.append(list.data);
+    }
+    offsets_.push_back(data_.size());
+}
+
+size_t TrigramIndex::memory_bytes() const {
+    return keys_.capacity() * sizeof(uint32_t) + counts_.capacity() * sizeof(uint32_t) +
+           offsets_.capacity() * sizeof(uint64_t) + data_.capacity();
+}
+
+std::vector<uint32_t> TrigramIndex::postings(size_t key_index) const {
+    std::vector<uint32_t> out;
+    out.reserve(counts_[key_index]);
+    size_t pos = offsets_[key_index];
+    const size_t end = offsets_[key_index + 1];
+    uint32_t value = 0;
+    while (pos < end) {
+        value += static_cast<uint32_t>(get_varint(data_.data(), end, pos));
+        out.push_back(value);
+    }
+    return out;
+}
+
+std::vector<uint32_t> TrigramIndex::candidates(const std::vector<std::string> &literals, bool &all) const {
+    std::vector<uint32_t> grams;
+    for (const std::string &literal : literals) {
+        for (size_t i = 0; i + 3 <= literal.size(); ++i) grams.push_back(trigram(literal, i));
+    }
+    std::sort(grams.begin(), grams.end());
+    grams.erase(std::unique(grams.begin(), grams.end()), grams.end());
+    all = grams.empty();
+    if (all) return {};
+
+    std::vector<size_t> lists;
+    for (uint32_t g : grams) {
+        auto it = std::lower_bound(keys_.begin(), keys_.end(), g);
+        if (it == keys_.end() || *it != g) return {}; // no path has this trigram
+        lists.push_back(static_cast<size_t>(it - keys_.begin()));
+    }
+    // Shortest list first, so the running intersection starts small
+    std::sort(lists.begin(), lists.end(), [&](size_t a, size_t b) { return counts_[a] < counts_[b]; });
+
+    std::vector<uint32_t> result = postings(lists[0]);
+    std::vector<uint32_t> next, merged;
+    for (size_t k = 1; k < lists.size() && !result.empty(); ++k) {
+        next = postings(lists[k]);
+        merged.clear();
+        std::set_intersection(result.begin(), result.end(), next.begin(), next.end(), std::back_inserter(merged));
+        result.swap(merged);
+    }
+    return result;
+}
+
+std::string TrigramIndex::serialize() const {
+    std::string out(kMagic);
+    put_varint(out, path_count_);
+    put_varint(out, keys_.size());
+    uint32_t previous = 0;
+    for (size_t i = 0; i < keys_.size(); ++i) {
+        put_varint(out, keys_[i] - previous);
+        previous = keys_[i];
+        put_varint(out, counts_[i]);
+        put_varint(out, offsets_[i + 1] - offsets_[i]);
+    }
+    out.append(data_);
+    return out;
+}
+
+TrigramIndex TrigramIndex::deserialize(std::string_view bytes) {
+    if (bytes.substr(0, kMagic.size()) != kMagic) throw std::runtime_error("Not a trigram index");
+    const char *data = bytes.data();
+    const size_t size = bytes.size();
+    size_t pos = kMagic.size();
+
+    TrigramIndex index;
+    index.path_count_ = get_varint(data, size, pos);
+    const uint64_t keys = get_varint(data, size, pos);
+    if (keys > size) throw std::runtime_error("Malformed trigram index");
+    index.keys_.reserve(keys);
+    index.counts_.reserve(keys);
+    index.offsets_.reserve(keys + 1);
+    uint64_t key = 0, offset = 0;
+    for (uint64_t i = 0; i < keys; ++i) {
+        uint64_t delta = get_varint(data, size, pos);
+        if ((i > 0 && delta == 0) || key + delta > 0xFFFFFF) throw std::runtime_error("Malformed trigram index");
+        key += delta;
+        uint64_t count = get_varint(data, size, pos);
+        uint64_t length = get_varint(data, size, pos);
+        if (count == 0 || count > index.path_count_ || length > size) throw std::runtime_error("Malformed trigram index");
+        index.keys_.push_back(static_cast<uint32_t>(key));
+        index.counts_.push_back(static_cast<uint32_t>(count));
+        index.offsets_.push_back(offset);
+        offset += length;
+    }
+    index.offsets_.push_back(offset);
+    if (offset != size - pos) throw std::runtime_error("Malformed trigram index");
+    index.data_.assign(bytes.substr(pos));
+    return index;
+}
+
+SearchMode parse_search_mode(const std::string &name) {
+    if (name == "substring") return SearchMode::Substring;
+    if (name == "glob") return SearchMode::Glob;
+    if (name == "regex") return SearchMode::Regex;
+    throw std::invalid_argument("Unknown search mode: " + name + ". Use substring, glob or regex");
+}
+
+PathPattern::PathPattern(const std::string &pattern, SearchMode mode) : pattern_(pattern), mode_(mode) {
+    switch (mode_) {
+    case SearchMode::Substring:
+        literals_ = {pattern_};
+        break;
+    case SearchMode::Glob:
+        whole_path_ = pattern_.find('/') != std::string::npos;
+        literals_ = glob_literals(pattern_);
+        break;
+    case SearchMode::Regex:
+        try {
+            regex_ = std::make_unique<std::regex>(pattern_, std::regex::ECMAScript | std::regex::optimize);
+        } catch (const std::regex_error &e) {
+            throw std::invalid_argument("Invalid regex: " + pattern_ + " (" + e.what() + ")");
+        }
+        literals_ = regex_literals(pattern_);
+        break;
+    }
+}
+
+bool PathPattern::matches(const std::string &path) const {
+    switch (mode_) {
+    case SearchMode::Substring:
+        return path.find(pattern_) != std::string::npos;
+    case SearchMode::Glob:
+        if (whole_path_) return fnmatch(pattern_.c_str(), path.c_str(), FNM_PATHNAME) == 0;
+        return fnmatch(pattern_.c_str(), path.c_str() + path.rfind('/') + 1, 0) == 0;
+    case SearchMode::Regex:
+        return std::regex_search(path, *regex_);
+    }
+    return false;
+}
+
+} // namespace vmtool
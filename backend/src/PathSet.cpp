@@ -0,0 +1,182 @@
+#include "../include/PathSet.hpp"
+#include "../include/Varint.hpp"
+#include <algorithm>
+#include <stdexcept>
+
+namespace vmtool {
+
+namespace {
+
+constexpr std::string_view kMagic = "PATHSET1\n";
+
+// Varint at data[pos]; advances pos. Throws if it is truncated or malformed.
+uint64_t get_varint(const char *data, size_t size, size_t &pos) {
+    uint64_t value;
+    if (!read_varint(data, size, pos, value)) throw std::runtime_error("Malformed path set");
+    return value;
+}
+
+size_t common_prefix(std::string_view a, std::string_view b) {
+    size_t n = std::min(a.size(), b.size());
+    size_t i = 0;
+    while (i < n && a[i] == b[i]) ++i;
+    return i;
+}
+
+} // anonymous namespace
+
+PathSet::PathSet(std::vector<std::string> paths) {
+    if (!std::is_sorted(paths.begin(), paths.end())) std::sort(paths.begin(), paths.end());
+    paths.erase(std::unique(paths.begin(), paths.end()), paths.end());
+    for (const std::string &path : paths) push_back(path);
+    data_.shrink_to_fit();
+    offsets_.shrink_to_fit();
+}
+
+void PathSet::push_back(std::string_view path) {
+    if (count_ > 0 && path <= std::string_view(last_)) {
+        throw std::invalid_argument("Paths must be appended in increasing order: " + std::string(path));
+    }
+    if (count_ % kBlock == 0) {
+        offsets_.push_back(data_.size());
+        put_varint(data_, path.size());
+        data_.append(path);
+    } else {
+        size_t shared = common_prefix(last_, path);
+        put_varint(data_, shared);
+        put_varint(data_, path.size() - shared);
+        data_.append(path.substr(shared));
+    }
+    last_.assign(path);
+    raw_bytes_ += path.size();
+    ++count_;
+}
+
+PathSet::const_iterator::const_iterator(const PathSet *set, size_t index)
+    : set_(set), index_(std::min(index, set->count_)) {
+    if (index_ == set_->count_) return;
+    // Decode from the start of the block up to the requested entry
+    size_t block = index_ / kBlock;
+    pos_ = set_->offsets_[block];
+    size_t target = index_;
+    index_ = block * kBlock;
+    decode();
+    while (index_ < target) {
+        ++index_;
+        decode();
+    }
+}
+
+void PathSet::const_iterator::decode() {
+    const char *data = set_->data_.data();
+    size_t size = set_->data_.size();
+    if (index_ % kBlock == 0) {
+        uint64_t length = get_varint(data, size, pos_);
+        current_.assign(data + pos_, length);
+        pos_ += length;
+    } else {
+        uint64_t shared = get_varint(data, size, pos_);
+        uint64_t suffix = get_varint(data, size, pos_);
+        current_.resize(shared);
+        current_.append(data + pos_, suffix);
+        pos_ += suffix;
+    }
+}
+
+PathSet::const_iterator &PathSet::const_iterator::operator++() {
+    if (++index_ < set_->count_) decode();
+    return *this;
+}
+
+std::string PathSet::at(size_t index) const {
+    if (index >= count_) throw std::out_of_range("Path index out of range");
+    return *iterator_at(index);
+}
+
+size_t PathSet::lower_bound(std::string_view key) const {
+    if (count_ == 0) return 0;
+    // Last block whose first path is <= key, by binary search over the block heads
+    size_t lo = 0, hi = offsets_.size();
+    while (hi - lo > 1) {
+        size_t mid = (lo + hi) / 2;
+        size_t pos = offsets_[mid];
+        uint64_t length = get_varint(data_.data(), data_.size(), pos);
+        if (std::string_view(data_.data() + pos, length) <= key) {
+            lo = mid;
+        } else {
+            hi = mid;
+        }
+    }
+    // Then a linear scan inside it
+    const_iterator it = iterator_at(lo * kBlock);
+    size_t block_end = std::min(count_, (lo + 1) * kBlock);
+    while (it.index() < block_end && std::string_view(*it) < key) ++it;
+    return it.index();
+}
+
+bool PathSet::contains(std::string_view path) const {
+    size_t i = lower_bound(path);
+    return i < count_ && *iterator_at(i) == path;
+}
+
+std::pair<size_t, size_t> PathSet::prefix_range(std::string_view prefix) const {
+    size_t first = lower_bound(prefix);
+    if (prefix.empty()) return {first, count_};
+    // The first string past every string with this prefix: drop trailing 0xFF bytes,
+    // then increment the last byte
+    std::string upper(prefix);
+    while (!upper.empty() && static_cast<uint8_t>(upper.back()) == 0xFF) upper.pop_back();
+    if (upper.empty()) return {first, count_};
+    upper.back() = static_cast<char>(static_cast<uint8_t>(upper.back()) + 1);
+    return {first, lower_bound(upper)};
+}
+
+std::pair<size_t, size_t> PathSet::subtree_range(std::string_view dir) const {
+    std::string prefix(dir);
+    while (prefix.size() > 1 && prefix.back() == '/') prefix.pop_back();
+    if (prefix != "/") prefix.push_back('/');
+    return prefix_range(prefix);
+}
+
+std::string PathSet::serialize() const {
+    std::string out(kMagic);
+    put_varint(out, count_);
+    out.append(data_);
+    return out;
+}
+
+PathSet PathSet::deserialize(std::string_view bytes) {
+    if (bytes.substr(0, kMagic.size()) != kMagic) throw std::runtime_error("Not a path set");
+    size_t pos = kMagic.size();
+    uint64_t count = get_varint(bytes.data(), bytes.size(), pos);
+
+    // Rebuild the block table (and check every entry) with one pass over the data
+    PathSet set;
+    set.data_.assign(bytes.substr(pos));
+    const char *data = set.data_.data();
+    size_t size = set.data_.size();
+    size_t at = 0;
+    for (uint64_t i = 0; i < count; ++i) {
+        if (i % kBlock == 0) {
+            set.offsets_.push_back(at);
+            uint64_t length = get_varint(data, size, at);
+            if (length > size - at) throw std::runtime_error("Truncated path set");
+            set.last_.assign(data + at, length);
+            at += length;
+        } else {
+            uint64_t shared = get_varint(data, size, at);
+            uint64_t suffix = get_varint(data, size, at);
+            if (shared > set.last_.size() || suffix > size - at) throw std::runtime_error("Malformed path set");
+            set.last_.resize(shared);
+            set.last_.append(data + at, suffix);
+            at += suffix;
+        }
+        set.raw_bytes_ += set.last_.size();
+    }
+    if (at != size) throw std::runtime_error("Malformed path set");
+    set.count_ = count;
+    set.offsets_.shrink_to_fit();
+    return set;
+}
+
+} // namespace vmtool
@@ -0,0 +1,156 @@
+#include "../include/SessionPool.hpp"
+
+namespace vmtool {
+
+SessionPool &SessionPool::instance() {
+    static SessionPool pool;
+    return pool;
+}
+
+SessionPool::~SessionPool() {
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        stopping_ = true;
+    }
+    reaper_wake_.notify_all();
+    if (reaper_.joinable()) reaper_.join();
+}
+
+std::string SessionPool::make_key(const std::vector<ImageIdentity> &images, bool mount) {
+    std::string key = mount ? "m" : "d";
+    for (const auto &image : images) {
+        key += "|" + image.key;
+    }
+    return key;
+}
+
+std::shared_ptr<GuestSession> SessionPool::acquire(const std::vector<std::string> &disks, bool mount) {
+    std::vector<ImageIdentity> images;
+    bool poolable = true;
+    for (const auto &disk : disks) {
+        images.push_back(ImageIdentity::of(disk));
+        poolable = poolable && images.back().valid;
+    }
+    std::string key = make_key(images, mount);
+
+    std::unique_ptr<GuestSession> session;
+    std::vector<std::unique_ptr<GuestSession>> stale;
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        // Never hand out a session that timed out or whose appliance died
+        stale = trim_locked();
+        for (auto it = idle_.begin(); it != idle_.end();) {
+            if (it->key != key) {
+                ++it;
+                continue;
+            }
+            bool current = true;
+            for (size_t i = 0; i < images.size(); ++i) {
+                current = current && it->images[i].same_version(images[i]);
+            }
+            if (!current) {
+                // The image file changed since launch: the appliance may see stale data
+                stale.push_back(std::move(it->session));
+                it = idle_.erase(it);
+                continue;
+            }
+            session = std::move(it->session);
+            idle_.erase(it);
+            ++reuses_;
+            break;
+        }
+        if (!session) ++launches_;
+    }
+    stale.clear();
+
+    if (!session) {
+        session.reset(new GuestSession(disks));
+        if (mount) session->mount_os();
+    }
+
+    if (!poolable) {
+        return std::shared_ptr<GuestSession>(session.release());
+    }
+    GuestSession *raw = session.release();
+    return std::shared_ptr<GuestSession>(raw, [this, key, images](GuestSession *s) {
+        release(std::unique_ptr<GuestSession>(s), key, images);
+    });
+}
+
+void SessionPool::release(std::unique_ptr<GuestSession> session, std::string key, std::vector<ImageIdentity> images) {
+    if (!session->alive()) return;
+
+    std::vector<std::unique_ptr<GuestSession>> closing;
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        idle_.push_front(Idle{std::move(key), std::move(images), std::move(session),
+                              std::chrono::steady_clock::now()});
+        closing = trim_locked();
+        if (!reaper_.joinable() && !stopping_) reaper_ = std::thread(&SessionPool::reap, this);
+    }
+    reaper_wake_.notify_one();
+}
+
+void SessionPool::reap() {
+    std::unique_lock<std::mutex> lock(mutex_);
+    while (!stopping_) {
+        if (idle_.empty()) {
+            reaper_wake_.wait(lock);
+        } else {
+            // The least recently released session (at the back) expires first
+            reaper_wake_.wait_until(lock, idle_.back().since + kIdleTimeout);
+        }
+        std::vector<std::unique_ptr<GuestSession>> closing = trim_locked();
+        if (closing.empty()) continue;
+        // Shutting appliances down takes a while; do it without the pool lock
+        lock.unlock();
+        closing.clear();
+        lock.lock();
+    }
+}
+
+std::vector<std::unique_ptr<GuestSession>> SessionPool::trim_locked() {
+    std::vector<std::unique_ptr<GuestSession>> closing;
+    auto now = std::chrono::steady_clock::now();
+    size_t kept = 0;
+    for (auto it = idle_.begin(); it != idle_.end();) {
+        if (kept >= max_idle_ || now - it->since >= kIdleTimeout || !it->session->alive()) {
+            closing.push_back(std::move(it->session));
+            it = idle_.erase(it);
+        } else {
+            ++kept;
+            ++it;
+        }
+    }
+    return closing;
+}
+
+SessionPool::Stats SessionPool::stats() {
+    std::vector<std::unique_ptr<GuestSession>> closing;
+    std::lock_guard<std::mutex> lock(mutex_);
+    closing = trim_locked();
+    Stats s;
+    s.launches = launches_;
+    s.reuses = reuses_;
+    s.idle = idle_.size();
+    s.max_idle = max_idle_;
+    return s;
+}
+
+void SessionPool::set_max_idle(size_t count) {
+    std::vector<std::unique_ptr<GuestSession>> closing;
+    std::lock_guard<std::mutex> lock(mutex_);
+    max_idle_ = count;
+    closing = trim_locked();
+}
+
+void SessionPool::clear() {
+    std::list<Idle> closing;
+    {
+        std::lock_guard<std::mutex> lock(mutex_);
+        closing.swap(idle_);
+        launches_ = reuses_ = 0;
+    }
+}
+
+} // namespace vmtool
@@ -0,0 +1,70 @@
+#include "../include/StreamSearch.hpp"
+#include <algorithm>
+#include <cstring>
+#include <stdexcept>
+
+namespace vmtool {
+
+StreamSearcher::StreamSearcher(const std::string &needle) : needle_(needle) {
+    if (needle_.empty()) {
+        throw std::runtime_error("Search needle must not be empty");
+    }
+    const size_t m = needle_.size();
+    std::fill(std::begin(shift_), std::end(shift_), m);
+    for (size_t i = 0; i + 1 < m; ++i) {
+        shift_[static_cast<unsigned char>(needle_[i])] = m - 1 - i;
+    }
+}
+
+uint64_t StreamSearcher::search(const char *hay, size_t n) const {
+    const size_t m = needle_.size();
+    if (n < m) return npos;
+    if (m == 1) {
+        const void *hit = std::memchr(hay, needle_[0], n);
+        return hit ? static_cast<uint64_t>(static_cast<const char *>(hit) - hay) : npos;
+    }
+
+    const unsigned char last = static_cast<unsigned char>(needle_[m - 1]);
+    size_t pos = 0;
+    while (pos + m <= n) {
+        unsigned char c = static_cast<unsigned char>(hay[pos + m - 1]);
+        if (c == last && std::memcmp(hay + pos, needle_.data(), m - 1) == 0) {
+            return pos;
+        }
+        pos += shift_[c];
+    }
+    return npos;
+}
+
+uint64_t StreamSearcher::feed(const char *data, size_t size) {
+    if (found_ != npos || size == 0) return found_;
+    const size_t keep = needle_.size() - 1;
+
+    // Matches starting in the carried-over tail end within the first keep bytes of this chunk
+    if (!tail_.empty()) {
+        std::string window = tail_;
+        window.append(data, std::min(size, keep));
+        uint64_t idx = search(window.data(), window.size());
+        if (idx != npos) {
+            found_ = consumed_ - tail_.size() + idx;
+            return found_;
+        }
+    }
+
+    uint64_t idx = search(data, size);
+    if (idx != npos) {
+        found_ = consumed_ + idx;
+        return found_;
+    }
+
+    if (size >= keep) {
+        tail_.assign(data + size - keep, keep);
+    } else {
+        tail_.append(data, size);
+        if (tail_.size() > keep) tail_.erase(0, tail_.size() - keep);
+    }
+    consumed_ += size;
+    return npos;
+}
+
+} // namespace vmtool
@@ -0,0 +1,125 @@
+#include "../include/TreeDiff.hpp"
+#include <algorithm>
+#include <stdexcept>
+#include <string_view>
+
+namespace vmtool {
+
+namespace {
+
+const char *const kChangeNames[] = {"type", "size", "mode", "uid", "gid", "mtime", "target", "content"};
+
+// Length of the "<root>/" prefix stripped from every path below root
+size_t root_prefix(const std::string &root) {
+    return root == "/" ? 1 : root.size() + 1;
+}
+
+} // anonymous namespace
+
+std::vector<std::string> change_names(uint32_t flags) {
+    std::vector<std::string> out;
+    for (size_t bit = 0; bit < sizeof(kChangeNames) / sizeof(kChangeNames[0]); ++bit) {
+        if (flags & (1u << bit)) out.emplace_back(kChangeNames[bit]);
+    }
+    return out;
+}
+
+uint32_t parse_change_names(const std::vector<std::string> &names) {
+    uint32_t flags = 0;
+    for (const std::string &name : names) {
+        const auto *end = kChangeNames + sizeof(kChangeNames) / sizeof(kChangeNames[0]);
+        const auto *it = std::find(kChangeNames, end, name);
+        if (it == end) throw std::invalid_argument("Unknown change: " + name);
+        flags |= 1u << (it - kChangeNames);
+    }
+    return flags;
+}
+
+uint32_t compare_entries(const TreeEntry &a, const TreeEntry &b) {
+    uint32_t flags = 0;
+    if ((a.st.mode & 0170000) != (b.st.mode & 0170000)) flags |= kChangeType;
+    if (a.st.size != b.st.size) flags |= kChangeSize;
+    if ((a.st.mode & 07777) != (b.st.mode & 07777)) flags |= kChangeMode;
+    if (a.st.uid != b.st.uid) flags |= kChangeUid;
+    if (a.st.gid != b.st.gid) flags |= kChangeGid;
+    if (a.st.mtime_sec != b.st.mtime_sec || a.st.mtime_nsec != b.st.mtime_nsec) flags |= kChangeMtime;
+    if (a.st.is_link() && b.st.is_link() && a.target != b.target) flags |= kChangeTarget;
+    if (a.st.is_reg() && b.st.is_reg()) {
+        if (a.st.size != b.st.size ||
+            (!a.checksum.empty() && !b.checksum.empty() && a.checksum != b.checksum)) {
+            flags |= kChangeContent;
+        }
+    }
+    return flags;
+}
+
+TreeDiffResult diff_trees(const std::vector<TreeEntry> &a, const std::string &a_root,
+                          const std::vector<TreeEntry> &b, const std::string &b_root,
+                          bool keep_unchanged, uint32_t report_mask) {
+    TreeDiffResult out;
+    const size_t pa = root_prefix(a_root);
+    const size_t pb = root_prefix(b_root);
+    size_t i = 0, j = 0;
+
+    while (i < a.size() || j < b.size()) {
+        int cmp;
+        if (i == a.size()) {
+            cmp = 1;
+        } else if (j == b.size()) {
+            cmp = -1;
+        } else {
+            std::string_view ra = std::string_view(a[i].path).substr(std::min(pa, a[i].path.size()));
+            std::string_view rb = std::string_view(b[j].path).substr(std::min(pb, b[j].path.size()));
+            cmp = ra.compare(rb);
+        }
+
+        if (cmp < 0) {
+            out.rows.push_back(TreeChange{TreeChange::Removed, static_cast<int64_t>(i++), -1, 0});
+            ++out.removed;
+        } else if (cmp > 0) {
+            out.rows.push_back(TreeChange{TreeChange::Added, -1, static_cast<int64_t>(j++), 0});
+            ++out.added;
+        } else {
+            uint32_t flags = compare_entries(a[i], b[j]) & report_mask;
+            if (flags) {
+                out.rows.push_back(TreeChange{TreeChange::Modified, static_cast<int64_t>(i), static_cast<int64_t>(j), flags});
+                ++out.modified;
+            } else {
+                if (keep_unchanged) {
+                    out.rows.push_back(TreeChange{TreeChange::Unchanged, static_cast<int64_t>(i), static_cast<int64_t>(j), 0});
+                }
+                ++out.unchanged;
+            }
+            ++i;
+            ++j;
+        }
+    }
+    return out;
+}
+
+FileListDiff::FileListDiff(const PathSet &first, const PathSet &second) {
+    status_.reserve(std::max(first.size(), second.size()));
+
+    auto i = first.begin(), j = second.begin();
+    while (i != first.end() || j != second.end()) {
+        Status st;
+        if (j == second.end() || (i != first.end() && *i < *j)) {
+            st = Removed;
+            paths_.push_back(*i);
+            ++i;
+        } else if (i == first.end() || *j < *i) {
+            st = Added;
+            paths_.push_back(*j);
+            ++j;
+        } else {
+            st = Common;
+            paths_.push_back(*i);
+            ++i;
+            ++j;
+        }
+        by_status_[st].push_back(static_cast<uint32_t>(status_.size()));
+        status_.push_back(st);
+    }
+}
+
+} // namespace vmtool
@@ -0,0 +1,76 @@
+#include "../include/TreeWalk.hpp"
+#include <algorithm>
+#include <iterator>
+#include <stdexcept>
+
+namespace vmtool {
+
+std::string normalize_guest_dir(std::string dir) {
+    if (dir.empty() || dir[0] != '/') dir = "/" + dir;
+    while (dir.size() > 1 && dir.back() == '/') dir.pop_back();
+    return dir;
+}
+
+void walk_tree_each(GuestSession &session, const std::string &root, const TreeVisitor &visit) {
+    std::vector<std::string> pending{normalize_guest_dir(root)};
+    std::vector<TreeEntry> entries;
+    bool first = true;
+
+    while (!pending.empty()) {
+        std::string dir = std::move(pending.back());
+        pending.pop_back();
+
+        std::vector<std::string> names;
+        try {
+            names = session.list_dir(dir);
+        } catch (const std::runtime_error &) {
+            if (first) throw;
+            continue;
+        }
+        first = false;
+        std::sort(names.begin(), names.end());
+
+        std::vector<GuestStat> stats = session.lstat_list(dir, names);
+        const std::string prefix = (dir == "/") ? "/" : dir + "/";
+        std::vector<std::string> links;
+        std::vector<size_t> link_index;
+        const size_t subdirs = pending.size();
+
+        entries.clear();
+        for (size_t i = 0; i < names.size(); ++i) {
+            if (!stats[i].exists) continue; // vanished or unreadable
+            TreeEntry e;
+            e.path = prefix + names[i];
+            e.st = stats[i];
+            if (e.st.is_dir()) {
+                pending.push_back(e.path);
+            } else if (e.st.is_link()) {
+                links.push_back(names[i]);
+                link_index.push_back(entries.size());
+            }
+            entries.push_back(std::move(e));
+        }
+        // Subdirectories come off the stack in name order
+        std::reverse(pending.begin() + static_cast<std::ptrdiff_t>(subdirs), pending.end());
+
+        if (!links.empty()) {
+            std::vector<std::string> targets = session.readlink_list(dir, links);
+            for (size_t k = 0; k < links.size(); ++k) {
+                entries[link_index[k]].target = std::move(targets[k]);
+            }
+        }
+        visit(dir, entries);
+    }
+}
+
+std::vector<TreeEntry> walk_tree(GuestSession &session, const std::string &root) {
+    std::vector<TreeEntry> entries;
+    walk_tree_each(session, root, [&](const std::string &, std::vector<TreeEntry> &batch) {
+        std::move(batch.begin(), batch.end(), std::back_inserter(entries));
+    });
+    std::sort(entries.begin(), entries.end(),
+              [](const TreeEntry &a, const TreeEntry &b) { return a.path < b.path; });
+    return entries;
+}
+
+} // namespace vmtool
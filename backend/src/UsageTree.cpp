@@ -0,0 +1,185 @@
+#include "../include/UsageTree.hpp"
+#include "../include/TreeWalk.hpp"
+#include "../include/Varint.hpp"
+#include <algorithm>
+#include <stdexcept>
+#include <utility>
+
+namespace vmtool {
+
+namespace {
+
+constexpr std::string_view kMagic = "USAGETREE1\n";
+
+uint64_t get_varint(const char *data, size_t size, size_t &pos) {
+    uint64_t value;
+    if (!read_varint(data, size, pos, value)) throw std::runtime_error("Malformed usage tree");
+    return value;
+}
+
+} // anonymous namespace
+
+void UsageTree::add_node(std::string_view name, size_t parent) {
+    Node node;
+    node.parent = static_cast<uint32_t>(parent);
+    node.name_offset = static_cast<uint32_t>(names_.size());
+    node.name_length = static_cast<uint32_t>(name.size());
+    names_.append(name);
+    nodes_.push_back(node);
+}
+
+UsageTree UsageTree::build(GuestSession &session) {
+    UsageTree tree;
+    // Ancestors of the directory being visited, as (path, node index)
+    std::vector<std::pair<std::string, size_t>> open;
+
+    // walk_tree_each visits directories depth-first in name order: preorder
+    walk_tree_each(session, "/", [&](const std::string &dir, std::vector<TreeEntry> &entries) {
+        size_t index = tree.nodes_.size();
+        if (open.empty()) {
+            tree.add_node("", 0);
+        } else {
+            size_t slash = dir.rfind('/');
+            std::string_view parent(dir.data(), slash == 0 ? 1 : slash);
+            // Close the subtrees this directory is not part of
+            while (open.back().first != parent) {
+                tree.nodes_[open.back().second].end = static_cast<uint32_t>(index);
+                open.pop_back();
+            }
+            tree.add_node(std::string_view(dir).substr(slash + 1), open.back().second);
+        }
+        open.emplace_back(dir, index);
+
+        UsageTotals &own = tree.nodes_[index].own;
+        for (const TreeEntry &e : entries) {
+            if (e.st.is_dir()) {
+                ++own.dirs;
+            } else if (e.st.is_reg()) {
+                ++own.files;
+                own.bytes += std::max<int64_t>(0, e.st.size);
+            }
+        }
+    });
+    for (const auto &o : open) tree.nodes_[o.second].end = static_cast<uint32_t>(tree.nodes_.size());
+
+    tree.nodes_.shrink_to_fit();
+    tree.names_.shrink_to_fit();
+    tree.sum_totals();
+    return tree;
+}
+
+void UsageTree::sum_totals() {
+    for (Node &n : nodes_) n.total = n.own;
+    // Parents precede their children, so a backwards pass completes every
+    // subtree before it is added to its parent
+    for (size_t i = nodes_.size(); i-- > 1;) {
+        const UsageTotals &t = nodes_[i].total;
+        UsageTotals &into = nodes_[nodes_[i].parent].total;
+        into.files += t.files;
+        into.dirs += t.dirs;
+        into.bytes += t.bytes;
+    }
+}
+
+std::string_view UsageTree::name(size_t index) const {
+    const Node &n = nodes_.at(index);
+    return std::string_view(names_).substr(n.name_offset, n.name_length);
+}
+
+std::string UsageTree::path(size_t index) const {
+    if (index == 0) return "/";
+    std::vector<size_t> chain;
+    for (size_t i = index; i != 0; i = nodes_.at(i).parent) chain.push_back(i);
+    std::string out;
+    for (auto it = chain.rbegin(); it != chain.rend(); ++it) {
+        out.push_back('/');
+        out.append(name(*it));
+    }
+    return out;
+}
+
+std::vector<size_t> UsageTree::children(size_t index) const {
+    std::vector<size_t> out;
+    const size_t end = nodes_.at(index).end;
+    for (size_t child = index + 1; child < end; child = nodes_[child].end) out.push_back(child);
+    return out;
+}
+
+size_t UsageTree::find(std::string_view dir) const {
+    if (nodes_.empty()) return npos;
+    size_t index = 0;
+    size_t pos = 0;
+    while (pos < dir.size()) {
+        if (dir[pos] == '/') {
+            ++pos;
+            continue;
+        }
+        size_t slash = dir.find('/', pos);
+        std::string_view component = dir.substr(pos, slash == std::string_view::npos ? dir.npos : slash - pos);
+        pos = slash == std::string_view::npos ? dir.size() : slash;
+
+        size_t found = npos;
+        const size_t end = nodes_[index].end;
+        for (size_t child = index + 1; child < end; child = nodes_[child].end) {
+            if (name(child) == component) {
+                found = child;
+                break;
+            }
+        }
+        if (found == npos) return npos;
+        index = found;
+    }
+    return index;
+}
+
+std::string UsageTree::serialize() const {
+    std::string out(kMagic);
+    put_varint(out, nodes_.size());
+    for (size_t i = 0; i < nodes_.size(); ++i) {
+        const Node &n = nodes_[i];
+        put_varint(out, n.name_length);
+        out.append(name(i));
+        put_varint(out, i - n.parent);
+        put_varint(out, n.end - i);
+        put_varint(out, static_cast<uint64_t>(n.own.files));
+        put_varint(out, static_cast<uint64_t>(n.own.dirs));
+        put_varint(out, static_cast<uint64_t>(n.own.bytes));
+    }
+    return out;
+}
+
+UsageTree UsageTree::deserialize(std::string_view bytes) {
+    if (bytes.substr(0, kMagic.size()) != kMagic) throw std::runtime_error("Not a usage tree");
+    const char *data = bytes.data();
+    const size_t size = bytes.size();
+    size_t pos = kMagic.size();
+    const uint64_t count = get_varint(data, size, pos);
+    if (count > size) throw std::runtime_error("Malformed usage tree");
+
+    UsageTree tree;
+    tree.nodes_.reserve(count);
+    for (uint64_t i = 0; i < count; ++i) {
+        uint64_t length = get_varint(data, size, pos);
+        if (length > size - pos) throw std::runtime_error("Malformed usage tree");
+        std::string_view name(data + pos, length);
+        pos += length;
+        uint64_t up = get_varint(data, size, pos);
+        uint64_t span = get_varint(data, size, pos);
+        // Parents come first and every subtree lies inside its parent's
+        if (up > i || (i > 0 && up == 0) || span == 0 || span > count - i) {
+            throw std::runtime_error("Malformed usage tree");
+        }
+        tree.add_node(name, i - up);
+        Node &n = tree.nodes_.back();
+        if (i > 0 && i + span > tree.nodes_[n.parent].end) throw std::runtime_error("Malformed usage tree");
+        n.end = static_cast<uint32_t>(i + span);
+        n.own.files = static_cast<int64_t>(get_varint(data, size, pos));
+        n.own.dirs = static_cast<int64_t>(get_varint(data, size, pos));
+        n.own.bytes = static_cast<int64_t>(get_varint(data, size, pos));
+    }
+    if (pos != size) throw std::runtime_error("Malformed usage tree");
+    tree.sum_totals();
+    return tree;
+}
+
+} // namespace vmtool
@@ -1,8 +1,28 @@
 #include "../include/VMTool.hpp"
+#include "../include/BlockCache.hpp"
+#include "../include/BlockRangeSet.hpp"
+#include "../include/BinaryDiff.hpp"
+#include "../include/BlockStats.hpp"
+#include "../include/DiskStats.hpp"
+#include "../include/ByteCompare.hpp"
+#include "../include/Export.hpp"
+#include "../include/FileCache.hpp"
+#include "../include/Formatters.hpp"
+#include "../include/LineDiff.hpp"
+#include "../include/GuestSession.hpp"
+#include "../include/ImageIndex.hpp"
+#include "../include/PathSearch.hpp"
+#include "../include/PathSet.hpp"
+#include "../include/SessionPool.hpp"
+#include "../include/StreamSearch.hpp"
+#include "../include/TreeDiff.hpp"
+#include "../include/TreeWalk.hpp"
+#include "../include/UsageTree.hpp"
 #include <guestfs.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <algorithm>
+#include <atomic>
 #include <ctime>
 #include <cstdlib>
 #include <stdexcept>
@@ -12,10 +32,11 @@
 #include <vector>
 #include <unordered_map>
 #include <map>
+#include <optional>
+#include <fcntl.h>
 #include <sys/stat.h>
 #include <unistd.h>
 #include <cstdio>
-#include <bitset>
 #include <thread>
 #include <mutex>
 #include <cstring>
@@ -50,15 +71,25 @@ static std::string perms_string(uint32_t mode) {
     return out;
 }
 
-// Helper to format time_t to YYYY-mm-dd HH:MM:SS
-static std::string format_time(std::time_t t) {
-    if (t <= 0) return std::string("-");
-    char buf[32] = {0};
-    std::tm tmv;
-    // Match Python's datetime.fromtimestamp() which uses local time
-    if (!localtime_r(&t, &tmv)) return std::string("-");
-    if (std::strftime(buf, sizeof(buf), "%Y-%m-%d %H:%M:%S", &tmv) == 0) return std::string("-");
-    return std::string(buf);
+// Decode guest bytes for display; invalid UTF-8 becomes U+FFFD instead of raising
+static py::str decode_text(std::string_view text) {
+    PyObject *obj = PyUnicode_DecodeUTF8(text.data(), static_cast<Py_ssize_t>(text.size()), "replace");
+    if (!obj) throw py::error_already_set();
+    return py::reinterpret_steal<py::str>(obj);
+}
+
+// Seconds and nanoseconds of one timestamp as row["<prefix>_sec"/"<prefix>_nsec"]
+template <typename Row>
+static void put_time(Row &row, const char *prefix, int64_t sec, int64_t nsec) {
+    row[py::str(std::string(prefix) + "_sec")] = py::int_(sec);
+    row[py::str(std::string(prefix) + "_nsec")] = py::int_(nsec);
+}
+
+// Same keys, set to None when the path could not be stat'ed
+template <typename Row>
+static void put_no_time(Row &row, const char *prefix) {
+    row[py::str(std::string(prefix) + "_sec")] = py::none();
+    row[py::str(std::string(prefix) + "_nsec")] = py::none();
 }
 
 // A simple function to test libguestfs and integration
@@ -83,8 +114,22 @@ std::string get_guestfs_version() {
     return result;
 }
 
+py::list format_times(const std::vector<std::optional<int64_t>> &seconds, bool utc) {
+    std::vector<std::string> text;
+    text.reserve(seconds.size());
+    {
+        py::gil_scoped_release release;
+        TimeFormatter format(utc);
+        for (const auto &t : seconds) text.push_back(t ? format(*t) : std::string("-"));
+    }
+    py::list out;
+    for (const std::string &item : text) out.append(py::str(item));
+    return out;
+}
+
 // List files with metadata from a VM disk image using libguestfs.
-// Returns a Python list of dicts: {size:int|str, perms:str, mtime:str, path:str}
+// Returns a Python list of dicts: {size:int|str, perms:str, mtime_sec, mtime_nsec,
+// atime_sec, atime_nsec, ctime_sec, ctime_nsec (int|None), path:str}
 py::list list_files_with_metadata(const std::string &disk_path, bool verbose) {
     py::list results;
 
@@ -150,39 +195,40 @@ py::list list_files_with_metadata(const std::string &disk_path, bool verbose) {
         throw std::runtime_error("guestfs_find failed");
     }
 
+    TimeFormatter format_mtime;
     for (size_t k = 0; paths[k] != nullptr; ++k) {
         std::string path_component = paths[k];
         std::string full_path = (path_component == ".") ? std::string("/") : std::string("/") + path_component;
 
         // Stat each file
         struct guestfs_statns *st = guestfs_statns(g, full_path.c_str());
-        long long size_val = -1;
-        std::string perm_str = "-";
-        std::string mtime_str = "-";
-
-        if (st) {
-            size_val = static_cast<long long>(st->st_size);
-            perm_str = perms_string(static_cast<uint32_t>(st->st_mode & 0777));
-            mtime_str = format_time(static_cast<std::time_t>(st->st_mtime_sec));
-            guestfs_free_statns(st);
-        }
 
+        // Timestamps stay numeric; they are only formatted for display (verbose
+        // output here, format_times() or the browser for rows on screen)
         py::dict row;
-        if (size_val >= 0) {
-            row["size"] = py::int_(size_val);
+        if (st) {
+            row["size"] = py::int_(static_cast<long long>(st->st_size));
+            row["perms"] = py::str(perms_string(static_cast<uint32_t>(st->st_mode & 0777)));
+            put_time(row, "mtime", st->st_mtime_sec, st->st_mtime_nsec);
+            put_time(row, "atime", st->st_atime_sec, st->st_atime_nsec);
+            put_time(row, "ctime", st->st_ctime_sec, st->st_ctime_nsec);
         } else {
             row["size"] = py::str("-");
+            row["perms"] = py::str("-");
+            put_no_time(row, "mtime");
+            put_no_time(row, "atime");
+            put_no_time(row, "ctime");
         }
-        row["perms"] = py::str(perm_str);
-        row["mtime"] = py::str(mtime_str);
         row["path"] = py::str(full_path);
 
         if (verbose) {
             std::ostringstream line;
-            line << (size_val >= 0 ? std::to_string(size_val) : std::string("-"));
-            line << " " << perm_str << " " << mtime_str << " " << full_path;
+            line << (st ? std::to_string(static_cast<long long>(st->st_size)) : std::string("-"));
+            line << " " << (st ? perms_string(static_cast<uint32_t>(st->st_mode & 0777)) : std::string("-"));
+            line << " " << (st ? format_mtime(st->st_mtime_sec) : std::string("-")) << " " << full_path;
             py::print(line.str());
         }
+        if (st) guestfs_free_statns(st);
 
         results.append(row);
     }
@@ -195,6 +241,13 @@ py::list list_files_with_metadata(const std::string &disk_path, bool verbose) {
     return results;
 }
 
+// Formatted mtime of a list_files_with_metadata entry ("-" when it has none)
+static std::string entry_mtime(const py::dict &d, TimeFormatter &format_mtime) {
+    py::str key("mtime_sec");
+    if (!d.contains(key) || d[key].is_none()) return "-";
+    return format_mtime(d[key].cast<int64_t>());
+}
+
 // Write entries to a file in a formatted table. Expects entries as produced by list_files_with_metadata.
 void write_files_with_metadata(py::list entries, const std::string &output_file) {
     std::ofstream ofs(output_file);
@@ -208,12 +261,13 @@ void write_files_with_metadata(py::list entries, const std::string &output_file)
         << std::setw(20) << "Name" << '\n';
     ofs << std::string(60, '=') << '\n';
 
+    TimeFormatter format_mtime;
     const ssize_t n = py::len(entries);
     for (ssize_t i = 0; i < n; ++i) {
         py::dict d = entries[i].cast<py::dict>();
         std::string size_str = py::str(d[py::str("size")]);
         std::string perms    = py::str(d[py::str("perms")]);
-        std::string mtime    = py::str(d[py::str("mtime")]);
+        std::string mtime    = entry_mtime(d, format_mtime);
         std::string path     = py::str(d[py::str("path")]);
 
         ofs << std::right << std::setw(10) << size_str << ' '
@@ -222,239 +276,289 @@ void write_files_with_metadata(py::list entries, const std::string &output_file)
     }
 }
 
-// Summary metadata for a QCOW2 disk: counts and sizes, including per-user
-py::dict get_disk_meta_data(const std::string &disk_path, bool verbose) {
-    py::dict out;
-
-    guestfs_h *g = guestfs_create();
-    if (!g) {
-        throw std::runtime_error("Failed to create guestfs handle");
-    }
-
-    if (guestfs_add_drive_ro(g, disk_path.c_str()) == -1) {
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_add_drive_ro failed");
+py::dict export_files_with_metadata(const std::string &disk_path,
+                                    const py::object &output,
+                                    const std::string &format,
+                                    const std::string &compression,
+                                    const std::string &directory) {
+    const bool to_fd = py::isinstance<py::int_>(output);
+    const std::string output_name = to_fd ? std::string() : output.cast<std::string>();
+    const ExportFormat export_format = parse_export_format(format);
+    const ExportCompression export_compression = parse_export_compression(compression, output_name);
+    const std::string dir = normalize_guest_dir(directory);
+
+    int fd = to_fd ? output.cast<int>() : -1;
+    uint64_t rows = 0, bytes_in = 0, bytes_out = 0;
+    {
+        py::gil_scoped_release release;
+        if (!to_fd) {
+            fd = ::open(output_name.c_str(), O_WRONLY | O_CREAT | O_TRUNC | O_CLOEXEC, 0644);
+            if (fd < 0) throw std::runtime_error("Failed to open output file: " + output_name);
+        }
+        try {
+            // Rows go from each listed directory straight to the sink; nothing is
+            // collected, so memory does not grow with the number of files
+            std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+            ExportSink sink(fd, export_compression);
+            ExportWriter writer(sink, export_format);
+            writer.header();
+            walk_tree_each(*session, dir, [&](const std::string &, std::vector<TreeEntry> &entries) {
+                for (const TreeEntry &e : entries) writer.row(e);
+            });
+            writer.finish();
+            rows = writer.rows();
+            bytes_in = sink.bytes_in();
+            bytes_out = sink.bytes_out();
+        } catch (...) {
+            if (!to_fd) ::close(fd);
+            throw;
+        }
+        if (!to_fd && ::close(fd) != 0) {
+            throw std::runtime_error("Failed to write output file: " + output_name);
+        }
     }
 
-    if (guestfs_launch(g) == -1) {
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_launch failed");
-    }
+    static const char *const kCompression[] = {"none", "gzip", "zstd"};
+    py::dict out;
+    out["output"] = to_fd ? py::object(py::int_(fd)) : py::object(py::str(output_name));
+    out["directory"] = dir;
+    out["format"] = format;
+    out["compression"] = kCompression[static_cast<int>(export_compression)];
+    out["rows"] = rows;
+    out["bytes_uncompressed"] = bytes_in;
+    out["bytes_written"] = bytes_out;
+    return out;
+}
 
-    // Inspect and mount
-    char **roots = guestfs_inspect_os(g);
-    if (!roots || !roots[0]) {
-        if (roots) free_string_list(roots);
-        guestfs_shutdown(g);
-        guestfs_close(g);
-        throw std::runtime_error("No OS found in image");
-    }
+// Contents of a small guest file through the host file cache: served without a
+// round trip when this image version was read before, else cat'ed and cached
+static bool cat_cached(guestfs_h *g, const ImageIdentity &image, const char *path, std::string &out) {
+    if (FileCache::instance().get(image, path, out)) return true;
+
+    GuestStat st;
+    struct guestfs_statns *sn = guestfs_statns(g, path);
+    if (sn) {
+        st.exists = true;
+        st.ino = sn->st_ino;
+        st.mode = sn->st_mode;
+        st.size = sn->st_size;
+        st.mtime_sec = sn->st_mtime_sec;
+        st.mtime_nsec = sn->st_mtime_nsec;
+        guestfs_free_statns(sn);
+        if (FileCache::instance().get(image, path, st, out)) return true;
+    }
+
+    size_t size = 0;
+    char *content = guestfs_read_file(g, path, &size);
+    if (!content) return false;
+    out.assign(content, size);
+    free(content);
+    if (st.exists && st.is_reg()) FileCache::instance().put(image, path, st, out);
+    return true;
+}
 
-    for (size_t i = 0; roots[i] != nullptr; ++i) {
-        const char *root = roots[i];
-        char **mpdev = guestfs_inspect_get_mountpoints(g, root);
-        if (!mpdev) continue;
-        struct MP { std::string mountpoint; std::string device; };
-        std::vector<MP> mps;
-        for (size_t j = 0; mpdev[j] && mpdev[j+1]; j += 2) {
-            mps.push_back(MP{mpdev[j], mpdev[j+1]});
-        }
-        free_string_list(mpdev);
-        std::sort(mps.begin(), mps.end(), [](const MP &a, const MP &b){
-            return a.mountpoint.size() < b.mountpoint.size();
-        });
-        for (const auto &p : mps) {
-            (void) guestfs_mount_ro(g, p.device.c_str(), p.mountpoint.c_str());
+// Names by numeric id from /etc/passwd or /etc/group (name:x:id:...)
+static std::unordered_map<long long, std::string> parse_id_names(const std::string &content) {
+    std::unordered_map<long long, std::string> names;
+    std::istringstream iss(content);
+    std::string line;
+    while (std::getline(iss, line)) {
+        if (line.empty() || line[0] == '#') continue;
+        std::vector<std::string> fields;
+        std::string f;
+        std::istringstream ls(line);
+        while (std::getline(ls, f, ':')) fields.push_back(f);
+        if (fields.size() >= 3) {
+            try {
+                names[std::stoll(fields[2])] = fields[0];
+            } catch (...) {}
         }
     }
+    return names;
+}
+
+// Per-owner rows: every known name even without files, then ids seen only in the
+// tree, sorted by bytes (descending)
+static py::list owner_rows(const std::unordered_map<long long, std::string> &names,
+                           const std::unordered_map<int64_t, UsageTotals> &totals,
+                           const char *id_key, const char *name_key, const char *unknown_prefix) {
+    std::vector<std::pair<long long, UsageTotals>> order;
+    order.reserve(names.size() + totals.size());
+    for (const auto &kv : names) {
+        auto it = totals.find(kv.first);
+        order.emplace_back(kv.first, it != totals.end() ? it->second : UsageTotals{});
+    }
+    for (const auto &kv : totals) {
+        if (!names.count(kv.first)) order.emplace_back(kv.first, kv.second);
+    }
+    std::stable_sort(order.begin(), order.end(),
+                     [](const auto &a, const auto &b) { return a.second.bytes > b.second.bytes; });
+
+    py::list rows;
+    for (const auto &kv : order) {
+        auto name = names.find(kv.first);
+        py::dict row;
+        row[id_key] = py::int_(kv.first);
+        row[name_key] = py::str(name != names.end() ? name->second : unknown_prefix + std::to_string(kv.first));
+        row["files"] = py::int_(kv.second.files);
+        row["dirs"] = py::int_(kv.second.dirs);
+        row["bytes"] = py::int_(kv.second.bytes);
+        rows.append(row);
+    }
+    return rows;
+}
 
-    // Parse /etc/passwd for users
+// Inodes one session is expected to walk before another is worth launching
+static constexpr uint64_t kMetaInodesPerWorker = 250000;
+static constexpr size_t kMaxMetaWorkers = 4;
+
+// Summary metadata for a QCOW2 disk in one walk: counts and sizes per user, group,
+// top-level directory and file type, a size histogram and the largest files
+py::dict get_disk_meta_data(const std::string &disk_path, bool verbose, size_t top_n) {
+    ImageIdentity image = ImageIdentity::of(disk_path);
     std::unordered_map<long long, std::string> uid_to_user;
-    try {
-        char *passwd = guestfs_cat(g, "/etc/passwd");
-        if (passwd) {
-            std::string content(passwd);
-            free(passwd);
-            std::istringstream iss(content);
-            std::string line;
-            while (std::getline(iss, line)) {
-                if (line.empty() || line[0] == '#') continue;
-                // Format: name:x:uid:gid:gecos:home:shell
-                std::vector<std::string> fields;
-                std::string f;
-                std::istringstream ls(line);
-                while (std::getline(ls, f, ':')) fields.push_back(f);
-                if (fields.size() >= 3) {
-                    try {
-                        long long uid = std::stoll(fields[2]);
-                        uid_to_user[uid] = fields[0];
-                    } catch (...) {}
-                }
+    std::unordered_map<long long, std::string> gid_to_group;
+    DiskStats stats(top_n);
+    size_t workers = 1;
+    {
+        py::gil_scoped_release release;
+        std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+
+        std::string content;
+        if (cat_cached(session->handle(), image, "/etc/passwd", content)) uid_to_user = parse_id_names(content);
+        if (cat_cached(session->handle(), image, "/etc/group", content)) gid_to_group = parse_id_names(content);
+
+        // The root itself and its entries count under "/"; every top-level directory
+        // is one work item
+        TreeEntry root;
+        root.path = "/";
+        root.st = session->stat("/");
+        if (root.st.exists) stats.add(root, "/");
+        std::vector<std::string> names = session->list_dir("/");
+        std::sort(names.begin(), names.end());
+        std::vector<GuestStat> root_stats = session->lstat_list("/", names);
+        std::vector<std::string> tops;
+        for (size_t i = 0; i < names.size(); ++i) {
+            if (!root_stats[i].exists) continue;
+            TreeEntry e;
+            e.path = "/" + names[i];
+            e.st = root_stats[i];
+            if (e.st.is_dir()) {
+                stats.add(e, e.path);
+                tops.push_back(e.path);
+            } else {
+                stats.add(e, "/");
             }
         }
-    } catch (...) {
-        // ignore parsing errors
-    }
 
-    // Parse /etc/group for groups
-    std::unordered_map<long long, std::string> gid_to_group;
-    try {
-        char *group = guestfs_cat(g, "/etc/group");
-        if (group) {
-            std::string content(group);
-            free(group);
-            std::istringstream iss(content);
-            std::string line;
-            while (std::getline(iss, line)) {
-                if (line.empty() || line[0] == '#') continue;
-                // Format: name:x:gid:members
-                std::vector<std::string> fields;
-                std::string f;
-                std::istringstream ls(line);
-                while (std::getline(ls, f, ':')) fields.push_back(f);
-                if (fields.size() >= 3) {
+        // One session per kMetaInodesPerWorker inodes in use over the mounted filesystems
+        const uint64_t inodes = session->used_inodes();
+        workers = static_cast<size_t>((inodes + kMetaInodesPerWorker - 1) / kMetaInodesPerWorker);
+        workers = std::max<size_t>(1, std::min({workers, kMaxMetaWorkers, tops.size()}));
+
+        // Workers take top-level directories off a shared counter, walk each with the
+        // batched walker into their own aggregates, and the aggregates are merged
+        std::atomic<size_t> next{0};
+        std::vector<DiskStats> partial(workers, DiskStats(top_n));
+        std::vector<std::exception_ptr> errors(workers);
+        auto work = [&](size_t w, std::shared_ptr<GuestSession> s) {
+            try {
+                if (!s) s = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+                for (size_t i = next++; i < tops.size(); i = next++) {
+                    const std::string &top = tops[i];
                     try {
-                        long long gid = std::stoll(fields[2]);
-                        gid_to_group[gid] = fields[0];
-                    } catch (...) {}
+                        walk_tree_each(*s, top, [&](const std::string &, std::vector<TreeEntry> &entries) {
+                            for (const TreeEntry &e : entries) partial[w].add(e, top);
+                        });
+                    } catch (const std::runtime_error &) {
+                        // Unlistable directory: skipped like any other
+                    }
                 }
+            } catch (...) {
+                errors[w] = std::current_exception();
             }
+        };
+        std::vector<std::thread> threads;
+        for (size_t w = 1; w < workers; ++w) threads.emplace_back(work, w, nullptr);
+        work(0, std::move(session));
+        for (std::thread &t : threads) t.join();
+        for (const std::exception_ptr &e : errors) {
+            if (e) std::rethrow_exception(e);
         }
-    } catch (...) {
-        // ignore parsing errors
-    }
-
-    // Traverse filesystem
-    char **paths = guestfs_find(g, "/");
-    if (!paths) {
-        guestfs_umount_all(g);
-        guestfs_shutdown(g);
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_find failed");
+        for (DiskStats &p : partial) stats.merge(std::move(p));
     }
 
-    long long files_count = 0;
-    long long dirs_count = 0;
-    long long total_file_bytes = 0;
-    long long total_dir_bytes = 0;
-    std::unordered_map<long long, long long> per_uid_bytes;
-    std::unordered_map<long long, long long> per_uid_files;
-    std::unordered_map<long long, long long> per_uid_dirs;
-    std::unordered_map<long long, long long> per_gid_bytes;
-    std::unordered_map<long long, long long> per_gid_files;
-    std::unordered_map<long long, long long> per_gid_dirs;
-
-    for (size_t k = 0; paths[k] != nullptr; ++k) {
-        std::string path_component = paths[k];
-        std::string full_path = (path_component == ".") ? std::string("/") : std::string("/") + path_component;
-
-        struct guestfs_statns *st = guestfs_statns(g, full_path.c_str());
-        if (!st) continue;
-
-        uint32_t mode = static_cast<uint32_t>(st->st_mode);
-        bool is_dir = (S_ISDIR(mode));
-        bool is_reg = (S_ISREG(mode));
-        long long uid = static_cast<long long>(st->st_uid);
-        long long gid = static_cast<long long>(st->st_gid);
-        if (is_dir) {
-            dirs_count++;
-            long long dsz = static_cast<long long>(st->st_size);
-            if (dsz > 0) total_dir_bytes += dsz;
-            per_uid_dirs[uid] += 1;
-            per_gid_dirs[gid] += 1;
-        } else if (is_reg) {
-            files_count++;
-            long long sz = static_cast<long long>(st->st_size);
-            if (sz > 0) total_file_bytes += sz;
-            per_uid_bytes[uid] += std::max<long long>(0, sz);
-            per_uid_files[uid] += 1;
-            per_gid_bytes[gid] += std::max<long long>(0, sz);
-            per_gid_files[gid] += 1;
-        }
-        guestfs_free_statns(st);
-
-        if (verbose && (k % 5000 == 0)) {
-            py::print("Processed:", k);
-        }
-    }
+    py::dict out;
+    out["files_count"] = py::int_(stats.files());
+    out["dirs_count"] = py::int_(stats.dirs());
+    out["total_file_bytes"] = py::int_(stats.file_bytes());
+    out["total_dir_bytes"] = py::int_(stats.dir_bytes());
+    out["total_bytes"] = py::int_(stats.file_bytes() + stats.dir_bytes());
+
+    // Owners of regular files, as before
+    auto with_files = [](const std::unordered_map<int64_t, UsageTotals> &totals) {
+        return static_cast<long long>(std::count_if(totals.begin(), totals.end(),
+                                                    [](const auto &kv) { return kv.second.files > 0; }));
+    };
+    out["users_total"] = py::int_(static_cast<long long>(uid_to_user.size()));
+    out["users_with_files"] = py::int_(with_files(stats.per_uid()));
+    out["per_user"] = owner_rows(uid_to_user, stats.per_uid(), "uid", "user", "uid_");
+    out["groups_total"] = py::int_(static_cast<long long>(gid_to_group.size()));
+    out["groups_with_files"] = py::int_(with_files(stats.per_gid()));
+    out["per_group"] = owner_rows(gid_to_group, stats.per_gid(), "gid", "group", "gid_");
 
-    // Prepare per-user list: include all users from /etc/passwd even if zero; sort by bytes desc
-    std::vector<std::pair<long long, long long>> order_users;
-    order_users.reserve(per_uid_bytes.size() + uid_to_user.size());
-    // Seed with all known users to ensure presence
-    for (const auto &kv : uid_to_user) {
-        long long uid = kv.first;
-        long long bytes = per_uid_bytes.count(uid) ? per_uid_bytes[uid] : 0;
-        order_users.emplace_back(uid, bytes);
-    }
-    // Add any extra uids seen in ownership but not in passwd
-    for (const auto &kv : per_uid_bytes) {
-        if (!uid_to_user.count(kv.first)) order_users.emplace_back(kv.first, kv.second);
+    py::dict types;
+    for (size_t t = 0; t < DiskStats::kTypeCount; ++t) {
+        types[DiskStats::type_name(t)] = py::int_(stats.type_counts()[t]);
     }
-    std::sort(order_users.begin(), order_users.end(), [](auto &a, auto &b){ return a.second > b.second; });
+    out["file_types"] = types;
 
-    py::list per_user_list;
-    for (const auto &kv : order_users) {
-        long long uid = kv.first;
-        long long bytes = kv.second;
-        long long nfiles = per_uid_files.count(uid) ? per_uid_files[uid] : 0;
-        long long ndirs  = per_uid_dirs.count(uid) ? per_uid_dirs[uid] : 0;
+    // Regular files by size: bucket 0 holds empty files, bucket k sizes [2^(k-1), 2^k - 1];
+    // only buckets with files are listed
+    py::list histogram;
+    for (size_t b = 0; b < DiskStats::kSizeBuckets; ++b) {
+        if (stats.bucket_files()[b] == 0) continue;
         py::dict row;
-        row["uid"] = py::int_(uid);
-        row["user"] = py::str(uid_to_user.count(uid) ? uid_to_user[uid] : std::string("uid_") + std::to_string(uid));
-        row["files"] = py::int_(nfiles);
-        row["dirs"]  = py::int_(ndirs);
-        row["bytes"] = py::int_(bytes);
-        per_user_list.append(row);
-    }
-
-    // Prepare per-group list: include all groups from /etc/group even if zero; sort by bytes desc
-    std::vector<std::pair<long long, long long>> order_groups;
-    order_groups.reserve(per_gid_bytes.size() + gid_to_group.size());
-    for (const auto &kv : gid_to_group) {
-        long long gid = kv.first;
-        long long bytes = per_gid_bytes.count(gid) ? per_gid_bytes[gid] : 0;
-        order_groups.emplace_back(gid, bytes);
-    }
-    for (const auto &kv : per_gid_bytes) {
-        if (!gid_to_group.count(kv.first)) order_groups.emplace_back(kv.first, kv.second);
-    }
-    std::sort(order_groups.begin(), order_groups.end(), [](auto &a, auto &b){ return a.second > b.second; });
-
-    py::list per_group_list;
-    for (const auto &kv : order_groups) {
-        long long gid = kv.first;
-        long long bytes = kv.second;
-        long long nfiles = per_gid_files.count(gid) ? per_gid_files[gid] : 0;
-        long long ndirs  = per_gid_dirs.count(gid) ? per_gid_dirs[gid] : 0;
+        row["bucket"] = py::int_(b);
+        row["min"] = py::int_(b == 0 ? 0 : uint64_t(1) << (b - 1));
+        row["max"] = py::int_(b == 0 ? 0 : b == 64 ? ~uint64_t(0) : (uint64_t(1) << b) - 1);
+        row["files"] = py::int_(stats.bucket_files()[b]);
+        row["bytes"] = py::int_(stats.bucket_bytes()[b]);
+        histogram.append(row);
+    }
+    out["size_histogram"] = histogram;
+
+    std::vector<std::pair<std::string, UsageTotals>> tops(stats.per_top().begin(), stats.per_top().end());
+    std::sort(tops.begin(), tops.end(), [](const auto &a, const auto &b) {
+        return a.second.bytes != b.second.bytes ? a.second.bytes > b.second.bytes : a.first < b.first;
+    });
+    py::list per_top;
+    for (const auto &kv : tops) {
         py::dict row;
-        row["gid"] = py::int_(gid);
-        row["group"] = py::str(gid_to_group.count(gid) ? gid_to_group[gid] : std::string("gid_") + std::to_string(gid));
-        row["files"] = py::int_(nfiles);
-        row["dirs"]  = py::int_(ndirs);
-        row["bytes"] = py::int_(bytes);
-        per_group_list.append(row);
-    }
-
-    out["files_count"] = py::int_(files_count);
-    out["dirs_count"] = py::int_(dirs_count);
-    out["total_file_bytes"] = py::int_(total_file_bytes);
-    out["total_dir_bytes"] = py::int_(total_dir_bytes);
-    out["total_bytes"] = py::int_(total_file_bytes + total_dir_bytes);
-    out["users_total"] = py::int_(static_cast<long long>(uid_to_user.size()));
-    out["users_with_files"] = py::int_(static_cast<long long>(per_uid_files.size()));
-    out["per_user"] = per_user_list;
-    out["groups_total"] = py::int_(static_cast<long long>(gid_to_group.size()));
-    out["groups_with_files"] = py::int_(static_cast<long long>(per_gid_files.size()));
-    out["per_group"] = per_group_list;
+        row["path"] = decode_text(kv.first);
+        row["files"] = py::int_(kv.second.files);
+        row["dirs"] = py::int_(kv.second.dirs);
+        row["bytes"] = py::int_(kv.second.bytes);
+        per_top.append(row);
+    }
+    out["per_top_dir"] = per_top;
 
-    free_string_list(paths);
-    guestfs_umount_all(g);
-    guestfs_shutdown(g);
-    guestfs_close(g);
+    py::list largest;
+    for (const TreeEntry &e : stats.largest()) {
+        py::dict row;
+        row["path"] = decode_text(e.path);
+        row["size"] = py::int_(e.st.size);
+        row["uid"] = py::int_(e.st.uid);
+        row["gid"] = py::int_(e.st.gid);
+        row["mtime_sec"] = py::int_(e.st.mtime_sec);
+        largest.append(row);
+    }
+    out["largest_files"] = largest;
+    out["workers"] = py::int_(workers);
 
     if (verbose) {
-        py::print("Files:", files_count, "Dirs:", dirs_count, "Total bytes:", total_file_bytes);
+        py::print("Files:", stats.files(), "Dirs:", stats.dirs(), "Total bytes:", stats.file_bytes(),
+                  "Workers:", workers);
     }
 
     return out;
@@ -464,6 +568,7 @@ py::dict get_disk_meta_data(const std::string &disk_path, bool verbose) {
 py::dict get_files_with_metadata_json(const std::string& disk_path, bool verbose) {
     py::list entries = list_files_with_metadata(disk_path, verbose);
     py::dict out;
+    TimeFormatter format_mtime;
     const ssize_t n = py::len(entries);
     for (ssize_t i = 0; i < n; ++i) {
         py::dict d = entries[i].cast<py::dict>();
@@ -471,7 +576,7 @@ py::dict get_files_with_metadata_json(const std::string& disk_path, bool verbose
         // Extract fields if present
         py::object size = d.contains(py::str("size")) ? d[py::str("size")] : py::str("-");
         py::object perms = d.contains(py::str("perms")) ? d[py::str("perms")] : py::str("-");
-        py::object mtime = d.contains(py::str("mtime")) ? d[py::str("mtime")] : py::str("-");
+        py::object mtime = py::str(entry_mtime(d, format_mtime));
         py::object path  = d.contains(py::str("path"))  ? d[py::str("path")]  : py::str("-");
 
         py::dict row;
@@ -487,119 +592,150 @@ py::dict get_files_with_metadata_json(const std::string& disk_path, bool verbose
     return out;
 }
 
-// Read file contents from inside the guest image. Uses guestfs_cat to read the file,
-// then applies optional stop delimiter and byte limit.
-py::object get_file_contents_in_disk(const std::string &disk_path,
-                                     const std::string &name,
-                                     bool binary,
-                                     long long read,
-                                     const std::string &stop) {
-    guestfs_h *g = guestfs_create();
-    if (!g) {
-        throw std::runtime_error("Failed to create guestfs handle");
-    }
+// Ranges up to this many bytes are read with chunked guestfs_pread; larger ones are
+// streamed once through guestfs_download_offset into a temporary file.
+static std::atomic<uint64_t> g_download_threshold{kDefaultDownloadThreshold};
 
-    if (guestfs_add_drive_ro(g, disk_path.c_str()) == -1) {
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_add_drive_ro failed");
-    }
-    if (guestfs_launch(g) == -1) {
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_launch failed");
-    }
+// First read size when scanning a file for a stop delimiter
+static constexpr size_t kFirstStopChunk = 64 * 1024;
 
-    // Inspect and mount
-    char **roots = guestfs_inspect_os(g);
-    if (!roots || !roots[0]) {
-        if (roots) free_string_list(roots);
-        guestfs_shutdown(g);
-        guestfs_close(g);
-        throw std::runtime_error("No OS found in image");
-    }
-    for (size_t i = 0; roots[i] != nullptr; ++i) {
-        const char *root = roots[i];
-        char **mpdev = guestfs_inspect_get_mountpoints(g, root);
-        if (!mpdev) continue;
-        struct MP { std::string mountpoint; std::string device; };
-        std::vector<MP> mps;
-        for (size_t j = 0; mpdev[j] && mpdev[j+1]; j += 2) {
-            mps.push_back(MP{mpdev[j], mpdev[j+1]});
-        }
-        free_string_list(mpdev);
-        std::sort(mps.begin(), mps.end(), [](const MP &a, const MP &b){
-            return a.mountpoint.size() < b.mountpoint.size();
-        });
-        for (const auto &p : mps) {
-            (void) guestfs_mount_ro(g, p.device.c_str(), p.mountpoint.c_str());
-        }
-    }
+uint64_t get_download_threshold() {
+    return g_download_threshold.load();
+}
 
-    // Ensure path is absolute in guest
-    std::string guest_path = name;
-    if (guest_path.empty() || guest_path[0] != '/') {
-        // Interpret as absolute for safety
-        guest_path = std::string("/") + guest_path;
+void set_download_threshold(uint64_t bytes) {
+    g_download_threshold.store(bytes);
+}
+
+// Read `length` bytes at `offset` of a guest file from a mounted session. Below the
+// download threshold the bytes come straight from pread in bounded chunks; above it a
+// single ranged download avoids thousands of round trips.
+static std::vector<char> read_guest_range(GuestSession &session,
+                                          const std::string &guest_path,
+                                          uint64_t offset,
+                                          uint64_t length) {
+    std::vector<char> data;
+    if (length == 0) return data;
+
+    if (length <= g_download_threshold.load()) {
+        data.resize(static_cast<size_t>(length));
+        data.resize(session.read_file(guest_path, offset, data.size(), data.data()));
+        return data;
     }
 
-    // Download the file to a secure temporary path to preserve exact bytes
     char tmp_template[] = "/tmp/vmtXXXXXX";
     int tfd = mkstemp(tmp_template);
     if (tfd >= 0) close(tfd);
     std::string host_tmp = std::string(tmp_template);
 
-    if (guestfs_download(g, guest_path.c_str(), host_tmp.c_str()) == -1) {
-        guestfs_umount_all(g);
-        guestfs_shutdown(g);
-        guestfs_close(g);
+    if (guestfs_download_offset(session.handle(), guest_path.c_str(), host_tmp.c_str(),
+                                static_cast<int64_t>(offset), static_cast<int64_t>(length)) == -1) {
         std::remove(host_tmp.c_str());
         throw std::runtime_error(std::string("Failed to download file: ") + guest_path);
     }
 
-    // Read bytes from temp file
     std::ifstream ifs(host_tmp, std::ios::binary);
     if (!ifs) {
-        guestfs_umount_all(g);
-        guestfs_shutdown(g);
-        guestfs_close(g);
         std::remove(host_tmp.c_str());
         throw std::runtime_error(std::string("Failed to open temp file: ") + host_tmp);
     }
+    data.resize(static_cast<size_t>(length));
+    ifs.read(data.data(), static_cast<std::streamsize>(data.size()));
+    data.resize(static_cast<size_t>(ifs.gcount()));
+    ifs.close();
+    std::remove(host_tmp.c_str());
+    return data;
+}
 
+// Read a guest file from `offset` until `stop` appears or `length` bytes were read,
+// whichever comes first. Chunks start small and double, so a delimiter near the
+// start costs little more than the bytes in front of it.
+static std::vector<char> read_guest_until(GuestSession &session,
+                                          const std::string &guest_path,
+                                          uint64_t offset,
+                                          uint64_t length,
+                                          const std::string &stop) {
+    StreamSearcher searcher(stop);
     std::vector<char> data;
-    if (read >= 0) {
-        data.resize(static_cast<size_t>(read));
-        ifs.read(data.data(), static_cast<std::streamsize>(data.size()));
-        data.resize(static_cast<size_t>(ifs.gcount()));
-    } else {
-        // read all
-        ifs.seekg(0, std::ios::end);
-        std::streamsize sz = ifs.tellg();
-        ifs.seekg(0, std::ios::beg);
-        if (sz > 0) {
-            data.resize(static_cast<size_t>(sz));
-            ifs.read(data.data(), sz);
+    size_t chunk = kFirstStopChunk;
+    while (data.size() < length) {
+        size_t want = static_cast<size_t>(std::min<uint64_t>(chunk, length - data.size()));
+        size_t have = data.size();
+        data.resize(have + want);
+        size_t got = session.read_file(guest_path, offset + have, want, data.data() + have);
+        data.resize(have + got);
+
+        uint64_t match = searcher.feed(data.data() + have, got);
+        if (match != StreamSearcher::npos) {
+            data.resize(static_cast<size_t>(match));
+            break;
         }
+        if (got < want) break; // end of file
+        chunk = std::min(chunk * 2, GuestSession::kMaxChunk);
     }
-    ifs.close();
+    return data;
+}
 
-    // Cleanup guest and temp
-    guestfs_umount_all(g);
-    guestfs_shutdown(g);
-    guestfs_close(g);
-    std::remove(host_tmp.c_str());
+// Bytes [offset, offset + read) of a file already held in memory, ending at the
+// first `stop` the same way read_guest_until() does
+static std::vector<char> slice_contents(const std::string &whole, uint64_t offset,
+                                        long long read, const std::string &stop) {
+    size_t start = static_cast<size_t>(std::min<uint64_t>(offset, whole.size()));
+    size_t length = whole.size() - start;
+    if (read >= 0) length = static_cast<size_t>(std::min<uint64_t>(length, static_cast<uint64_t>(read)));
+    if (!stop.empty()) {
+        size_t match = whole.find(stop, start);
+        if (match != std::string::npos && match + stop.size() <= start + length) length = match - start;
+    }
+    return std::vector<char>(whole.begin() + start, whole.begin() + start + length);
+}
 
-    // Apply stop delimiter if provided (search in bytes)
-    if (!stop.empty() && !data.empty()) {
-        const std::string needle = stop;
-        auto it = std::search(data.begin(), data.end(), needle.begin(), needle.end());
-        if (it != data.end()) {
-            data.resize(static_cast<size_t>(it - data.begin()));
-        }
+// Read file contents from inside the guest image. Reads only the requested range
+// [offset, offset + read); with a stop delimiter, reading ends at its first occurrence.
+py::object get_file_contents_in_disk(const std::string &disk_path,
+                                     const std::string &name,
+                                     bool binary,
+                                     long long read,
+                                     const std::string &stop,
+                                     long long offset) {
+    if (offset < 0) {
+        throw std::runtime_error("offset must not be negative");
+    }
+
+    // Ensure path is absolute in guest
+    std::string guest_path = name;
+    if (guest_path.empty() || guest_path[0] != '/') {
+        // Interpret as absolute for safety
+        guest_path = std::string("/") + guest_path;
     }
 
-    // If both stop and read were provided, enforce read limit after stop trim
-    if (read >= 0 && data.size() > static_cast<size_t>(read)) {
-        data.resize(static_cast<size_t>(read));
+    std::vector<char> data;
+    {
+        py::gil_scoped_release release;
+        ImageIdentity image = ImageIdentity::of(disk_path);
+        std::string whole;
+        bool cached = FileCache::instance().get(image, guest_path, whole);
+
+        if (!cached) {
+            std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+            GuestStat st = session->stat(guest_path);
+            cached = FileCache::instance().get(image, guest_path, st, whole);
+            if (!cached) {
+                uint64_t size = st.exists ? static_cast<uint64_t>(st.size) : session->file_size(guest_path);
+                uint64_t start = std::min<uint64_t>(static_cast<uint64_t>(offset), size);
+                uint64_t length = size - start;
+                if (read >= 0) {
+                    length = std::min<uint64_t>(length, static_cast<uint64_t>(read));
+                }
+                data = stop.empty() ? read_guest_range(*session, guest_path, start, length)
+                                    : read_guest_until(*session, guest_path, start, length, stop);
+                // A read that covered the whole file fills the host cache
+                if (start == 0 && st.is_reg() && data.size() == size) {
+                    FileCache::instance().put(image, guest_path, st, std::string(data.begin(), data.end()));
+                }
+            }
+        }
+        if (cached) data = slice_contents(whole, static_cast<uint64_t>(offset), read, stop);
     }
 
     if (binary) {
@@ -610,142 +746,478 @@ py::object get_file_contents_in_disk(const std::string &disk_path,
     }
 }
 
-py::str get_file_contents_in_disk_format(const std::string &disk_path,
-                                         const std::string &name,
-                                         const std::string &format,
-                                         long long read,
-                                         const std::string &stop) {
-    // Always fetch raw bytes so we preserve NULs and exact values
-    py::object contents = get_file_contents_in_disk(disk_path, name, /*binary=*/true, read, stop);
-    // Convert py::bytes to std::string (std::string preserves NULs and length)
-    std::string buf = contents.cast<std::string>();
+// Split an absolute guest path into its parent directory and final name
+static std::pair<std::string, std::string> split_guest_path(const std::string &path) {
+    size_t slash = path.find_last_of('/');
+    if (slash == std::string::npos) return {"/", path};
+    std::string dir = (slash == 0) ? "/" : path.substr(0, slash);
+    return {dir, path.substr(slash + 1)};
+}
 
-    if (format == "hex") {
-        // Uppercase spaced hex: "00 0F 1A ..."
-        static const char *hexmap = "0123456789ABCDEF";
-        if (buf.empty()) return py::str("");
-        std::string out;
-        out.reserve(buf.size() * 3 - 1);
-        for (size_t i = 0; i < buf.size(); ++i) {
-            unsigned char b = static_cast<unsigned char>(buf[i]);
-            out.push_back(hexmap[(b >> 4) & 0xF]);
-            out.push_back(hexmap[b & 0xF]);
-            if (i + 1 < buf.size()) out.push_back(' ');
+py::dict get_files_contents_in_disk(const std::string &disk_path,
+                                    const std::vector<std::string> &paths,
+                                    long long max_bytes) {
+    struct Item {
+        std::string guest_path;
+        std::string data;
+        std::string error;
+    };
+    std::vector<Item> items(paths.size());
+
+    {
+        py::gil_scoped_release release;
+        ImageIdentity image = ImageIdentity::of(disk_path);
+        FileCache &cache = FileCache::instance();
+        auto truncate = [&](std::string &data) {
+            if (max_bytes >= 0 && data.size() > static_cast<uint64_t>(max_bytes)) data.resize(static_cast<size_t>(max_bytes));
+        };
+
+        // Files cached from this image version need no appliance; group the rest by
+        // parent directory so each directory costs one batched lstat
+        std::map<std::string, std::vector<size_t>> by_dir;
+        for (size_t i = 0; i < paths.size(); ++i) {
+            std::string guest_path = paths[i];
+            while (guest_path.size() > 1 && guest_path.back() == '/') guest_path.pop_back();
+            if (guest_path.empty() || guest_path[0] != '/') guest_path = "/" + guest_path;
+            items[i].guest_path = guest_path;
+            if (cache.get(image, guest_path, items[i].data)) {
+                truncate(items[i].data);
+            } else {
+                by_dir[split_guest_path(guest_path).first].push_back(i);
+            }
         }
-        return py::str(out);
-    } else if (format == "bits") {
-        // Continuous bitstring: 8 chars per byte
-        if (buf.empty()) return py::str("");
-        std::string out;
-        out.reserve(buf.size() * 8);
-        for (size_t i = 0; i < buf.size(); ++i) {
-            unsigned char b = static_cast<unsigned char>(buf[i]);
-            std::bitset<8> bs(b);
-            out += bs.to_string();
+
+        std::shared_ptr<GuestSession> session;
+        if (!by_dir.empty()) session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+
+        for (const auto &entry : by_dir) {
+            std::vector<std::string> names;
+            for (size_t i : entry.second) {
+                names.push_back(split_guest_path(items[i].guest_path).second);
+            }
+            std::vector<GuestStat> stats = session->lstat_list(entry.first, names);
+
+            for (size_t k = 0; k < entry.second.size(); ++k) {
+                Item &item = items[entry.second[k]];
+                GuestStat st = stats[k];
+                if (names[k].empty()) st = session->stat("/");
+                if (st.exists && st.is_link()) st = session->stat(item.guest_path);
+
+                if (!st.exists) {
+                    item.error = "No such file or directory";
+                } else if (st.is_dir()) {
+                    item.error = "Is a directory";
+                } else if (!st.is_reg()) {
+                    item.error = "Not a regular file";
+                } else if (cache.get(image, item.guest_path, st, item.data)) {
+                    truncate(item.data);
+                } else {
+                    uint64_t length = static_cast<uint64_t>(st.size);
+                    if (max_bytes >= 0) length = std::min<uint64_t>(length, static_cast<uint64_t>(max_bytes));
+                    try {
+                        // Small files are a single pread round trip on the shared appliance
+                        item.data.resize(static_cast<size_t>(length));
+                        item.data.resize(session->read_file(item.guest_path, 0, item.data.size(), &item.data[0]));
+                        cache.put(image, item.guest_path, st, item.data);
+                    } catch (const std::exception &e) {
+                        item.data.clear();
+                        item.error = e.what();
+                    }
+                }
+            }
+        }
+    }
+
+    py::dict out;
+    for (size_t i = 0; i < paths.size(); ++i) {
+        if (items[i].error.empty()) {
+            out[py::str(paths[i])] = py::bytes(items[i].data);
+        } else {
+            py::dict err;
+            err[py::str("error")] = py::str(items[i].error);
+            out[py::str(paths[i])] = err;
         }
-        return py::str(out);
-    } else {
-        throw std::runtime_error("Invalid format. Supported formats are 'hex' and 'bits'.");
     }
+    return out;
 }
 
-// check if a file exists in the guest image
-pybind11::dict check_file_exists_in_disk(const std::string &disk_path, const std::string &name) {
-    guestfs_h *g = guestfs_create();
-    if (!g) {
-        throw std::runtime_error("Failed to create guestfs handle");
+// Run fn(0) on this thread and fn(1) on a helper thread; rethrows the first failure
+template <typename Fn>
+static void run_both(Fn fn) {
+    std::exception_ptr other;
+    std::thread t([&]() {
+        try {
+            fn(1);
+        } catch (...) {
+            other = std::current_exception();
+        }
+    });
+    try {
+        fn(0);
+    } catch (...) {
+        t.join();
+        throw;
     }
+    t.join();
+    if (other) std::rethrow_exception(other);
+}
 
-    if (guestfs_add_drive_ro(g, disk_path.c_str()) == -1) {
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_add_drive_ro failed");
+// {"path","exists"[,"type","size","mode"][,"sha256"]} describing one compared file
+static py::dict guest_file_info(const std::string &guest_path, const GuestStat &st, const std::string &sha256) {
+    py::dict info;
+    info["path"] = guest_path;
+    info["exists"] = st.exists;
+    if (st.exists) {
+        info["type"] = st.is_reg() ? "file" : st.is_dir() ? "directory" : "other";
+        info["size"] = st.size;
+        info["mode"] = st.mode & 07777;
+    }
+    if (!sha256.empty()) info["sha256"] = sha256;
+    return info;
+}
+
+// Bytes sniffed for NULs when deciding between a line diff and a byte diff
+static constexpr size_t kBinarySniff = 8000;
+
+py::list text_diff_hunks(const TextDiff &diff, size_t context) {
+    std::vector<DiffHunk> hunks;
+    {
+        py::gil_scoped_release release;
+        hunks = diff.hunks(context);
+    }
+    py::list out;
+    for (const DiffHunk &h : hunks) {
+        py::dict hd;
+        hd["old_start"] = h.a_start + 1;
+        hd["old_lines"] = h.a_count;
+        hd["new_start"] = h.b_start + 1;
+        hd["new_lines"] = h.b_count;
+        py::list lines;
+        for (const DiffOp &op : h.ops) {
+            if (op.kind == DiffOp::Insert) {
+                for (size_t j = op.b_begin; j < op.b_end; ++j) lines.append(py::make_tuple("+", decode_text(diff.b_line(j))));
+            } else {
+                const char *tag = op.kind == DiffOp::Equal ? " " : "-";
+                for (size_t j = op.a_begin; j < op.a_end; ++j) lines.append(py::make_tuple(tag, decode_text(diff.a_line(j))));
+            }
+        }
+        hd["lines"] = lines;
+        out.append(hd);
     }
-    if (guestfs_launch(g) == -1) {
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_launch failed");
+    return out;
+}
+
+// A line as (text, changed) segments; `changed` ranges come from diff_chars
+static py::list line_segments(std::string_view line, const std::vector<ByteRange> &changed) {
+    py::list segments;
+    size_t pos = 0;
+    for (const ByteRange &r : changed) {
+        if (r.first > pos) segments.append(py::make_tuple(decode_text(line.substr(pos, r.first - pos)), false));
+        segments.append(py::make_tuple(decode_text(line.substr(r.first, r.second - r.first)), true));
+        pos = r.second;
+    }
+    if (pos < line.size() || segments.empty()) segments.append(py::make_tuple(decode_text(line.substr(pos)), false));
+    return segments;
+}
+
+py::list text_diff_rows(const TextDiff &diff, size_t start, size_t count, bool intraline) {
+    static const char *kinds[] = {"eq", "chg", "del", "add"};
+    const auto &rows = diff.rows();
+    size_t end = std::min(rows.size(), start + std::min(count, rows.size()));
+    std::vector<ByteRange> a_changed, b_changed;
+
+    py::list out;
+    for (size_t i = start; i < end; ++i) {
+        const TextDiff::Row &row = rows[i];
+        a_changed.clear();
+        b_changed.clear();
+        if (row.kind == TextDiff::Row::Change && intraline) {
+            diff_chars(diff.a_line(row.a_line), diff.b_line(row.b_line), a_changed, b_changed);
+        }
+        py::object left = py::none(), right = py::none();
+        py::object left_no = py::none(), right_no = py::none();
+        if (row.a_line >= 0) {
+            left_no = py::int_(row.a_line + 1);
+            left = line_segments(diff.a_line(row.a_line), a_changed);
+        }
+        if (row.b_line >= 0) {
+            right_no = py::int_(row.b_line + 1);
+            right = line_segments(diff.b_line(row.b_line), b_changed);
+        }
+        out.append(py::make_tuple(kinds[row.kind], left_no, left, right_no, right));
     }
+    return out;
+}
 
-    // Inspect and mount
-    char **roots = guestfs_inspect_os(g);
-    if (!roots || !roots[0]) {
-        if (roots) free_string_list(roots);
-        guestfs_shutdown(g);
-        guestfs_close(g);
-        throw std::runtime_error("No OS found in image");
+py::list text_diff_lines(const TextDiff &diff, const std::string &side, size_t start, size_t count) {
+    if (side != "old" && side != "new") {
+        throw std::invalid_argument("Invalid side '" + side + "'. Supported: 'old', 'new'.");
     }
-    for (size_t i = 0; roots[i] != nullptr; ++i) {
-        const char *root = roots[i];
-        char **mpdev = guestfs_inspect_get_mountpoints(g, root);
-        if (!mpdev) continue;
-        struct MP { std::string mountpoint; std::string device; };
-        std::vector<MP> mps;
-        for (size_t j = 0; mpdev[j] && mpdev[j+1]; j += 2) {
-            mps.push_back(MP{mpdev[j], mpdev[j+1]});
-        }
-        free_string_list(mpdev);
-        std::sort(mps.begin(), mps.end(), [](const MP &a, const MP &b){
-            return a.mountpoint.size() < b.mountpoint.size();
+    const bool old_side = side == "old";
+    const size_t total = old_side ? diff.a_line_count() : diff.b_line_count();
+    const size_t end = start < total ? start + std::min(count, total - start) : start;
+    py::list out;
+    for (size_t i = start; i < end; ++i) out.append(decode_text(old_side ? diff.a_line(i) : diff.b_line(i)));
+    return out;
+}
+
+py::dict compare_file_in_disks(const std::string &disk_path1,
+                               const std::string &path1,
+                               const std::string &disk_path2,
+                               const std::string &path2,
+                               long long max_bytes,
+                               size_t context,
+                               bool read_identical,
+                               const std::string &algorithm) {
+    const DiffAlgorithm algo = parse_diff_algorithm(algorithm);
+    struct Side {
+        std::string disk;
+        std::string guest_path;
+        std::shared_ptr<GuestSession> session;
+        GuestStat st;
+        std::string sha256;
+        std::string data;
+        bool truncated = false;
+    };
+    Side sides[2];
+    sides[0].disk = disk_path1;
+    sides[1].disk = disk_path2;
+    sides[0].guest_path = path1;
+    sides[1].guest_path = path2;
+    for (Side &side : sides) {
+        if (side.guest_path.empty() || side.guest_path[0] != '/') side.guest_path = "/" + side.guest_path;
+    }
+
+    bool identical = false;
+    bool binary = false;
+    std::string method = "missing";
+    std::shared_ptr<TextDiff> text_diff;
+    std::vector<ByteRange> ranges;
+
+    {
+        py::gil_scoped_release release;
+
+        // Both appliances come up (or are taken from the pool) and stat at the same time
+        run_both([&](int i) {
+            Side &side = sides[i];
+            side.session = SessionPool::instance().acquire({side.disk}, /*mount=*/true);
+            side.st = side.session->stat(side.guest_path);
         });
-        for (const auto &p : mps) {
-            (void) guestfs_mount_ro(g, p.device.c_str(), p.mountpoint.c_str());
+
+        auto read_side = [&](int i) {
+            Side &side = sides[i];
+            uint64_t length = static_cast<uint64_t>(side.st.size);
+            if (max_bytes >= 0 && length > static_cast<uint64_t>(max_bytes)) {
+                length = static_cast<uint64_t>(max_bytes);
+                side.truncated = true;
+            }
+            ImageIdentity image = ImageIdentity::of(side.disk);
+            if (FileCache::instance().get(image, side.guest_path, side.st, side.data)) {
+                side.data.resize(static_cast<size_t>(length));
+                return;
+            }
+            side.data.resize(static_cast<size_t>(length));
+            side.data.resize(side.session->read_file(side.guest_path, 0, side.data.size(), &side.data[0]));
+            FileCache::instance().put(image, side.guest_path, side.st, side.data);
+        };
+
+        if (sides[0].st.exists && sides[0].st.is_reg() && sides[1].st.exists && sides[1].st.is_reg()) {
+            // Equal sizes: hash inside both appliances first, so identical files never cross the wire
+            if (sides[0].st.size == sides[1].st.size) {
+                run_both([&](int i) { sides[i].sha256 = sides[i].session->checksum("sha256", sides[i].guest_path); });
+                identical = sides[0].sha256 == sides[1].sha256;
+            }
+
+            if (identical) {
+                method = "checksum";
+                if (read_identical) read_side(0);
+            } else {
+                method = "content";
+                run_both(read_side);
+
+                const std::string &a = sides[0].data;
+                const std::string &b = sides[1].data;
+                binary = std::memchr(a.data(), 0, std::min(a.size(), kBinarySniff)) != nullptr ||
+                         std::memchr(b.data(), 0, std::min(b.size(), kBinarySniff)) != nullptr;
+                if (binary) {
+                    size_t common = std::min(a.size(), b.size());
+                    diff_mask(reinterpret_cast<const unsigned char *>(a.data()),
+                              reinterpret_cast<const unsigned char *>(b.data()),
+                              common, nullptr, &ranges);
+                    if (a.size() != b.size()) ranges.emplace_back(common, std::max(a.size(), b.size()));
+                } else {
+                    text_diff = std::make_shared<TextDiff>(a, b, algo);
+                }
+            }
         }
+
+        sides[0].session.reset();
+        sides[1].session.reset();
     }
 
-    // Ensure path is absolute in guest
-    std::string guest_path = name;
-    if (guest_path.empty() || guest_path[0] != '/') {
-        // Interpret as absolute for safety
-        guest_path = std::string("/") + guest_path;
+    py::dict result;
+    result["identical"] = identical;
+    result["method"] = method;
+    result["binary"] = binary;
+    result["truncated"] = sides[0].truncated || sides[1].truncated;
+
+    const char *file_keys[2] = {"file1", "file2"};
+    const char *data_keys[2] = {"data1", "data2"};
+    for (int i = 0; i < 2; ++i) {
+        const Side &side = sides[i];
+        result[file_keys[i]] = guest_file_info(side.guest_path, side.st, side.sha256);
+        result[data_keys[i]] = py::bytes(side.data);
     }
 
-    // Check if path exists first
-    bool exists = guestfs_exists(g, guest_path.c_str());
+    if (text_diff) {
+        result["hunks"] = text_diff_hunks(*text_diff, context);
+        result["diff"] = py::cast(text_diff);
+    } else {
+        result["hunks"] = py::list();
+        result["diff"] = py::none();
+    }
 
-    bool dir = false;
-    bool file = false;
-    bool link = false;
-    bool socket = false;
-    bool chardev = false;
-    bool blockdev = false;
-    bool fifo = false;
-    bool unknown = false;
+    py::list range_list;
+    for (const auto &r : ranges) range_list.append(py::make_tuple(r.first, r.second));
+    result["differing_ranges"] = range_list;
+    return result;
+}
 
-    long long owner_uid = -1;
-    long long group_gid = -1;
-    std::string permissions = "-";
-    long long size_val = -1;
-    std::string mtime_str = "-";
+py::dict diff_binary_file_in_disks(const std::string &disk_path1,
+                                   const std::string &path1,
+                                   const std::string &disk_path2,
+                                   const std::string &path2,
+                                   const std::string &mode,
+                                   size_t chunk_size,
+                                   size_t max_ranges) {
+    if (mode != "aligned" && mode != "shift") {
+        throw std::invalid_argument("Invalid mode '" + mode + "'. Supported: 'aligned', 'shift'.");
+    }
+    BinaryDiffOptions options;
+    options.shift = (mode == "shift");
+    options.chunk_size = chunk_size;
+    options.max_ranges = max_ranges;
+
+    std::string guest_paths[2] = {path1, path2};
+    const std::string disks[2] = {disk_path1, disk_path2};
+    for (std::string &p : guest_paths) {
+        if (p.empty() || p[0] != '/') p = "/" + p;
+    }
+    std::shared_ptr<GuestSession> sessions[2];
+    GuestStat stats[2];
+    std::string sums[2];
+    bool identical = false;
+    std::string method = "missing";
+    BinaryDiffResult diff;
+
+    {
+        py::gil_scoped_release release;
+        run_both([&](int i) {
+            sessions[i] = SessionPool::instance().acquire({disks[i]}, /*mount=*/true);
+            stats[i] = sessions[i]->stat(guest_paths[i]);
+        });
 
-    if (exists) {
-        struct guestfs_statns *st = guestfs_statns(g, guest_path.c_str());
-        if (st) {
-            uint32_t mode = static_cast<uint32_t>(st->st_mode);
-            dir = S_ISDIR(mode);
-            file = S_ISREG(mode);
-            link = S_ISLNK(mode);
-            socket = S_ISSOCK(mode);
-            chardev = S_ISCHR(mode);
-            blockdev = S_ISBLK(mode);
-            fifo = S_ISFIFO(mode);
-            unknown = !(dir || file || link || socket || chardev || blockdev || fifo);
-
-            owner_uid = static_cast<long long>(st->st_uid);
-            group_gid = static_cast<long long>(st->st_gid);
-            permissions = perms_string(static_cast<uint32_t>(mode & 0777));
-            size_val = static_cast<long long>(st->st_size);
-            mtime_str = format_time(static_cast<std::time_t>(st->st_mtime_sec));
-
-            guestfs_free_statns(st);
-        } else {
-            // If stat fails despite existence, mark as unknown
-            unknown = true;
+        if (stats[0].exists && stats[0].is_reg() && stats[1].exists && stats[1].is_reg()) {
+            if (stats[0].size == stats[1].size) {
+                run_both([&](int i) { sums[i] = sessions[i]->checksum("sha256", guest_paths[i]); });
+                identical = sums[0] == sums[1];
+            }
+            if (identical) {
+                method = "checksum";
+            } else {
+                method = "content";
+                auto reader = [&](int i) -> ReadFn {
+                    return [&, i](uint64_t offset, size_t length, char *out) {
+                        return sessions[i]->read_file(guest_paths[i], offset, length, out);
+                    };
+                };
+                ReadFn read_a = reader(0), read_b = reader(1);
+                diff = diff_streams(read_a, static_cast<uint64_t>(stats[0].size),
+                                    read_b, static_cast<uint64_t>(stats[1].size), options);
+            }
         }
+        sessions[0].reset();
+        sessions[1].reset();
+    }
+
+    py::dict result;
+    result["identical"] = identical;
+    result["method"] = method;
+    result["mode"] = mode;
+    result["file1"] = guest_file_info(guest_paths[0], stats[0], sums[0]);
+    result["file2"] = guest_file_info(guest_paths[1], stats[1], sums[1]);
+    result["differing_bytes"] = diff.differing_bytes;
+    result["range_count"] = diff.range_count;
+    result["truncated"] = diff.truncated;
+
+    py::list ranges;
+    for (const ByteRange &r : diff.ranges) ranges.append(py::make_tuple(r.first, r.second));
+    result["ranges"] = ranges;
+
+    static const char *kinds[] = {"replace", "delete", "insert"};
+    py::list edits;
+    for (const BinaryEdit &e : diff.edits) {
+        edits.append(py::make_tuple(kinds[e.kind], e.a_begin, e.a_end, e.b_begin, e.b_end));
+    }
+    result["edits"] = edits;
+
+    py::list previews;
+    for (const auto &p : diff.previews) previews.append(py::make_tuple(py::bytes(p.first), py::bytes(p.second)));
+    result["previews"] = previews;
+    return result;
+}
+
+py::str get_file_contents_in_disk_format(const std::string &disk_path,
+                                         const std::string &name,
+                                         const std::string &format,
+                                         long long read,
+                                         const std::string &stop,
+                                         long long offset) {
+    // Always fetch raw bytes so we preserve NULs and exact values
+    py::object contents = get_file_contents_in_disk(disk_path, name, /*binary=*/true, read, stop, offset);
+    // Convert py::bytes to std::string (std::string preserves NULs and length)
+    std::string buf = contents.cast<std::string>();
+
+    const unsigned char *bytes = reinterpret_cast<const unsigned char *>(buf.data());
+    if (format == "hex") {
+        // Uppercase spaced hex: "00 0F 1A ..."
+        return py::str(format_hex(bytes, buf.size()));
+    } else if (format == "bits") {
+        // Continuous bitstring: 8 chars per byte
+        return py::str(format_bits(bytes, buf.size()));
+    } else {
+        throw std::runtime_error("Invalid format. Supported formats are 'hex' and 'bits'.");
     }
+}
 
-    // Cleanup guest
-    guestfs_umount_all(g);
-    guestfs_shutdown(g);
-    guestfs_close(g);
+static const char *const kPathsSection = "paths:/";
+
+// The image's stored listing, or null when the image index has none for this version
+static std::shared_ptr<PathSet> stored_paths(const ImageIdentity &image) {
+    std::string stored;
+    if (ImageIndex::instance().load(image, kPathsSection, stored)) {
+        try {
+            return std::make_shared<PathSet>(PathSet::deserialize(stored));
+        } catch (const std::runtime_error &) {
+            // Unreadable section: treated as missing, and overwritten by list_paths
+        }
+    }
+    return nullptr;
+}
+
+// check_file_exists_in_disk's result for one guest path from its stat (symlinks
+// followed); st.exists is false when the path does not exist
+static pybind11::dict exists_row(const std::string &guest_path, const GuestStat &st) {
+    const uint32_t mode = static_cast<uint32_t>(st.mode);
+    const bool exists = st.exists;
+    const bool dir = exists && S_ISDIR(mode);
+    const bool file = exists && S_ISREG(mode);
+    const bool link = exists && S_ISLNK(mode);
+    const bool socket = exists && S_ISSOCK(mode);
+    const bool chardev = exists && S_ISCHR(mode);
+    const bool blockdev = exists && S_ISBLK(mode);
+    const bool fifo = exists && S_ISFIFO(mode);
+    const bool unknown = exists && !(dir || file || link || socket || chardev || blockdev || fifo);
 
     // Build dictionary result
     pybind11::dict out;
@@ -760,21 +1232,116 @@ pybind11::dict check_file_exists_in_disk(const std::string &disk_path, const std
     out[pybind11::str("fifo")] = pybind11::bool_(fifo);
     out[pybind11::str("unknown")] = pybind11::bool_(unknown);
 
-
     // owner/group numeric IDs
-    out[pybind11::str("owner")] = pybind11::int_(owner_uid);
-    out[pybind11::str("group")] = pybind11::int_(group_gid);
-    out[pybind11::str("permissions")] = pybind11::str(permissions);
-    if (size_val >= 0) {
-        out[pybind11::str("size")] = pybind11::int_(size_val);
+    out[pybind11::str("owner")] = pybind11::int_(exists ? st.uid : -1);
+    out[pybind11::str("group")] = pybind11::int_(exists ? st.gid : -1);
+    out[pybind11::str("permissions")] = pybind11::str(exists ? perms_string(mode & 0777) : std::string("-"));
+    if (exists && st.size >= 0) {
+        out[pybind11::str("size")] = pybind11::int_(st.size);
     } else {
         out[pybind11::str("size")] = pybind11::str("-");
     }
-    out[pybind11::str("mtime")] = pybind11::str(mtime_str);
+    // Raw timestamps; format_times() turns them into text where they are displayed
+    if (exists) {
+        put_time(out, "mtime", st.mtime_sec, st.mtime_nsec);
+        put_time(out, "atime", st.atime_sec, st.atime_nsec);
+        put_time(out, "ctime", st.ctime_sec, st.ctime_nsec);
+    } else {
+        put_no_time(out, "mtime");
+        put_no_time(out, "atime");
+        put_no_time(out, "ctime");
+    }
+    return out;
+}
 
+// True when the listing shows `path` cannot exist: its deepest ancestor in the
+// listing has entries of its own, so it is a real directory (not a symlink, whose
+// target find does not descend into) and the next component is not in it
+static bool listed_missing(const PathSet &paths, const std::string &path) {
+    if (path == "/" || paths.contains(path)) return false;
+    // Listed paths are canonical; "." and ".." components are left to the appliance
+    for (size_t pos = 0; pos < path.size();) {
+        size_t next = path.find('/', pos + 1);
+        std::string_view component(path.data() + pos + 1, (next == std::string::npos ? path.size() : next) - pos - 1);
+        if (component.empty() || component == "." || component == "..") return false;
+        pos = next == std::string::npos ? path.size() : next;
+    }
+    std::string ancestor = path;
+    do {
+        size_t slash = ancestor.rfind('/');
+        ancestor.resize(slash == 0 ? 1 : slash);
+    } while (ancestor != "/" && !paths.contains(ancestor));
+    if (ancestor == "/") return true;
+    std::pair<size_t, size_t> below = paths.subtree_range(ancestor);
+    return below.first < below.second;
+}
+
+pybind11::dict check_files_exist_in_disk(const std::string &disk_path, const std::vector<std::string> &names) {
+    // Ensure paths are absolute in guest (interpreted as absolute for safety)
+    std::vector<std::string> guest_paths;
+    guest_paths.reserve(names.size());
+    for (const std::string &name : names) {
+        guest_paths.push_back(name.empty() || name[0] != '/' ? "/" + name : name);
+    }
+
+    std::vector<GuestStat> stats(names.size());
+    {
+        py::gil_scoped_release release;
+        std::shared_ptr<PathSet> listing = stored_paths(ImageIdentity::of(disk_path));
+
+        // Paths the stored listing rules out need no appliance; the rest are lstat'ed
+        // in one batch per parent directory
+        std::map<std::string, std::vector<size_t>> by_dir;
+        bool root = false;
+        for (size_t i = 0; i < guest_paths.size(); ++i) {
+            std::string path = normalize_guest_dir(guest_paths[i]);
+            if (listing && listed_missing(*listing, path)) continue;
+            if (path == "/") {
+                root = true;
+                continue;
+            }
+            by_dir[path.substr(0, std::max<size_t>(1, path.rfind('/')))].push_back(i);
+        }
+
+        if (root || !by_dir.empty()) {
+            std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+            if (root) {
+                GuestStat st = session->stat("/");
+                for (size_t i = 0; i < guest_paths.size(); ++i) {
+                    if (normalize_guest_dir(guest_paths[i]) == "/") stats[i] = st;
+                }
+            }
+            for (const auto &group : by_dir) {
+                const std::string &dir = group.first;
+                std::vector<std::string> base;
+                base.reserve(group.second.size());
+                for (size_t i : group.second) {
+                    std::string path = normalize_guest_dir(guest_paths[i]);
+                    base.push_back(path.substr(path.rfind('/') + 1));
+                }
+                std::vector<GuestStat> found = session->lstat_list(dir, base);
+                for (size_t k = 0; k < found.size(); ++k) {
+                    size_t i = group.second[k];
+                    // Symlinks are reported as what they point to (missing when dangling)
+                    stats[i] = found[k].is_link() ? session->stat(guest_paths[i]) : found[k];
+                }
+            }
+        }
+    }
+
+    pybind11::dict out;
+    for (size_t i = 0; i < names.size(); ++i) {
+        out[pybind11::str(names[i])] = exists_row(guest_paths[i], stats[i]);
+    }
     return out;
 }
 
+// check if a file exists in the guest image
+pybind11::dict check_file_exists_in_disk(const std::string &disk_path, const std::string &name) {
+    pybind11::dict rows = check_files_exist_in_disk(disk_path, {name});
+    return rows[pybind11::str(name)].cast<pybind11::dict>();
+}
+
 pybind11::dict list_files_in_directory_in_disk(const std::string& disk_path, const std::string& directory, bool detailed = false) {
     guestfs_h *g = guestfs_create();
     if (!g) {
@@ -838,13 +1405,17 @@ pybind11::dict list_files_in_directory_in_disk(const std::string& disk_path, con
     guestfs_shutdown(g);
     guestfs_close(g);
     
-    // Build dictionary result
+    // Build dictionary result; details for every entry come from one batched check
+    pybind11::dict details;
+    if (detailed) {
+        std::vector<std::string> paths;
+        for (size_t i = 0; files[i] != nullptr; ++i) paths.push_back(guest_path + "/" + files[i]);
+        details = check_files_exist_in_disk(disk_path, paths);
+    }
     pybind11::dict out;
     for (size_t i = 0; files[i] != nullptr; ++i) {
         if (detailed) {
-            // check_file_exists_in_disk
-            pybind11::dict file_info = check_file_exists_in_disk(disk_path, guest_path + "/" + files[i]);
-            out[pybind11::str(files[i])] = file_info;
+            out[pybind11::str(files[i])] = details[pybind11::str(guest_path + "/" + files[i])];
         }else{
             out[pybind11::str(files[i])] = pybind11::str(files[i]);
         }
@@ -853,90 +1424,132 @@ pybind11::dict list_files_in_directory_in_disk(const std::string& disk_path, con
     return out;
 }
 
-pybind11::dict list_all_filenames_in_disk(const std::string& disk_path, bool verbose) {
-    guestfs_h *g = guestfs_create();
-    if (!g) {
-        throw std::runtime_error("Failed to create guestfs handle");
-    }
+std::shared_ptr<PathSet> list_paths(const std::string &disk_path) {
+    ImageIdentity image = ImageIdentity::of(disk_path);
+    if (std::shared_ptr<PathSet> paths = stored_paths(image)) return paths;
 
-    // Add drive read-only and launch
-    if (guestfs_add_drive_ro(g, disk_path.c_str()) == -1) {
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_add_drive_ro failed");
-    }
-
-    if (guestfs_launch(g) == -1) {
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_launch failed");
+    std::vector<std::string> names;
+    {
+        std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+        names = session->find("/");
     }
-
-    // Inspect OSes
-    char **roots = guestfs_inspect_os(g);
-    if (!roots || !roots[0]) {
-        if (roots) free_string_list(roots);
-        guestfs_shutdown(g);
-        guestfs_close(g);
-        throw std::runtime_error("No OS found in image");
-    }
-
-    // For each root, get mountpoints and mount read-only
-    for (size_t i = 0; roots[i] != nullptr; ++i) {
-        const char *root = roots[i];
-
-        // get mountpoints: returns [mountpoint, device, mountpoint, device, ..., NULL]
-        char **mpdev = guestfs_inspect_get_mountpoints(g, root);
-        if (!mpdev) continue;
-
-        struct MP { std::string mountpoint; std::string device; };
-        std::vector<MP> mps;
-        for (size_t j = 0; mpdev[j] && mpdev[j+1]; j += 2) {
-            mps.push_back(MP{mpdev[j], mpdev[j+1]});
+    for (std::string &name : names) {
+        if (name == ".") {
+            name = "/";
+        } else {
+            name.insert(0, 1, '/');
         }
-        free_string_list(mpdev);
-
-        std::sort(mps.begin(), mps.end(), [](const MP &a, const MP &b){
-            return a.mountpoint.size() < b.mountpoint.size();
-        });
+    }
 
-        for (const auto &p : mps) {
-            // Mount read-only
-            if (guestfs_mount_ro(g, p.device.c_str(), p.mountpoint.c_str()) == -1) {
-                // continue attempting other mounts
-                continue;
-            }
+    auto paths = std::make_shared<PathSet>(std::move(names));
+    ImageIndex::instance().store(image, kPathsSection, paths->serialize());
+    return paths;
+}
+
+static const char *const kTrigramSection = "trigrams:/";
+
+// Listing and trigram index of the image searched last, kept in memory so that
+// repeated searches skip reading them back from the image index
+static std::mutex g_search_mutex;
+static ImageIdentity g_search_image;
+static std::shared_ptr<PathSet> g_search_paths;
+static std::shared_ptr<TrigramIndex> g_search_index;
+
+static void load_search_index(const std::string &disk_path, std::shared_ptr<PathSet> &paths,
+                              std::shared_ptr<TrigramIndex> &index) {
+    ImageIdentity image = ImageIdentity::of(disk_path);
+    {
+        std::lock_guard<std::mutex> lock(g_search_mutex);
+        if (g_search_index && image.valid && image.key == g_search_image.key && image.same_version(g_search_image)) {
+            paths = g_search_paths;
+            index = g_search_index;
+            return;
         }
     }
 
-    // Now find all paths
-    char **paths = guestfs_find(g, "/");
-    if (!paths) {
-        guestfs_umount_all(g);
-        guestfs_shutdown(g);
-        guestfs_close(g);
-        throw std::runtime_error("guestfs_find failed");
+    paths = list_paths(disk_path);
+    std::string stored;
+    if (ImageIndex::instance().load(image, kTrigramSection, stored)) {
+        try {
+            TrigramIndex loaded = TrigramIndex::deserialize(stored);
+            // Posting lists hold listing indices; only valid for a listing of the same size
+            if (loaded.path_count() == paths->size()) index = std::make_shared<TrigramIndex>(std::move(loaded));
+        } catch (const std::runtime_error &) {
+            // Unreadable section: built again and overwritten below
+        }
+    }
+    if (!index) {
+        index = std::make_shared<TrigramIndex>(*paths);
+        ImageIndex::instance().store(image, kTrigramSection, index->serialize());
     }
 
-    // Collect all file paths in a vector
-    std::vector<std::string> file_paths;
-    for (size_t k = 0; paths[k] != nullptr; ++k) {
-        std::string path_component = paths[k];
-        std::string full_path = (path_component == ".") ? std::string("/") : std::string("/") + path_component;
-        file_paths.push_back(full_path);
+    std::lock_guard<std::mutex> lock(g_search_mutex);
+    g_search_image = image;
+    g_search_paths = paths;
+    g_search_index = index;
+}
+
+py::dict search_paths(const std::string &disk_path, const std::string &pattern, const std::string &mode,
+                      size_t limit) {
+    const SearchMode search_mode = parse_search_mode(mode);
+    std::vector<std::string> matches;
+    size_t total = 0;
+    size_t checked = 0;
+    {
+        py::gil_scoped_release release;
+        PathPattern matcher(pattern, search_mode);
+        std::shared_ptr<PathSet> paths;
+        std::shared_ptr<TrigramIndex> index;
+        load_search_index(disk_path, paths, index);
+
+        auto check = [&](const std::string &path) {
+            ++checked;
+            if (!matcher.matches(path)) return;
+            if (limit == 0 || matches.size() < limit) matches.push_back(path);
+            ++total;
+        };
+
+        bool all = false;
+        std::vector<uint32_t> candidates = index->candidates(matcher.literals(), all);
+        if (all) {
+            // Nothing to narrow the search with: check every path
+            for (const std::string &path : *paths) check(path);
+        } else {
+            // Candidates are sorted; step the iterator within a block, seek across blocks
+            PathSet::const_iterator it = paths->begin();
+            for (uint32_t c : candidates) {
+                if (c < it.index() || c - it.index() >= PathSet::kBlock) it = paths->iterator_at(c);
+                while (it.index() < c) ++it;
+                check(*it);
+            }
+        }
     }
 
-    free_string_list(paths);
-    guestfs_umount_all(g);
-    guestfs_shutdown(g);
-    guestfs_close(g);
+    py::list rows;
+    for (const std::string &path : matches) rows.append(decode_text(path));
+    py::dict out;
+    out["pattern"] = pattern;
+    out["mode"] = mode;
+    out["total"] = py::int_(total);
+    out["checked"] = py::int_(checked);
+    out["truncated"] = py::bool_(total > matches.size());
+    out["paths"] = rows;
+    return out;
+}
 
-    // Sort the file paths alphabetically
-    std::sort(file_paths.begin(), file_paths.end());
+pybind11::dict list_all_filenames_in_disk(const std::string& disk_path, bool verbose) {
+    std::shared_ptr<PathSet> paths;
+    {
+        py::gil_scoped_release release;
+        paths = list_paths(disk_path);
+    }
 
-    // Build dictionary with serial numbers as keys
+    // Build dictionary with serial numbers as keys (paths come out sorted)
     pybind11::dict out;
-    for (size_t i = 0; i < file_paths.size(); ++i) {
+    for (auto it = paths->begin(); it != paths->end(); ++it) {
+        size_t i = it.index();
         std::string key = std::to_string(i + 1);
-        out[py::str(key)] = py::str(file_paths[i]);
+        out[py::str(key)] = py::str(*it);
 
         if (verbose && (i % 5000 == 0)) {
             py::print("Processed:", i + 1, "files");
@@ -946,6 +1559,71 @@ pybind11::dict list_all_filenames_in_disk(const std::string& disk_path, bool ver
     return out;
 }
 
+static const char *const kUsageSection = "usage:/";
+
+// The image's usage tree from the image index, else from one walk of the image
+static std::shared_ptr<UsageTree> load_usage_tree(const std::string &disk_path) {
+    ImageIdentity image = ImageIdentity::of(disk_path);
+    std::string stored;
+    if (ImageIndex::instance().load(image, kUsageSection, stored)) {
+        try {
+            return std::make_shared<UsageTree>(UsageTree::deserialize(stored));
+        } catch (const std::runtime_error &) {
+            // Unreadable section: walk the image again and overwrite it
+        }
+    }
+
+    std::shared_ptr<UsageTree> tree;
+    {
+        std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+        tree = std::make_shared<UsageTree>(UsageTree::build(*session));
+    }
+    ImageIndex::instance().store(image, kUsageSection, tree->serialize());
+    return tree;
+}
+
+// One directory of a usage tree with its largest subdirectories (at most top_n),
+// recursing max_depth levels; "more" counts the subdirectories left out
+static py::dict usage_node(const UsageTree &tree, size_t index, size_t max_depth, size_t top_n) {
+    const UsageTree::Node &n = tree.node(index);
+    py::dict out;
+    out["path"] = decode_text(tree.path(index));
+    out["bytes"] = py::int_(n.total.bytes);
+    out["files"] = py::int_(n.total.files);
+    out["dirs"] = py::int_(n.total.dirs);
+    out["own_bytes"] = py::int_(n.own.bytes);
+    out["own_files"] = py::int_(n.own.files);
+
+    std::vector<size_t> children = tree.children(index);
+    size_t shown = max_depth > 0 ? std::min(top_n, children.size()) : 0;
+    std::partial_sort(children.begin(), children.begin() + static_cast<std::ptrdiff_t>(shown), children.end(),
+                      [&](size_t a, size_t b) {
+                          const int64_t x = tree.node(a).total.bytes, y = tree.node(b).total.bytes;
+                          return x != y ? x > y : a < b;
+                      });
+    py::list rows;
+    for (size_t k = 0; k < shown; ++k) rows.append(usage_node(tree, children[k], max_depth - 1, top_n));
+    out["children"] = rows;
+    out["more"] = py::int_(children.size() - shown);
+    return out;
+}
+
+py::dict usage_tree(const std::string &disk_path, size_t max_depth, size_t top_n, const std::string &directory) {
+    const std::string dir = normalize_guest_dir(directory);
+    std::shared_ptr<UsageTree> tree;
+    {
+        py::gil_scoped_release release;
+        tree = load_usage_tree(disk_path);
+    }
+    size_t index = tree->find(dir);
+    if (index == UsageTree::npos) {
+        throw std::invalid_argument("Directory not found in image: " + dir);
+    }
+    py::dict out = usage_node(*tree, index, max_depth, top_n);
+    out["directories"] = py::int_(tree->size());
+    return out;
+}
+
 pybind11::dict list_all_filenames_in_directory(const std::string& disk_path, const std::string& directory, bool verbose) {
     guestfs_h *g = guestfs_create();
     if (!g) {
@@ -1128,11 +1806,16 @@ struct BlockCompareWorker {
     }
 };
 
-pybind11::dict list_blocks_difference_in_disks(const std::string& disk_path1, 
-                                                const std::string& disk_path2, 
-                                                size_t block_size,
-                                                int64_t start_block,
-                                                int64_t end_block) {
+// Scan [start_block, end_block) of two disks and return the sorted differing block numbers.
+// Fills in the total block count of the common size and the resolved block range.
+static std::vector<uint64_t> scan_differing_blocks(const std::string& disk_path1,
+                                                   const std::string& disk_path2,
+                                                   size_t block_size,
+                                                   int64_t start_block,
+                                                   int64_t end_block,
+                                                   uint64_t &total_blocks,
+                                                   uint64_t &start_block_num,
+                                                   uint64_t &end_block_num) {
     uint64_t compare_size = 0;
     guestfs_h *g_main = nullptr;
 
@@ -1175,9 +1858,9 @@ pybind11::dict list_blocks_difference_in_disks(const std::string& disk_path1,
 
     // Use single thread to avoid resource exhaustion
     std::vector<uint64_t> all_differing_blocks;
-    uint64_t total_blocks = 0;
-    uint64_t start_block_num = 0;
-    uint64_t end_block_num = 0;
+    total_blocks = 0;
+    start_block_num = 0;
+    end_block_num = 0;
     
     guestfs_h *g = guestfs_create();
     if (!g) {
@@ -1272,6 +1955,20 @@ pybind11::dict list_blocks_difference_in_disks(const std::string& disk_path1,
 
     // Sort the differing blocks
     std::sort(all_differing_blocks.begin(), all_differing_blocks.end());
+    return all_differing_blocks;
+}
+
+pybind11::dict list_blocks_difference_in_disks(const std::string& disk_path1, 
+                                                const std::string& disk_path2, 
+                                                size_t block_size,
+                                                int64_t start_block,
+                                                int64_t end_block) {
+    uint64_t total_blocks = 0;
+    uint64_t start_block_num = 0;
+    uint64_t end_block_num = 0;
+    std::vector<uint64_t> all_differing_blocks = scan_differing_blocks(
+        disk_path1, disk_path2, block_size, start_block, end_block,
+        total_blocks, start_block_num, end_block_num);
 
     // Build dictionary with metadata and differing blocks
     pybind11::dict out;
@@ -1304,85 +2001,712 @@ pybind11::dict list_blocks_difference_in_disks(const std::string& disk_path1,
     return out;
 }
 
+std::shared_ptr<BlockRangeSet> block_diff_map(const std::string& disk_path1,
+                                              const std::string& disk_path2,
+                                              size_t block_size,
+                                              int64_t start_block,
+                                              int64_t end_block) {
+    uint64_t total_blocks = 0;
+    uint64_t start_block_num = 0;
+    uint64_t end_block_num = 0;
+    std::vector<uint64_t> blocks = scan_differing_blocks(
+        disk_path1, disk_path2, block_size, start_block, end_block,
+        total_blocks, start_block_num, end_block_num);
+    return std::make_shared<BlockRangeSet>(start_block_num, end_block_num, total_blocks, block_size, blocks);
+}
+
+// Read `count` blocks starting at start_block, serving whole blocks from the shared
+// BlockCache and launching an appliance only when some block of the range is missing.
+// The result is cut short at the end of the device. Call without the GIL held.
+static std::string read_blocks_cached(const std::string &disk_path,
+                                      uint64_t start_block,
+                                      uint64_t count,
+                                      size_t block_size) {
+    BlockCache &cache = BlockCache::instance();
+    ImageIdentity image = ImageIdentity::of(disk_path);
+
+    uint64_t offset = start_block * block_size;
+    uint64_t disk_size = cache.device_size(image);
+    if (disk_size > 0) {
+        if (offset >= disk_size) {
+            throw std::runtime_error("start_block is beyond disk size");
+        }
+        count = std::min<uint64_t>(count, (disk_size - offset + block_size - 1) / block_size);
+
+        std::string out;
+        std::string block;
+        uint64_t i = 0;
+        for (; i < count; ++i) {
+            if (!cache.get(image, offset + i * block_size, block_size, block)) break;
+            out += block;
+        }
+        if (i == count) return out;
+    }
+
+    GuestSession session({disk_path});
+    disk_size = session.device_size(0);
+    cache.set_device_size(image, disk_size);
+    if (offset >= disk_size) {
+        throw std::runtime_error("start_block is beyond disk size");
+    }
+
+    // The last block range may be cut short by the end of the device
+    uint64_t length = std::min<uint64_t>(count * block_size, disk_size - offset);
+    std::string out(static_cast<size_t>(length), '\0');
+    out.resize(session.read_device(0, offset, out.size(), &out[0]));
+
+    for (size_t pos = 0; pos < out.size(); pos += block_size) {
+        cache.put(image, offset + pos, block_size, out.substr(pos, block_size));
+    }
+    return out;
+}
+
 pybind11::dict get_block_data_in_disk(const std::string& disk_path,
                                        uint64_t block_number,
                                        size_t block_size,
                                        const std::string& format) {
-    guestfs_h *g = guestfs_create();
-    if (!g) {
-        throw std::runtime_error("Failed to create libguestfs handle");
+    if (format != "hex" && format != "bits") {
+        throw std::runtime_error("Invalid format: " + format + ". Use 'hex' or 'bits'");
     }
+    check_block_size(block_size);
 
-    try {
-        // Add drive as read-only
-        if (guestfs_add_drive_opts(g, disk_path.c_str(), 
-                                   GUESTFS_ADD_DRIVE_OPTS_READONLY, 1, -1) == -1) {
-            throw std::runtime_error("Failed to add drive");
-        }
+    std::string buffer;
+    {
+        py::gil_scoped_release release;
+        buffer = read_blocks_cached(disk_path, block_number, 1, block_size);
+    }
+    if (buffer.size() != block_size) {
+        throw std::runtime_error("Failed to read block " + std::to_string(block_number));
+    }
 
-        if (guestfs_launch(g) == -1) {
-            throw std::runtime_error("guestfs_launch failed");
+    const unsigned char *bytes = reinterpret_cast<const unsigned char *>(buffer.data());
+    std::string formatted_data = (format == "hex") ? format_hex(bytes, buffer.size())
+                                                   : format_bits(bytes, buffer.size());
+
+    // Build dictionary with block number as key
+    pybind11::dict out;
+    std::string key = std::to_string(block_number);
+    out[py::str(key)] = py::str(formatted_data);
+
+    return out;
+}
+
+pybind11::memoryview read_blocks(const std::string& disk_path,
+                                 uint64_t start_block,
+                                 uint64_t count,
+                                 size_t block_size) {
+    check_block_size(block_size);
+
+    auto buffer = std::make_shared<ByteBuffer>();
+    {
+        py::gil_scoped_release release;
+        buffer->data = read_blocks_cached(disk_path, start_block, count, block_size);
+    }
+
+    // The memoryview keeps the owning ByteBuffer alive; no copy of the data is made
+    return py::memoryview(py::cast(buffer));
+}
+
+// Clamp a hexdump window request and check its format
+static uint64_t hexdump_length(long long length, const std::string &format) {
+    if (format != "hex" && format != "bits") {
+        throw std::invalid_argument("Invalid format: " + format + ". Use 'hex' or 'bits'");
+    }
+    if (length <= 0) {
+        throw std::invalid_argument("length must be greater than zero");
+    }
+    return std::min<uint64_t>(static_cast<uint64_t>(length), kMaxHexdumpWindow);
+}
+
+// Rows of one hexdump window plus the offsets of the windows around it
+static py::dict hexdump_result(const std::string &window, uint64_t offset, uint64_t requested,
+                               uint64_t size, const std::string &format) {
+    std::vector<DumpRow> rows;
+    {
+        py::gil_scoped_release release;
+        rows = dump_rows(reinterpret_cast<const unsigned char *>(window.data()), window.size(), format, offset);
+    }
+
+    py::list py_rows;
+    for (const DumpRow &row : rows) {
+        py_rows.append(py::make_tuple(row.offset, py::str(row.data), py::str(row.ascii)));
+    }
+
+    uint64_t end = offset + window.size();
+    py::dict out;
+    out["size"] = size;
+    out["offset"] = offset;
+    out["length"] = static_cast<uint64_t>(window.size());
+    out["format"] = format;
+    out["next_offset"] = end < size ? py::object(py::int_(end)) : py::object(py::none());
+    out["prev_offset"] = offset > 0 ? py::object(py::int_(offset - std::min(offset, requested)))
+                                    : py::object(py::none());
+    out["rows"] = py_rows;
+    return out;
+}
+
+py::dict hexdump_file_in_disk(const std::string &disk_path,
+                              const std::string &name,
+                              uint64_t offset,
+                              long long length,
+                              const std::string &format) {
+    uint64_t want = hexdump_length(length, format);
+    std::string guest_path = name;
+    if (guest_path.empty() || guest_path[0] != '/') {
+        guest_path = std::string("/") + guest_path;
+    }
+
+    std::string window;
+    uint64_t size = 0;
+    {
+        py::gil_scoped_release release;
+        std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+        size = session->file_size(guest_path);
+        if (offset < size) {
+            window.resize(static_cast<size_t>(std::min<uint64_t>(want, size - offset)));
+            window.resize(session->read_file(guest_path, offset, window.size(), &window[0]));
         }
+    }
 
-        char **devices = guestfs_list_devices(g);
-        if (!devices || !devices[0]) {
-            throw std::runtime_error("Could not find device");
+    py::dict out = hexdump_result(window, std::min(offset, size), want, size, format);
+    out["disk"] = disk_path;
+    out["path"] = guest_path;
+    return out;
+}
+
+py::dict hexdump_disk(const std::string &disk_path,
+                      uint64_t offset,
+                      long long length,
+                      const std::string &format) {
+    uint64_t want = hexdump_length(length, format);
+    const size_t block_size = kHexdumpBlockSize;
+
+    // Read the covering blocks through the block cache, then cut the window out. An
+    // offset at or past the end of the device gives an empty window, as for files.
+    std::string window;
+    uint64_t size = 0;
+    {
+        py::gil_scoped_release release;
+        const ImageIdentity image = ImageIdentity::of(disk_path);
+        size = BlockCache::instance().device_size(image);
+        if (size == 0) {
+            std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/false);
+            size = session->device_size(0);
+            BlockCache::instance().set_device_size(image, size);
         }
-        std::string dev = devices[0];
-        free_string_list(devices);
+        if (offset < size) {
+            uint64_t first = offset / block_size;
+            uint64_t last = (offset + std::min(want, size - offset) - 1) / block_size;
+            std::string blocks = read_blocks_cached(disk_path, first, last - first + 1, block_size);
+            size_t skip = static_cast<size_t>(offset - first * block_size);
+            if (skip < blocks.size()) {
+                window = blocks.substr(skip, static_cast<size_t>(want));
+            }
+        }
+    }
+
+    py::dict out = hexdump_result(window, std::min(offset, size), want, size, format);
+    out["disk"] = disk_path;
+    return out;
+}
 
-        // Calculate offset from block number
+// Read one block from an attached drive of an open session and store it in the cache
+static std::string read_session_block(GuestSession &session,
+                                      size_t drive,
+                                      const ImageIdentity &image,
+                                      const std::string &disk_path,
+                                      uint64_t block_number,
+                                      size_t block_size) {
+    BlockCache &cache = BlockCache::instance();
+    uint64_t disk_size = session.device_size(drive);
+    cache.set_device_size(image, disk_size);
+
+    uint64_t offset = block_number * block_size;
+    if (offset >= disk_size) {
+        throw std::runtime_error("Block " + std::to_string(block_number) + " is beyond the end of " + disk_path);
+    }
+    std::string out(static_cast<size_t>(std::min<uint64_t>(block_size, disk_size - offset)), '\0');
+    out.resize(session.read_device(drive, offset, out.size(), &out[0]));
+    cache.put(image, offset, block_size, out);
+    return out;
+}
+
+pybind11::dict compare_block(const std::string& disk_path1,
+                             const std::string& disk_path2,
+                             uint64_t block_number,
+                             size_t block_size) {
+    check_block_size(block_size);
+
+    auto data1 = std::make_shared<ByteBuffer>();
+    auto data2 = std::make_shared<ByteBuffer>();
+    auto mask = std::make_shared<ByteBuffer>();
+    std::vector<ByteRange> ranges;
+    size_t differing = 0;
+
+    {
+        py::gil_scoped_release release;
+        BlockCache &cache = BlockCache::instance();
+        ImageIdentity image1 = ImageIdentity::of(disk_path1);
+        ImageIdentity image2 = ImageIdentity::of(disk_path2);
         uint64_t offset = block_number * block_size;
 
-        // Read the block
-        size_t size_read = 0;
-        char* buffer = guestfs_pread_device(g, dev.c_str(), block_size, offset, &size_read);
-        if (!buffer || size_read != block_size) {
-            if (buffer) std::free(buffer);
-            throw std::runtime_error("Failed to read block " + std::to_string(block_number));
-        }
+        bool have1 = cache.get(image1, offset, block_size, data1->data);
+        bool have2 = cache.get(image2, offset, block_size, data2->data);
 
-        std::string formatted_data;
+        // Attach only the drives whose block is not cached, all to the same appliance
+        if (!have1 || !have2) {
+            std::vector<std::string> disks;
+            if (!have1) disks.push_back(disk_path1);
+            if (!have2) disks.push_back(disk_path2);
+            GuestSession session(disks);
 
-        if (format == "hex") {
-            // Format as uppercase hex bytes separated by spaces
-            std::ostringstream oss;
-            for (size_t i = 0; i < size_read; ++i) {
-                if (i > 0) oss << " ";
-                oss << std::uppercase << std::hex << std::setw(2) << std::setfill('0')
-                    << (static_cast<unsigned int>(static_cast<unsigned char>(buffer[i])));
+            size_t drive = 0;
+            if (!have1) {
+                data1->data = read_session_block(session, drive++, image1, disk_path1, block_number, block_size);
             }
-            formatted_data = oss.str();
-        } else if (format == "bits") {
-            // Format as continuous bitstring
-            std::ostringstream oss;
-            for (size_t i = 0; i < size_read; ++i) {
-                std::bitset<8> bits(static_cast<unsigned char>(buffer[i]));
-                oss << bits.to_string();
+            if (!have2) {
+                data2->data = read_session_block(session, drive++, image2, disk_path2, block_number, block_size);
             }
-            formatted_data = oss.str();
-        } else {
-            std::free(buffer);
-            guestfs_close(g);
-            throw std::runtime_error("Invalid format: " + format + ". Use 'hex' or 'bits'");
         }
 
-        std::free(buffer);
-        guestfs_close(g);
+        // Bytes present in only one of the blocks (end of a shorter disk) count as differing
+        const std::string &a = data1->data;
+        const std::string &b = data2->data;
+        size_t common = std::min(a.size(), b.size());
+        size_t longest = std::max(a.size(), b.size());
+        mask->data.assign(longest, '\1');
+        differing = diff_mask(reinterpret_cast<const unsigned char *>(a.data()),
+                              reinterpret_cast<const unsigned char *>(b.data()),
+                              common,
+                              reinterpret_cast<unsigned char *>(&mask->data[0]),
+                              &ranges);
+        if (longest > common) {
+            differing += longest - common;
+            if (!ranges.empty() && ranges.back().second == common) {
+                ranges.back().second = longest;
+            } else {
+                ranges.emplace_back(common, longest);
+            }
+        }
+    }
+
+    py::list ranges_list;
+    for (const auto &r : ranges) {
+        ranges_list.append(py::make_tuple(py::int_(r.first), py::int_(r.second)));
+    }
 
-        // Build dictionary with block number as key
-        pybind11::dict out;
-        std::string key = std::to_string(block_number);
-        out[py::str(key)] = py::str(formatted_data);
+    pybind11::dict out;
+    out[py::str("block")] = py::int_(block_number);
+    out[py::str("block_size")] = py::int_(block_size);
+    out[py::str("data1")] = py::memoryview(py::cast(data1));
+    out[py::str("data2")] = py::memoryview(py::cast(data2));
+    out[py::str("diff_mask")] = py::memoryview(py::cast(mask));
+    out[py::str("differing_bytes")] = py::int_(differing);
+    out[py::str("differing_ranges")] = ranges_list;
+    out[py::str("identical")] = py::bool_(differing == 0);
+    return out;
+}
 
-        return out;
+std::shared_ptr<BlockStats> block_stats(const std::string& disk_path,
+                                        size_t block_size,
+                                        int64_t start_block,
+                                        int64_t end_block) {
+    check_block_size(block_size);
+
+    py::gil_scoped_release release;
+    GuestSession session({disk_path});
+    uint64_t disk_size = session.device_size(0);
+    BlockCache::instance().set_device_size(ImageIdentity::of(disk_path), disk_size);
+
+    // A short tail block at the end of the device is included
+    uint64_t total_blocks = (disk_size + block_size - 1) / block_size;
+    uint64_t first = (start_block < 0) ? 0 : static_cast<uint64_t>(start_block);
+    uint64_t last = (end_block < 0) ? total_blocks : std::min(static_cast<uint64_t>(end_block), total_blocks);
+    if (first >= total_blocks) {
+        throw std::runtime_error("start_block is beyond disk size");
+    }
+
+    auto stats = std::make_shared<BlockStats>(first, block_size);
+
+    // Stream whole blocks in bounded chunks; the range is not put in the block cache
+    size_t chunk = std::max<size_t>(1, GuestSession::kMaxChunk / block_size) * block_size;
+    std::string buf(chunk, '\0');
+    uint64_t end_offset = std::min<uint64_t>(last * block_size, disk_size);
+    for (uint64_t offset = first * block_size; offset < end_offset; offset += chunk) {
+        size_t want = static_cast<size_t>(std::min<uint64_t>(chunk, end_offset - offset));
+        size_t got = session.read_device(0, offset, want, &buf[0]);
+        stats->add(reinterpret_cast<const unsigned char *>(buf.data()), got);
+        if (got < want) break;
+    }
+    return stats;
+}
 
-    } catch (const std::exception& e) {
-        if (g) {
-            guestfs_close(g);
+// Algorithms guestfs_checksums_out accepts
+static const char *const kChecksumAlgorithms[] = {"crc", "md5", "sha1", "sha224", "sha256", "sha384", "sha512"};
+
+// Parse one "<sum>  ./<path>" line of checksums_out. Names containing '\\' or a
+// newline are escaped the way coreutils does it: the line starts with '\\'.
+static bool parse_checksum_line(const std::string &line, const std::string &directory,
+                                std::pair<std::string, std::string> &out) {
+    bool escaped = !line.empty() && line[0] == '\\';
+    size_t start = escaped ? 1 : 0;
+    size_t sep = line.find("  ", start);
+    if (sep == std::string::npos) return false;
+
+    std::string name = line.substr(sep + 2);
+    if (escaped) {
+        std::string raw;
+        raw.reserve(name.size());
+        for (size_t i = 0; i < name.size(); ++i) {
+            if (name[i] == '\\' && i + 1 < name.size()) {
+                char c = name[++i];
+                raw += (c == 'n') ? '\n' : (c == 'r') ? '\r' : c;
+            } else {
+                raw += name[i];
+            }
+        }
+        name.swap(raw);
+    }
+    if (name.compare(0, 2, "./") == 0) name.erase(0, 2);
+
+    out.first = (directory == "/" ? "/" : directory + "/") + name;
+    out.second = line.substr(start, sep - start);
+    return true;
+}
+
+// Checksums are kept in the image index as sorted "path\0sum\n" records
+static std::string checksum_section(const std::string &algorithm, const std::string &directory) {
+    return "checksums/" + algorithm + ":" + directory;
+}
+
+PathChecksums checksum_tree_entries(const std::string &disk_path,
+                                    const std::string &directory,
+                                    const std::string &algorithm) {
+    if (std::find(std::begin(kChecksumAlgorithms), std::end(kChecksumAlgorithms), algorithm) ==
+        std::end(kChecksumAlgorithms)) {
+        throw std::invalid_argument("Invalid checksum algorithm: " + algorithm +
+                                    ". Use crc, md5, sha1, sha224, sha256, sha384 or sha512");
+    }
+    std::string dir = normalize_guest_dir(directory);
+    ImageIdentity image = ImageIdentity::of(disk_path);
+    std::string section = checksum_section(algorithm, dir);
+
+    PathChecksums entries;
+    std::string stored;
+    if (ImageIndex::instance().load(image, section, stored)) {
+        size_t pos = 0;
+        while (pos < stored.size()) {
+            size_t nul = stored.find('\0', pos);
+            size_t eol = stored.find('\n', nul);
+            if (nul == std::string::npos || eol == std::string::npos) break;
+            entries.emplace_back(stored.substr(pos, nul - pos), stored.substr(nul + 1, eol - nul - 1));
+            pos = eol + 1;
         }
+        return entries;
+    }
+
+    // The appliance writes every checksum into one host file; parse it line by line
+    char tmp_template[] = "/tmp/vmtXXXXXX";
+    int tfd = mkstemp(tmp_template);
+    if (tfd >= 0) close(tfd);
+    std::string host_tmp(tmp_template);
+    try {
+        std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disk_path}, /*mount=*/true);
+        session->checksums_out(algorithm, dir, host_tmp);
+    } catch (...) {
+        std::remove(host_tmp.c_str());
         throw;
     }
+
+    std::ifstream ifs(host_tmp, std::ios::binary);
+    std::string line;
+    std::pair<std::string, std::string> entry;
+    while (std::getline(ifs, line)) {
+        if (parse_checksum_line(line, dir, entry)) entries.push_back(std::move(entry));
+    }
+    ifs.close();
+    std::remove(host_tmp.c_str());
+    std::sort(entries.begin(), entries.end());
+
+    stored.clear();
+    for (const auto &e : entries) {
+        stored += e.first;
+        stored += '\0';
+        stored += e.second;
+        stored += '\n';
+    }
+    ImageIndex::instance().store(image, section, stored);
+    return entries;
+}
+
+py::dict checksum_tree(const std::string &disk_path,
+                       const std::string &directory,
+                       const std::string &algorithm) {
+    PathChecksums entries;
+    {
+        py::gil_scoped_release release;
+        entries = checksum_tree_entries(disk_path, directory, algorithm);
+    }
+    py::dict out;
+    for (const auto &e : entries) {
+        out[py::str(e.first)] = py::str(e.second);
+    }
+    return out;
+}
+
+// Type name of a stat'ed guest entry
+static const char *entry_type(const GuestStat &st) {
+    return st.is_reg() ? "file" : st.is_dir() ? "directory" : st.is_link() ? "symlink" : "other";
+}
+
+// {"type","size","mode","uid","gid","mtime"[,"target"][,"checksum"]} for one side of a diff row
+static py::dict tree_entry_info(const TreeEntry &e) {
+    py::dict info;
+    info["type"] = entry_type(e.st);
+    info["size"] = e.st.size;
+    info["mode"] = e.st.mode & 07777;
+    info["uid"] = e.st.uid;
+    info["gid"] = e.st.gid;
+    info["mtime"] = e.st.mtime_sec;
+    if (e.st.is_link()) info["target"] = e.target;
+    if (!e.checksum.empty()) info["checksum"] = e.checksum;
+    return info;
+}
+
+// Attach checksums (sorted by path, like the listing) to the regular files of a listing
+static void attach_checksums(std::vector<TreeEntry> &entries, const PathChecksums &sums) {
+    size_t k = 0;
+    for (TreeEntry &e : entries) {
+        while (k < sums.size() && sums[k].first < e.path) ++k;
+        if (k == sums.size()) break;
+        if (sums[k].first == e.path && e.st.is_reg()) e.checksum = sums[k].second;
+    }
+}
+
+py::dict diff_directories(const std::string &disk_path1,
+                          const std::string &directory1,
+                          const std::string &disk_path2,
+                          const std::string &directory2,
+                          bool compare_content,
+                          const std::string &algorithm,
+                          bool include_unchanged) {
+    const std::string disks[2] = {disk_path1, disk_path2};
+    const std::string dirs[2] = {normalize_guest_dir(directory1), normalize_guest_dir(directory2)};
+    std::vector<TreeEntry> trees[2];
+    TreeDiffResult diff;
+
+    {
+        py::gil_scoped_release release;
+
+        // Each side hashes (or reads its hashes from the image index) and walks in its
+        // own appliance; both run at the same time
+        run_both([&](int i) {
+            PathChecksums sums;
+            if (compare_content) sums = checksum_tree_entries(disks[i], dirs[i], algorithm);
+            std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disks[i]}, /*mount=*/true);
+            trees[i] = walk_tree(*session, dirs[i]);
+            session.reset();
+            attach_checksums(trees[i], sums);
+        });
+        diff = diff_trees(trees[0], dirs[0], trees[1], dirs[1], include_unchanged);
+    }
+
+    static const char *const kStatus[] = {"removed", "added", "modified", "unchanged"};
+    const size_t prefix[2] = {dirs[0] == "/" ? 1 : dirs[0].size() + 1,
+                              dirs[1] == "/" ? 1 : dirs[1].size() + 1};
+
+    py::list rows;
+    for (const TreeChange &c : diff.rows) {
+        const TreeEntry *a = c.a >= 0 ? &trees[0][static_cast<size_t>(c.a)] : nullptr;
+        const TreeEntry *b = c.b >= 0 ? &trees[1][static_cast<size_t>(c.b)] : nullptr;
+        py::dict row;
+        row["path"] = a ? a->path.substr(prefix[0]) : b->path.substr(prefix[1]);
+        row["status"] = kStatus[c.kind];
+        row["changes"] = change_names(c.flags);
+        row["path1"] = a ? py::object(py::str(a->path)) : py::object(py::none());
+        row["path2"] = b ? py::object(py::str(b->path)) : py::object(py::none());
+        row["old"] = a ? py::object(tree_entry_info(*a)) : py::object(py::none());
+        row["new"] = b ? py::object(tree_entry_info(*b)) : py::object(py::none());
+        rows.append(row);
+    }
+
+    py::dict out;
+    out["disk1"] = disk_path1;
+    out["dir1"] = dirs[0];
+    out["disk2"] = disk_path2;
+    out["dir2"] = dirs[1];
+    out["total1"] = trees[0].size();
+    out["total2"] = trees[1].size();
+    out["removed"] = diff.removed;
+    out["added"] = diff.added;
+    out["modified"] = diff.modified;
+    out["unchanged"] = diff.unchanged;
+    out["content_compared"] = compare_content;
+    out["rows"] = rows;
+    return out;
+}
+
+py::list metadata_diff_rows(const MetadataDiff &diff, size_t start, size_t count) {
+    static const char *const kStatus[] = {"removed", "added", "modified"};
+    const size_t end = start < diff.rows.size() ? start + std::min(count, diff.rows.size() - start) : start;
+    py::list rows;
+    for (size_t i = start; i < end; ++i) {
+        const TreeChange &c = diff.rows[i];
+        const TreeEntry *a = c.a >= 0 ? &diff.trees[0][static_cast<size_t>(c.a)] : nullptr;
+        const TreeEntry *b = c.b >= 0 ? &diff.trees[1][static_cast<size_t>(c.b)] : nullptr;
+        py::dict row;
+        row["path"] = a ? a->path : b->path;
+        row["status"] = kStatus[c.kind];
+        row["flags"] = c.flags;
+        row["changes"] = change_names(c.flags);
+        row["old"] = a ? py::object(tree_entry_info(*a)) : py::object(py::none());
+        row["new"] = b ? py::object(tree_entry_info(*b)) : py::object(py::none());
+        rows.append(row);
+    }
+    return rows;
+}
+
+py::dict diff_files_with_metadata(const std::string &disk_path1,
+                                  const std::string &disk_path2,
+                                  const std::vector<std::string> &changes,
+                                  bool include_presence,
+                                  size_t limit) {
+    // Content is not read here, so only metadata bits can be asked for
+    const uint32_t mask = changes.empty() ? kMetadataChanges : parse_change_names(changes);
+    if (mask & kChangeContent) {
+        throw std::invalid_argument("content changes need diff_directories (checksums)");
+    }
+
+    const std::string disks[2] = {disk_path1, disk_path2};
+    auto result = std::make_shared<MetadataDiff>();
+    TreeDiffResult diff;
+
+    {
+        py::gil_scoped_release release;
+        run_both([&](int i) {
+            std::shared_ptr<GuestSession> session = SessionPool::instance().acquire({disks[i]}, /*mount=*/true);
+            result->trees[i] = walk_tree(*session, "/");
+        });
+        diff = diff_trees(result->trees[0], "/", result->trees[1], "/", /*keep_unchanged=*/false, mask);
+        if (!include_presence) {
+            diff.rows.erase(std::remove_if(diff.rows.begin(), diff.rows.end(),
+                                           [](const TreeChange &c) { return c.kind != TreeChange::Modified; }),
+                            diff.rows.end());
+        }
+        result->rows = std::move(diff.rows);
+    }
+
+    py::dict out;
+    out["disk1"] = disk_path1;
+    out["disk2"] = disk_path2;
+    out["total1"] = result->trees[0].size();
+    out["total2"] = result->trees[1].size();
+    out["removed"] = diff.removed;
+    out["added"] = diff.added;
+    out["modified"] = diff.modified;
+    out["unchanged"] = diff.unchanged;
+    out["changes"] = change_names(mask);
+    out["total_rows"] = result->rows.size();
+    out["rows"] = metadata_diff_rows(*result, 0, limit);
+    out["truncated"] = result->rows.size() > limit;
+    out["diff"] = py::cast(result);
+    return out;
+}
+
+// Guest paths from a Python iterable of str; a dict contributes its values, so the
+// {"1": path, ...} result of list_all_filenames_in_disk can be passed as it is
+static std::vector<std::string> path_list(const py::object &paths) {
+    py::iterable items = py::isinstance<py::dict>(paths) ? py::iterable(paths.attr("values")())
+                                                         : py::iterable(paths);
+    std::vector<std::string> out;
+    if (py::hasattr(paths, "__len__")) out.reserve(py::len(paths));
+    for (py::handle item : items) {
+        out.push_back(item.cast<std::string>());
+    }
+    return out;
+}
+
+std::shared_ptr<FileListDiff> diff_file_lists(const py::object &paths1, const py::object &paths2) {
+    // PathSets (from list_paths) are merged as they are; other inputs are collected
+    // here and front-coded without the GIL
+    const py::object *args[2] = {&paths1, &paths2};
+    std::shared_ptr<PathSet> sets[2];
+    std::vector<std::string> lists[2];
+    for (int i = 0; i < 2; ++i) {
+        if (py::isinstance<PathSet>(*args[i])) {
+            sets[i] = args[i]->cast<std::shared_ptr<PathSet>>();
+        } else {
+            lists[i] = path_list(*args[i]);
+        }
+    }
+    py::gil_scoped_release release;
+    for (int i = 0; i < 2; ++i) {
+        if (!sets[i]) sets[i] = std::make_shared<PathSet>(std::move(lists[i]));
+    }
+    return std::make_shared<FileListDiff>(*sets[0], *sets[1]);
+}
+
+static const char *const kFileListStatus[] = {"removed", "added", "common"};
+
+py::list file_list_diff_rows(const FileListDiff &diff, size_t start, size_t count, const std::string &status) {
+    py::list rows;
+    if (status.empty()) {
+        size_t end = std::min(diff.size(), start + std::min(count, diff.size()));
+        for (auto it = diff.paths().iterator_at(start); it.index() < end; ++it) {
+            rows.append(py::make_tuple(py::str(*it), kFileListStatus[diff.status(it.index())]));
+        }
+        return rows;
+    }
+
+    size_t which = 0;
+    while (which < 3 && status != kFileListStatus[which]) ++which;
+    if (which == 3) {
+        throw std::invalid_argument("Invalid status: " + status + ". Use 'removed', 'added' or 'common'");
+    }
+    const std::vector<uint32_t> &index = diff.rows_of(static_cast<FileListDiff::Status>(which));
+    size_t end = std::min(index.size(), start + std::min(count, index.size()));
+    for (size_t k = start; k < end; ++k) {
+        rows.append(py::make_tuple(py::str(diff.path(index[k])), kFileListStatus[which]));
+    }
+    return rows;
+}
+
+pybind11::dict image_index_stats() {
+    ImageIndex::Stats s = ImageIndex::instance().stats();
+    pybind11::dict out;
+    out[py::str("directory")] = py::str(ImageIndex::instance().directory());
+    out[py::str("hits")] = py::int_(s.hits);
+    out[py::str("misses")] = py::int_(s.misses);
+    out[py::str("stores")] = py::int_(s.stores);
+    out[py::str("invalidations")] = py::int_(s.invalidations);
+    return out;
+}
+
+pybind11::dict file_cache_stats() {
+    FileCache::Stats s = FileCache::instance().stats();
+    pybind11::dict out;
+    out[py::str("hits")] = py::int_(s.hits);
+    out[py::str("misses")] = py::int_(s.misses);
+    out[py::str("evictions")] = py::int_(s.evictions);
+    out[py::str("shared")] = py::int_(s.shared);
+    out[py::str("files")] = py::int_(s.files);
+    out[py::str("blobs")] = py::int_(s.blobs);
+    out[py::str("bytes")] = py::int_(s.bytes);
+    out[py::str("capacity")] = py::int_(s.capacity);
+    return out;
+}
+
+pybind11::dict block_cache_stats() {
+    BlockCache::Stats s = BlockCache::instance().stats();
+    pybind11::dict out;
+    out[py::str("hits")] = py::int_(s.hits);
+    out[py::str("misses")] = py::int_(s.misses);
+    out[py::str("evictions")] = py::int_(s.evictions);
+    out[py::str("invalidations")] = py::int_(s.invalidations);
+    out[py::str("entries")] = py::int_(s.entries);
+    out[py::str("bytes")] = py::int_(s.bytes);
+    out[py::str("capacity")] = py::int_(s.capacity);
+    return out;
 }
 
 } // namespace vmtool
\ No newline at end of file
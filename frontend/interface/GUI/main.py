@@ -260,12 +260,13 @@ class SaveWorker(QObject):
             # Prepare small sample to emit
             count = len(entries)
             sample = []
+            mtimes = vmtool.format_times([d['mtime_sec'] for d in entries[:5]])
             for i in range(min(5, count)):
                 d = entries[i]
                 sample.append({
                     'size': d['size'],
                     'perms': d['perms'],
-                    'mtime': d['mtime'],
+                    'mtime': mtimes[i],
                     'path': d['path']
                 })
             self.finished.emit(True, count, "", timer.elapsed(), sample)
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 import json
 import os
-import difflib
-import re
 import hashlib
+import threading
+import uuid
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict
 from datetime import datetime
@@ -318,7 +319,8 @@ def list_files() -> str | Response:
 
         # Fetch fresh data from vmtool
         entries = vmtool.list_files_with_metadata(disk_path, verbose)
-        # entries is a list of dicts with keys: size, perms, mtime, path
+        # entries is a list of dicts with keys: size, perms, path and mtime/atime/ctime
+        # _sec/_nsec; the page formats the timestamps of the rows it shows
 
         # Save to cache for potential future use (JSON download, etc.)
         cache_data = {
@@ -453,29 +455,39 @@ def file_contents() -> str | Response:
     read_val = request.form.get("read", "-1").strip()
     stop = request.form.get("stop", "")
 
+    offset_val = request.form.get("offset", "0").strip()
+
     try:
         read = int(read_val) if read_val else -1
     except ValueError:
         read = -1
+    try:
+        offset = max(0, int(offset_val)) if offset_val else 0
+    except ValueError:
+        offset = 0
 
     if not disk_path or not name:
         flash("Disk path and file path are required", "error")
         return redirect(url_for("file_contents"))
 
     try:
-        data = vmtool.get_file_contents_in_disk(disk_path, name, binary, read, stop)
+        data = vmtool.get_file_contents_in_disk(disk_path, name, binary, read, stop, offset)
         if binary:
             pass
             # When binary, return a download of bytes
             # if isinstance(data, (bytes, bytearray)):
             #     return Response(data, mimetype="application/octet-stream")
             # Some pybind can still hand us Python bytes-like in str; fall through
-        return render_template("file_contents.html", result=data, disk_path=disk_path, name=name, binary=binary, read=read, stop=stop)
+        return render_template("file_contents.html", result=data, disk_path=disk_path, name=name, binary=binary, read=read, stop=stop, offset=offset)
     except Exception as e:  # noqa: BLE001
         flash(f"Error: {e}", "error")
         return redirect(url_for("file_contents"))
 
 
+# Bytes per window of the paged hex viewer (1024 hex rows)
+_HEXDUMP_WINDOW = 16 * 1024
+
+
 @app.route("/file-contents-format", methods=["GET", "POST"])
 @login_required
 def file_contents_format() -> str | Response:
@@ -488,23 +500,92 @@ def file_contents_format() -> str | Response:
     read_val = request.form.get("read", "-1").strip()
     stop = request.form.get("stop", "")
 
+    offset_val = request.form.get("offset", "0").strip()
+
     try:
         read = int(read_val) if read_val else -1
     except ValueError:
         read = -1
+    try:
+        offset = max(0, int(offset_val)) if offset_val else 0
+    except ValueError:
+        offset = 0
 
     if not disk_path or not name:
         flash("Disk path and file path are required", "error")
         return redirect(url_for("file_contents_format"))
 
     try:
-        data = vmtool.get_file_contents_in_disk_format(disk_path, name, fmt, read, stop)
-        return render_template("file_contents_format.html", result=data, disk_path=disk_path, name=name, format=fmt, read=read, stop=stop)
+        if stop:
+            # The stop delimiter has to be searched for, so the range is read in one go
+            data = vmtool.get_file_contents_in_disk_format(disk_path, name, fmt, read, stop, offset)
+            return render_template("file_contents_format.html", result=data, disk_path=disk_path, name=name, format=fmt, read=read, stop=stop, offset=offset)
+
+        # Otherwise render the first window only; the page fetches the rest from /api/hexdump
+        length = _HEXDUMP_WINDOW if read < 0 else max(1, min(read, _HEXDUMP_WINDOW))
+        dump = vmtool.hexdump_file_in_disk(disk_path, name, offset, length, fmt)
+        end = None if read < 0 else offset + read
+        return render_template("file_contents_format.html", result=None, dump=dump, end=end, window=_HEXDUMP_WINDOW, disk_path=disk_path, name=name, format=fmt, read=read, stop=stop, offset=offset)
     except Exception as e:  # noqa: BLE001
         flash(f"Error: {e}", "error")
         return redirect(url_for("file_contents_format"))
 
 
+# Line diffs behind /file-compare with the compared files, kept so the page can fetch
+# further rows on scroll and export both texts without embedding them
+_TEXT_DIFFS: "OrderedDict[str, tuple[Any, Dict[str, Any]]]" = OrderedDict()
+_TEXT_DIFFS_LOCK = threading.Lock()
+_TEXT_DIFFS_MAX = 8
+_FILE_DIFF_WINDOW = 200
+_TEXT_EXPORT_LINES = 10000
+
+
+def _get_text_diff(diff_id: str) -> tuple[Any, Dict[str, Any]] | None:
+    with _TEXT_DIFFS_LOCK:
+        entry = _TEXT_DIFFS.get(diff_id)
+        if entry is not None:
+            _TEXT_DIFFS.move_to_end(diff_id)
+        return entry
+
+
+def _text_diff_side(text_diff: Any, side: str):
+    """Yield one side ("old" or "new") of a stored TextDiff as text, a page of lines at a time."""
+    total = text_diff.old_lines if side == "old" else text_diff.new_lines
+    for start in range(0, total, _TEXT_EXPORT_LINES):
+        yield ("\n" if start else "") + "\n".join(text_diff.lines(side, start, _TEXT_EXPORT_LINES))
+
+
+_BINARY_DIFF_ROWS = 1000
+
+
+def _binary_diff_rows(cmp: Dict[str, Any]) -> list[Dict[str, Any]]:
+    """Rows for the binary view of /file-compare from diff_binary_file_in_disks output."""
+    size1 = cmp["file1"].get("size", 0)
+    size2 = cmp["file2"].get("size", 0)
+    if cmp["mode"] == "shift":
+        kinds = {"replace": "chg", "delete": "del", "insert": "add"}
+        spans = [(kinds[k], (a0, a1), (b0, b1)) for k, a0, a1, b0, b1 in cmp["edits"]]
+    else:
+        spans = [("chg", (s, min(e, size1)), (s, min(e, size2))) for s, e in cmp["ranges"]]
+
+    def preview_hex(data: bytes, span: tuple[int, int]) -> str:
+        text = data.hex(" ").upper()
+        return text + " …" if span[1] - span[0] > len(data) else text
+
+    rows: list[Dict[str, Any]] = []
+    previews = cmp["previews"]
+    for i, (kind, old, new) in enumerate(spans):
+        p1, p2 = previews[i] if i < len(previews) else (b"", b"")
+        rows.append({
+            "kind": kind,
+            "old": old,
+            "new": new,
+            "hex1": preview_hex(p1, old) if p1 else "",
+            "hex2": preview_hex(p2, new) if p2 else "",
+        })
+    return rows
+
+
 @app.route("/file-compare", methods=["GET", "POST"])
 @login_required
 def file_compare() -> str | Response:
@@ -517,77 +598,74 @@ def file_compare() -> str | Response:
     disk2 = request.form.get("disk_path_2", "").strip()
     path2 = request.form.get("file_path_2", "").strip()
     binary = request.form.get("binary") == "on"
+    shift = request.form.get("shift") == "on"
 
     if not disk1 or not path1 or not disk2 or not path2:
         flash("Please provide both disk paths and file paths.", "error")
         return redirect(url_for("file_compare"))
 
     try:
-        # Check existence
-        exists1: Dict[str, Any] = vmtool.check_file_exists_in_disk(disk1, path1)
-        exists2: Dict[str, Any] = vmtool.check_file_exists_in_disk(disk2, path2)
-
-        def regroup_hex_into_lines(s: str, per_line: int = 32) -> list[str]:
-            # Extract hex byte tokens and regroup into lines of `per_line` bytes
-            tokens = re.findall(r"[0-9A-Fa-f]{2}", s)
-            if not tokens:
-                # Fallback: splitlines if nothing matched (leave as-is)
-                return s.splitlines()
-            lines: list[str] = []
-            for i in range(0, len(tokens), per_line):
-                chunk = tokens[i:i+per_line]
-                lines.append(" ".join(chunk))
-            return lines
-
-        # Prepare contents
-        if exists1.get("exists"):
-            if binary:
-                content1 = vmtool.get_file_contents_in_disk_format(disk1, path1, "hex", -1, "")
-            else:
-                content1 = vmtool.get_file_contents_in_disk(disk1, path1, False, -1, "")
-            if not isinstance(content1, str):
-                content1 = str(content1)
-            lines1 = regroup_hex_into_lines(content1, 32) if binary else content1.splitlines()
-        else:
-            lines1 = ["[FILE DOES NOT EXIST]"]
-
-        if exists2.get("exists"):
-            if binary:
-                content2 = vmtool.get_file_contents_in_disk_format(disk2, path2, "hex", -1, "")
-            else:
-                content2 = vmtool.get_file_contents_in_disk(disk2, path2, False, -1, "")
-            if not isinstance(content2, str):
-                content2 = str(content2)
-            lines2 = regroup_hex_into_lines(content2, 32) if binary else content2.splitlines()
+        if binary:
+            # Byte-level compare streamed through the backend; the files are never loaded here
+            cmp: Dict[str, Any] = vmtool.diff_binary_file_in_disks(
+                disk1, path1, disk2, path2, "shift" if shift else "aligned", max_ranges=_BINARY_DIFF_ROWS
+            )
         else:
-            lines2 = ["[FILE DOES NOT EXIST]"]
-
-        # Generate side-by-side HTML diff
-        h = difflib.HtmlDiff()
-        diff_html = h.make_table(
-            lines1,
-            lines2,
-            fromdesc=f"{disk1}:{path1}",
-            todesc=f"{disk2}:{path2}",
-            context=False,
-            numlines=0,
-        )
+            # One call stats, hashes and reads both files through pooled appliances
+            cmp = vmtool.compare_file_in_disks(disk1, path1, disk2, path2, read_identical=True)
+        exists1 = bool(cmp["file1"]["exists"])
+        exists2 = bool(cmp["file2"]["exists"])
+        for info in (cmp["file1"], cmp["file2"]):
+            if info["exists"] and info["type"] != "file":
+                flash(f"Error: {info['path']} is not a regular file", "error")
+                return redirect(url_for("file_compare"))
+
+        result: Dict[str, Any] = {
+            "disk1": disk1,
+            "path1": path1,
+            "disk2": disk2,
+            "path2": path2,
+            "exists1": exists1,
+            "exists2": exists2,
+            "identical": bool(cmp["identical"]),
+            "binary": binary,
+            "shift": shift,
+        }
 
-        return render_template(
-            "file_compare.html",
-            result={
-                "diff_html": diff_html,
-                "disk1": disk1,
-                "path1": path1,
-                "disk2": disk2,
-                "path2": path2,
-                "exists1": bool(exists1.get("exists")),
-                "exists2": bool(exists2.get("exists")),
-                "binary": binary,
-                "content1": content1 if exists1.get("exists") else "[FILE DOES NOT EXIST]",
-                "content2": content2 if exists2.get("exists") else "[FILE DOES NOT EXIST]",
-            },
-        )
+        if binary:
+            rows = _binary_diff_rows(cmp)
+            result.update({
+                "binary_rows": rows,
+                "differing_bytes": cmp["differing_bytes"],
+                "range_count": cmp["range_count"],
+                "truncated": cmp["truncated"],
+            })
+            return render_template("file_compare.html", result=result)
+
+        # Line diff in the backend; only the first window of rows is rendered here and
+        # the texts themselves are served from the stored diff
+        text_diff = cmp["diff"]
+        if text_diff is None:
+            missing = b"[FILE DOES NOT EXIST]"
+            # Identical files are only read once
+            data2: bytes = cmp["data1"] if cmp["identical"] else cmp["data2"]
+            text_diff = vmtool.diff_text(cmp["data1"] if exists1 else missing, data2 if exists2 else missing)
+        diff_id = uuid.uuid4().hex
+        with _TEXT_DIFFS_LOCK:
+            _TEXT_DIFFS[diff_id] = (text_diff, {k: result[k] for k in ("disk1", "path1", "disk2", "path2", "exists1", "exists2")})
+            while len(_TEXT_DIFFS) > _TEXT_DIFFS_MAX:
+                _TEXT_DIFFS.popitem(last=False)
+
+        result.update({
+            "diff_id": diff_id,
+            "rows": text_diff.rows(0, _FILE_DIFF_WINDOW),
+            "total_rows": len(text_diff),
+            "window": _FILE_DIFF_WINDOW,
+            "added": text_diff.added,
+            "removed": text_diff.removed,
+            "change_starts": text_diff.change_starts(),
+        })
+        return render_template("file_compare.html", result=result)
     except Exception as e:  # noqa: BLE001
         flash(f"Error: {e}", "error")
         return redirect(url_for("file_compare"))
@@ -608,12 +686,43 @@ def check_exists() -> str | Response:
 
     try:
         data: Dict[str, Any] = vmtool.check_file_exists_in_disk(disk_path, name)
-        return render_template("check_exists.html", result=data, disk_path=disk_path, name=name)
+        mtime = vmtool.format_times([data["mtime_sec"]])[0]
+        return render_template("check_exists.html", result=data, disk_path=disk_path, name=name, mtime=mtime)
     except Exception as e:  # noqa: BLE001
         flash(f"Error: {e}", "error")
         return redirect(url_for("check_exists"))
 
 
+# Merged listings behind /files-diff, kept so the page can page through them
+_FILE_LIST_DIFFS: "OrderedDict[str, Any]" = OrderedDict()
+_FILE_LIST_DIFFS_LOCK = threading.Lock()
+_FILE_LIST_DIFFS_MAX = 4
+_FILES_DIFF_WINDOW = 500
+
+
+def _get_file_list_diff(diff_id: str) -> Any:
+    with _FILE_LIST_DIFFS_LOCK:
+        file_diff = _FILE_LIST_DIFFS.get(diff_id)
+        if file_diff is not None:
+            _FILE_LIST_DIFFS.move_to_end(diff_id)
+        return file_diff
+
+
+# Whole-image metadata diffs behind /api/files-diff/metadata, paged the same way
+_METADATA_DIFFS: "OrderedDict[str, Any]" = OrderedDict()
+_METADATA_DIFFS_LOCK = threading.Lock()
+_METADATA_DIFFS_MAX = 4
+_METADATA_DIFF_WINDOW = 1000
+
+
+def _get_metadata_diff(diff_id: str) -> Any:
+    with _METADATA_DIFFS_LOCK:
+        metadata_diff = _METADATA_DIFFS.get(diff_id)
+        if metadata_diff is not None:
+            _METADATA_DIFFS.move_to_end(diff_id)
+        return metadata_diff
+
+
 @app.route("/files-diff", methods=["GET", "POST"])
 @login_required
 def files_diff() -> str | Response:
@@ -628,99 +737,33 @@ def files_diff() -> str | Response:
         return redirect(url_for("files_diff"))
 
     try:
-        # Create cache directory if it doesn't exist
-        cache_dir = Path(__file__).parent / ".cache"
-        cache_dir.mkdir(exist_ok=True)
-
-        # Generate cache keys for both disks
-        cache_key1 = hashlib.sha256(f"{disk1}:files".encode()).hexdigest()
-        cache_key2 = hashlib.sha256(f"{disk2}:files".encode()).hexdigest()
-        cache_file1 = cache_dir / f"files_diff_{cache_key1}.json"
-        cache_file2 = cache_dir / f"files_diff_{cache_key2}.json"
-
-        # Get file lists from both disks (use cache or fetch fresh)
-        if cache_file1.exists():
-            with open(cache_file1, 'r') as f:
-                files1_dict = json.load(f)
-        else:
-            files1_dict = vmtool.list_all_filenames_in_disk(disk1)
-            with open(cache_file1, 'w') as f:
-                json.dump(files1_dict, f, indent=2)
-
-        if cache_file2.exists():
-            with open(cache_file2, 'r') as f:
-                files2_dict = json.load(f)
-        else:
-            files2_dict = vmtool.list_all_filenames_in_disk(disk2)
-            with open(cache_file2, 'w') as f:
-                json.dump(files2_dict, f, indent=2)
-
-        # Extract just the file paths (values) and sort them
-        files1_set = set(files1_dict.values())
-        files2_set = set(files2_dict.values())
-        
-        # Calculate file categories
-        only_in_disk1 = files1_set - files2_set
-        only_in_disk2 = files2_set - files1_set
-        common_files = files1_set & files2_set
-
-        # Build combined data for AG Grid
-        all_files_data = []
-        
-        # Add files only in disk1
-        for filepath in sorted(only_in_disk1):
-            all_files_data.append({
-                "filename": filepath,
-                "status": "Only in VM1",
-                "in_vm1": True,
-                "in_vm2": False
-            })
-        
-        # Add files only in disk2
-        for filepath in sorted(only_in_disk2):
-            all_files_data.append({
-                "filename": filepath,
-                "status": "Only in VM2",
-                "in_vm1": False,
-                "in_vm2": True
-            })
-        
-        # Add common files
-        for filepath in sorted(common_files):
-            all_files_data.append({
-                "filename": filepath,
-                "status": "Common",
-                "in_vm1": True,
-                "in_vm2": True
-            })
-
-        # Build side-by-side diff data
-        all_files_sorted = sorted(files1_set | files2_set)
-        diff_rows = []
-        for filepath in all_files_sorted:
-            in_vm1 = filepath in files1_set
-            in_vm2 = filepath in files2_set
-            diff_rows.append({
-                "filename": filepath,
-                "in_vm1": in_vm1,
-                "in_vm2": in_vm2,
-                "status": "Common" if (in_vm1 and in_vm2) else ("Only in VM1" if in_vm1 else "Only in VM2")
-            })
+        # Front-coded listings, kept in the backend's image index until an image changes
+        files1 = vmtool.list_paths(disk1)
+        files2 = vmtool.list_paths(disk2)
+
+        # One linear merge of the two sorted listings in the backend; the rows stay
+        # there and the page fetches them a window at a time
+        file_diff = vmtool.diff_file_lists(files1, files2)
+        diff_id = uuid.uuid4().hex
+        with _FILE_LIST_DIFFS_LOCK:
+            _FILE_LIST_DIFFS[diff_id] = file_diff
+            while len(_FILE_LIST_DIFFS) > _FILE_LIST_DIFFS_MAX:
+                _FILE_LIST_DIFFS.popitem(last=False)
 
         return render_template(
             "files_diff.html",
             result={
-                "data": all_files_data,
-                "diff_rows": diff_rows,
+                "diff_id": diff_id,
+                "rows": file_diff.rows(0, _FILES_DIFF_WINDOW),
+                "total_rows": len(file_diff),
+                "window": _FILES_DIFF_WINDOW,
                 "disk1": disk1,
                 "disk2": disk2,
-                "total_files1": len(files1_set),
-                "total_files2": len(files2_set),
-                "common_files": len(common_files),
-                "only_in_disk1": len(only_in_disk1),
-                "only_in_disk2": len(only_in_disk2),
-                "cache_file1": str(cache_file1),
-                "cache_file2": str(cache_file2),
+                "total_files1": file_diff.total_first,
+                "total_files2": file_diff.total_second,
+                "common_files": file_diff.common,
+                "only_in_disk1": file_diff.only_in_first,
+                "only_in_disk2": file_diff.only_in_second,
             },
         )
     except Exception as e:  # noqa: BLE001
@@ -738,89 +781,40 @@ def directory_diff() -> str | Response:
     disk2 = request.form.get("disk_path_2", "").strip()
     dir1 = request.form.get("directory_1", "").strip()
     dir2 = request.form.get("directory_2", "").strip()
+    compare_content = request.form.get("compare_content") == "on"
 
     if not disk1 or not disk2 or not dir1 or not dir2:
         flash("All fields are required", "error")
         return redirect(url_for("directory_diff"))
 
     try:
-        # Create cache directory if it doesn't exist
-        cache_dir = Path(__file__).parent / ".cache"
-        cache_dir.mkdir(exist_ok=True)
-
-        # Generate cache keys for both directories
-        cache_key1 = hashlib.sha256(f"{disk1}:{dir1}:dir".encode()).hexdigest()
-        cache_key2 = hashlib.sha256(f"{disk2}:{dir2}:dir".encode()).hexdigest()
-        cache_file1 = cache_dir / f"dir_diff_{cache_key1}.json"
-        cache_file2 = cache_dir / f"dir_diff_{cache_key2}.json"
-
-        # Get file lists from both directories (use cache or fetch fresh)
-        # if cache_file1.exists():
-        #     with open(cache_file1, 'r') as f:
-        #         files1_dict = json.load(f)
-        # else:
-        files1_dict = vmtool.list_all_filenames_in_directory(disk1, dir1)
-        with open(cache_file1, 'w') as f:
-            json.dump(files1_dict, f, indent=2)
-
-        # if cache_file2.exists():
-        #     with open(cache_file2, 'r') as f:
-        #         files2_dict = json.load(f)
-        # else:
-        files2_dict = vmtool.list_all_filenames_in_directory(disk2, dir2)
-        with open(cache_file2, 'w') as f:
-            json.dump(files2_dict, f, indent=2)
-
-        # Extract just the file paths (values) and sort them
-        files1_set = set(files1_dict.values())
-        files2_set = set(files2_dict.values())
-        
-        # Calculate file categories
-        only_in_dir1 = files1_set - files2_set
-        only_in_dir2 = files2_set - files1_set
-        common_files = files1_set & files2_set
-
-        # Build combined data for AG Grid
+        # Both trees are walked (and hashed) in the backend; rows arrive merged by relative path
+        diff = vmtool.diff_directories(disk1, dir1, disk2, dir2, compare_content, "sha256", True)
+
+        status_labels = {
+            "removed": "Only in Dir1",
+            "added": "Only in Dir2",
+            "modified": "Modified",
+            "unchanged": "Common",
+        }
         all_files_data = []
-        
-        # Add files only in dir1
-        for filepath in sorted(only_in_dir1):
-            all_files_data.append({
-                "filename": filepath,
-                "status": "Only in Dir1",
-                "in_dir1": True,
-                "in_dir2": False
-            })
-        
-        # Add files only in dir2
-        for filepath in sorted(only_in_dir2):
-            all_files_data.append({
-                "filename": filepath,
-                "status": "Only in Dir2",
-                "in_dir1": False,
-                "in_dir2": True
-            })
-        
-        # Add common files
-        for filepath in sorted(common_files):
+        diff_rows = []
+        for row in diff["rows"]:
+            status = status_labels[row["status"]]
             all_files_data.append({
-                "filename": filepath,
-                "status": "Common",
-                "in_dir1": True,
-                "in_dir2": True
+                "filename": row["path1"] or row["path2"],
+                "status": status,
+                "changes": ", ".join(row["changes"]),
+                "in_dir1": row["path1"] is not None,
+                "in_dir2": row["path2"] is not None,
             })
-
-        # Build side-by-side diff data
-        all_files_sorted = sorted(files1_set | files2_set)
-        diff_rows = []
-        for filepath in all_files_sorted:
-            in_dir1 = filepath in files1_set
-            in_dir2 = filepath in files2_set
             diff_rows.append({
-                "filename": filepath,
-                "in_dir1": in_dir1,
-                "in_dir2": in_dir2,
-                "status": "Common" if (in_dir1 and in_dir2) else ("Only in Dir1" if in_dir1 else "Only in Dir2")
+                "filename1": row["path1"],
+                "filename2": row["path2"],
+                "in_dir1": row["path1"] is not None,
+                "in_dir2": row["path2"] is not None,
+                "modified": row["status"] == "modified",
+                "status": status,
             })
 
         return render_template(
@@ -832,13 +826,13 @@ def directory_diff() -> str | Response:
                 "disk2": disk2,
                 "dir1": dir1,
                 "dir2": dir2,
-                "total_files1": len(files1_set),
-                "total_files2": len(files2_set),
-                "common_files": len(common_files),
-                "only_in_dir1": len(only_in_dir1),
-                "only_in_dir2": len(only_in_dir2),
-                "cache_file1": str(cache_file1),
-                "cache_file2": str(cache_file2),
+                "compare_content": compare_content,
+                "total_files1": diff["total1"],
+                "total_files2": diff["total2"],
+                "common_files": diff["modified"] + diff["unchanged"],
+                "modified_files": diff["modified"],
+                "only_in_dir1": diff["removed"],
+                "only_in_dir2": diff["added"],
             },
         )
     except Exception as e:  # noqa: BLE001
@@ -988,10 +982,31 @@ def vm_vmware() -> str | Response:
         return redirect(url_for("vm_vmware"))
 
 
+# Recent block comparisons, kept so the heatmap and block list can be paged without rescanning
+_DIFF_MAPS: "OrderedDict[str, Any]" = OrderedDict()
+_DIFF_MAPS_LOCK = threading.Lock()
+_DIFF_MAPS_MAX = 8
+_HEATMAP_BUCKETS = 256
+_DIFF_PAGE_SIZE = 100
+
+
+def _get_diff_map(diff_id: str) -> Any:
+    with _DIFF_MAPS_LOCK:
+        diff_map = _DIFF_MAPS.get(diff_id)
+        if diff_map is not None:
+            _DIFF_MAPS.move_to_end(diff_id)
+        return diff_map
+
+
 @app.route("/api/compare", methods=["POST"])
 @login_required
 def api_compare() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
-    """API endpoint to compare two disk images block by block"""
+    """API endpoint to compare two disk images block by block.
+
+    Only the summary, the zoom level 0 heatmap and the first page of differing blocks
+    are returned; the rest is fetched through /api/compare/heatmap and /api/compare/blocks
+    with the returned diff_id.
+    """
     try:
         data = request.json
         disk1 = data.get("disk1")
@@ -1009,17 +1024,412 @@ def api_compare() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
         if not os.path.exists(disk2):
             return {"error": f"Disk 2 not found: {disk2}"}, 400
         
-        # Call vmtool to compare disks
-        result = vmtool.list_blocks_difference_in_disks(
+        # Call vmtool to compare disks; differing blocks stay in C++ as ranges
+        diff_map = vmtool.block_diff_map(
             disk1, disk2, block_size, start_block, end_block
         )
-        
-        return jsonify(result)
+
+        diff_id = uuid.uuid4().hex
+        with _DIFF_MAPS_LOCK:
+            _DIFF_MAPS[diff_id] = diff_map
+            while len(_DIFF_MAPS) > _DIFF_MAPS_MAX:
+                _DIFF_MAPS.popitem(last=False)
+
+        first_page = diff_map.blocks_from(diff_map.start_block, _DIFF_PAGE_SIZE)
+        total_blocks = diff_map.total_blocks
+        return {
+            "diff_id": diff_id,
+            "vm1": {"name": disk1, "number_of_blocks": total_blocks},
+            "vm2": {"name": disk2, "number_of_blocks": total_blocks},
+            "block_size": block_size,
+            "start_block": diff_map.start_block,
+            "end_block": diff_map.end_block,
+            "total_differing_blocks": len(diff_map),
+            "heatmap": diff_map.heatmap(0, 0, _HEATMAP_BUCKETS),
+            "differing_blocks": {str(i + 1): f"Block-{b}" for i, b in enumerate(first_page)},
+        }
     
     except Exception as e:  # noqa: BLE001
         return {"error": str(e)}, 500
 
 
+@app.route("/api/compare/heatmap", methods=["POST"])
+@login_required
+def api_compare_heatmap() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint returning differing-block counts per bucket for one zoom level and window.
+
+    Request JSON: {"diff_id": "...", "zoom": 0, "window": 0, "buckets": 256}
+    Zoom level z splits the compared range into 2^z windows.
+    """
+    try:
+        data = request.json or {}
+        diff_map = _get_diff_map(data.get("diff_id") or "")
+        if diff_map is None:
+            return {"error": "Comparison not found; run the comparison again"}, 404
+
+        zoom = max(0, int(data.get("zoom", 0)))
+        window = max(0, int(data.get("window", 0)))
+        buckets = max(1, min(int(data.get("buckets", _HEATMAP_BUCKETS)), 4096))
+        return diff_map.heatmap(zoom, window, buckets)
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/compare/blocks", methods=["POST"])
+@login_required
+def api_compare_blocks() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint returning one page of differing block numbers starting at from_block.
+
+    Request JSON: {"diff_id": "...", "from_block": 0, "limit": 100}
+    """
+    try:
+        data = request.json or {}
+        diff_map = _get_diff_map(data.get("diff_id") or "")
+        if diff_map is None:
+            return {"error": "Comparison not found; run the comparison again"}, 404
+
+        from_block = max(0, int(data.get("from_block", 0)))
+        limit = max(1, min(int(data.get("limit", _DIFF_PAGE_SIZE)), 1000))
+        blocks = diff_map.blocks_from(from_block, limit)
+        return {
+            "from_block": from_block,
+            "blocks": blocks,
+            # continue from here for the next page, None when exhausted
+            "next_block": blocks[-1] + 1 if len(blocks) == limit else None,
+        }
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/file-compare/rows", methods=["POST"])
+@login_required
+def api_file_compare_rows() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint returning a window of side-by-side rows of a /file-compare diff.
+
+    Request JSON: {"diff_id": "...", "start": 0, "count": 200}
+    Each row is [kind, old_no, old_segments, new_no, new_segments] with segments
+    [[text, changed], ...]; kind is eq, chg, del or add.
+    """
+    try:
+        data = request.json or {}
+        entry = _get_text_diff(data.get("diff_id") or "")
+        if entry is None:
+            return {"error": "Comparison not found; run the comparison again"}, 404
+
+        text_diff = entry[0]
+        start = max(0, int(data.get("start", 0)))
+        count = max(1, min(int(data.get("count", _FILE_DIFF_WINDOW)), 2000))
+        return {
+            "start": start,
+            "rows": text_diff.rows(start, count),
+            "total_rows": len(text_diff),
+        }
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/file-compare/<diff_id>/raw/<int:side>", methods=["GET"])
+@login_required
+def api_file_compare_raw(diff_id: str, side: int) -> tuple[Dict[str, Any], int] | Response:
+    """Stream the text of file 1 or 2 of a /file-compare diff as text/plain."""
+    entry = _get_text_diff(diff_id)
+    if entry is None:
+        return {"error": "Comparison not found; run the comparison again"}, 404
+    if side not in (1, 2):
+        return {"error": "side must be 1 or 2"}, 400
+
+    text_diff, info = entry
+    name = os.path.basename(info[f"path{side}"]) or "file"
+    return Response(
+        _text_diff_side(text_diff, "old" if side == 1 else "new"),
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename={name}"},
+    )
+
+
+@app.route("/api/file-compare/<diff_id>/export", methods=["GET"])
+@login_required
+def api_file_compare_export(diff_id: str) -> tuple[Dict[str, Any], int] | Response:
+    """Stream a /file-compare diff as JSON: the compared files plus content1 and content2."""
+    entry = _get_text_diff(diff_id)
+    if entry is None:
+        return {"error": "Comparison not found; run the comparison again"}, 404
+
+    text_diff, info = entry
+
+    def generate():
+        yield json.dumps({**info, "binary": False})[:-1]
+        for key, side in (("content1", "old"), ("content2", "new")):
+            yield f', "{key}": "'
+            for chunk in _text_diff_side(text_diff, side):
+                yield json.dumps(chunk)[1:-1]
+            yield '"'
+        yield "}"
+
+    return Response(
+        generate(),
+        mimetype="application/json",
+        headers={"Content-Disposition": f"attachment; filename=file-compare-{datetime.now():%Y-%m-%d}.json"},
+    )
+
+
+@app.route("/api/files-diff/rows", methods=["POST"])
+@login_required
+def api_files_diff_rows() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint returning a window of rows of a /files-diff comparison.
+
+    Request JSON: {"diff_id": "...", "start": 0, "count": 500, "status": ""}
+    status "" pages through all rows; "removed" (only in VM1), "added" (only in VM2)
+    or "common" through one category. Each row is [path, status].
+    """
+    try:
+        data = request.json or {}
+        file_diff = _get_file_list_diff(data.get("diff_id") or "")
+        if file_diff is None:
+            return {"error": "Comparison not found; run the comparison again"}, 404
+
+        status = data.get("status") or ""
+        if status not in ("", "removed", "added", "common"):
+            return {"error": f"Invalid status: {status}"}, 400
+
+        start = max(0, int(data.get("start", 0)))
+        count = max(1, min(int(data.get("count", _FILES_DIFF_WINDOW)), 5000))
+        totals = {
+            "": len(file_diff),
+            "removed": file_diff.only_in_first,
+            "added": file_diff.only_in_second,
+            "common": file_diff.common,
+        }
+        return {
+            "start": start,
+            "rows": file_diff.rows(start, count, status),
+            "total_rows": totals[status],
+        }
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/files-diff/<diff_id>/export", methods=["GET"])
+@login_required
+def api_files_diff_export(diff_id: str) -> tuple[Dict[str, Any], int] | Response:
+    """Stream every row of a /files-diff comparison as a JSON array of {filename, status}."""
+    file_diff = _get_file_list_diff(diff_id)
+    if file_diff is None:
+        return {"error": "Comparison not found; run the comparison again"}, 404
+
+    def generate():
+        yield "["
+        first = True
+        for start in range(0, len(file_diff), 10000):
+            for path, status in file_diff.rows(start, 10000):
+                yield ("" if first else ",") + json.dumps({"filename": path, "status": status})
+                first = False
+        yield "]"
+
+    return Response(
+        generate(),
+        mimetype="application/json",
+        headers={"Content-Disposition": f"attachment; filename=vm-files-diff-{datetime.now():%Y-%m-%d}.json"},
+    )
+
+
+@app.route("/api/files-diff/metadata", methods=["POST"])
+@login_required
+def api_files_diff_metadata() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint reporting metadata changes between two whole images.
+
+    Request JSON:
+    {
+      "disk1": "/path/to/disk1.qcow2",
+      "disk2": "/path/to/disk2.qcow2",
+      "changes": ["mode", "uid", "gid"],   # optional; default: all metadata changes
+      "include_presence": true,            # optional; rows for paths in one image only
+      "limit": 1000                        # optional; rows in this response, at most 10000
+    }
+
+    Returns counts plus the first `limit` rows of {path, status, flags, changes, old, new},
+    total_rows, truncated, and a diff_id for /api/files-diff/metadata/rows.
+    """
+    try:
+        data = request.json or {}
+        disk1 = (data.get("disk1") or "").strip()
+        disk2 = (data.get("disk2") or "").strip()
+        changes = data.get("changes") or []
+        include_presence = bool(data.get("include_presence", True))
+        limit = max(0, min(int(data.get("limit", _METADATA_DIFF_WINDOW)), 10000))
+
+        if not disk1 or not disk2:
+            return {"error": "Both disk paths are required"}, 400
+
+        for disk in (disk1, disk2):
+            if not os.path.exists(disk):
+                return {"error": f"Disk not found: {disk}"}, 400
+
+        if not isinstance(changes, list):
+            return {"error": "changes must be a list of change names"}, 400
+
+        result = vmtool.diff_files_with_metadata(disk1, disk2, changes, include_presence, limit)
+        # Further rows are paged from the diff kept here, never sent all at once
+        diff_id = uuid.uuid4().hex
+        with _METADATA_DIFFS_LOCK:
+            _METADATA_DIFFS[diff_id] = result.pop("diff")
+            while len(_METADATA_DIFFS) > _METADATA_DIFFS_MAX:
+                _METADATA_DIFFS.popitem(last=False)
+        result["diff_id"] = diff_id
+        return result
+
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/files-diff/metadata/rows", methods=["POST"])
+@login_required
+def api_files_diff_metadata_rows() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint returning a window of rows of an /api/files-diff/metadata report.
+
+    Request JSON: {"diff_id": "...", "start": 0, "count": 1000}
+    Each row is {path, status, flags, changes, old, new}.
+    """
+    try:
+        data = request.json or {}
+        metadata_diff = _get_metadata_diff(data.get("diff_id") or "")
+        if metadata_diff is None:
+            return {"error": "Comparison not found; run the comparison again"}, 404
+
+        start = max(0, int(data.get("start", 0)))
+        count = max(1, min(int(data.get("count", _METADATA_DIFF_WINDOW)), 10000))
+        return {
+            "start": start,
+            "rows": metadata_diff.rows(start, count),
+            "total_rows": len(metadata_diff),
+        }
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/check-exists", methods=["POST"])
+@login_required
+def api_check_exists() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint checking many guest paths in one appliance session.
+
+    Request JSON:
+    {
+      "disk_path": "/path/to/disk.qcow2",
+      "names": ["/etc/hosts", "/etc/ssh/sshd_config"]
+    }
+
+    Returns {"results": {name: {exists, full_path, dir, file, ..., mtime_sec, ...}}, "missing": [...]}.
+    """
+    try:
+        data = request.json or {}
+        disk_path = (data.get("disk_path") or "").strip()
+        names = data.get("names") or []
+
+        if not disk_path:
+            return {"error": "'disk_path' is required"}, 400
+
+        if not os.path.exists(disk_path):
+            return {"error": f"Disk not found: {disk_path}"}, 400
+
+        if not isinstance(names, list) or not all(isinstance(n, str) for n in names):
+            return {"error": "names must be a list of guest paths"}, 400
+
+        results = vmtool.check_files_exist_in_disk(disk_path, names)
+        missing = [name for name, info in results.items() if not info["exists"]]
+        return {"disk_path": disk_path, "results": results, "missing": missing}
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/search-paths", methods=["POST"])
+@login_required
+def api_search_paths() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint searching an image's paths through its trigram index.
+
+    Request JSON:
+    {
+      "disk_path": "/path/to/disk.qcow2",
+      "pattern": "*.pem",
+      "mode": "glob",   # optional; "substring" (default), "glob" or "regex"
+      "limit": 1000     # optional; at most this many paths, 0 for all
+    }
+
+    Returns {pattern, mode, total, checked, truncated, paths}.
+    """
+    try:
+        data = request.json or {}
+        disk_path = (data.get("disk_path") or "").strip()
+        pattern = data.get("pattern") or ""
+        mode = data.get("mode") or "substring"
+        limit = int(data.get("limit", 1000))
+
+        if not disk_path:
+            return {"error": "'disk_path' is required"}, 400
+
+        if not os.path.exists(disk_path):
+            return {"error": f"Disk not found: {disk_path}"}, 400
+
+        if not pattern:
+            return {"error": "'pattern' is required"}, 400
+
+        if limit < 0:
+            return {"error": "limit must not be negative"}, 400
+
+        return vmtool.search_paths(disk_path, pattern, mode, limit)
+
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/usage-tree", methods=["POST"])
+@login_required
+def api_usage_tree() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint for du-style directory usage, served from the image index after the first walk.
+
+    Request JSON:
+    {
+      "disk_path": "/path/to/disk.qcow2",
+      "directory": "/var",   # optional; default "/"
+      "max_depth": 1,        # optional; levels of subdirectories, default 1
+      "top_n": 50            # optional; largest subdirectories per directory, default 50
+    }
+
+    Returns {path, bytes, files, dirs, own_bytes, own_files, children, more, directories}.
+    """
+    try:
+        data = request.json or {}
+        disk_path = (data.get("disk_path") or "").strip()
+        directory = (data.get("directory") or "/").strip()
+        max_depth = int(data.get("max_depth", 1))
+        top_n = int(data.get("top_n", 50))
+
+        if not disk_path:
+            return {"error": "'disk_path' is required"}, 400
+
+        if not os.path.exists(disk_path):
+            return {"error": f"Disk not found: {disk_path}"}, 400
+
+        if max_depth < 0 or top_n < 0:
+            return {"error": "max_depth and top_n must not be negative"}, 400
+
+        return vmtool.usage_tree(disk_path, max_depth, top_n, directory)
+
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
 @app.route("/api/list-files", methods=["POST"])
 @login_required
 def api_list_files() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
@@ -1042,12 +1452,69 @@ def api_list_files() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
             return {"error": f"Disk not found: {disk_path}"}, 400
 
         entries = vmtool.list_files_with_metadata(disk_path, verbose)
-        # entries: list[ {size, perms, mtime, path} ]
+        # entries: list[ {size, perms, path, mtime_sec, mtime_nsec, atime_*, ctime_*} ]
         return {"disk_path": disk_path, "verbose": verbose, "entries": entries}
     except Exception as e:  # noqa: BLE001
         return {"error": str(e)}, 500
 
 
+def _dump_row_tokens(line: str, row: int, per_row: int, mask: memoryview) -> tuple[str, list[tuple[str, bool]]]:
+    """Split one dump row into its offset label and one (token, differs) pair per byte.
+
+    Hex rows ("OFFS: XX XX ..") already space their bytes; a bits row is one run of
+    8-digit groups and is cut into them.
+    """
+    label, _, body = line.partition(": ")
+    parts = body.split(" ") if " " in body else [body[k:k + 8] for k in range(0, len(body), 8)]
+    tokens = []
+    for j, token in enumerate(parts):
+        pos = row * per_row + j
+        tokens.append((token, pos < len(mask) and bool(mask[pos])))
+    return label, tokens
+
+
+def _block_contents_result(disk1: str, disk2: str, block_number: int, block_size: int, format_type: str) -> Dict[str, Any]:
+    """Read one block from each disk in a single backend call and lay both out side by side.
+
+    The backend returns the raw blocks together with a byte-level diff mask, so rows and
+    differing bytes are known here without diffing the formatted strings.
+    """
+    cmp = vmtool.compare_block(disk1, disk2, block_number, block_size)
+    content1 = vmtool.format_dump(cmp["data1"], format_type)
+    content2 = vmtool.format_dump(cmp["data2"], format_type)
+    mask = cmp["diff_mask"]
+    per_row = 16 if format_type == "hex" else 8
+
+    lines1 = content1.split("\n") if content1 else []
+    lines2 = content2.split("\n") if content2 else []
+    rows = []
+    for row in range(max(len(lines1), len(lines2))):
+        left = _dump_row_tokens(lines1[row], row, per_row, mask) if row < len(lines1) else None
+        right = _dump_row_tokens(lines2[row], row, per_row, mask) if row < len(lines2) else None
+        if left is None:
+            kind = "add"
+        elif right is None:
+            kind = "del"
+        elif any(mask[row * per_row:(row + 1) * per_row]):
+            kind = "chg"
+        else:
+            kind = "eq"
+        rows.append({"t": kind, "left": left, "right": right})
+
+    return {
+        "disk1": disk1,
+        "disk2": disk2,
+        "block_number": block_number,
+        "block_size": block_size,
+        "format": format_type,
+        "content1": content1,
+        "content2": content2,
+        "rows": rows,
+        "differing_bytes": cmp["differing_bytes"],
+        "differing_ranges": cmp["differing_ranges"],
+    }
+
+
 @app.route("/block-contents-compare", methods=["GET", "POST"])
 @login_required
 def block_contents_compare():
@@ -1076,42 +1543,7 @@ def block_contents_compare():
                         flash(f"Disk 2 not found: {disk2_q}", "error")
                         return render_template("block_contents_compare.html", result=None)
 
-                    data1 = vmtool.get_block_data_in_disk(disk1_q, block_number, block_size, format_type)
-                    data2 = vmtool.get_block_data_in_disk(disk2_q, block_number, block_size, format_type)
-
-                    key = str(block_number)
-                    content1 = data1.get(key, "")
-                    content2 = data2.get(key, "")
-
-                    def format_hex(s: str) -> str:
-                        bytes_list = [b for b in s.strip().split() if b]
-                        lines = []
-                        for i in range(0, len(bytes_list), 16):
-                            row = bytes_list[i:i+16]
-                            offset = format(i, '04X')
-                            lines.append(f"{offset}: {' '.join(row)}")
-                        return "\n".join(lines)
-
-                    def format_bits(s: str) -> str:
-                        lines = []
-                        for i in range(0, len(s), 64):
-                            row = s[i:i+64]
-                            offset = format((i//8), '04X')
-                            lines.append(f"{offset}: {row}")
-                        return "\n".join(lines)
-
-                    formatted1 = format_hex(content1) if format_type == "hex" else format_bits(content1)
-                    formatted2 = format_hex(content2) if format_type == "hex" else format_bits(content2)
-
-                    result = {
-                        "disk1": disk1_q,
-                        "disk2": disk2_q,
-                        "block_number": block_number,
-                        "block_size": block_size,
-                        "format": format_type,
-                        "content1": formatted1,
-                        "content2": formatted2,
-                    }
+                    result = _block_contents_result(disk1_q, disk2_q, block_number, block_size, format_type)
                     return render_template("block_contents_compare.html", result=result)
                 except Exception as _e:  # noqa: BLE001
                     # Fallback to form if parsing/processing fails
@@ -1139,45 +1571,7 @@ def block_contents_compare():
             flash(f"Disk 2 not found: {disk2}", "error")
             return render_template("block_contents_compare.html", result=None)
 
-        # Fetch data via vmtool
-        data1 = vmtool.get_block_data_in_disk(disk1, block_number, block_size, format_type)
-        data2 = vmtool.get_block_data_in_disk(disk2, block_number, block_size, format_type)
-
-        key = str(block_number)
-        content1 = data1.get(key, "")
-        content2 = data2.get(key, "")
-
-        # Helper formatters mirroring JS formatting
-        def format_hex(s: str) -> str:
-            bytes_list = [b for b in s.strip().split() if b]
-            lines = []
-            for i in range(0, len(bytes_list), 16):
-                row = bytes_list[i:i+16]
-                offset = format(i, '04X')
-                lines.append(f"{offset}: {' '.join(row)}")
-            return "\n".join(lines)
-
-        def format_bits(s: str) -> str:
-            lines = []
-            for i in range(0, len(s), 64):
-                row = s[i:i+64]
-                offset = format((i//8), '04X')
-                lines.append(f"{offset}: {row}")
-            return "\n".join(lines)
-
-        formatted1 = format_hex(content1) if format_type == "hex" else format_bits(content1)
-        formatted2 = format_hex(content2) if format_type == "hex" else format_bits(content2)
-
-        result = {
-            "disk1": disk1,
-            "disk2": disk2,
-            "block_number": block_number,
-            "block_size": block_size,
-            "format": format_type,
-            "content1": formatted1,
-            "content2": formatted2,
-        }
-
+        result = _block_contents_result(disk1, disk2, block_number, block_size, format_type)
         return render_template("block_contents_compare.html", result=result)
 
     except Exception as e:  # noqa: BLE001
@@ -1201,6 +1595,16 @@ def guide():
     """GitBook-like SPA docs served statically"""
     return send_from_directory("static/guide", "index.html")
 
+_MAX_BLOCK_SIZE = 1024 * 1024
+
+
+def _block_size_error(block_size: int) -> str | None:
+    """Reject block sizes the backend refuses: powers of two up to 1 MiB are accepted."""
+    if 0 < block_size <= _MAX_BLOCK_SIZE and block_size & (block_size - 1) == 0:
+        return None
+    return f"block_size must be a power of two no larger than {_MAX_BLOCK_SIZE}"
+
+
 @app.route("/api/block-data", methods=["POST"])
 @login_required
 def api_block_data() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
@@ -1217,7 +1621,11 @@ def api_block_data() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
         
         if not os.path.exists(disk):
             return {"error": f"Disk not found: {disk}"}, 400
-        
+
+        block_size_error = _block_size_error(block_size)
+        if block_size_error:
+            return {"error": block_size_error}, 400
+
         # Call vmtool to get block data
         result = vmtool.get_block_data_in_disk(
             disk, block_number, block_size, format_type
@@ -1229,6 +1637,229 @@ def api_block_data() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
         return {"error": str(e)}, 500
 
 
+@app.route("/api/block-compare", methods=["POST"])
+@login_required
+def api_block_compare() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint to read and compare the same block of two disks in one call.
+
+    Request JSON:
+    {
+      "disk1": "/path/to/disk1.qcow2",
+      "disk2": "/path/to/disk2.qcow2",
+      "block_number": 0,
+      "block_size": 4096,
+      "format": "hex"
+    }
+
+    Returns both formatted blocks plus the differing byte ranges within the block.
+    """
+    try:
+        data = request.json or {}
+        disk1 = (data.get("disk1") or "").strip()
+        disk2 = (data.get("disk2") or "").strip()
+        block_number = int(data.get("block_number", 0))
+        block_size = int(data.get("block_size", 4096))
+        format_type = data.get("format", "hex")
+
+        if not disk1 or not disk2:
+            return {"error": "Both disk paths are required"}, 400
+
+        for disk in (disk1, disk2):
+            if not os.path.exists(disk):
+                return {"error": f"Disk not found: {disk}"}, 400
+
+        if format_type not in ("hex", "bits"):
+            return {"error": f"Invalid format: {format_type}. Use 'hex' or 'bits'"}, 400
+
+        block_size_error = _block_size_error(block_size)
+        if block_size_error:
+            return {"error": block_size_error}, 400
+
+        cmp = vmtool.compare_block(disk1, disk2, block_number, block_size)
+        return {
+            "block_number": block_number,
+            "block_size": block_size,
+            "format": format_type,
+            "data1": vmtool.format_dump(cmp["data1"], format_type),
+            "data2": vmtool.format_dump(cmp["data2"], format_type),
+            "differing_bytes": cmp["differing_bytes"],
+            "differing_ranges": [list(r) for r in cmp["differing_ranges"]],
+        }
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/block-range", methods=["POST"])
+@login_required
+def api_block_range() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint to read a window of consecutive blocks in one call.
+
+    Request JSON:
+    {
+      "disk": "/path/to/disk.qcow2",
+      "start_block": 0,
+      "count": 16,
+      "block_size": 4096,
+      "format": "hex"
+    }
+
+    Returns one offset dump (with ASCII gutter) per block, keyed by block number,
+    so the viewer can page through neighbouring blocks without another request.
+    """
+    try:
+        data = request.json or {}
+        disk = (data.get("disk") or "").strip()
+        start_block = int(data.get("start_block", 0))
+        count = max(1, min(int(data.get("count", 16)), 256))
+        block_size = int(data.get("block_size", 4096))
+        format_type = data.get("format", "hex")
+
+        if not disk:
+            return {"error": "Disk path is required"}, 400
+
+        if not os.path.exists(disk):
+            return {"error": f"Disk not found: {disk}"}, 400
+
+        if format_type not in ("hex", "bits"):
+            return {"error": f"Invalid format: {format_type}. Use 'hex' or 'bits'"}, 400
+
+        block_size_error = _block_size_error(block_size)
+        if block_size_error:
+            return {"error": block_size_error}, 400
+
+        view = vmtool.read_blocks(disk, start_block, count, block_size)
+        blocks = {}
+        for i in range(0, len(view), block_size):
+            # memoryview slices share the backend buffer; only the dump text is created
+            blocks[str(start_block + i // block_size)] = vmtool.format_dump(view[i:i + block_size], format_type, 0, True)
+
+        return {
+            "disk": disk,
+            "start_block": start_block,
+            "count": len(blocks),
+            "block_size": block_size,
+            "format": format_type,
+            "blocks": blocks,
+        }
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/hexdump", methods=["POST"])
+@login_required
+def api_hexdump() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint returning one window of the hex viewer.
+
+    Request JSON:
+    {
+      "disk": "/path/to/disk.qcow2",
+      "path": "/etc/hosts",     # optional; the raw disk is dumped without it
+      "offset": 0,
+      "length": 16384,
+      "format": "hex"
+    }
+
+    Returns rows of [offset, data, ascii] plus next_offset/prev_offset for paging.
+    """
+    try:
+        data = request.json or {}
+        disk = (data.get("disk") or "").strip()
+        path = (data.get("path") or "").strip()
+        offset = max(0, int(data.get("offset", 0)))
+        length = max(1, min(int(data.get("length", _HEXDUMP_WINDOW)), 1024 * 1024))
+        format_type = data.get("format", "hex")
+
+        if not disk:
+            return {"error": "Disk path is required"}, 400
+
+        if not os.path.exists(disk):
+            return {"error": f"Disk not found: {disk}"}, 400
+
+        if format_type not in ("hex", "bits"):
+            return {"error": f"Invalid format: {format_type}. Use 'hex' or 'bits'"}, 400
+
+        if path:
+            return vmtool.hexdump_file_in_disk(disk, path, offset, length, format_type)
+        return vmtool.hexdump_disk(disk, offset, length, format_type)
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/block-stats", methods=["POST"])
+@login_required
+def api_block_stats() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint classifying the blocks of a disk range as zero, low- or high-entropy.
+
+    Request JSON:
+    {
+      "disk": "/path/to/disk.qcow2",
+      "block_size": 4096,
+      "start_block": 0,
+      "end_block": -1,
+      "buckets": 256
+    }
+
+    Returns the per-class counts and a per-bucket profile (mean entropy in bits per
+    byte, fraction of zero blocks) for an overview strip.
+    """
+    try:
+        data = request.json or {}
+        disk = (data.get("disk") or "").strip()
+        block_size = int(data.get("block_size", 4096))
+        start_block = int(data.get("start_block", 0))
+        end_block = int(data.get("end_block", -1))
+        buckets = max(1, min(int(data.get("buckets", 256)), 4096))
+
+        if not disk:
+            return {"error": "Disk path is required"}, 400
+
+        if not os.path.exists(disk):
+            return {"error": f"Disk not found: {disk}"}, 400
+
+        block_size_error = _block_size_error(block_size)
+        if block_size_error:
+            return {"error": block_size_error}, 400
+
+        stats = vmtool.block_stats(disk, block_size, start_block, end_block)
+        return {
+            "disk": disk,
+            "block_size": block_size,
+            "start_block": stats.start_block,
+            "blocks": stats.blocks,
+            "zero_blocks": stats.zero_blocks,
+            # below 2 bits/byte: sparse or repetitive data; 7.5 and up: compressed or encrypted
+            "low_entropy_blocks": stats.count_below(2.0),
+            "high_entropy_blocks": stats.count_at_least(7.5),
+            "profile": stats.profile(buckets),
+        }
+
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/block-cache", methods=["GET"])
+@login_required
+def api_block_cache() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint exposing the backend block cache counters (hits, misses, bytes, ...)."""
+    try:
+        return vmtool.block_cache.stats()
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/file-cache", methods=["GET"])
+@login_required
+def api_file_cache() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
+    """API endpoint exposing the backend guest file cache counters (hits, misses, blobs, bytes, ...)."""
+    try:
+        return vmtool.file_cache.stats()
+    except Exception as e:  # noqa: BLE001
+        return {"error": str(e)}, 500
+
+
 @app.route("/api/convert", methods=["POST"])
 @login_required
 def api_convert() -> tuple[Dict[str, Any], int] | Dict[str, Any]:
@@ -0,0 +1,75 @@
+# file: vmtool_check_files_exist_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_check_files_exist_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Check many paths at once in a VM disk image (one session, batched per directory)
+
+import argparse
+import json
+import sys
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_check_files_exist_in_disk",
+        description="Check many paths at once in a VM disk image (one session, batched per directory)",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--names", nargs="*", default=[], help="Guest paths to check")
+    parser.add_argument("--list", help="File with one guest path per line ('-' for stdin)")
+    parser.add_argument("--missing", action="store_true", help="Print only the paths that do not exist")
+    parser.add_argument("--json", help="Path to write every result as JSON")
+    return parser
+
+def main() -> int:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    names = list(args.names)
+    if args.list:
+        source = sys.stdin if args.list == "-" else open(args.list)
+        with source:
+            names.extend(line.strip() for line in source if line.strip())
+    if not names:
+        parser.error("give paths with --names or --list")
+
+    results = vmtool.check_files_exist_in_disk(args.disk, names)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"JSON saved to: {args.json}")
+
+    missing = 0
+    for name, info in results.items():
+        if not info["exists"]:
+            missing += 1
+            print(f"missing  {name}")
+        elif not args.missing:
+            kind = "dir" if info["dir"] else "file" if info["file"] else "other"
+            print(f"{kind:<7}  {name}  size={info['size']} perms={info['permissions']}")
+    print(f"{len(results) - missing} of {len(results)} paths exist")
+    return 1 if missing else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
+
+# USAGE
+"""
+sudo python3 vmtool_check_files_exist_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    [--names /etc/hosts /etc/passwd ...] \
+    [--list /full/path/to/paths.txt] \
+    [--missing] \
+    [--json /full/path/to/results.json]
+"""
+
+# example input
+"""
+sudo python3 vmtool_check_files_exist_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm1.qcow2 \
+    --list $PWD/compliance_paths.txt \
+    --missing
+"""
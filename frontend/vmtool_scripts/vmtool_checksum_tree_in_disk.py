@@ -0,0 +1,61 @@
+# file: vmtool_checksum_tree_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_checksum_tree_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Checksum every file under a directory of a VM disk image in one appliance call
+
+import argparse
+import json
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_checksum_tree_in_disk",
+        description="Checksum every file under a directory of a VM disk image in one appliance call",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--directory", default="/", help="Guest directory to checksum (default: /)")
+    parser.add_argument("--algorithm", default="sha256",
+                        choices=["crc", "md5", "sha1", "sha224", "sha256", "sha384", "sha512"],
+                        help="Checksum algorithm (default: sha256)")
+    parser.add_argument("--out", help="Write {path: checksum} as JSON to this file instead of printing (optional)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    # Computed inside the appliance; repeated runs on an unchanged image come from the index
+    sums = vmtool.checksum_tree(args.disk, args.directory, args.algorithm)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(sums, f, indent=2)
+        print(f"Saved {len(sums)} checksums to: {args.out}")
+        return
+
+    # Same layout as sha256sum and friends
+    for path, checksum in sums.items():
+        print(f"{checksum}  {path}")
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_checksum_tree_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    --directory /etc \
+    --algorithm sha256
+"""
+
+# example input
+"""
+sudo python3 vmtool_checksum_tree_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm3.qcow2 \
+    --directory /usr/bin \
+    --algorithm md5 \
+    --out usr_bin_md5.json
+"""
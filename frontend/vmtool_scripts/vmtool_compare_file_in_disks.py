@@ -0,0 +1,136 @@
+# file: vmtool_compare_file_in_disks.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_compare_file_in_disks.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Compare a file in one VM disk image with a file in another and print a unified diff
+
+import argparse
+import json
+import sys
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_compare_file_in_disks",
+        description="Compare a file in one VM disk image with a file in another and print a unified diff",
+    )
+    parser.add_argument("--disk1", required=True, help="Path to first qcow2/raw disk image (required)")
+    parser.add_argument("--path1", required=True, help="Guest file path in disk 1 (required)")
+    parser.add_argument("--disk2", required=True, help="Path to second qcow2/raw disk image (required)")
+    parser.add_argument("--path2", help="Guest file path in disk 2 (defaults to --path1)")
+    parser.add_argument("--max-bytes", type=int, default=-1, help="Bytes to read per file (-1 means all)")
+    parser.add_argument("--context", type=int, default=3, help="Unchanged lines around each change (default 3)")
+    parser.add_argument("--algorithm", choices=["histogram", "myers"], default="histogram",
+                        help="Line diff algorithm (default histogram)")
+    parser.add_argument("--binary", action="store_true",
+                        help="Byte-level compare streamed with constant memory; prints differing byte ranges")
+    parser.add_argument("--shift", action="store_true",
+                        help="With --binary, detect inserted/removed bytes and print edits instead")
+    parser.add_argument("--json", help="Save the hunks and file info as JSON (optional)")
+    return parser
+
+def binary_main(args: argparse.Namespace, path2: str) -> None:
+    r = vmtool.diff_binary_file_in_disks(args.disk1, args.path1, args.disk2, path2,
+                                         "shift" if args.shift else "aligned")
+    for key, disk in (("file1", args.disk1), ("file2", args.disk2)):
+        if not r[key]["exists"]:
+            print(f"{disk}:{r[key]['path']}: does not exist")
+
+    if r["identical"]:
+        print(f"Files are identical (sha256 {r['file1']['sha256']})")
+    elif r["method"] == "content":
+        what = "edit(s)" if args.shift else "range(s)"
+        print(f"{r['differing_bytes']} byte(s) differ in {r['range_count']} {what}")
+        if args.shift:
+            for kind, a0, a1, b0, b1 in r["edits"][:50]:
+                print(f"  {kind:<8} old {a0}-{a1} new {b0}-{b1}")
+        else:
+            for start, end in r["ranges"][:50]:
+                print(f"  {start}-{end} ({end - start} bytes)")
+        if r["range_count"] > 50:
+            print(f"  ... {r['range_count'] - 50} more")
+
+    if args.json:
+        out = {k: v for k, v in r.items() if k != "previews"}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+        print(f"Saved JSON to {args.json}")
+
+    if not r["identical"]:
+        sys.exit(1)
+
+def main() -> None:
+    args = build_parser().parse_args()
+    path2 = args.path2 or args.path1
+
+    if args.binary:
+        binary_main(args, path2)
+        return
+
+    r = vmtool.compare_file_in_disks(args.disk1, args.path1, args.disk2, path2,
+                                     args.max_bytes, args.context, algorithm=args.algorithm)
+
+    for key, disk in (("file1", args.disk1), ("file2", args.disk2)):
+        info = r[key]
+        if not info["exists"]:
+            print(f"{disk}:{info['path']}: does not exist")
+        elif info["type"] != "file":
+            print(f"{disk}:{info['path']}: is a {info['type']}, not a regular file")
+
+    if r["identical"]:
+        print(f"Files are identical (sha256 {r['file1']['sha256']})")
+    elif r["binary"]:
+        ranges = r["differing_ranges"]
+        print(f"Binary files differ in {len(ranges)} byte range(s)")
+        for start, end in ranges[:20]:
+            print(f"  {start}-{end} ({end - start} bytes)")
+    elif r["method"] == "content":
+        print(f"--- {args.disk1}:{r['file1']['path']}")
+        print(f"+++ {args.disk2}:{r['file2']['path']}")
+        for h in r["hunks"]:
+            print(f"@@ -{h['old_start']},{h['old_lines']} +{h['new_start']},{h['new_lines']} @@")
+            for tag, text in h["lines"]:
+                print(f"{tag}{text}")
+    if r["truncated"]:
+        print(f"(compared the first {args.max_bytes} bytes only)")
+
+    if args.json:
+        out = {k: v for k, v in r.items() if k not in ("data1", "data2", "diff")}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(out, f, indent=2)
+        print(f"Saved JSON to {args.json}")
+
+    if not r["identical"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_compare_file_in_disks.py \
+    --disk1 /full/path/to/disk1.qcow2 \
+    --path1 /etc/ssh/sshd_config \
+    --disk2 /full/path/to/disk2.qcow2
+"""
+
+# example input
+"""
+sudo python3 vmtool_compare_file_in_disks.py \
+    --disk1 /home/akashmaji/Desktop/vm1.qcow2 \
+    --path1 /etc/passwd \
+    --disk2 /home/akashmaji/Desktop/vm3.qcow2 \
+    --context 1 \
+    --json passwd_diff.json
+"""
+
+# example input (binary, insertion-aware)
+"""
+sudo python3 vmtool_compare_file_in_disks.py \
+    --disk1 /home/akashmaji/Desktop/vm1.qcow2 \
+    --path1 /usr/bin/bash \
+    --disk2 /home/akashmaji/Desktop/vm3.qcow2 \
+    --binary --shift
+"""
@@ -0,0 +1,72 @@
+# file: vmtool_diff_directories_in_disks.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_diff_directories_in_disks.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Report added, removed and modified files between directories of two VM disk images
+
+import argparse
+import json
+import sys
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_diff_directories_in_disks",
+        description="Report added, removed and modified files between directories of two VM disk images",
+    )
+    parser.add_argument("--disk1", required=True, help="Path to the first qcow2/raw disk image (required)")
+    parser.add_argument("--dir1", required=True, help="Directory in the first image (required)")
+    parser.add_argument("--disk2", required=True, help="Path to the second qcow2/raw disk image (required)")
+    parser.add_argument("--dir2", required=True, help="Directory in the second image (required)")
+    parser.add_argument("--no-content", action="store_true", help="Compare metadata only, without checksums")
+    parser.add_argument("--algorithm", default="sha256",
+                        choices=["crc", "md5", "sha1", "sha224", "sha256", "sha384", "sha512"],
+                        help="Checksum algorithm for content comparison (default: sha256)")
+    parser.add_argument("--json", help="Write the full report as JSON to this file (optional)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    diff = vmtool.diff_directories(args.disk1, args.dir1, args.disk2, args.dir2,
+                                   not args.no_content, args.algorithm)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(diff, f, indent=2)
+        print(f"Saved report to: {args.json}")
+
+    marks = {"removed": "-", "added": "+", "modified": "M"}
+    for row in diff["rows"]:
+        changes = f"  ({', '.join(row['changes'])})" if row["changes"] else ""
+        print(f"{marks[row['status']]} {row['path']}{changes}")
+    print(f"\n{diff['added']} added, {diff['removed']} removed, "
+          f"{diff['modified']} modified, {diff['unchanged']} unchanged")
+
+    # Exit status 1 when the directories differ, like diff(1)
+    sys.exit(1 if diff["added"] or diff["removed"] or diff["modified"] else 0)
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_diff_directories_in_disks.py \
+    --disk1 /full/path/to/disk1.qcow2 \
+    --dir1 /etc \
+    --disk2 /full/path/to/disk2.qcow2 \
+    --dir2 /etc
+"""
+
+# example input
+"""
+sudo python3 vmtool_diff_directories_in_disks.py \
+    --disk1 /home/akashmaji/Desktop/vm1.qcow2 \
+    --dir1 /home/akashmaji \
+    --disk2 /home/akashmaji/Desktop/vm3.qcow2 \
+    --dir2 /home/akashmaji \
+    --json home_diff.json
+"""
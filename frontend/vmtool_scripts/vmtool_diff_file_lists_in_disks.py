@@ -0,0 +1,57 @@
+# file: vmtool_diff_file_lists_in_disks.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_diff_file_lists_in_disks.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: List paths present in only one of two VM disk images, or in both
+
+import argparse
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_diff_file_lists_in_disks",
+        description="List paths present in only one of two VM disk images, or in both",
+    )
+    parser.add_argument("--disk1", required=True, help="Path to the first qcow2/raw disk image (required)")
+    parser.add_argument("--disk2", required=True, help="Path to the second qcow2/raw disk image (required)")
+    parser.add_argument("--status", default="", choices=["", "removed", "added", "common"],
+                        help="Only print rows with this status: removed (only in disk1), "
+                             "added (only in disk2) or common (default: all)")
+    parser.add_argument("--limit", type=int, default=100, help="Maximum rows to print (default: 100)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    files1 = vmtool.list_all_filenames_in_disk(args.disk1)
+    files2 = vmtool.list_all_filenames_in_disk(args.disk2)
+    diff = vmtool.diff_file_lists(files1, files2)
+
+    marks = {"removed": "-", "added": "+", "common": " "}
+    for path, status in diff.rows(0, args.limit, args.status):
+        print(f"{marks[status]} {path}")
+    print(f"\n{diff.total_first} files in disk1, {diff.total_second} files in disk2: "
+          f"{diff.only_in_first} only in disk1, {diff.only_in_second} only in disk2, "
+          f"{diff.common} common")
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_diff_file_lists_in_disks.py \
+    --disk1 /full/path/to/disk1.qcow2 \
+    --disk2 /full/path/to/disk2.qcow2
+"""
+
+# example input
+"""
+sudo python3 vmtool_diff_file_lists_in_disks.py \
+    --disk1 /home/akashmaji/Desktop/vm1.qcow2 \
+    --disk2 /home/akashmaji/Desktop/vm3.qcow2 \
+    --status added \
+    --limit 50
+"""
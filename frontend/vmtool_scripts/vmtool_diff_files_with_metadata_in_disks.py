@@ -0,0 +1,84 @@
+# file: vmtool_diff_files_with_metadata_in_disks.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_diff_files_with_metadata_in_disks.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Report size, permission, owner, mtime, type and symlink target changes between two VM disk images
+
+import argparse
+import json
+import sys
+import vmtool
+
+CHANGES = ["type", "size", "mode", "uid", "gid", "mtime", "target"]
+PAGE = 10000
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_diff_files_with_metadata_in_disks",
+        description="Report size, permission, owner, mtime, type and symlink target changes between two VM disk images",
+    )
+    parser.add_argument("--disk1", required=True, help="Path to the first qcow2/raw disk image (required)")
+    parser.add_argument("--disk2", required=True, help="Path to the second qcow2/raw disk image (required)")
+    parser.add_argument("--changes", nargs="+", choices=CHANGES,
+                        help="Only report these kinds of change (default: all)")
+    parser.add_argument("--modified-only", action="store_true",
+                        help="Leave out paths present in only one image")
+    parser.add_argument("--json", help="Write the full report as JSON to this file (optional)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    # Rows stay in the backend and are fetched a page at a time
+    diff = vmtool.diff_files_with_metadata(args.disk1, args.disk2, args.changes or [],
+                                           not args.modified_only, limit=0)
+    rows = diff.pop("diff")
+
+    def pages():
+        for start in range(0, len(rows), PAGE):
+            yield rows.rows(start, PAGE)
+
+    if args.json:
+        summary = {k: v for k, v in diff.items() if k not in ("rows", "truncated")}
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(json.dumps(summary, indent=2)[:-2] + ',\n  "rows": [')
+            first = True
+            for page in pages():
+                for row in page:
+                    f.write(("" if first else ",") + "\n    " + json.dumps(row))
+                    first = False
+            f.write("\n  ]\n}\n")
+        print(f"Saved report to: {args.json}")
+
+    marks = {"removed": "-", "added": "+", "modified": "M"}
+    for page in pages():
+        for row in page:
+            changes = f"  ({', '.join(row['changes'])})" if row["changes"] else ""
+            print(f"{marks[row['status']]} {row['path']}{changes}")
+    print(f"\n{diff['added']} added, {diff['removed']} removed, "
+          f"{diff['modified']} modified, {diff['unchanged']} unchanged")
+
+    # Exit status 1 when a reported change was found, like diff(1)
+    sys.exit(1 if len(rows) else 0)
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_diff_files_with_metadata_in_disks.py \
+    --disk1 /full/path/to/disk1.qcow2 \
+    --disk2 /full/path/to/disk2.qcow2
+"""
+
+# example input
+"""
+sudo python3 vmtool_diff_files_with_metadata_in_disks.py \
+    --disk1 /home/akashmaji/Desktop/vm1.qcow2 \
+    --disk2 /home/akashmaji/Desktop/vm3.qcow2 \
+    --changes mode uid gid \
+    --modified-only
+"""
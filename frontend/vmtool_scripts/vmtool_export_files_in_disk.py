@@ -0,0 +1,61 @@
+# file: vmtool_export_files_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_export_files_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Export the file listing of a VM disk image as TSV, CSV, NDJSON or a table, optionally compressed
+
+import argparse
+import sys
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_export_files_in_disk",
+        description="Export the file listing of a VM disk image as TSV, CSV, NDJSON or a table, optionally compressed",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--out", required=True, help="Output file, or - for standard output (required)")
+    parser.add_argument("--format", default="tsv", choices=["tsv", "csv", "ndjson", "table"],
+                        help="Row format (default: tsv)")
+    parser.add_argument("--compression", default="auto", choices=["auto", "none", "gzip", "zstd"],
+                        help="Compression; auto picks it from a .gz/.zst output name (default: auto)")
+    parser.add_argument("--directory", default="/", help="Only export this guest directory (default: /)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    # Rows are written by the backend as the tree is walked; "-" hands it stdout's descriptor
+    output = sys.stdout.fileno() if args.out == "-" else args.out
+    if args.out == "-":
+        sys.stdout.flush()
+    result = vmtool.export_files_with_metadata(args.disk, output, args.format,
+                                               args.compression, args.directory)
+
+    print(f"Exported {result['rows']} entries ({result['bytes_uncompressed']} bytes, "
+          f"{result['bytes_written']} written, compression: {result['compression']})",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_export_files_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    --out /full/path/to/files.tsv.gz \
+    [--format tsv|csv|ndjson|table] \
+    [--compression auto|none|gzip|zstd] \
+    [--directory /etc]
+"""
+
+# example input
+"""
+sudo python3 vmtool_export_files_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm1.qcow2 \
+    --out $PWD/vm1_files.ndjson.zst \
+    --format ndjson
+"""
@@ -37,9 +37,34 @@ def print_meta_data(meta):
 
     print("===========================================================")
 
+    for line in capacity_lines(meta):
+        print(line)
+
 # print_meta_data(meta)
 
 
+def capacity_lines(meta):
+    """File types, size histogram, top-level directories and largest files as text lines."""
+    lines = ["File types:"]
+    for name, count in meta["file_types"].items():
+        if count:
+            lines.append(f"  {name}: {count}")
+    lines.append("===========================================================")
+    lines.append("\nFile sizes (log2 buckets):")
+    for row in meta["size_histogram"]:
+        lines.append(f"  {row['min']}-{row['max']}: files={row['files']} bytes={row['bytes']}")
+    lines.append("===========================================================")
+    lines.append("\nTop-level directories:")
+    for row in meta["per_top_dir"]:
+        lines.append(f"  {row['path']}: files={row['files']} dirs={row['dirs']} bytes={row['bytes']}")
+    lines.append("===========================================================")
+    lines.append("\nLargest files:")
+    for row in meta["largest_files"]:
+        lines.append(f"  {row['size']}  {row['path']}")
+    lines.append("===========================================================")
+    return lines
+
+
 def write_meta_data(meta, filename):
     with open(filename, "w") as f:
         f.write("===========================================================")
@@ -71,6 +96,10 @@ def write_meta_data(meta, filename):
             f.write(f"  {row['group']} (gid={row['gid']}): files={row['files']} dirs={row['dirs']} bytes={row['bytes']}")
             f.write("\n")
         f.write("===========================================================")
+        f.write("\n")
+        for line in capacity_lines(meta):
+            f.write(line)
+            f.write("\n")
 
 
 def save_meta_data(meta, filename):
@@ -86,6 +115,7 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
     parser.add_argument("--json", help="Path to write JSON metadata output")
     parser.add_argument("--out", help="Path to write human-readable TEXT output")
+    parser.add_argument("--top-n", type=int, default=20, help="Number of largest files to report (default: 20)")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose vmtool logs")
     return parser
 
@@ -103,7 +133,7 @@ def main(argv: list[str] | None = None) -> int:
         return 2
 
     # Fetch meta from backend
-    meta = vmtool.get_disk_meta_data(args.disk, args.verbose)
+    meta = vmtool.get_disk_meta_data(args.disk, args.verbose, args.top_n)
 
     wrote_any = False
     if args.json:
@@ -132,6 +162,7 @@ sudo python3 vmtool_get_disk_meta_data.py \
     --disk /full/path/to/disk.qcow2 \
     [--json /full/path/to/output.json] \
     [--out /full/path/to/output.txt] \
+    [--top-n 20] \
     [--verbose]
 """
 
@@ -11,6 +11,7 @@ def build_parser() -> argparse.ArgumentParser:
     parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
     parser.add_argument("--name", required=True, help="Path to file inside the guest (e.g., /etc/hosts)")
     parser.add_argument("--binary", action="store_true", help="Return bytes instead of text")
+    parser.add_argument("--offset", type=int, default=0, help="Byte offset to start reading at (default: 0)")
     parser.add_argument("--read", type=int, default=-1, help="Bytes to read (-1 means all)")
     parser.add_argument("--stop", default="", help="Stop at first occurrence of this delimiter (not included)")
     parser.add_argument("--out", help="Optional output file path; writes bytes if --binary else text")
@@ -24,7 +25,7 @@ def main(argv: list[str] | None = None) -> int:
 
     try:
         data = vmtool.get_file_contents_in_disk(
-            args.disk, args.name, binary=args.binary, read=args.read, stop=args.stop
+            args.disk, args.name, binary=args.binary, read=args.read, stop=args.stop, offset=args.offset
         )
         if args.out:
             if args.binary:
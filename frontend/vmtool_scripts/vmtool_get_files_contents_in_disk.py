@@ -0,0 +1,74 @@
+# file: vmtool_get_files_contents_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_get_files_contents_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Fetch many files from inside a VM disk image in one appliance session
+
+import argparse
+import os
+import sys
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_get_files_contents_in_disk",
+        description="Fetch many files from inside a VM disk image in one appliance session",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--paths", nargs="*", default=[], help="Guest file paths (e.g., /etc/hosts /etc/passwd)")
+    parser.add_argument("--paths-file", help="Text file with one guest path per line (optional)")
+    parser.add_argument("--max-bytes", type=int, default=-1, help="Bytes to read per file (-1 means all)")
+    parser.add_argument("--out-dir", help="Save each file under this directory, keeping its guest path (optional)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    paths = list(args.paths)
+    if args.paths_file:
+        with open(args.paths_file, "r", encoding="utf-8") as f:
+            paths.extend(line.strip() for line in f if line.strip())
+    if not paths:
+        parser.error("give at least one path with --paths or --paths-file")
+
+    results = vmtool.get_files_contents_in_disk(args.disk, paths, args.max_bytes)
+
+    failed = 0
+    for path, value in results.items():
+        if isinstance(value, dict):
+            failed += 1
+            print(f"{path}: ERROR {value['error']}")
+            continue
+        print(f"{path}: {len(value)} bytes")
+        if args.out_dir:
+            target = os.path.join(args.out_dir, path.lstrip("/"))
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(value)
+
+    print(f"\nRead {len(results) - failed} of {len(results)} files")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_get_files_contents_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    --paths /etc/hosts /etc/passwd /etc/fstab \
+    --out-dir collected
+"""
+
+# example input
+"""
+sudo python3 vmtool_get_files_contents_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm3.qcow2 \
+    --paths-file audit_paths.txt \
+    --max-bytes 65536 \
+    --out-dir audit
+"""
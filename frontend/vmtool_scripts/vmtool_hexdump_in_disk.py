@@ -0,0 +1,63 @@
+# file: vmtool_hexdump_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_hexdump_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Page through a guest file or the raw disk as hex viewer rows, one window at a time
+
+import argparse
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_hexdump_in_disk",
+        description="Page through a guest file or the raw disk as hex viewer rows, one window at a time",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--path", help="Guest file to dump; the raw disk is dumped when omitted (optional)")
+    parser.add_argument("--offset", type=int, default=0, help="Byte offset of the first window (default: 0)")
+    parser.add_argument("--length", type=int, default=4096, help="Bytes per window, at most 1 MiB (default: 4096)")
+    parser.add_argument("--windows", type=int, default=1, help="Number of consecutive windows to print (default: 1)")
+    parser.add_argument("--format", choices=["hex", "bits"], default="hex", help="Dump format: hex or bits (default: hex)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    width = 47 if args.format == "hex" else 64
+    offset = args.offset
+    for _ in range(args.windows):
+        # Only the requested window is read and formatted
+        if args.path:
+            page = vmtool.hexdump_file_in_disk(args.disk, args.path, offset, args.length, args.format)
+        else:
+            page = vmtool.hexdump_disk(args.disk, offset, args.length, args.format)
+        for row_offset, data, ascii in page["rows"]:
+            print(f"{row_offset:08X}: {data:<{width}}  |{ascii}|")
+        if page["next_offset"] is None:
+            break
+        offset = page["next_offset"]
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_hexdump_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    --path /etc/hosts \
+    --offset 0 \
+    --length 4096 \
+    --format hex
+"""
+
+# example input
+"""
+sudo python3 vmtool_hexdump_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm3.qcow2 \
+    --offset 1048576 \
+    --length 512 \
+    --windows 2
+"""
@@ -12,10 +12,10 @@ import vmtool
 def print_entries(entries):
     print(f"{'Size':>10} {'Permission':>10} {'Last Modified':>20} {'Name':>20}")
     print("=" * 60)
-    for e in entries:
+    mtimes = vmtool.format_times([e["mtime_sec"] for e in entries])
+    for e, mtime in zip(entries, mtimes):
         size = e["size"]
         perms = e["perms"]
-        mtime = e["mtime"]
         path = e["path"]
         print(f"{str(size):>10} {perms:>10} {mtime:>20} {path}")
 
@@ -0,0 +1,63 @@
+# file: vmtool_list_paths_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_list_paths_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: List the paths of a VM disk image from its front-coded, indexed listing
+
+import argparse
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_list_paths_in_disk",
+        description="List the paths of a VM disk image from its front-coded, indexed listing",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--prefix", help="Only paths starting with this string")
+    group.add_argument("--subtree", help="Only paths below this guest directory")
+    parser.add_argument("--stats", action="store_true", help="Print path count and memory use only")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    paths = vmtool.list_paths(args.disk)
+
+    if args.stats:
+        ratio = paths.raw_bytes / paths.memory_bytes if paths.memory_bytes else 0
+        print(f"{len(paths)} paths, {paths.raw_bytes} bytes of path text "
+              f"stored in {paths.memory_bytes} bytes ({ratio:.1f}x)")
+        return
+
+    if args.prefix is not None:
+        first, last = paths.prefix_range(args.prefix)
+    elif args.subtree is not None:
+        first, last = paths.subtree_range(args.subtree)
+    else:
+        first, last = 0, len(paths)
+
+    for start in range(first, last, 10000):
+        for path in paths.slice(start, min(10000, last - start)):
+            print(path)
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_list_paths_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    [--prefix /usr/share/locale | --subtree /etc] \
+    [--stats]
+"""
+
+# example input
+"""
+sudo python3 vmtool_list_paths_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm1.qcow2 \
+    --subtree /etc/ssh
+"""
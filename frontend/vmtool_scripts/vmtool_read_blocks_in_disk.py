@@ -0,0 +1,65 @@
+# file: vmtool_read_blocks_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_read_blocks_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Read a range of consecutive blocks from a VM disk image as raw bytes or a dump
+
+import argparse
+import sys
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_read_blocks_in_disk",
+        description="Read a range of consecutive blocks from a VM disk image as raw bytes or a dump",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--start", type=int, required=True, help="First block number to read (required)")
+    parser.add_argument("--count", type=int, default=1, help="Number of blocks to read (default: 1)")
+    parser.add_argument("--block-size", type=int, default=4096, help="Block size in bytes (default: 4096)")
+    parser.add_argument("--format", choices=["hex", "bits"], default="hex", help="Dump format: hex or bits (default: hex)")
+    parser.add_argument("--out", help="Write the raw bytes to this file instead of printing a dump (optional)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    # One appliance launch for the whole range; the result is a zero-copy memoryview
+    view = vmtool.read_blocks(args.disk, args.start, args.count, args.block_size)
+
+    if args.out:
+        with open(args.out, "wb") as f:
+            f.write(view)
+        print(f"Saved {len(view)} bytes to: {args.out}")
+        return
+
+    for i in range(0, len(view), args.block_size):
+        block_num = args.start + i // args.block_size
+        print(f"\nBlock {block_num}:")
+        sys.stdout.write(vmtool.format_dump(view[i:i + args.block_size], args.format, 0, True))
+        sys.stdout.write("\n")
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_read_blocks_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    --start 12 \
+    --count 4 \
+    --block-size 4096 \
+    --format hex
+"""
+
+# example input
+"""
+sudo python3 vmtool_read_blocks_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm3.qcow2 \
+    --start 0 \
+    --count 256 \
+    --out first_mb.bin
+"""
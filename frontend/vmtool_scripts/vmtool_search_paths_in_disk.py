@@ -0,0 +1,61 @@
+# file: vmtool_search_paths_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_search_paths_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Search the paths of a VM disk image by substring, glob or regex using its trigram index
+
+import argparse
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_search_paths_in_disk",
+        description="Search the paths of a VM disk image by substring, glob or regex using its trigram index",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--pattern", required=True, help="Text, glob or regex to search for (required)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--glob", action="store_true", help="Pattern is a glob (matched against the file name unless it has a '/')")
+    mode.add_argument("--regex", action="store_true", help="Pattern is a regex (searched anywhere in the path)")
+    parser.add_argument("--limit", type=int, default=0, help="Print at most this many paths (default: all)")
+    parser.add_argument("--count", action="store_true", help="Print only the number of matches")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    mode = "glob" if args.glob else "regex" if args.regex else "substring"
+    result = vmtool.search_paths(args.disk, args.pattern, mode, args.limit)
+
+    if args.count:
+        print(result["total"])
+        return
+
+    for path in result["paths"]:
+        print(path)
+    if result["truncated"]:
+        print(f"... {result['total'] - len(result['paths'])} more matches")
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_search_paths_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    --pattern <text|glob|regex> \
+    [--glob | --regex] \
+    [--limit 100] \
+    [--count]
+"""
+
+# example input
+"""
+sudo python3 vmtool_search_paths_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm1.qcow2 \
+    --pattern '*.pem' \
+    --glob
+"""
@@ -0,0 +1,86 @@
+# file: vmtool_stream_file_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_stream_file_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Stream a file from inside a VM disk image to hash it, copy it out or grep it with constant memory
+
+import argparse
+import hashlib
+import sys
+import vmtool
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_stream_file_in_disk",
+        description="Stream a file from inside a VM disk image to hash it, copy it out or grep it with constant memory",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--name", required=True, help="Path to file inside the guest (e.g., /var/log/syslog)")
+    parser.add_argument("--hash", choices=sorted(hashlib.algorithms_guaranteed), help="Print this digest of the file (optional)")
+    parser.add_argument("--grep", help="Print lines containing this text (optional)")
+    parser.add_argument("--out", help="Copy the file to this host path (optional)")
+    parser.add_argument("--chunk-size", type=int, default=1024 * 1024, help="Bytes per read (default: 1 MiB)")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    digest = hashlib.new(args.hash) if args.hash else None
+    out = open(args.out, "wb") if args.out else None
+    needle = args.grep.encode() if args.grep else None
+
+    try:
+        with vmtool.open(args.disk, args.name) as f:
+            if needle is not None:
+                # Line iteration is served from the read-ahead buffer
+                for number, line in enumerate(f, start=1):
+                    if needle in line:
+                        sys.stdout.write(f"{number}: {line.decode(errors='replace')}")
+                    if digest:
+                        digest.update(line)
+                    if out:
+                        out.write(line)
+            else:
+                # One reusable buffer; readinto fills it without extra copies
+                buf = bytearray(args.chunk_size)
+                view = memoryview(buf)
+                while True:
+                    n = f.readinto(view)
+                    if not n:
+                        break
+                    if digest:
+                        digest.update(view[:n])
+                    if out:
+                        out.write(view[:n])
+    finally:
+        if out:
+            out.close()
+
+    if digest:
+        print(f"{digest.hexdigest()}  {args.name}")
+    if args.out:
+        print(f"Saved to: {args.out}")
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_stream_file_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    --name /var/log/syslog \
+    --hash sha256 \
+    --grep error
+"""
+
+# example input
+"""
+sudo python3 vmtool_stream_file_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm3.qcow2 \
+    --name /var/lib/mysql/ibdata1 \
+    --hash sha256 \
+    --out ibdata1.bin
+"""
@@ -0,0 +1,68 @@
+# file: vmtool_usage_tree_in_disk.py
+# location: VM-Diffing-Tool/frontend/vmtool_scripts/vmtool_usage_tree_in_disk.py
+# author: Akash Maji
+# date: 2026-10-19
+# version: 0.1
+# description: Show du-style directory usage of a VM disk image as a tree of its largest directories
+
+import argparse
+import json
+import vmtool
+
+def print_node(node, indent=0) -> None:
+    print(f"{'  ' * indent}{node['bytes']:>15}  {node['files']:>9} files  {node['path']}")
+    for child in node["children"]:
+        print_node(child, indent + 1)
+    # Directories at the depth limit list no children; only note the ones cut by --top-n
+    if node["children"] and node["more"]:
+        print(f"{'  ' * (indent + 1)}... {node['more']} more directories")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vmtool_usage_tree_in_disk",
+        description="Show du-style directory usage of a VM disk image as a tree of its largest directories",
+    )
+    parser.add_argument("--disk", required=True, help="Path to qcow2/raw disk image (required)")
+    parser.add_argument("--directory", default="/", help="Guest directory to start from (default: /)")
+    parser.add_argument("--max-depth", type=int, default=2, help="Levels of subdirectories to show (default: 2)")
+    parser.add_argument("--top-n", type=int, default=10, help="Largest subdirectories shown per directory (default: 10)")
+    parser.add_argument("--json", help="Path to write the tree as JSON")
+    return parser
+
+def main() -> None:
+    parser = build_parser()
+    args = parser.parse_args()
+
+    tree = vmtool.usage_tree(args.disk, args.max_depth, args.top_n, args.directory)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(tree, f, indent=2)
+        print(f"JSON saved to: {args.json}")
+        return
+
+    print(f"{'bytes':>15}  {'files':>15}  path")
+    print_node(tree)
+
+if __name__ == "__main__":
+    main()
+
+
+# USAGE
+"""
+sudo python3 vmtool_usage_tree_in_disk.py \
+    --disk /full/path/to/disk.qcow2 \
+    [--directory /] \
+    [--max-depth 2] \
+    [--top-n 10] \
+    [--json /full/path/to/usage.json]
+"""
+
+# example input
+"""
+sudo python3 vmtool_usage_tree_in_disk.py \
+    --disk /home/akashmaji/Desktop/vm1.qcow2 \
+    --directory /var \
+    --max-depth 3 \
+    --top-n 5
+"""